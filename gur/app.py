@@ -1,4 +1,10 @@
-from views import CliUpdateView, CliListPkgsView
+from views import (
+    CliUpdateView,
+    CliListPkgsView,
+    CliListOutdatedView,
+    CliSearchView,
+    CliPruneView
+)
 
 class App:
 
@@ -22,8 +28,29 @@ class App:
 
         """
         if self.args.update:
-            view = CliUpdateView()
+            view = CliUpdateView(
+                self.args.jobs,
+                self.args.full,
+                self.args.timings,
+                self.args.fetch_backend
+            )
             view.update()
+        elif self.args.materialize is not None:
+            view = CliUpdateView(
+                self.args.jobs,
+                timings=self.args.timings,
+                fetch_backend=self.args.fetch_backend
+            )
+            view.materialize(self.args.materialize)
         elif self.args.list_pkgs:
             view = CliListPkgsView()
             view.list_pkgs()
+        elif self.args.list_outdated:
+            view = CliListOutdatedView()
+            view.list_outdated()
+        elif self.args.search:
+            view = CliSearchView(self.args.search)
+            view.search()
+        elif self.args.prune:
+            view = CliPruneView()
+            view.prune()
@@ -1,12 +1,28 @@
 from abc import ABC, abstractmethod
+from json import loads
+from re import match
+from shutil import rmtree
+from time import monotonic, time
 
 import git
 import os
 
+from config_mgr import ConfigMgr
 from errors import error_map
+from fetch_profile import FetchProfile
+from git_plumbing import GitPlumbing
+from job_pool import JobPool
 from mirrors_mgr import MirrorsMgr
+from object_store import ObjectStore
 from package_database_mgr import PackageDatabaseMgr
 from package_desc import PackageDesc
+from package_pruner import PackagePruner
+from pkg_desc_reader import PkgDescReader
+from poll_scheduler import PollScheduler
+from remote_probe import RemoteProbe
+from search_index_mgr import SearchIndexMgr
+from synchronized_listener import SynchronizedListener
+from transfer_guard import TransferError
 from utils import Utils
 
 class Command(ABC):
@@ -75,9 +91,289 @@ class UpdateCmd(Command):
     Implementation of 'Update' command. The main goal of this command is to
     sync the local database with the upstream repositories.
 
+    The master repositories, and the package repositories of each of them, are
+    updated by pools of 'jobs' worker threads.
+
     """
 
-    class InitializeRepoCmd(Command):
+    class PkgRepoCmd(Command):
+
+        """
+        Base of the subcommands which sync a master repository and fetch its
+        package repositories.
+
+        The master repositories are checked out sparsely (unless disabled by
+        the 'sparse_checkout' option of 'update'), with only the package
+        descriptions gur reads.
+
+        In lazy mode ('lazy' option of 'update'), the packages nobody
+        installed are tracked by their upstream head only: no package
+        repository is created for them until they are materialized.
+
+        """
+
+        sparse_patterns = ['/src/*/pkg_desc.json']
+
+        def __init__(
+                self,
+                pkg_mgr,
+                repo_id,
+                pool=None,
+                probe=None,
+                object_store=None,
+                pkg_desc_reader=None,
+                fetch_profile=None,
+                plumbing=None):
+            """
+            Initialize the internal data shared by the subcommands.
+
+            :pkg_mgr: Package manager instance.
+            :repo_id: Identification of the repository.
+            :pool: Job pool where the packages are fetched. If not specified,
+                   the packages are fetched one after another.
+            :probe: Remote probe used to track the packages lazily. If not
+                    specified, all the packages are fetched.
+            :object_store: Shared object store where the packages are
+                           fetched, if any.
+            :pkg_desc_reader: Reader of the package descriptions from the
+                              object database. If not specified, they are
+                              read from the working tree.
+            :fetch_profile: Profile of the package fetches. If not specified,
+                            it's read from the configuration file.
+            :plumbing: Git plumbing of the package repositories. If not
+                       specified, the command has its own.
+
+            """
+            super().__init__()
+
+            self.pkg_mgr = pkg_mgr
+            self.repo_id = repo_id
+            self.pool = JobPool() if pool is None else pool
+            self.probe = probe
+            self.object_store = object_store
+            self.pkg_desc_reader = pkg_desc_reader
+            self.fetch_profile = (
+                FetchProfile.from_config() if fetch_profile is None
+                else fetch_profile
+            )
+            self.plumbing = GitPlumbing() if plumbing is None else plumbing
+            self.lazy = False
+            self.changed_pkgs = set()
+            self.pkg_stats = []
+
+        def is_sparse_checkout(self):
+            """
+            Verify if the master repositories are checked out sparsely.
+
+            :returns: True if they are; otherwise False.
+
+            """
+            return ConfigMgr.get_boolean('update', 'sparse_checkout', True)
+
+        def set_sparse_checkout(self, repo):
+            """
+            Limit the working tree of the master repository to the package
+            descriptions. The nested package repositories are untracked, so
+            they are kept.
+
+            :repo: The master repository.
+
+            """
+            with self.plumbing.process('sparse_checkout'):
+                repo.git.sparse_checkout(
+                    'set',
+                    '--no-cone',
+                    *self.sparse_patterns
+                )
+
+        def is_lazy(self):
+            """
+            Verify if the packages nobody installed are tracked lazily.
+
+            :returns: True if they are; otherwise False.
+
+            """
+            return ConfigMgr.get_boolean('update', 'lazy')
+
+        def probe_lazy_pkg(self, pkg):
+            """
+            Get, through the remote probe, the upstream head of a package
+            which can be tracked lazily.
+
+            :pkg: The package description.
+            :returns: The upstream head or None if the package must be
+                      materialized (lazy mode is disabled, the package is
+                      installed or already materialized, or it couldn't be
+                      probed).
+
+            """
+            if self.probe is None or not self.is_lazy_pkg(pkg):
+                return None
+
+            return self.probe.get_head(pkg.repo, pkg.branch)
+
+        def is_lazy_pkg(self, pkg):
+            """
+            Verify if a package can be tracked lazily.
+
+            :pkg: The package description.
+            :returns: True if lazy mode is enabled and the package is neither
+                      installed nor materialized; otherwise False.
+
+            """
+            return self.lazy and not os.path.isdir(pkg.dir) and \
+                not self.pkg_mgr.is_pkg_installed(pkg.name, self.repo_id)
+
+        def probe_pkgs(self, pkg_entries, is_probed):
+            """
+            Probe the upstreams of the packages whose checks will probe them,
+            in a single batch (see remote_probe), so the checks find their
+            heads cached instead of probing them one by one.
+
+            :pkg_entries: Names of the package entries.
+            :is_probed: Function which verifies if the check of a package will
+                        probe it, given its package entry and description.
+
+            """
+            if self.probe is None:
+                return
+
+            repo_urls = []
+
+            for pkg_entry in pkg_entries:
+                pkg = self.get_pkg_desc(pkg_entry)
+
+                if is_probed(pkg_entry, pkg):
+                    repo_urls.append(pkg.repo)
+
+            self.probe.probe_many(repo_urls)
+
+        def list_pkg_entries(self):
+            """
+            List the package entries of the master repository.
+
+            :returns: A list of package entries.
+
+            """
+            if self.pkg_desc_reader is not None:
+                return self.pkg_desc_reader.list_pkgs(self.repo_id)
+
+            src_dir = self.repo_id + '/src'
+
+            # the package repos of the installed packages deleted upstream
+            # are left without description
+            return [
+                pkg_entry for pkg_entry in os.listdir(src_dir)
+                if os.path.isfile(
+                    '{}/{}/pkg_desc.json'.format(src_dir, pkg_entry)
+                )
+            ]
+
+        def map_pkg_entries(self, fetch_pkg, listener, is_probed=None):
+            """
+            Run a function for each package entry of the master repository in
+            the job pool, yielding the results as the jobs finish. If the jobs
+            are interrupted (by an error, a timeout or a cancellation), the
+            packages left unfinished are reported.
+
+            :fetch_pkg: Function to be run, given a package entry.
+            :listener: Event listener to propagate the command events.
+            :is_probed: Function which verifies if the check of a package will
+                        probe it, given its package entry and description.
+                        If specified, those packages are probed in a batch
+                        beforehand (see probe_pkgs).
+
+            """
+            pkg_entries = list(self.list_pkg_entries())
+            unfinished = set(pkg_entries)
+
+            def run(pkg_entry):
+                result = fetch_pkg(pkg_entry)
+                unfinished.discard(pkg_entry)
+
+                return result
+
+            try:
+                if is_probed is not None:
+                    self.probe_pkgs(pkg_entries, is_probed)
+
+                yield from self.pool.map(run, pkg_entries)
+            finally:
+                if unfinished:
+                    listener.on_pkgs_unfinished(self.repo_id, sorted(unfinished))
+
+        def get_pkg_desc(self, pkg_entry):
+            """
+            Get the description of a package of the master repository.
+
+            :pkg_entry: Name of the package entry.
+            :returns: The package description.
+
+            """
+            if self.pkg_desc_reader is not None:
+                return self.pkg_desc_reader.get_pkg_desc(self.repo_id, pkg_entry)
+
+            return PackageDesc(self.repo_id, pkg_entry)
+
+        def fetch_origin(self, pkg_repo, pkg, listener):
+            """
+            Fetch the origin of a package repository, through the shared
+            object store if there is one.
+
+            :pkg_repo: The package repository.
+            :pkg: The package description.
+            :listener: Event listener to propagate the command events.
+
+            """
+            progress = CommandProgress(
+                listener,
+                'Fetching {} ...'.format(pkg.name)
+            )
+            fetch_args = self.fetch_profile.get_fetch_args(pkg.branch)
+
+            if self.object_store is not None:
+                self.object_store.fetch_into(
+                    pkg_repo,
+                    pkg.repo,
+                    pkg.branch,
+                    progress,
+                    **fetch_args
+                )
+            else:
+                self.plumbing.fetch(
+                    pkg_repo,
+                    progress=progress,
+                    **fetch_args
+                )
+
+        def resolve_entries(self, entries):
+            """
+            Resolve the fetched heads of package entries in a single pass (see
+            git_plumbing), once the packages of the master repository were
+            fetched.
+
+            :entries: List of (pkg_name, head, repo_id) tuples, whose head is
+                      either a commit hash or, for a fetched package, a
+                      (pkg_repo, branch_name) tuple.
+            :returns: The list of (pkg_name, head_commit, repo_id) tuples.
+
+            """
+            head_commits = iter(
+                self.plumbing.resolve_heads(
+                    [head for _, head, _ in entries if isinstance(head, tuple)]
+                )
+            )
+
+            return [
+                (
+                    pkg_name,
+                    next(head_commits) if isinstance(head, tuple) else head,
+                    repo_id
+                )
+                for pkg_name, head, repo_id in entries
+            ]
+
+    class InitializeRepoCmd(PkgRepoCmd):
 
         """
         Implementation of InitializeRepo subcommand, responsible for the
@@ -85,7 +381,19 @@ class UpdateCmd(Command):
 
         """
 
-        def __init__(self, pkg_mgr, repo_id, branch_name, repo_url):
+        def __init__(
+                self,
+                pkg_mgr,
+                repo_id,
+                branch_name,
+                repo_url,
+                search_idx=None,
+                pool=None,
+                probe=None,
+                object_store=None,
+                pkg_desc_reader=None,
+                fetch_profile=None,
+                plumbing=None):
             """
             Initialize the command internal data.
 
@@ -93,14 +401,36 @@ class UpdateCmd(Command):
             :repo_id: Identification of the repository.
             :branch_name: Name of the repository branch.
             :repo_url: Url of the repository.
+            :search_idx: Search index where the packages are staged, if any.
+            :pool: Job pool where the packages are fetched. If not specified,
+                   the packages are fetched one after another.
+            :probe: Remote probe used to track the packages lazily. If not
+                    specified, all the packages are fetched.
+            :object_store: Shared object store where the packages are
+                           fetched, if any.
+            :pkg_desc_reader: Reader of the package descriptions from the
+                              object database. If not specified, they are
+                              read from the working tree.
+            :fetch_profile: Profile of the package fetches. If not specified,
+                            it's read from the configuration file.
+            :plumbing: Git plumbing of the package repositories. If not
+                       specified, the command has its own.
 
             """
-            super().__init__()
+            super().__init__(
+                pkg_mgr,
+                repo_id,
+                pool,
+                probe,
+                object_store,
+                pkg_desc_reader,
+                fetch_profile,
+                plumbing
+            )
 
-            self.pkg_mgr = pkg_mgr
-            self.repo_id = repo_id
             self.branch_name = branch_name
             self.repo_url = repo_url
+            self.search_idx = search_idx
 
         def execute(self, listener):
             """
@@ -111,34 +441,82 @@ class UpdateCmd(Command):
             """
             listener.on_repo_update_start(self.repo_id, self.branch_name)
 
-            _ = git.Repo.clone_from(
+            is_sparse = self.is_sparse_checkout()
+            self.lazy = self.is_lazy()
+
+            repo = self.plumbing.clone_repo(
                 self.repo_url,
                 self.repo_id,
-                branch=self.branch_name,
-                progress=CommandProgress(listener, 'Cloning master repo ...')
+                self.branch_name,
+                is_sparse,
+                CommandProgress(listener, 'Cloning master repo ...')
             )
 
-            listener.on_repo_update_finish(self.repo_id, self.branch_name)
+            if is_sparse:
+                self.set_sparse_checkout(repo)
 
-            for pkg_entry in os.listdir(self.repo_id + '/src'):
-                pkg = PackageDesc(self.repo_id, pkg_entry)
+                with self.plumbing.process('reset'):
+                    repo.git.reset('--hard')
 
-                listener.on_pkg_update_start(pkg.name, pkg.branch)
+            listener.on_repo_update_finish(self.repo_id, self.branch_name)
+
+            entries = []
+            lazy_entries = []
 
-                pkg_repo = git.Repo.init(pkg.dir)
-                origin = pkg_repo.create_remote('origin', pkg.repo)
-                origin.fetch(
-                    progress=CommandProgress(
+            try:
+                for materialized, entry in self.map_pkg_entries(
+                        lambda pkg_entry: self.__fetch_pkg(pkg_entry, listener),
                         listener,
-                        'Fetching {} ...'.format(pkg.name)
-                    )
-                )
+                        lambda _, pkg: self.is_lazy_pkg(pkg)):
+                    if materialized:
+                        entries.append(entry)
+                    else:
+                        lazy_entries.append(entry)
+            finally:
+                # the packages fetched so far are recorded even on errors
+                if entries:
+                    self.pkg_mgr.add_entries(self.resolve_entries(entries))
+                if lazy_entries:
+                    self.pkg_mgr.add_entries(lazy_entries, materialized=False)
+
+                self.plumbing.release_master_repo(self.repo_id)
+
+        def __fetch_pkg(self, pkg_entry, listener):
+            """
+            Fetch the repository of a package, unless it's tracked lazily.
 
-                head_commit = pkg_repo.rev_parse('origin/{}'.format(pkg.branch))
-                self.pkg_mgr.add_entry(pkg.name, head_commit.hexsha)
+            :pkg_entry: Name of the package entry in the master repository.
+            :listener: Event listener to propagate the command events.
+            :returns: A (materialized, (pkg_name, head, repo_id)) tuple, whose
+                      head is resolved later if the package was fetched (see
+                      resolve_entries).
+
+            """
+            pkg = self.get_pkg_desc(pkg_entry)
+
+            if self.search_idx is not None:
+                self.search_idx.add_pkg(self.repo_id, pkg)
+
+            listener.on_pkg_update_start(pkg.name, pkg.branch)
+
+            remote_head = self.probe_lazy_pkg(pkg)
+
+            if remote_head is not None:
+                listener.on_update_progress(
+                    1, 1, 1, 'Probing {} ...'.format(pkg.name)
+                )
                 listener.on_pkg_update_finish(pkg.name, pkg.branch)
 
-    class UpdateRepoCmd(Command):
+                return (False, (pkg.name, remote_head, self.repo_id))
+
+            pkg_repo = self.plumbing.init_repo(pkg.dir, pkg.repo)
+            self.fetch_origin(pkg_repo, pkg, listener)
+
+            listener.on_pkg_update_finish(pkg.name, pkg.branch)
+
+            return (True, (pkg.name, (pkg_repo, pkg.branch), self.repo_id))
+
+    class UpdateRepoCmd(PkgRepoCmd):
 
         """
         Implementation of UpdateRepo subcommand, responsible for updating a new
@@ -146,16 +524,53 @@ class UpdateCmd(Command):
 
         """
 
-        def __init__(self, pkg_mgr, repo_id, branch_name):
+        def __init__(
+                self,
+                pkg_mgr,
+                repo_id,
+                branch_name,
+                search_idx=None,
+                pool=None,
+                probe=None,
+                object_store=None,
+                pkg_desc_reader=None,
+                fetch_profile=None,
+                scheduler=None,
+                plumbing=None):
             """
             Initialize the command internal data.
 
+            :probe: Remote probe used to skip the repositories which didn't
+                    change upstream and to track the packages lazily. If not
+                    specified, all the repositories are pulled/fetched.
+            :object_store: Shared object store where the packages are
+                           fetched, if any.
+            :pkg_desc_reader: Reader of the package descriptions from the
+                              object database. If not specified, they are
+                              read from the working tree.
+            :fetch_profile: Profile of the package fetches. If not specified,
+                            it's read from the configuration file.
+            :scheduler: Scheduler of the package checks, which skips the
+                        packages which aren't due. If not specified, all the
+                        packages are checked.
+            :plumbing: Git plumbing of the package repositories. If not
+                       specified, the command has its own.
+
             """
-            super().__init__()
+            super().__init__(
+                pkg_mgr,
+                repo_id,
+                pool,
+                probe,
+                object_store,
+                pkg_desc_reader,
+                fetch_profile,
+                plumbing
+            )
 
-            self.pkg_mgr = pkg_mgr
-            self.repo_id = repo_id
             self.branch_name = branch_name
+            self.search_idx = search_idx
+            self.scheduler = scheduler
 
         def execute(self, listener):
             """
@@ -166,107 +581,815 @@ class UpdateCmd(Command):
             """
             listener.on_repo_update_start(self.repo_id, self.branch_name)
 
-            repo = git.Repo(self.repo_id)
+            repo = self.plumbing.open_master_repo(self.repo_id)
+            old_head = repo.head.commit.hexsha
 
-            listener.on_update_progress(1, 0, 1, 'Pulling master repo ...')
-            repo.remotes.origin.pull(self.branch_name)
-            listener.on_update_progress(1, 1, 1, 'Pulling master repo ...')
+            listener.on_update_progress(1, 0, 1, 'Syncing master repo ...')
+            if not self.__is_master_repo_synced(repo):
+                self.__sync_master_repo(repo)
+            listener.on_update_progress(1, 1, 1, 'Syncing master repo ...')
 
             listener.on_repo_update_finish(self.repo_id, self.branch_name)
 
-            for pkg_entry in os.listdir(self.repo_id + '/src'):
-                pkg = PackageDesc(self.repo_id, pkg_entry)
-                pkg_repo = None
+            self.lazy = self.is_lazy()
+            self.changed_pkgs = set()
+            self.pkg_stats = []
 
-                listener.on_pkg_update_start(pkg.name, pkg.branch)
+            new_head = repo.head.commit.hexsha
+            if new_head != old_head:
+                self.__apply_tree_diff(repo, old_head, new_head, listener)
 
-                # new package for an existing repo
-                if not os.path.isdir(pkg.dir):
-                    os.mkdir(pkg.dir)
+            new_entries = []
+            entries = []
+            lazy_entries = []
 
-                    pkg_repo = git.Repo.init(pkg.dir)
-                    origin = pkg_repo.create_remote('origin', pkg.repo)
-                    origin.fetch(
-                        progress=CommandProgress(
-                            listener,
-                            'Fetching {} ...'.format(pkg.name)
-                        )
+            try:
+                for result in self.map_pkg_entries(
+                        lambda pkg_entry: self.__fetch_pkg(pkg_entry, listener),
+                        listener,
+                        self.__is_probed):
+                    # not due for a check
+                    if result is None:
+                        continue
+
+                    is_new, materialized, entry = result
+
+                    if not materialized:
+                        lazy_entries.append(entry)
+                    elif is_new:
+                        new_entries.append(entry)
+                    else:
+                        entries.append(entry)
+            finally:
+                # the packages fetched so far are recorded even on errors
+                resolved = self.resolve_entries(new_entries + entries)
+                new_entries = resolved[:len(new_entries)]
+                entries = resolved[len(new_entries):]
+
+                if new_entries:
+                    self.pkg_mgr.add_entries(new_entries)
+                if entries:
+                    self.pkg_mgr.update_entries(entries)
+                if lazy_entries:
+                    self.pkg_mgr.add_entries(lazy_entries, materialized=False)
+                if self.pkg_stats:
+                    self.pkg_mgr.set_stats_many(
+                        self.__record_checks(resolved + lazy_entries)
                     )
 
-                    head_commit = pkg_repo.rev_parse('origin/{}'.format(pkg.branch))
-                    self.pkg_mgr.add_entry(pkg.name, head_commit.hexsha)
-                else:
-                    pkg_repo = git.Repo(pkg.dir)
-                    pkg_repo.remotes.origin.fetch(
-                        progress=CommandProgress(
-                            listener,
-                            'Fetching {} ...'.format(pkg.name)
-                        )
+                self.plumbing.release_master_repo(self.repo_id)
+
+        def __record_checks(self, entries):
+            """
+            Record the checks of the packages into their statistics, once
+            their heads were resolved.
+
+            :entries: List of (pkg_name, head_commit, repo_id) tuples of the
+                      checked packages.
+            :returns: A list of (pkg_name, repo_id, stats) tuples.
+
+            """
+            head_commits = {entry[0]: entry[1] for entry in entries}
+
+            return [
+                (
+                    pkg_name,
+                    self.repo_id,
+                    self.scheduler.record_check(
+                        stats,
+                        head_commits[pkg_name] != remote_rev,
+                        fetch_time,
+                        check_time
                     )
+                )
+                for pkg_name, stats, remote_rev, fetch_time, check_time
+                in self.pkg_stats
+                if pkg_name in head_commits
+            ]
+
+        def __fetch_pkg(self, pkg_entry, listener):
+            """
+            Check a package, if it's due, recording the check statistics.
+
+            :pkg_entry: Name of the package entry in the master repository.
+            :listener: Event listener to propagate the command events.
+            :returns: A (is_new, materialized, (pkg_name, head, repo_id))
+                      tuple (see __check_pkg) or None if the package isn't
+                      due.
+
+            """
+            pkg = self.get_pkg_desc(pkg_entry)
+
+            if self.search_idx is not None:
+                self.search_idx.add_pkg(self.repo_id, pkg)
+
+            if self.scheduler is None:
+                return self.__check_pkg(pkg_entry, pkg, listener)
+
+            stats = self.pkg_mgr.get_stats(pkg.name, self.repo_id)
+
+            # the packages whose description changed are always checked
+            if pkg_entry not in self.changed_pkgs and \
+                    not self.scheduler.is_due(stats):
+                return None
+
+            remote_rev = self.pkg_mgr.get_remote_rev(pkg.name, self.repo_id)
+            start_time = monotonic()
+
+            result = self.__check_pkg(pkg_entry, pkg, listener)
+
+            # recorded once the head is resolved (see __record_checks)
+            self.pkg_stats.append(
+                (pkg.name, stats, remote_rev, monotonic() - start_time, time())
+            )
+
+            return result
+
+        def __is_probed(self, pkg_entry, pkg):
+            """
+            Verify if the check of a package will probe its upstream: the
+            package is due and its description didn't change, and it's either
+            materialized or tracked lazily.
+
+            :pkg_entry: Name of the package entry in the master repository.
+            :pkg: The package description.
+            :returns: True if it will; otherwise False.
+
+            """
+            if pkg_entry in self.changed_pkgs:
+                return False
+
+            if self.scheduler is not None and not self.scheduler.is_due(
+                    self.pkg_mgr.get_stats(pkg.name, self.repo_id)):
+                return False
+
+            return os.path.isdir(pkg.dir) or self.is_lazy_pkg(pkg)
+
+        def __check_pkg(self, pkg_entry, pkg, listener):
+            """
+            Fetch the repository of a package, initializing it if the package
+            is new, unless it's tracked lazily.
+
+            :pkg_entry: Name of the package entry in the master repository.
+            :pkg: The package description.
+            :listener: Event listener to propagate the command events.
+            :returns: A (is_new, materialized, (pkg_name, head, repo_id))
+                      tuple, whose head is resolved later if the package was
+                      fetched (see resolve_entries).
 
-                    head_commit = pkg_repo.rev_parse('origin/{}'.format(pkg.branch))
-                    self.pkg_mgr.update_entry(pkg.name, head_commit.hexsha)
+            """
+            pkg_repo = None
+            is_new = False
+
+            listener.on_pkg_update_start(pkg.name, pkg.branch)
 
+            remote_head = self.probe_lazy_pkg(pkg)
+
+            if remote_head is not None:
+                listener.on_update_progress(
+                    1, 1, 1, 'Probing {} ...'.format(pkg.name)
+                )
                 listener.on_pkg_update_finish(pkg.name, pkg.branch)
 
-    def __init__(self, pkg_mgr=None):
+                return (is_new, False, (pkg.name, remote_head, self.repo_id))
+
+            # new package for an existing repo
+            if not os.path.isdir(pkg.dir):
+                os.mkdir(pkg.dir)
+
+                pkg_repo = self.plumbing.init_repo(pkg.dir, pkg.repo)
+                self.fetch_origin(pkg_repo, pkg, listener)
+                is_new = True
+            elif pkg_entry in self.changed_pkgs:
+                # the description changed, so the upstream may have moved
+                pkg_repo = self.plumbing.open_repo(pkg.dir)
+
+                if self.plumbing.get_origin_url(pkg_repo) != pkg.repo:
+                    self.plumbing.set_origin(pkg_repo, pkg.repo)
+
+                self.fetch_origin(pkg_repo, pkg, listener)
+            else:
+                remote_head = self.__probe_pkg(pkg)
+
+                # nothing changed upstream since the last update
+                if remote_head is not None:
+                    listener.on_update_progress(
+                        1, 1, 1, 'Fetching {} ...'.format(pkg.name)
+                    )
+                    listener.on_pkg_update_finish(pkg.name, pkg.branch)
+
+                    return (is_new, True, (pkg.name, remote_head, self.repo_id))
+
+                pkg_repo = self.plumbing.open_repo(pkg.dir)
+                self.fetch_origin(pkg_repo, pkg, listener)
+
+            listener.on_pkg_update_finish(pkg.name, pkg.branch)
+
+            return (
+                is_new,
+                True,
+                (pkg.name, (pkg_repo, pkg.branch), self.repo_id)
+            )
+
+        def __apply_tree_diff(self, repo, old_head, new_head, listener):
+            """
+            Apply the changes of the package descriptions between two commits
+            of the master repository: the changed packages are recorded in
+            'changed_pkgs' and the deleted ones are removed from the package
+            database, along with their package repositories, unless they're
+            installed.
+
+            :repo: The master repository.
+            :old_head: Hash of the previous head commit.
+            :new_head: Hash of the new head commit.
+            :listener: Event listener to propagate the command events.
+
+            """
+            deleted_pkgs = {}
+
+            with self.plumbing.process('diff'):
+                diffs = repo.commit(old_head).diff(new_head, paths='src')
+
+            for diff in diffs:
+                old_pkg_entry = self.__get_pkg_entry(diff.a_path)
+                new_pkg_entry = self.__get_pkg_entry(diff.b_path)
+
+                if diff.deleted_file or diff.renamed_file:
+                    if old_pkg_entry is not None:
+                        pkg_desc_content = loads(
+                            diff.a_blob.data_stream.read().decode('utf-8')
+                        )
+                        deleted_pkgs[old_pkg_entry] = pkg_desc_content['name']
+
+                if not diff.deleted_file and new_pkg_entry is not None:
+                    self.changed_pkgs.add(new_pkg_entry)
+
+            removed_entries = []
+
+            for pkg_entry, pkg_name in deleted_pkgs.items():
+                # the package description was moved back in the same range
+                if pkg_entry in self.changed_pkgs:
+                    continue
+
+                listener.on_pkg_remove(pkg_name)
+
+                # the entry and the package repo of an installed package are
+                # kept, so it isn't forgotten by the package manager
+                if self.pkg_mgr.is_pkg_installed(pkg_name, self.repo_id):
+                    continue
+
+                rmtree('{}/src/{}'.format(self.repo_id, pkg_entry), True)
+                removed_entries.append((pkg_name, self.repo_id))
+
+            if removed_entries:
+                self.pkg_mgr.remove_entries(removed_entries)
+
+        @staticmethod
+        def __get_pkg_entry(path):
+            """
+            Get the package entry of a package description path.
+
+            :path: Path in the master repository.
+            :returns: The package entry or None if the path isn't a package
+                      description.
+
+            """
+            if path is None:
+                return None
+
+            found = match('^src/([^/]+)/pkg_desc\\.json$', path)
+
+            return found.group(1) if found else None
+
+        def __sync_master_repo(self, repo):
+            """
+            Sync the master repository with its upstream: the branch is
+            fetched and the local branch, index and working tree are reset to
+            it, so the sync never merges.
+
+            :repo: The master repository.
+
+            """
+            self.plumbing.fetch(
+                repo,
+                '+refs/heads/{0}:refs/remotes/origin/{0}'.format(
+                    self.branch_name
+                )
+            )
+
+            # master repositories cloned before the sparse checkout
+            sparse_file = '{}/.git/info/sparse-checkout'.format(self.repo_id)
+            if self.is_sparse_checkout() and not os.path.isfile(sparse_file):
+                self.set_sparse_checkout(repo)
+
+            with self.plumbing.process('reset'):
+                repo.git.reset('--hard', 'origin/{}'.format(self.branch_name))
+
+        def __is_master_repo_synced(self, repo):
+            """
+            Verify, through the remote probe, if the master repository is in
+            sync with its upstream.
+
+            :repo: The master repository.
+            :returns: True if the upstream head is the local one; otherwise
+                      False (or if it couldn't be probed).
+
+            """
+            if self.probe is None:
+                return False
+
+            remote_head = self.probe.get_head(
+                repo.remotes.origin.url,
+                self.branch_name
+            )
+
+            return remote_head is not None and remote_head == repo.head.commit.hexsha
+
+        def __probe_pkg(self, pkg):
+            """
+            Verify, through the remote probe, if the upstream head of a package
+            is the one recorded by the last update.
+
+            :pkg: The package description.
+            :returns: The upstream head if it didn't change; otherwise None
+                      (or if it couldn't be probed).
+
+            """
+            if self.probe is None:
+                return None
+
+            remote_head = self.probe.get_head(pkg.repo, pkg.branch)
+
+            if remote_head is None:
+                return None
+
+            if remote_head != self.pkg_mgr.get_remote_rev(pkg.name, self.repo_id):
+                return None
+
+            return remote_head
+
+    def __init__(
+            self,
+            pkg_mgr=None,
+            search_idx=None,
+            jobs=1,
+            probe=None,
+            object_store=None,
+            pkg_desc_reader=None,
+            full=False,
+            fetch_backend=None):
         """
         Initialize the command dependencies.
 
+        :jobs: Maximum number of repositories updated at the same time.
+        :object_store: Shared object store of the package repositories. If not
+                       specified, it's used only if enabled in the
+                       configuration file ('shared' option of 'store').
+        :pkg_desc_reader: Reader of the package descriptions from the object
+                          database. If not specified, it's used only if
+                          enabled in the configuration file ('odb_pkg_desc'
+                          option of 'update').
+        :full: If True, all the packages are checked, even the ones which
+               aren't due according to the adaptive schedule (enabled by the
+               'adaptive' option of 'schedule').
+        :fetch_backend: Name of the backend which clones and fetches the
+                        repositories. If not specified, it's read from the
+                        configuration file ('backend' option of 'fetch').
+
         """
         self.pkg_mgr = PackageDatabaseMgr() if not pkg_mgr else pkg_mgr
+        self.search_idx = SearchIndexMgr() if not search_idx else search_idx
+        self.jobs = jobs
+        self.scheduler = (
+            PollScheduler.from_config(full)
+            if ConfigMgr.get_boolean('schedule', 'adaptive') else None
+        )
+        self.plumbing = GitPlumbing(fetch_backend)
+        self.probe = RemoteProbe(self.plumbing) if not probe else probe
+
+        if object_store is None and ConfigMgr.get_boolean('store', 'shared'):
+            object_store = ObjectStore(plumbing=self.plumbing)
+
+        self.object_store = object_store
+
+        if pkg_desc_reader is None and \
+                ConfigMgr.get_boolean('update', 'odb_pkg_desc'):
+            pkg_desc_reader = PkgDescReader(plumbing=self.plumbing)
+
+        self.pkg_desc_reader = pkg_desc_reader
 
     def execute(self, listener):
         """
-        Execute the update command.
+        Execute the update command. On SIGINT or SIGTERM, the git transfers
+        are cancelled (see transfer_guard) and the update winds up, recording
+        what was fetched so far, before the signal is raised again.
 
         :listener: Listener to report the command events.
 
         """
-        self.pkg_mgr.switch_dir()
+        if self.jobs > 1:
+            listener = SynchronizedListener(listener)
+
+        with self.plumbing.guard.handle_signals():
+            self.pkg_mgr.switch_dir()
+            self.pkg_mgr.lock()
 
-        listener.on_update_start()
-        for repo_entry in MirrorsMgr.get_mirrors():
             try:
-                branch_name,repo_url = repo_entry.split(',')
-                repo_id = Utils.get_repo_id(repo_url)
-                inner_cmd = None
+                with JobPool(self.jobs) as master_pool, \
+                        JobPool(self.jobs) as pkg_pool:
+                    self.__update_mirrors(listener, master_pool, pkg_pool)
+            finally:
+                self.plumbing.close()
+                self.pkg_mgr.unlock()
+
+    def __update_mirrors(self, listener, master_pool, pkg_pool):
+        """
+        Update all the master repositories of the mirrors file.
+
+        :listener: Listener to report the command events.
+        :master_pool: Job pool where the master repositories are updated.
+        :pkg_pool: Job pool where the package repositories are fetched.
+
+        """
+        listener.on_update_start()
+
+        updated = all(
+            list(
+                master_pool.map(
+                    lambda repo_entry: self.__update_master_repo(
+                        listener,
+                        repo_entry,
+                        pkg_pool
+                    ),
+                    MirrorsMgr.get_mirrors()
+                )
+            )
+        )
+
+        # a failed update may leave the package repos half linked to the
+        # object store, so nothing is pruned then
+        if updated:
+            self.__prune(listener)
+
+        self.search_idx.save()
+
+        if self.pkg_desc_reader is not None:
+            self.pkg_desc_reader.save()
+
+        listener.on_update_finish()
+        listener.on_git_timings(
+            self.plumbing.get_timings(),
+            self.plumbing.get_counters()
+        )
+
+    def __prune(self, listener):
+        """
+        Prune the master repositories removed from the mirrors file and the
+        store repositories no longer borrowed by any package (see
+        package_pruner).
+
+        :listener: Listener to report the command events.
+
+        """
+        pruner = PackagePruner(self.pkg_mgr, self.search_idx, self.object_store)
+        pruned = pruner.prune_master_repos()
+
+        for repo_id in pruned:
+            listener.on_master_repo_remove(repo_id)
+
+        if pruned:
+            self.pkg_mgr.flush()
+
+        pruner.prune_object_store()
+
+    def __update_master_repo(self, listener, repo_entry, pkg_pool):
+        """
+        Update a master repository of the mirrors file. The errors are
+        reported to the listener.
+
+        :listener: Listener to report the command events.
+        :repo_entry: The mirrors file entry, in 'branch,url' format.
+        :pkg_pool: Job pool where the package repositories are fetched.
+        :returns: True if the master repository was updated; otherwise False.
+
+        """
+        try:
+            branch_name,repo_url = repo_entry.split(',')
+            repo_id = Utils.get_repo_id(repo_url)
+            inner_cmd = None
+
+            listener.on_master_repo_update_start(
+                repo_id,
+                branch_name
+            )
 
-                listener.on_master_repo_update_start(
+            if os.path.isdir(repo_id):
+                inner_cmd = UpdateCmd.UpdateRepoCmd(
+                    self.pkg_mgr,
                     repo_id,
-                    branch_name
+                    branch_name,
+                    self.search_idx,
+                    pkg_pool,
+                    self.probe,
+                    self.object_store,
+                    self.pkg_desc_reader,
+                    scheduler=self.scheduler,
+                    plumbing=self.plumbing
+                )
+            else:
+                inner_cmd = UpdateCmd.InitializeRepoCmd(
+                    self.pkg_mgr,
+                    repo_id,
+                    branch_name,
+                    repo_url,
+                    self.search_idx,
+                    pkg_pool,
+                    self.probe,
+                    self.object_store,
+                    self.pkg_desc_reader,
+                    plumbing=self.plumbing
                 )
 
-                if os.path.isdir(repo_id):
-                    inner_cmd = UpdateCmd.UpdateRepoCmd(
-                        self.pkg_mgr,
-                        repo_id,
-                        branch_name
-                    )
-                else:
-                    inner_cmd = UpdateCmd.InitializeRepoCmd(
-                        self.pkg_mgr,
-                        repo_id,
-                        branch_name,
-                        repo_url
-                    )
+            self.search_idx.discard_repo(repo_id)
 
+            try:
                 inner_cmd.execute(listener)
+            finally:
+                # the changes are written back once per master repo
+                self.pkg_mgr.flush()
 
-                listener.on_master_repo_update_finish(
-                    repo_id,
-                    branch_name
+            self.search_idx.commit_repo(repo_id)
+
+            listener.on_master_repo_update_finish(
+                repo_id,
+                branch_name
+            )
+
+            return True
+        except git.GitCommandError as err:
+            listener.on_update_progress(1, 1, 1, '')
+            listener.on_error(
+                '{} {}'.format(
+                    error_map.get(err.command[1], error_map['unknown']),
+                    repo_id
                 )
-            except git.GitCommandError as err:
-                listener.on_update_progress(1, 1, 1, '')
-                listener.on_error(
-                    '{} {}'.format(error_map[err.command[1]], repo_id)
+            )
+        except TransferError as err:
+            listener.on_update_progress(1, 1, 1, '')
+            listener.on_error(
+                '{} {}: {}'.format(error_map[err.error_key], repo_id, err)
+            )
+        except Exception:
+            listener.on_update_progress(1, 1, 1, '')
+            listener.on_error(error_map['unknown'])
+
+        return False
+
+class MaterializeCmd(Command):
+
+    """
+    Implementation of 'Materialize' command. The main goal of this command is
+    to fetch the package repositories of the packages which the update command
+    tracks lazily, by their upstream head only.
+
+    """
+
+    class MaterializeRepoCmd(UpdateCmd.PkgRepoCmd):
+
+        """
+        Implementation of MaterializeRepo subcommand, responsible for fetching
+        the lazily tracked packages of a master repository.
+
+        """
+
+        def __init__(
+                self,
+                pkg_mgr,
+                repo_id,
+                pkg_names,
+                pool=None,
+                object_store=None,
+                pkg_desc_reader=None,
+                fetch_profile=None,
+                plumbing=None):
+            """
+            Initialize the command internal data.
+
+            :pkg_mgr: Package manager instance.
+            :repo_id: Identification of the repository.
+            :pkg_names: Names of the packages to be materialized.
+            :pool: Job pool where the packages are fetched. If not specified,
+                   the packages are fetched one after another.
+            :object_store: Shared object store where the packages are
+                           fetched, if any.
+            :pkg_desc_reader: Reader of the package descriptions from the
+                              object database. If not specified, they are
+                              read from the working tree.
+            :fetch_profile: Profile of the package fetches. If not specified,
+                            it's read from the configuration file.
+            :plumbing: Git plumbing of the package repositories. If not
+                       specified, the command has its own.
+
+            """
+            super().__init__(
+                pkg_mgr,
+                repo_id,
+                pool,
+                object_store=object_store,
+                pkg_desc_reader=pkg_desc_reader,
+                fetch_profile=fetch_profile,
+                plumbing=plumbing
+            )
+
+            self.pkg_names = pkg_names
+
+        def execute(self, listener):
+            """
+            Run the command.
+
+            :listener: Event listener to propagate the command events.
+
+            """
+            entries = []
+
+            try:
+                for entry in self.pool.map(
+                        lambda pkg_entry: self.__fetch_pkg(pkg_entry, listener),
+                        self.list_pkg_entries()):
+                    if entry is not None:
+                        entries.append(entry)
+            except BaseException:
+                # interrupted by an error, a timeout or a cancellation
+                listener.on_pkgs_unfinished(
+                    self.repo_id,
+                    sorted(set(self.pkg_names) - {entry[0] for entry in entries})
                 )
-            except Exception:
-                listener.on_update_progress(1, 1, 1, '')
-                listener.on_error(error_map['unknown'])
+                raise
+            finally:
+                # the packages fetched so far are recorded even on errors
+                if entries:
+                    self.pkg_mgr.add_entries(self.resolve_entries(entries))
 
-        listener.on_update_finish()
+        def __fetch_pkg(self, pkg_entry, listener):
+            """
+            Fetch the repository of a package, if it's one of the packages to
+            be materialized.
+
+            :pkg_entry: Name of the package entry in the master repository.
+            :listener: Event listener to propagate the command events.
+            :returns: The (pkg_name, head, repo_id) tuple of the package, whose
+                      head is resolved later (see resolve_entries), or None if
+                      it was skipped.
+
+            """
+            pkg = self.get_pkg_desc(pkg_entry)
+
+            if pkg.name not in self.pkg_names:
+                return None
+
+            listener.on_pkg_update_start(pkg.name, pkg.branch)
+
+            # an interrupted materialization is reinitialized
+            pkg_repo = self.plumbing.init_repo(pkg.dir, pkg.repo)
+            self.fetch_origin(pkg_repo, pkg, listener)
+
+            listener.on_pkg_update_finish(pkg.name, pkg.branch)
+
+            return (pkg.name, (pkg_repo, pkg.branch), self.repo_id)
+
+    def __init__(
+            self,
+            pkg_names=None,
+            pkg_mgr=None,
+            jobs=1,
+            object_store=None,
+            pkg_desc_reader=None,
+            fetch_backend=None):
+        """
+        Initialize the command dependencies.
+
+        :pkg_names: Names of the packages to be materialized. If not
+                    specified, all the lazily tracked packages are.
+        :jobs: Maximum number of packages fetched at the same time.
+        :object_store: Shared object store of the package repositories. If not
+                       specified, it's used only if enabled in the
+                       configuration file ('shared' option of 'store').
+        :pkg_desc_reader: Reader of the package descriptions from the object
+                          database. If not specified, it's used only if
+                          enabled in the configuration file ('odb_pkg_desc'
+                          option of 'update').
+        :fetch_backend: Name of the backend which fetches the repositories. If
+                        not specified, it's read from the configuration file
+                        ('backend' option of 'fetch').
+
+        """
+        self.pkg_names = pkg_names
+        self.pkg_mgr = PackageDatabaseMgr() if not pkg_mgr else pkg_mgr
+        self.jobs = jobs
+
+        self.plumbing = GitPlumbing(fetch_backend)
+
+        if object_store is None and ConfigMgr.get_boolean('store', 'shared'):
+            object_store = ObjectStore(plumbing=self.plumbing)
+
+        self.object_store = object_store
+
+        if pkg_desc_reader is None and \
+                ConfigMgr.get_boolean('update', 'odb_pkg_desc'):
+            pkg_desc_reader = PkgDescReader(plumbing=self.plumbing)
+
+        self.pkg_desc_reader = pkg_desc_reader
+
+    def execute(self, listener):
+        """
+        Execute the materialize command. On SIGINT or SIGTERM, the git
+        transfers are cancelled, like on the update.
+
+        :listener: Listener to report the command events.
+
+        """
+        if self.jobs > 1:
+            listener = SynchronizedListener(listener)
+
+        with self.plumbing.guard.handle_signals():
+            self.pkg_mgr.switch_dir()
+            self.pkg_mgr.lock()
+
+            try:
+                listener.on_update_start()
+
+                lazy_pkgs = {}
+
+                for entry in self.pkg_mgr.get_lazy_entries():
+                    if not self.pkg_names or entry['name'] in self.pkg_names:
+                        lazy_pkgs.setdefault(
+                            entry['repo'],
+                            set()
+                        ).add(entry['name'])
+
+                with JobPool(self.jobs) as pool:
+                    for repo_id, pkg_names in sorted(lazy_pkgs.items()):
+                        self.__materialize_master_repo(
+                            listener,
+                            repo_id,
+                            pkg_names,
+                            pool
+                        )
+
+                if self.pkg_desc_reader is not None:
+                    self.pkg_desc_reader.save()
+
+                listener.on_update_finish()
+                listener.on_git_timings(
+                    self.plumbing.get_timings(),
+                    self.plumbing.get_counters()
+                )
+            finally:
+                self.plumbing.close()
+                self.pkg_mgr.unlock()
+
+    def __materialize_master_repo(self, listener, repo_id, pkg_names, pool):
+        """
+        Materialize the lazily tracked packages of a master repository. The
+        errors are reported to the listener.
+
+        :listener: Listener to report the command events.
+        :repo_id: Identification of the master repository.
+        :pkg_names: Names of the packages to be materialized.
+        :pool: Job pool where the package repositories are fetched.
+
+        """
+        try:
+            inner_cmd = MaterializeCmd.MaterializeRepoCmd(
+                self.pkg_mgr,
+                repo_id,
+                pkg_names,
+                pool,
+                self.object_store,
+                self.pkg_desc_reader,
+                plumbing=self.plumbing
+            )
+
+            try:
+                inner_cmd.execute(listener)
+            finally:
+                self.pkg_mgr.flush()
+        except git.GitCommandError as err:
+            listener.on_update_progress(1, 1, 1, '')
+            listener.on_error(
+                '{} {}'.format(
+                    error_map.get(err.command[1], error_map['unknown']),
+                    repo_id
+                )
+            )
+        except TransferError as err:
+            listener.on_update_progress(1, 1, 1, '')
+            listener.on_error(
+                '{} {}: {}'.format(error_map[err.error_key], repo_id, err)
+            )
+        except Exception:
+            listener.on_update_progress(1, 1, 1, '')
+            listener.on_error(error_map['unknown'])
 
 class ListPkgsCmd(Command):
 
@@ -292,6 +1415,10 @@ class ListPkgsCmd(Command):
         """
         self.pkg_mgr.switch_dir()
 
+        # the installed packages are queried only once, so the status of every
+        # package is a set lookup
+        installed_pkgs = self.pkg_mgr.get_installed_pkgs()
+
         for entry in os.listdir():
             if not os.path.isdir(entry):
                 continue
@@ -299,11 +1426,148 @@ class ListPkgsCmd(Command):
             for pkg_repo in os.listdir(entry):
                 repo_id = '{}/{}'.format(entry, pkg_repo)
 
+                # the shared object store and the database shards live in the
+                # package dir as well, so only the master repos are listed
+                if not os.path.isdir('{}/.git'.format(repo_id)) or \
+                        not os.path.isdir('{}/src'.format(repo_id)):
+                    continue
+
                 listener.on_pkg_list_start(repo_id)
 
                 for pkg_entry in os.listdir('{}/src'.format(repo_id)):
-                    is_installed = self.pkg_mgr.is_pkg_installed(pkg_entry)
+                    # entries written before the database was keyed by
+                    # repository have no repository ID
+                    is_installed = (
+                        (repo_id, pkg_entry) in installed_pkgs or
+                        ('', pkg_entry) in installed_pkgs
+                    )
 
                     listener.on_pkg_show(pkg_entry, is_installed)
 
                 listener.on_pkg_list_finish(repo_id)
+
+class ListOutdatedCmd(Command):
+
+    """
+    Implementation of 'ListOutdated' command. The main goal of this command is
+    to list the installed packages which have a new revision available.
+
+    """
+
+    def __init__(self, pkg_mgr=None):
+        """
+        Initialize the command dependencies.
+
+        """
+        self.pkg_mgr = PackageDatabaseMgr() if not pkg_mgr else pkg_mgr
+
+    def execute(self, listener):
+        """
+        Execute the list-outdated command.
+
+        :listener: Listener to report the command events.
+
+        """
+        listener.on_outdated_list_start()
+
+        outdated_pkgs = self.pkg_mgr.get_outdated_pkgs()
+        for entry in outdated_pkgs:
+            listener.on_pkg_outdated(
+                entry['repo'],
+                entry['name'],
+                entry['rev']['local'],
+                entry['rev']['remote']
+            )
+
+        listener.on_outdated_list_finish(len(outdated_pkgs))
+
+class PruneCmd(Command):
+
+    """
+    Implementation of 'Prune' command. The main goal of this command is to
+    remove what is left behind by the packages removed upstream and by the
+    master repositories removed from the mirrors file.
+
+    """
+
+    def __init__(self, pkg_mgr=None, search_idx=None, object_store=None):
+        """
+        Initialize the command dependencies.
+
+        """
+        self.pkg_mgr = PackageDatabaseMgr() if not pkg_mgr else pkg_mgr
+        self.search_idx = SearchIndexMgr() if not search_idx else search_idx
+        self.object_store = object_store
+
+    def execute(self, listener):
+        """
+        Execute the prune command. The package entries are removed in a single
+        batch, once everything was pruned.
+
+        :listener: Listener to report the command events.
+
+        """
+        self.pkg_mgr.switch_dir()
+        self.pkg_mgr.lock()
+
+        try:
+            listener.on_prune_start()
+
+            pruner = PackagePruner(
+                self.pkg_mgr,
+                self.search_idx,
+                self.object_store
+            )
+            count = 0
+
+            for repo_id, pkg_names in pruner.prune_master_repos(True).items():
+                listener.on_master_repo_prune(repo_id)
+                count += len(pkg_names)
+
+            for repo_id, pkg_names in pruner.prune_pkgs().items():
+                for pkg_name in pkg_names:
+                    listener.on_pkg_prune(repo_id, pkg_name)
+
+                count += len(pkg_names)
+
+            pruner.prune_object_store()
+
+            self.pkg_mgr.flush()
+            self.search_idx.save()
+
+            listener.on_prune_finish(count)
+        finally:
+            self.pkg_mgr.unlock()
+
+class SearchCmd(Command):
+
+    """
+    Implementation of 'Search' command. The main goal of this command is to
+    find packages through the search index built by the update command.
+
+    """
+
+    def __init__(self, query, search_idx=None):
+        """
+        Initialize the command dependencies.
+
+        :query: The search query.
+
+        """
+        self.query = query
+        self.search_idx = SearchIndexMgr() if not search_idx else search_idx
+
+    def execute(self, listener):
+        """
+        Execute the search command.
+
+        :listener: Listener to report the command events.
+
+        """
+        listener.on_search_start(self.query)
+
+        results = self.search_idx.search(self.query)
+        for doc in results:
+            listener.on_pkg_found(doc['repo_id'], doc['name'], doc['description'])
+
+        listener.on_search_finish(self.query, len(results))
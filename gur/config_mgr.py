@@ -0,0 +1,44 @@
+from configparser import ConfigParser
+
+class ConfigMgr:
+
+    """
+    Implementation of the class responsible for the management of the
+    configuration file.
+
+    """
+
+    config_file = '/etc/gur/gur.conf'
+
+    @classmethod
+    def get(cls, section, option, fallback=None):
+        """
+        Get an option from the configuration file.
+
+        :section: Name of the section of the option.
+        :option: Name of the option.
+        :fallback: Value returned when the option is not set.
+        :returns: The option value.
+
+        """
+        config = ConfigParser()
+        config.read(cls.config_file)
+
+        return config.get(section, option, fallback=fallback)
+
+    @classmethod
+    def get_boolean(cls, section, option, fallback=False):
+        """
+        Get a boolean option ('yes'/'no', 'true'/'false', 'on'/'off', '1'/'0')
+        from the configuration file.
+
+        :section: Name of the section of the option.
+        :option: Name of the option.
+        :fallback: Value returned when the option is not set.
+        :returns: The option value.
+
+        """
+        config = ConfigParser()
+        config.read(cls.config_file)
+
+        return config.getboolean(section, option, fallback=fallback)
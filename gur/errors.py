@@ -4,5 +4,9 @@ error_map = {
     'clone': 'Fail to clone the repository',
     'fetch': 'Fail to fetch date from upstream repository',
     'pull': 'Fail to pull the repository',
+    'reset': 'Fail to reset the repository',
+    'sparse-checkout': 'Fail to set the sparse checkout of the repository',
+    'timeout': 'Timed out while transferring the repository',
+    'cancel': 'Cancelled the update of the repository',
     'unknown': 'Unknown error'
 }
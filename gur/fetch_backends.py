@@ -0,0 +1,609 @@
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+
+import git
+from git.util import hex_to_bin
+from gitdb.exc import BadObject
+
+class FetchBackend(ABC):
+
+    """
+    Definition of the interface for the backends which clone and fetch the
+    repositories.
+
+    The repositories are handled through the objects of the backend, except
+    the master repositories, which are always GitPython repositories: the
+    sparse checkout, the tree diffs and the package descriptions need them.
+
+    The fetch arguments are the keyword arguments of GitPython's Remote.fetch
+    (see fetch_profile), plus the progress handler (a RemoteProgress).
+
+    The clones and fetches run with the environment of their transfer (see
+    transfer_guard), if any, so the guard can bound and kill their git
+    processes.
+
+    """
+
+    @abstractmethod
+    def clone_repo(
+            self,
+            repo_url,
+            path,
+            branch_name,
+            no_checkout=False,
+            progress=None,
+            transfer=None):
+        """
+        Clone a master repository.
+
+        :repo_url: Url of the repository.
+        :path: Path of the clone.
+        :branch_name: Name of the branch checked out.
+        :no_checkout: If True, the working tree isn't checked out.
+        :progress: Progress handler of the clone.
+        :transfer: Transfer watched by the transfer guard, if any.
+        :returns: The GitPython repository.
+
+        """
+        pass # pragma: no cover
+
+    @abstractmethod
+    def init_repo(self, path, repo_url, bare=False):
+        """
+        Create a repository, or reinitialize an existing one, with its origin
+        remote pointing to a given url.
+
+        :path: Path of the repository.
+        :repo_url: Url of the origin remote.
+        :bare: If True, the repository is created without working tree.
+        :returns: The repository.
+
+        """
+        pass # pragma: no cover
+
+    @abstractmethod
+    def open_repo(self, path):
+        """
+        Open an existing repository.
+
+        :path: Path of the repository.
+        :returns: The repository.
+
+        """
+        pass # pragma: no cover
+
+    @abstractmethod
+    def close_repo(self, repo):
+        """
+        Release the resources of a repository: its helper processes, file
+        descriptors and memory maps. The repository is still usable.
+
+        :repo: The repository.
+
+        """
+        pass # pragma: no cover
+
+    @abstractmethod
+    def get_git_dir(self, repo):
+        """
+        Get the git dir of a repository.
+
+        :repo: The repository.
+        :returns: The path of the git dir.
+
+        """
+        pass # pragma: no cover
+
+    @abstractmethod
+    def get_origin_url(self, repo):
+        """
+        Get the url of the origin remote of a repository.
+
+        :repo: The repository.
+        :returns: The url of the origin remote.
+
+        """
+        pass # pragma: no cover
+
+    @abstractmethod
+    def set_origin(self, repo, repo_url):
+        """
+        Point the origin remote of a repository to a given url.
+
+        :repo: The repository.
+        :repo_url: Url of the origin remote.
+
+        """
+        pass # pragma: no cover
+
+    @abstractmethod
+    def fetch(self, repo, *refspecs, transfer=None, **fetch_args):
+        """
+        Fetch the origin remote of a repository.
+
+        :repo: The repository.
+        :refspecs: The refspecs. If not specified, the ones of the remote are
+                   fetched.
+        :transfer: Transfer watched by the transfer guard, if any.
+        :fetch_args: The fetch arguments.
+
+        """
+        pass # pragma: no cover
+
+    @abstractmethod
+    def rev_parse(self, repo, rev):
+        """
+        Resolve a revision of a repository.
+
+        :repo: The repository.
+        :rev: The revision.
+        :returns: The hash of the commit.
+
+        """
+        pass # pragma: no cover
+
+    @abstractmethod
+    def update_ref(self, repo, ref_path, head_commit):
+        """
+        Point a ref of a repository to a commit, which may live in the
+        alternates of the repository.
+
+        :repo: The repository.
+        :ref_path: Full path of the ref.
+        :head_commit: Hash of the commit.
+
+        """
+        pass # pragma: no cover
+
+class GitPythonBackend(FetchBackend):
+
+    """
+    Implementation of the fetch backend which runs the git binary through
+    GitPython, with as few git processes per package as possible:
+
+        - the origin remote is configured and the refs are written in-process,
+          instead of through 'git remote' and 'git update-ref'.
+        - the package repositories use the object database of gitdb, so
+          resolving their heads doesn't start a 'git cat-file' process for
+          each of them.
+
+    """
+
+    origin_section = 'remote "origin"'
+    origin_fetch = '+refs/heads/*:refs/remotes/origin/*'
+
+    def clone_repo(
+            self,
+            repo_url,
+            path,
+            branch_name,
+            no_checkout=False,
+            progress=None,
+            transfer=None):
+        """
+        Clone a master repository.
+
+        :repo_url: Url of the repository.
+        :path: Path of the clone.
+        :branch_name: Name of the branch checked out.
+        :no_checkout: If True, the working tree isn't checked out.
+        :progress: Progress handler of the clone.
+        :transfer: Transfer watched by the transfer guard, if any.
+        :returns: The GitPython repository.
+
+        """
+        return git.Repo.clone_from(
+            repo_url,
+            path,
+            env=None if transfer is None else transfer.env,
+            branch=branch_name,
+            no_checkout=no_checkout,
+            progress=progress
+        )
+
+    def init_repo(self, path, repo_url, bare=False):
+        """
+        Create a repository, or reinitialize an existing one, with its origin
+        remote pointing to a given url.
+
+        :path: Path of the repository.
+        :repo_url: Url of the origin remote.
+        :bare: If True, the repository is created without working tree.
+        :returns: The repository.
+
+        """
+        if bare:
+            repo = git.Repo.init(path, odbt=git.GitDB, bare=True)
+        else:
+            repo = git.Repo.init(path, odbt=git.GitDB)
+
+        self.set_origin(repo, repo_url)
+
+        return repo
+
+    def open_repo(self, path):
+        """
+        Open an existing repository.
+
+        :path: Path of the repository.
+        :returns: The repository.
+
+        """
+        return git.Repo(path, odbt=git.GitDB)
+
+    def close_repo(self, repo):
+        """
+        Release the resources of a repository: its helper processes, file
+        descriptors and memory maps. The repository is still usable.
+
+        :repo: The repository.
+
+        """
+        repo.close()
+
+    def get_git_dir(self, repo):
+        """
+        Get the git dir of a repository.
+
+        :repo: The repository.
+        :returns: The path of the git dir.
+
+        """
+        return repo.git_dir
+
+    def get_origin_url(self, repo):
+        """
+        Get the url of the origin remote of a repository.
+
+        :repo: The repository.
+        :returns: The url of the origin remote.
+
+        """
+        return repo.remotes.origin.url
+
+    def set_origin(self, repo, repo_url):
+        """
+        Point the origin remote of a repository to a given url.
+
+        :repo: The repository.
+        :repo_url: Url of the origin remote.
+
+        """
+        writer = repo.config_writer()
+
+        try:
+            writer.set_value(self.origin_section, 'url', repo_url)
+            writer.set_value(self.origin_section, 'fetch', self.origin_fetch)
+        finally:
+            writer.release()
+
+    def fetch(self, repo, *refspecs, transfer=None, **fetch_args):
+        """
+        Fetch the origin remote of a repository.
+
+        :repo: The repository.
+        :refspecs: The refspecs. If not specified, the ones of the remote are
+                   fetched.
+        :transfer: Transfer watched by the transfer guard, if any.
+        :fetch_args: The fetch arguments.
+
+        """
+        if transfer is not None:
+            fetch_args['env'] = transfer.env
+
+        repo.remotes.origin.fetch(*refspecs, **fetch_args)
+
+    def rev_parse(self, repo, rev):
+        """
+        Resolve a revision of a repository.
+
+        :repo: The repository.
+        :rev: The revision.
+        :returns: The hash of the commit.
+
+        """
+        try:
+            return repo.rev_parse(rev).hexsha
+        except BadObject:
+            # the packs fetched after the object database was loaded
+            repo.odb.update_cache(force=True)
+
+            return repo.rev_parse(rev).hexsha
+
+    def update_ref(self, repo, ref_path, head_commit):
+        """
+        Point a ref of a repository to a commit, which may live in the
+        alternates of the repository.
+
+        :repo: The repository.
+        :ref_path: Full path of the ref.
+        :head_commit: Hash of the commit.
+
+        """
+        # the commit isn't looked up
+        git.Reference(repo, ref_path).set_object(
+            git.Commit(repo, hex_to_bin(head_commit))
+        )
+
+class Pygit2Backend(FetchBackend):
+
+    """
+    Implementation of the fetch backend which clones and fetches in-process,
+    through libgit2 (pygit2), with no git process at all.
+
+    libgit2 doesn't support partial clones, so the 'filter' fetch argument is
+    ignored. The master repositories are opened by pygit2 to be fetched.
+
+    There's no git process to kill, so the transfers are checked from the
+    progress callbacks instead, and libgit2 bounds the connections and the
+    socket reads itself (if it supports it).
+
+    """
+
+    def __init__(self):
+        """
+        Initialize the backend internal data.
+
+        """
+        try:
+            import pygit2
+        except ImportError:
+            raise RuntimeError(
+                "the fetch backend 'pygit2' requires the pygit2 module!"
+            )
+
+        self.pygit2 = pygit2
+
+    def __get_callbacks(self, progress, transfer):
+        """
+        Create the remote callbacks which report the transfer progress and
+        abort the transfer once its guard says so.
+
+        :progress: Progress handler of the transfer, if any.
+        :transfer: Transfer watched by the transfer guard, if any.
+        :returns: The remote callbacks.
+
+        """
+        callbacks = self.pygit2.RemoteCallbacks()
+
+        def on_progress(stats):
+            if transfer is not None:
+                transfer.check(stats.received_bytes)
+
+            if progress is not None:
+                progress.update(
+                    0,
+                    stats.received_objects,
+                    stats.total_objects
+                )
+
+        callbacks.transfer_progress = on_progress
+
+        return callbacks
+
+    def __set_timeouts(self, transfer):
+        """
+        Bound the connections and the socket reads of libgit2 by the timeouts
+        of the transfer guard.
+
+        :transfer: Transfer watched by the transfer guard.
+
+        """
+        guard = transfer.guard
+
+        for option_name, timeout in [
+                ('GIT_OPT_SET_SERVER_CONNECT_TIMEOUT', guard.connect_timeout),
+                ('GIT_OPT_SET_SERVER_TIMEOUT', guard.idle_timeout)]:
+            # only supported since libgit2 1.7
+            option = getattr(self.pygit2, option_name, None)
+
+            if option is not None and timeout > 0:
+                self.pygit2.option(option, timeout * 1000)
+
+    @contextmanager
+    def __to_pygit2(self, repo):
+        """
+        Get the pygit2 repository of a repository. The pygit2 repository
+        opened for a GitPython one is freed on exit.
+
+        :repo: The repository (a GitPython one for master repositories).
+        :returns: The pygit2 repository.
+
+        """
+        if isinstance(repo, self.pygit2.Repository):
+            yield repo
+            return
+
+        pygit2_repo = self.pygit2.Repository(repo.git_dir)
+
+        try:
+            yield pygit2_repo
+        finally:
+            pygit2_repo.free()
+
+    def clone_repo(
+            self,
+            repo_url,
+            path,
+            branch_name,
+            no_checkout=False,
+            progress=None,
+            transfer=None):
+        """
+        Clone a master repository.
+
+        :repo_url: Url of the repository.
+        :path: Path of the clone.
+        :branch_name: Name of the branch checked out.
+        :no_checkout: If True, the working tree isn't checked out.
+        :progress: Progress handler of the clone.
+        :transfer: Transfer watched by the transfer guard, if any.
+        :returns: The GitPython repository.
+
+        """
+        repo = self.init_repo(path, repo_url)
+
+        try:
+            self.fetch(
+                repo,
+                '+refs/heads/{0}:refs/remotes/origin/{0}'.format(branch_name),
+                transfer=transfer,
+                progress=progress
+            )
+
+            head_commit = repo.revparse_single('origin/{}'.format(branch_name))
+            branch = repo.branches.local.create(branch_name, head_commit)
+            branch.upstream = repo.branches.remote[
+                'origin/{}'.format(branch_name)
+            ]
+            repo.set_head(branch.name)
+
+            if not no_checkout:
+                repo.checkout_head(strategy=self.pygit2.GIT_CHECKOUT_FORCE)
+        finally:
+            repo.free()
+
+        return git.Repo(path)
+
+    def init_repo(self, path, repo_url, bare=False):
+        """
+        Create a repository, or reinitialize an existing one, with its origin
+        remote pointing to a given url.
+
+        :path: Path of the repository.
+        :repo_url: Url of the origin remote.
+        :bare: If True, the repository is created without working tree.
+        :returns: The repository.
+
+        """
+        repo = self.pygit2.init_repository(path, bare)
+
+        self.set_origin(repo, repo_url)
+
+        return repo
+
+    def open_repo(self, path):
+        """
+        Open an existing repository.
+
+        :path: Path of the repository.
+        :returns: The repository.
+
+        """
+        return self.pygit2.Repository(path)
+
+    def close_repo(self, repo):
+        """
+        Release the resources of a repository: its helper processes, file
+        descriptors and memory maps. The repository is still usable.
+
+        :repo: The repository.
+
+        """
+        repo.free()
+
+    def get_git_dir(self, repo):
+        """
+        Get the git dir of a repository.
+
+        :repo: The repository.
+        :returns: The path of the git dir.
+
+        """
+        return repo.path.rstrip('/')
+
+    def get_origin_url(self, repo):
+        """
+        Get the url of the origin remote of a repository.
+
+        :repo: The repository.
+        :returns: The url of the origin remote.
+
+        """
+        return repo.remotes['origin'].url
+
+    def set_origin(self, repo, repo_url):
+        """
+        Point the origin remote of a repository to a given url.
+
+        :repo: The repository.
+        :repo_url: Url of the origin remote.
+
+        """
+        if 'origin' in [remote.name for remote in repo.remotes]:
+            repo.remotes.set_url('origin', repo_url)
+        else:
+            repo.remotes.create('origin', repo_url)
+
+    def fetch(self, repo, *refspecs, transfer=None, **fetch_args):
+        """
+        Fetch the origin remote of a repository.
+
+        :repo: The repository.
+        :refspecs: The refspecs. If not specified, the ones of the remote are
+                   fetched.
+        :transfer: Transfer watched by the transfer guard, if any.
+        :fetch_args: The fetch arguments.
+
+        """
+        kwargs = {}
+
+        if 'refspec' in fetch_args:
+            refspecs += (fetch_args['refspec'],)
+
+        if refspecs:
+            kwargs['refspecs'] = list(refspecs)
+
+        if fetch_args.get('depth'):
+            kwargs['depth'] = fetch_args['depth']
+
+        if transfer is not None:
+            self.__set_timeouts(transfer)
+
+        with self.__to_pygit2(repo) as pygit2_repo:
+            # honored by libgit2 on the fetch
+            if fetch_args.get('no_tags'):
+                pygit2_repo.config['remote.origin.tagOpt'] = '--no-tags'
+            elif 'remote.origin.tagOpt' in pygit2_repo.config:
+                del pygit2_repo.config['remote.origin.tagOpt']
+
+            pygit2_repo.remotes['origin'].fetch(
+                callbacks=self.__get_callbacks(
+                    fetch_args.get('progress'),
+                    transfer
+                ),
+                **kwargs
+            )
+
+    def rev_parse(self, repo, rev):
+        """
+        Resolve a revision of a repository.
+
+        :repo: The repository.
+        :rev: The revision.
+        :returns: The hash of the commit.
+
+        """
+        with self.__to_pygit2(repo) as pygit2_repo:
+            return str(pygit2_repo.revparse_single(rev).id)
+
+    def update_ref(self, repo, ref_path, head_commit):
+        """
+        Point a ref of a repository to a commit, which may live in the
+        alternates of the repository.
+
+        :repo: The repository.
+        :ref_path: Full path of the ref.
+        :head_commit: Hash of the commit.
+
+        """
+        repo.references.create(
+            ref_path,
+            self.pygit2.Oid(hex=head_commit),
+            force=True
+        )
+
+fetch_backend_map = {
+    'gitpython': GitPythonBackend,
+    'pygit2': Pygit2Backend
+}
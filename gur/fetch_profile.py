@@ -0,0 +1,68 @@
+from config_mgr import ConfigMgr
+
+class FetchProfile:
+
+    """
+    Implementation of the class which describes how the package repositories
+    are fetched. gur only needs the head commit of the package branch, so the
+    fetches may be limited to:
+
+        depth:         the last 'depth' commits of the history (0 for all).
+        filter:        a partial clone filter (e.g. 'blob:none').
+        single_branch: the package branch.
+        tags:          False to not fetch the tags.
+
+    The default profile fetches everything, like a plain 'git fetch'.
+
+    """
+
+    def __init__(self, depth=0, filter='', single_branch=False, tags=True):
+        """
+        Initialize the profile data.
+
+        """
+        self.depth = depth
+        self.filter = filter
+        self.single_branch = single_branch
+        self.tags = tags
+
+    @classmethod
+    def from_config(cls):
+        """
+        Create the profile from the 'fetch' section of the configuration file.
+
+        :returns: The fetch profile.
+
+        """
+        return cls(
+            int(ConfigMgr.get('fetch', 'depth', '0')),
+            ConfigMgr.get('fetch', 'filter', ''),
+            ConfigMgr.get_boolean('fetch', 'single_branch', False),
+            ConfigMgr.get_boolean('fetch', 'tags', True)
+        )
+
+    def get_fetch_args(self, branch_name):
+        """
+        Get the arguments of a fetch of a package repository.
+
+        :branch_name: Name of the package branch.
+        :returns: A dict of keyword arguments of Remote.fetch.
+
+        """
+        fetch_args = {}
+
+        if self.single_branch:
+            fetch_args['refspec'] = (
+                '+refs/heads/{0}:refs/remotes/origin/{0}'.format(branch_name)
+            )
+
+        if self.depth > 0:
+            fetch_args['depth'] = self.depth
+
+        if self.filter:
+            fetch_args['filter'] = self.filter
+
+        if not self.tags:
+            fetch_args['no_tags'] = True
+
+        return fetch_args
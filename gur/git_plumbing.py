@@ -0,0 +1,373 @@
+from contextlib import contextmanager
+from threading import BoundedSemaphore, Lock
+from time import monotonic
+
+import git
+
+from config_mgr import ConfigMgr
+from fetch_backends import fetch_backend_map
+from ref_resolver import RefResolver
+from repo_pool import RepoPool
+from transfer_guard import TransferCancelled, TransferGuard
+
+class GitPlumbing:
+
+    """
+    Implementation of the class responsible for the git operations of the
+    update, which are run by a fetch backend (see fetch_backends). The fetched
+    heads are read from the ref files (see ref_resolver), falling back to the
+    backend only if they can't be.
+
+    Every operation is timed, with counters shared by all the threads, so the
+    cost of each kind of git operation can be measured (see 'get_timings'),
+    for any backend.
+
+    The repository handles are kept in bounded pools (see repo_pool), one for
+    the package repositories and one for the master repositories, which are
+    always GitPython repositories (see fetch_backends). The operations which
+    run a git process wait while 'max_processes' of them are running, no
+    matter how many threads the update has. The usage of both is counted (see
+    'get_counters').
+
+    The clones and fetches are bounded by a transfer guard (see
+    transfer_guard), which also cancels them all at once.
+
+    """
+
+    def __init__(
+            self,
+            backend=None,
+            max_repos=None,
+            max_processes=None,
+            guard=None):
+        """
+        Initialize the git plumbing internal data.
+
+        :backend: Name of the fetch backend. If not specified, the backend is
+                  read from the configuration file ('gitpython' by default).
+        :max_repos: Maximum number of repository handles kept open. If not
+                    specified, it's read from the configuration file (64 by
+                    default).
+        :max_processes: Maximum number of git processes running at the same
+                        time (0 for no limit). If not specified, it's read
+                        from the configuration file (16 by default).
+        :guard: Transfer guard of the clones and fetches. If not specified,
+                it's created from the configuration file.
+
+        """
+        if backend is None:
+            backend = ConfigMgr.get('fetch', 'backend', 'gitpython')
+
+        if max_repos is None:
+            max_repos = int(ConfigMgr.get('fetch', 'max_repos', '64'))
+
+        if max_processes is None:
+            max_processes = int(ConfigMgr.get('fetch', 'max_processes', '16'))
+
+        if backend not in fetch_backend_map:
+            raise RuntimeError(
+                "the fetch backend '{}' is not supported!".format(backend)
+            )
+
+        self.backend_name = backend
+        self.backend = fetch_backend_map[backend]()
+        self.resolver = RefResolver()
+        self.guard = TransferGuard.from_config() if guard is None else guard
+        self.pool = RepoPool(self.backend.close_repo, max_repos)
+        self.master_pool = RepoPool(lambda repo: repo.close(), max_repos)
+        self.max_processes = max_processes
+        self.__processes = (
+            BoundedSemaphore(max_processes) if max_processes > 0 else None
+        )
+        self.__live_processes = 0
+        self.__peak_processes = 0
+        self.__timings = {}
+        self.__lock = Lock()
+
+    @contextmanager
+    def timed(self, op_name):
+        """
+        Time an operation, adding its duration to the counters of its kind.
+
+        :op_name: Name of the kind of operation.
+
+        """
+        start = monotonic()
+
+        try:
+            yield
+        finally:
+            elapsed = monotonic() - start
+
+            with self.__lock:
+                count, total = self.__timings.get(op_name, (0, 0.0))
+                self.__timings[op_name] = (count + 1, total + elapsed)
+
+    @contextmanager
+    def process(self, op_name):
+        """
+        Time an operation which runs a git process, waiting while the maximum
+        number of git processes are running. No process is run once the
+        update was cancelled.
+
+        :op_name: Name of the kind of operation.
+
+        """
+        if self.guard.cancelled:
+            raise TransferCancelled('the update was cancelled!')
+
+        if self.__processes is not None:
+            self.__processes.acquire()
+
+        with self.__lock:
+            self.__live_processes += 1
+            self.__peak_processes = max(
+                self.__peak_processes,
+                self.__live_processes
+            )
+
+        try:
+            with self.timed(op_name):
+                yield
+        finally:
+            with self.__lock:
+                self.__live_processes -= 1
+
+            if self.__processes is not None:
+                self.__processes.release()
+
+    @contextmanager
+    def transfer(self, op_name):
+        """
+        Time a git transfer, like any other git process, watched by the
+        transfer guard.
+
+        :op_name: Name of the kind of operation.
+        :returns: The transfer (see transfer_guard).
+
+        """
+        with self.process(op_name), self.guard.watch(op_name) as transfer:
+            yield transfer
+
+    def get_counters(self):
+        """
+        Get the usage counters of the repository handles and of the git
+        processes.
+
+        :returns: A dict of counters by name.
+
+        """
+        counters = {
+            '{}_repos'.format(name): value
+            for name, value in self.pool.get_counters().items()
+        }
+        counters.update(
+            ('{}_master_repos'.format(name), value)
+            for name, value in self.master_pool.get_counters().items()
+        )
+
+        with self.__lock:
+            counters['live_processes'] = self.__live_processes
+            counters['peak_processes'] = self.__peak_processes
+
+        return counters
+
+    def close(self):
+        """
+        Close all the repository handles of the pools.
+
+        """
+        self.pool.clear()
+        self.master_pool.clear()
+
+    def get_timings(self):
+        """
+        Get the counters of the operations timed so far.
+
+        :returns: A dict of (count, total seconds) tuples by operation name.
+
+        """
+        with self.__lock:
+            return dict(self.__timings)
+
+    def clone_repo(
+            self,
+            repo_url,
+            path,
+            branch_name,
+            no_checkout=False,
+            progress=None):
+        """
+        Clone a master repository. The repository is kept in the pool of the
+        master repositories.
+
+        :repo_url: Url of the repository.
+        :path: Path of the clone.
+        :branch_name: Name of the branch checked out.
+        :no_checkout: If True, the working tree isn't checked out.
+        :progress: Progress handler of the clone.
+        :returns: The GitPython repository.
+
+        """
+        with self.transfer('clone') as transfer:
+            repo = self.backend.clone_repo(
+                repo_url,
+                path,
+                branch_name,
+                no_checkout,
+                progress,
+                transfer
+            )
+
+        return self.master_pool.put(path, repo)
+
+    def open_master_repo(self, path):
+        """
+        Open an existing master repository, unless it's already in the pool of
+        the master repositories.
+
+        :path: Path of the repository.
+        :returns: The GitPython repository.
+
+        """
+        with self.timed('open'):
+            return self.master_pool.get(path, git.Repo)
+
+    def release_master_repo(self, path):
+        """
+        Close a master repository and remove it from the pool, once its update
+        is done.
+
+        :path: Path of the repository.
+
+        """
+        self.master_pool.discard(path)
+
+    def init_repo(self, path, repo_url, bare=False):
+        """
+        Create a repository, or reinitialize an existing one, with its origin
+        remote pointing to a given url. The repository is kept in the pool.
+
+        :path: Path of the repository.
+        :repo_url: Url of the origin remote.
+        :bare: If True, the repository is created without working tree.
+        :returns: The repository.
+
+        """
+        with self.process('init'):
+            repo = self.backend.init_repo(path, repo_url, bare)
+
+        return self.pool.put(path, repo)
+
+    def open_repo(self, path):
+        """
+        Open an existing repository, unless it's already in the pool.
+
+        :path: Path of the repository.
+        :returns: The repository.
+
+        """
+        with self.timed('open'):
+            return self.pool.get(path, self.backend.open_repo)
+
+    def get_git_dir(self, repo):
+        """
+        Get the git dir of a repository.
+
+        :repo: The repository.
+        :returns: The path of the git dir.
+
+        """
+        return self.backend.get_git_dir(repo)
+
+    def get_origin_url(self, repo):
+        """
+        Get the url of the origin remote of a repository.
+
+        :repo: The repository.
+        :returns: The url of the origin remote.
+
+        """
+        return self.backend.get_origin_url(repo)
+
+    def set_origin(self, repo, repo_url):
+        """
+        Point the origin remote of a repository to a given url.
+
+        :repo: The repository.
+        :repo_url: Url of the origin remote.
+
+        """
+        with self.timed('config'):
+            self.backend.set_origin(repo, repo_url)
+
+    def fetch(self, repo, *refspecs, **fetch_args):
+        """
+        Fetch the origin remote of a repository.
+
+        :repo: The repository.
+        :refspecs: The refspecs. If not specified, the ones of the remote are
+                   fetched.
+        :fetch_args: The fetch arguments (see fetch_backends).
+
+        """
+        with self.transfer('fetch') as transfer:
+            self.backend.fetch(repo, *refspecs, transfer=transfer, **fetch_args)
+
+    def rev_parse(self, repo, rev):
+        """
+        Resolve a revision of a repository.
+
+        :repo: The repository.
+        :rev: The revision.
+        :returns: The hash of the commit.
+
+        """
+        with self.timed('rev_parse'):
+            return self.backend.rev_parse(repo, rev)
+
+    def resolve_head(self, repo, branch_name):
+        """
+        Resolve the fetched head of a branch of a repository.
+
+        :repo: The repository.
+        :branch_name: Name of the branch of the origin remote.
+        :returns: The hash of the head commit.
+
+        """
+        return self.resolve_heads([(repo, branch_name)])[0]
+
+    def resolve_heads(self, branches):
+        """
+        Resolve the fetched heads of multiple repositories in a single pass.
+
+        :branches: Iterable of (repo, branch_name) tuples.
+        :returns: A list of head commit hashes, in the same order.
+
+        """
+        branches = list(branches)
+
+        with self.timed('resolve'):
+            head_commits = self.resolver.resolve_many(
+                (self.get_git_dir(repo), branch_name)
+                for repo, branch_name in branches
+            )
+
+        return [
+            head_commit if head_commit is not None
+            else self.rev_parse(repo, 'origin/{}'.format(branch_name))
+            for head_commit, (repo, branch_name) in zip(head_commits, branches)
+        ]
+
+    def update_ref(self, repo, ref_path, head_commit):
+        """
+        Point a ref of a repository to a commit, which may live in the
+        alternates of the repository.
+
+        :repo: The repository.
+        :ref_path: Full path of the ref.
+        :head_commit: Hash of the commit.
+
+        """
+        with self.timed('update_ref'):
+            self.backend.update_ref(repo, ref_path, head_commit)
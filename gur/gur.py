@@ -29,6 +29,45 @@ def parse_args(): # pragma: no cover
         action='store_true'
     )
 
+    parser.add_argument(
+        '-j',
+        '--jobs',
+        help='number of repositories updated at the same time (default: 1)',
+        type=int,
+        default=1,
+        metavar='N'
+    )
+
+    parser.add_argument(
+        '-f',
+        '--full',
+        help='check all the packages, ignoring the adaptive schedule',
+        action='store_true'
+    )
+
+    parser.add_argument(
+        '-t',
+        '--timings',
+        help='show the time spent by each kind of git operation',
+        action='store_true'
+    )
+
+    parser.add_argument(
+        '--fetch-backend',
+        help='backend which clones and fetches the repositories '
+             '(gitpython or pygit2)',
+        choices=['gitpython', 'pygit2'],
+        metavar='NAME'
+    )
+
+    parser.add_argument(
+        '-m',
+        '--materialize',
+        help='fetch the packages tracked lazily (default: all of them)',
+        nargs='*',
+        metavar='PKG'
+    )
+
     parser.add_argument(
         '-l',
         '--list-pkgs',
@@ -36,6 +75,27 @@ def parse_args(): # pragma: no cover
         action='store_true'
     )
 
+    parser.add_argument(
+        '-o',
+        '--list-outdated',
+        help='list the installed packages with a new revision available',
+        action='store_true'
+    )
+
+    parser.add_argument(
+        '-s',
+        '--search',
+        help='search the available packages',
+        metavar='QUERY'
+    )
+
+    parser.add_argument(
+        '-p',
+        '--prune',
+        help='remove the packages and mirrors removed upstream',
+        action='store_true'
+    )
+
     # no arguments were provided
     if len(argv) == 1:
         parser.print_help()
@@ -48,6 +108,8 @@ if __name__ == '__main__': # pragma: no cover
         app = App(args)
 
         app.run()
+    except KeyboardInterrupt:
+        exit(130)
     except Exception as err:
         print(err)
         exit(1)
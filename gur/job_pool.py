@@ -0,0 +1,79 @@
+from concurrent.futures import as_completed, CancelledError, ThreadPoolExecutor
+
+class JobPool:
+
+    """
+    Implementation of a bounded pool of worker threads. The jobs are mostly
+    network bound (git operations), so threads are enough to overlap them.
+
+    A pool of a single job doesn't start any thread: the jobs are run in the
+    caller thread, in order.
+
+    """
+
+    def __init__(self, jobs=1):
+        """
+        Initialize the pool internal data.
+
+        :jobs: Maximum number of jobs running at the same time.
+
+        """
+        if jobs < 1:
+            raise RuntimeError('the number of jobs must be at least 1!')
+
+        self.jobs = jobs
+        self.__executor = ThreadPoolExecutor(jobs) if jobs > 1 else None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def map(self, func, items):
+        """
+        Run a function for each item, yielding the results as the jobs finish.
+
+        If a job fails, the jobs not started yet are cancelled and the results
+        of the running ones are still yielded before the first error is
+        raised.
+
+        :func: Function to be run.
+        :items: Iterable of items, passed as the single argument of func.
+
+        """
+        if self.__executor is None:
+            for item in items:
+                yield func(item)
+
+            return
+
+        futures = [self.__executor.submit(func, item) for item in items]
+        error = None
+
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except CancelledError:
+                continue
+            except Exception as err:
+                if error is None:
+                    error = err
+
+                    for pending in futures:
+                        pending.cancel()
+
+                continue
+
+            yield result
+
+        if error is not None:
+            raise error
+
+    def close(self):
+        """
+        Wait for the running jobs and release the worker threads.
+
+        """
+        if self.__executor is not None:
+            self.__executor.shutdown()
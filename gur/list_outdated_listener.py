@@ -0,0 +1,42 @@
+from abc import ABC, abstractmethod
+
+class ListOutdatedListener(ABC):
+
+    """
+    Definition of the interface for the list-outdated command events.
+
+    """
+
+    @abstractmethod
+    def on_outdated_list_start(self):
+        """
+        Trigger an on_outdated_list_start event, which indicates the start of
+        list operation.
+
+        """
+        pass # pragma: no cover
+
+    @abstractmethod
+    def on_outdated_list_finish(self, count):
+        """
+        Trigger an on_outdated_list_finish event, which indicates the end of
+        list operation.
+
+        :count: Number of outdated packages.
+
+        """
+        pass # pragma: no cover
+
+    @abstractmethod
+    def on_pkg_outdated(self, repo_id, pkg_name, local_rev, remote_rev):
+        """
+        Trigger an on_pkg_outdated event, which indicates that an outdated
+        package was found.
+
+        :repo_id: Identification of the master repository of the package.
+        :pkg_name: Name of the package.
+        :local_rev: Installed revision of the package.
+        :remote_rev: Remote revision of the package.
+
+        """
+        pass # pragma: no cover
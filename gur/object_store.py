@@ -0,0 +1,182 @@
+from os import makedirs
+from os.path import isdir, isfile
+from re import match
+from threading import Lock
+from urllib.parse import quote
+
+from git_plumbing import GitPlumbing
+
+class ObjectStore:
+
+    """
+    Implementation of the class responsible for the shared object store of the
+    package repositories.
+
+    The objects of each upstream repository are kept in a single bare
+    repository, keyed by the normalized upstream url, no matter how many master
+    repositories carry the package. The package repositories borrow the
+    objects through git alternates, so they only hold their own refs.
+
+    Within an update, identical fetches of the same url are done only once.
+
+    """
+
+    def __init__(
+            self,
+            pkg_dir='/var/db/gur/',
+            store_dir='objects',
+            plumbing=None):
+        """
+        Initialize the object store internal data.
+
+        :pkg_dir: Directory of the package database.
+        :store_dir: Name of the store directory.
+        :plumbing: Git plumbing of the store repositories. If not specified,
+                   the store has its own.
+
+        """
+        self.store_dir = '{}/{}'.format(pkg_dir.rstrip('/'), store_dir)
+        self.plumbing = GitPlumbing() if plumbing is None else plumbing
+        self.__fetched = set()
+        self.__locks = {}
+        self.__lock = Lock()
+
+    @staticmethod
+    def normalize_url(repo_url):
+        """
+        Normalize a repository url, so the different urls of the same upstream
+        repository share the same key.
+
+        :repo_url: Url of the repository.
+        :returns: The normalized url, in host/path format.
+
+        """
+        url = repo_url.strip().rstrip('/')
+
+        found = match('^[a-z+]+://(?:[^@/]+@)?([^/:]+)(?::[0-9]+)?/(.*)$', url)
+        if found is None:
+            # scp-like syntax (user@host:path)
+            found = match('^(?:[^@/]+@)?([^/:]+):(.*)$', url)
+
+        if found is not None:
+            url = '{}/{}'.format(found.group(1).lower(), found.group(2))
+
+        if url.endswith('.git'):
+            url = url[:-4]
+
+        return url
+
+    def get_store_path(self, repo_url):
+        """
+        Get the path of the bare repository of an upstream repository.
+
+        :repo_url: Url of the repository.
+        :returns: The path of the bare repository.
+
+        """
+        return '{}/{}.git'.format(
+            self.store_dir,
+            quote(self.normalize_url(repo_url), safe='')
+        )
+
+    def __get_lock(self, key):
+        """
+        Get the lock of a store repository.
+
+        :key: Path of the store repository.
+        :returns: The lock.
+
+        """
+        with self.__lock:
+            return self.__locks.setdefault(key, Lock())
+
+    def fetch(self, repo_url, progress=None, **fetch_args):
+        """
+        Fetch an upstream repository into the store. The fetch is skipped if
+        an identical one was already done by this store instance.
+
+        :repo_url: Url of the repository.
+        :progress: Progress handler of the fetch.
+        :fetch_args: The fetch arguments (see fetch_backends).
+        :returns: The store repository.
+
+        """
+        store_path = self.get_store_path(repo_url)
+        fetch_key = (store_path, tuple(sorted(fetch_args.items())))
+
+        with self.__get_lock(store_path):
+            if isdir(store_path):
+                store_repo = self.plumbing.open_repo(store_path)
+            else:
+                makedirs(self.store_dir, exist_ok=True)
+
+                store_repo = self.plumbing.init_repo(
+                    store_path,
+                    repo_url,
+                    bare=True
+                )
+
+            if fetch_key not in self.__fetched:
+                self.plumbing.fetch(
+                    store_repo,
+                    progress=progress,
+                    **fetch_args
+                )
+                self.__fetched.add(fetch_key)
+
+        return store_repo
+
+    def fetch_into(
+            self,
+            pkg_repo,
+            repo_url,
+            branch_name,
+            progress=None,
+            **fetch_args):
+        """
+        Fetch an upstream repository into the store and point the origin
+        branch of a package repository to it.
+
+        :pkg_repo: The package repository.
+        :repo_url: Url of the repository.
+        :branch_name: Name of the package branch.
+        :progress: Progress handler of the fetch.
+        :fetch_args: The fetch arguments (see fetch_backends).
+
+        """
+        store_repo = self.fetch(repo_url, progress, **fetch_args)
+
+        self.link(pkg_repo, store_repo)
+
+        head_commit = self.plumbing.resolve_head(store_repo, branch_name)
+        self.plumbing.update_ref(
+            pkg_repo,
+            'refs/remotes/origin/{}'.format(branch_name),
+            head_commit
+        )
+
+    def link(self, pkg_repo, store_repo):
+        """
+        Make the objects of a store repository available to a package
+        repository, through git alternates.
+
+        :pkg_repo: The package repository.
+        :store_repo: The store repository.
+
+        """
+        pkg_git_dir = self.plumbing.get_git_dir(pkg_repo)
+        store_objects = '{}/objects'.format(
+            self.plumbing.get_git_dir(store_repo)
+        )
+        alternates_file = '{}/objects/info/alternates'.format(pkg_git_dir)
+        alternates = []
+
+        if isfile(alternates_file):
+            with open(alternates_file, 'r') as f:
+                alternates = f.read().splitlines()
+
+        if store_objects not in alternates:
+            makedirs('{}/objects/info'.format(pkg_git_dir), exist_ok=True)
+
+            with open(alternates_file, 'a') as f:
+                f.write(store_objects + '\n')
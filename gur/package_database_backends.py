@@ -0,0 +1,1443 @@
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from json import dump, dumps, load, loads
+from mmap import mmap, ACCESS_READ
+from os import fsync, listdir, mkdir, remove, replace
+from os.path import getsize, isdir, isfile
+from shutil import copyfile
+from struct import Struct
+from urllib.parse import quote
+
+import sqlite3
+
+from config_mgr import ConfigMgr
+
+class PackageDatabaseBackend(ABC):
+
+    """
+    Definition of the interface for the storage backends of the package
+    database.
+
+    A package entry is a dict in the following format:
+
+        {
+            'name': <package name>,
+            'repo': <repository ID>,
+            'rev': { 'remote': <head commit>, 'local': <installed commit> }
+        }
+
+    """
+
+    def __init__(self, pkg_dir, db_file):
+        """
+        Initialize the backend internal data.
+
+        :pkg_dir: Directory of the package database.
+        :db_file: Name of the database file.
+
+        """
+        self.db_file = db_file
+        self.db_file_path = '{}/{}'.format(pkg_dir, db_file)
+
+    @abstractmethod
+    def get_entry(self, repo_id, pkg_name):
+        """
+        Get a package entry.
+
+        :repo_id: Identification of the repository of the package.
+        :pkg_name: Name of the package.
+        :returns: The package entry or None if it doesn't exist.
+
+        """
+        pass # pragma: no cover
+
+    @abstractmethod
+    def find_entries(self, pkg_name):
+        """
+        Get the entries of a package in all the repositories.
+
+        :pkg_name: Name of the package.
+        :returns: A list of package entries.
+
+        """
+        pass # pragma: no cover
+
+    @abstractmethod
+    def find_all_entries(self):
+        """
+        Get the entries of all the packages in all the repositories.
+
+        :returns: A list of package entries.
+
+        """
+        pass # pragma: no cover
+
+    @abstractmethod
+    def find_installed_entries(self):
+        """
+        Get the entries of all the installed packages.
+
+        :returns: A list of package entries.
+
+        """
+        pass # pragma: no cover
+
+    def find_outdated_entries(self):
+        """
+        Get the entries of all the installed packages whose remote revision
+        differs from the installed one.
+
+        :returns: A list of package entries.
+
+        """
+        return [
+            entry for entry in self.find_installed_entries()
+            if entry['rev']['remote'] != entry['rev']['local']
+        ]
+
+    @abstractmethod
+    def put_entry(self, entry):
+        """
+        Insert or replace a package entry.
+
+        :entry: The package entry.
+
+        """
+        pass # pragma: no cover
+
+    def put_entries(self, entries):
+        """
+        Insert or replace multiple package entries at once.
+
+        :entries: Iterable of package entries.
+
+        """
+        for entry in entries:
+            self.put_entry(entry)
+
+    @abstractmethod
+    def delete_entry(self, repo_id, pkg_name):
+        """
+        Delete a package entry.
+
+        :repo_id: Identification of the repository of the package.
+        :pkg_name: Name of the package.
+
+        """
+        pass # pragma: no cover
+
+    @abstractmethod
+    def commit(self):
+        """
+        Make the pending changes persistent.
+
+        """
+        pass # pragma: no cover
+
+    def optimize(self):
+        """
+        Run the maintenance of the backend deferred by the commits (e.g. a
+        compaction), once the writer is done with the package database.
+
+        """
+        pass
+
+    def close(self):
+        """
+        Release the resources of the backend (connections, open files and
+        memory maps). The pending changes are discarded.
+
+        """
+        pass
+
+class JsonBackend(PackageDatabaseBackend):
+
+    """
+    Implementation of the backend which stores the package database as a JSON
+    array. The file is loaded only once into an in-memory index keyed by
+    (repo_id, package name) and written back, atomically, on commit.
+
+    """
+
+    def __init__(self, pkg_dir, db_file='pkg_db.json'):
+        """
+        Initialize the backend internal data.
+
+        """
+        super().__init__(pkg_dir, db_file)
+
+        if not isfile(self.db_file_path):
+            with open(self.db_file_path, 'w') as f:
+                dump([], f)
+
+        self.__entries = None
+        self.__dirty = False
+
+    def __get_entries(self):
+        """
+        Get the in-memory index of the package database, loading it from the
+        database file on the first access.
+
+        :returns: A dict of package entries keyed by (repo_id, package name).
+
+        """
+        if self.__entries is None:
+            with open(self.db_file_path, 'r') as f:
+                self.__entries = {
+                    (entry.get('repo', ''), entry['name']): entry
+                    for entry in load(f)
+                }
+
+        return self.__entries
+
+    def load(self):
+        """
+        Load the database file, if it was not loaded yet.
+
+        """
+        self.__get_entries()
+
+    def get_entry(self, repo_id, pkg_name):
+        """
+        Get a package entry.
+
+        :repo_id: Identification of the repository of the package.
+        :pkg_name: Name of the package.
+        :returns: The package entry or None if it doesn't exist.
+
+        """
+        return self.__get_entries().get((repo_id, pkg_name))
+
+    def find_entries(self, pkg_name):
+        """
+        Get the entries of a package in all the repositories.
+
+        :pkg_name: Name of the package.
+        :returns: A list of package entries.
+
+        """
+        return [
+            entry for entry in self.__get_entries().values()
+            if entry['name'] == pkg_name
+        ]
+
+    def find_all_entries(self):
+        """
+        Get the entries of all the packages in all the repositories.
+
+        :returns: A list of package entries.
+
+        """
+        return list(self.__get_entries().values())
+
+    def find_installed_entries(self):
+        """
+        Get the entries of all the installed packages.
+
+        :returns: A list of package entries.
+
+        """
+        return [
+            entry for entry in self.__get_entries().values()
+            if entry['rev']['local']
+        ]
+
+    def put_entry(self, entry):
+        """
+        Insert or replace a package entry.
+
+        :entry: The package entry.
+
+        """
+        self.__get_entries()[(entry['repo'], entry['name'])] = entry
+        self.__dirty = True
+
+    def delete_entry(self, repo_id, pkg_name):
+        """
+        Delete a package entry.
+
+        :repo_id: Identification of the repository of the package.
+        :pkg_name: Name of the package.
+
+        """
+        if self.__get_entries().pop((repo_id, pkg_name), None) is not None:
+            self.__dirty = True
+
+    def commit(self):
+        """
+        Write the pending changes back to the database file. The new content
+        is written to a temporary file which replaces the database file, so
+        the database is never left partially written.
+
+        """
+        if not self.__dirty:
+            return
+
+        tmp_file_path = self.db_file_path + '.tmp'
+        with open(tmp_file_path, 'w') as f:
+            dump(list(self.__entries.values()), f)
+            f.flush()
+            fsync(f.fileno())
+
+        replace(tmp_file_path, self.db_file_path)
+        self.__dirty = False
+
+class SqliteBackend(PackageDatabaseBackend):
+
+    """
+    Implementation of the backend which stores the package database in a
+    SQLite database, with indexed columns for the package name, repository and
+    revisions. The changes are grouped in a single transaction until commit.
+
+    On the first use, the entries of the JSON database (if any) are migrated.
+
+    """
+
+    schema = [
+        """
+        CREATE TABLE packages (
+            repo TEXT NOT NULL,
+            name TEXT NOT NULL,
+            remote TEXT NOT NULL DEFAULT '',
+            local TEXT NOT NULL DEFAULT '',
+            materialized INTEGER NOT NULL DEFAULT 1,
+            last_check REAL,
+            last_change REAL,
+            next_check REAL,
+            change_interval REAL,
+            check_delay REAL,
+            fetch_time REAL,
+            PRIMARY KEY (repo, name)
+        )
+        """
+    ]
+
+    columns = [
+        ('materialized', 'INTEGER NOT NULL DEFAULT 1'),
+        ('last_check', 'REAL'),
+        ('last_change', 'REAL'),
+        ('next_check', 'REAL'),
+        ('change_interval', 'REAL'),
+        ('check_delay', 'REAL'),
+        ('fetch_time', 'REAL')
+    ]
+
+    # the package statistics by column
+    stats_columns = [
+        ('last_check', 'last_check'),
+        ('last_change', 'last_change'),
+        ('next_check', 'next_check'),
+        ('interval', 'change_interval'),
+        ('delay', 'check_delay'),
+        ('fetch_time', 'fetch_time')
+    ]
+
+    select = (
+        'SELECT repo, name, remote, local, materialized, last_check, '
+        'last_change, next_check, change_interval, check_delay, fetch_time '
+        'FROM packages'
+    )
+
+    indexes = [
+        'CREATE INDEX IF NOT EXISTS packages_name ON packages (name)',
+        'CREATE INDEX IF NOT EXISTS packages_remote ON packages (remote)',
+        'CREATE INDEX IF NOT EXISTS packages_local ON packages (local)',
+        # partial index holding only the outdated packages
+        "CREATE INDEX IF NOT EXISTS packages_outdated ON packages (repo, name) "
+        "WHERE local != '' AND remote != local"
+    ]
+
+    def __init__(self, pkg_dir, db_file='pkg_db.sqlite', json_file='pkg_db.json'):
+        """
+        Initialize the backend internal data.
+
+        :json_file: Name of the JSON database file to be migrated.
+
+        """
+        super().__init__(pkg_dir, db_file)
+
+        is_new = not isfile(self.db_file_path)
+
+        # the update threads share the connection, serialized by the package
+        # database mgr
+        self.conn = sqlite3.connect(
+            self.db_file_path,
+            check_same_thread=False
+        )
+
+        # readers see the last committed snapshot while a writer is running
+        self.conn.execute('PRAGMA journal_mode=WAL')
+
+        if is_new:
+            for statement in self.schema:
+                self.conn.execute(statement)
+
+            json_file_path = '{}/{}'.format(pkg_dir, json_file)
+            if isfile(json_file_path):
+                with open(json_file_path, 'r') as f:
+                    for entry in load(f):
+                        entry.setdefault('repo', '')
+                        self.put_entry(entry)
+
+        # the columns added after the database was created are added here
+        columns = [
+            row[1] for row in self.conn.execute('PRAGMA table_info(packages)')
+        ]
+        for column, definition in self.columns:
+            if column not in columns:
+                self.conn.execute(
+                    'ALTER TABLE packages ADD COLUMN {} {}'.format(
+                        column,
+                        definition
+                    )
+                )
+
+        # the indexes added after the database was created are built here
+        for statement in self.indexes:
+            self.conn.execute(statement)
+
+        self.conn.commit()
+
+    @staticmethod
+    def __to_entry(row):
+        """
+        Convert a database row to a package entry.
+
+        :row: The (repo, name, remote, local, materialized, <statistics>)
+              row.
+        :returns: The package entry.
+
+        """
+        entry = {
+            'name': row[1],
+            'repo': row[0],
+            'rev': { 'remote': row[2], 'local': row[3] }
+        }
+
+        if not row[4]:
+            entry['materialized'] = False
+
+        if row[5] is not None:
+            entry['stats'] = {
+                key: value
+                for (key, _), value in zip(SqliteBackend.stats_columns, row[5:])
+            }
+
+        return entry
+
+    def get_entry(self, repo_id, pkg_name):
+        """
+        Get a package entry.
+
+        :repo_id: Identification of the repository of the package.
+        :pkg_name: Name of the package.
+        :returns: The package entry or None if it doesn't exist.
+
+        """
+        row = self.conn.execute(
+            self.select + ' WHERE repo = ? AND name = ?',
+            (repo_id, pkg_name)
+        ).fetchone()
+
+        return self.__to_entry(row) if row else None
+
+    def find_entries(self, pkg_name):
+        """
+        Get the entries of a package in all the repositories.
+
+        :pkg_name: Name of the package.
+        :returns: A list of package entries.
+
+        """
+        rows = self.conn.execute(
+            self.select + ' WHERE name = ?',
+            (pkg_name,)
+        )
+
+        return [self.__to_entry(row) for row in rows]
+
+    def find_all_entries(self):
+        """
+        Get the entries of all the packages in all the repositories.
+
+        :returns: A list of package entries.
+
+        """
+        rows = self.conn.execute(self.select)
+
+        return [self.__to_entry(row) for row in rows]
+
+    def find_installed_entries(self):
+        """
+        Get the entries of all the installed packages.
+
+        :returns: A list of package entries.
+
+        """
+        rows = self.conn.execute(self.select + " WHERE local != ''")
+
+        return [self.__to_entry(row) for row in rows]
+
+    def find_outdated_entries(self):
+        """
+        Get the entries of all the installed packages whose remote revision
+        differs from the installed one, scanning only the outdated index.
+
+        :returns: A list of package entries.
+
+        """
+        rows = self.conn.execute(
+            self.select + " WHERE local != '' AND remote != local"
+        )
+
+        return [self.__to_entry(row) for row in rows]
+
+    def put_entry(self, entry):
+        """
+        Insert or replace a package entry.
+
+        :entry: The package entry.
+
+        """
+        self.put_entries([entry])
+
+    def put_entries(self, entries):
+        """
+        Insert or replace multiple package entries in a single statement.
+
+        :entries: Iterable of package entries.
+
+        """
+        self.conn.executemany(
+            'INSERT INTO packages ('
+            'repo, name, remote, local, materialized, last_check, '
+            'last_change, next_check, change_interval, check_delay, fetch_time'
+            ') VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) '
+            'ON CONFLICT (repo, name) DO UPDATE SET '
+            'remote = excluded.remote, local = excluded.local, '
+            'materialized = excluded.materialized, '
+            'last_check = excluded.last_check, '
+            'last_change = excluded.last_change, '
+            'next_check = excluded.next_check, '
+            'change_interval = excluded.change_interval, '
+            'check_delay = excluded.check_delay, '
+            'fetch_time = excluded.fetch_time',
+            (
+                (
+                    entry['repo'],
+                    entry['name'],
+                    entry['rev']['remote'],
+                    entry['rev']['local'],
+                    entry.get('materialized', True),
+                    *(
+                        entry.get('stats', {}).get(key)
+                        for key, _ in self.stats_columns
+                    )
+                )
+                for entry in entries
+            )
+        )
+
+    def delete_entry(self, repo_id, pkg_name):
+        """
+        Delete a package entry.
+
+        :repo_id: Identification of the repository of the package.
+        :pkg_name: Name of the package.
+
+        """
+        self.conn.execute(
+            'DELETE FROM packages WHERE repo = ? AND name = ?',
+            (repo_id, pkg_name)
+        )
+
+    def commit(self):
+        """
+        Commit the pending transaction.
+
+        """
+        self.conn.commit()
+
+    def close(self):
+        """
+        Release the resources of the backend (connections, open files and
+        memory maps). The pending changes are discarded.
+
+        """
+        self.conn.close()
+
+class JournalBackend(PackageDatabaseBackend):
+
+    """
+    Implementation of the backend which appends every change to a journal of
+    small JSON records instead of rewriting the whole database. The database
+    is read by replaying the journal over a JSON snapshot, and the journal is
+    folded into the snapshot (compacted) once it reaches a size threshold.
+    The compaction rewrites the whole snapshot, so it's run once the writer is
+    done (see 'optimize'), never on commit.
+
+    The durability of the journal records is configured by the 'fsync' option
+    of the [database] section of the configuration file:
+
+        record: the records are synced to disk as soon as they are written.
+        batch:  the records are synced to disk on commit (default).
+
+    """
+
+    def __init__(
+            self,
+            pkg_dir,
+            db_file='pkg_db.snapshot',
+            journal_file='pkg_db.journal',
+            json_file='pkg_db.json'):
+        """
+        Initialize the backend internal data.
+
+        :journal_file: Name of the journal file.
+        :json_file: Name of the JSON database file used to seed the snapshot.
+
+        """
+        super().__init__(pkg_dir, db_file)
+
+        self.journal_file = journal_file
+        self.journal_file_path = '{}/{}'.format(pkg_dir, journal_file)
+        self.fsync_mode = ConfigMgr.get('database', 'fsync', 'batch')
+        self.max_journal_size = int(
+            ConfigMgr.get('database', 'journal_max_size', str(1024 * 1024))
+        )
+
+        json_file_path = '{}/{}'.format(pkg_dir, json_file)
+        if not isfile(self.db_file_path) and isfile(json_file_path):
+            copyfile(json_file_path, self.db_file_path)
+
+        self.snapshot = JsonBackend(pkg_dir, db_file)
+        self.journal = None
+        self.journal_size = 0
+
+        self.__replay()
+
+    def __replay(self):
+        """
+        Apply the journal records over the snapshot. An incomplete record at
+        the end of the journal (e.g. an interrupted write) is ignored, and
+        discarded by the next write.
+
+        The journal is opened before the snapshot is loaded: if a compaction
+        happens in between, its records are already in the new snapshot and
+        replaying them again has no effect.
+
+        """
+        if not isfile(self.journal_file_path):
+            self.snapshot.load()
+            return
+
+        with open(self.journal_file_path, 'rb') as journal:
+            self.snapshot.load()
+
+            for line in journal:
+                try:
+                    if not line.endswith(b'\n'):
+                        raise ValueError('incomplete record')
+
+                    record = loads(line)
+                except ValueError:
+                    break
+
+                self.journal_size += len(line)
+
+                if record['op'] == 'put':
+                    self.snapshot.put_entry(record['entry'])
+                else:
+                    self.snapshot.delete_entry(record['repo'], record['name'])
+
+    def __append(self, records):
+        """
+        Append records to the journal.
+
+        :records: List of journal records.
+
+        """
+        if self.journal is None:
+            self.journal = open(self.journal_file_path, 'a')
+            self.journal.truncate(self.journal_size)
+
+        self.journal.write(''.join(dumps(record) + '\n' for record in records))
+
+        if self.fsync_mode == 'record':
+            self.journal.flush()
+            fsync(self.journal.fileno())
+
+    def get_entry(self, repo_id, pkg_name):
+        """
+        Get a package entry.
+
+        :repo_id: Identification of the repository of the package.
+        :pkg_name: Name of the package.
+        :returns: The package entry or None if it doesn't exist.
+
+        """
+        return self.snapshot.get_entry(repo_id, pkg_name)
+
+    def find_entries(self, pkg_name):
+        """
+        Get the entries of a package in all the repositories.
+
+        :pkg_name: Name of the package.
+        :returns: A list of package entries.
+
+        """
+        return self.snapshot.find_entries(pkg_name)
+
+    def find_all_entries(self):
+        """
+        Get the entries of all the packages in all the repositories.
+
+        :returns: A list of package entries.
+
+        """
+        return self.snapshot.find_all_entries()
+
+    def find_installed_entries(self):
+        """
+        Get the entries of all the installed packages.
+
+        :returns: A list of package entries.
+
+        """
+        return self.snapshot.find_installed_entries()
+
+    def put_entry(self, entry):
+        """
+        Insert or replace a package entry.
+
+        :entry: The package entry.
+
+        """
+        self.put_entries([entry])
+
+    def put_entries(self, entries):
+        """
+        Insert or replace multiple package entries, appending their records
+        to the journal with a single write.
+
+        :entries: Iterable of package entries.
+
+        """
+        records = []
+
+        for entry in entries:
+            self.snapshot.put_entry(entry)
+            records.append({ 'op': 'put', 'entry': entry })
+
+        self.__append(records)
+
+    def delete_entry(self, repo_id, pkg_name):
+        """
+        Delete a package entry.
+
+        :repo_id: Identification of the repository of the package.
+        :pkg_name: Name of the package.
+
+        """
+        self.snapshot.delete_entry(repo_id, pkg_name)
+        self.__append([{ 'op': 'delete', 'repo': repo_id, 'name': pkg_name }])
+
+    def commit(self):
+        """
+        Sync the journal to disk.
+
+        """
+        if self.journal is None:
+            return
+
+        self.journal.flush()
+        fsync(self.journal.fileno())
+
+    def optimize(self):
+        """
+        Compact the journal if it reached the size threshold.
+
+        """
+        if isfile(self.journal_file_path) and \
+                getsize(self.journal_file_path) >= self.max_journal_size:
+            self.compact()
+
+    def compact(self):
+        """
+        Fold the journal into the snapshot. The snapshot is replaced
+        atomically before the journal is replaced by an empty one, and
+        replaying a record twice has no effect, so neither an interrupted
+        compaction nor a concurrent reader loses records.
+
+        """
+        self.snapshot.commit()
+
+        tmp_file_path = self.journal_file_path + '.tmp'
+        open(tmp_file_path, 'w').close()
+        replace(tmp_file_path, self.journal_file_path)
+
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+
+        self.journal_size = 0
+
+    def close(self):
+        """
+        Release the resources of the backend (connections, open files and
+        memory maps). The pending changes are discarded.
+
+        """
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+
+class BinaryBackend(PackageDatabaseBackend):
+
+    """
+    Implementation of the backend which stores the package database in a
+    compact binary file, read through mmap without parsing it. The file has
+    the following layout (little-endian):
+
+        header:       magic (8 bytes), record count, string count (uint32)
+        records:      repo string, name string (uint32), remote and local
+                      revisions (20 raw bytes each, so only SHA-1 hashes are
+                      stored), flags (uint8), padding,
+                      last check, last change and next check times (double),
+                      change interval, check delay and fetch time (float)
+        string index: offset and length (uint32) of each string in the blob
+        string blob:  UTF-8 encoded strings
+
+    The repository IDs and package names are interned in the string table,
+    which is sorted, and the records are sorted by (repo string, name string).
+    So, a lookup is two binary searches on the string table followed by a
+    binary search on the records, comparing only integers.
+
+    The changes are kept in memory and the file is rewritten, atomically, on
+    commit.
+
+    """
+
+    magic = b'GURDB\x00\x00\x02'
+    header = Struct('<8sII')
+    record = Struct('<II20s20sB3xdddfff')
+    rev_size = 20
+    string = Struct('<II')
+
+    # files written before the package statistics were stored, which are
+    # read as is and rewritten in the current format on commit
+    magic_v1 = b'GURDB\x00\x00\x01'
+    record_v1 = Struct('<II20s20sB3x')
+
+    # flags of a record
+    has_remote = 0x01
+    has_local = 0x02
+    is_lazy = 0x04
+    has_stats = 0x08
+
+    # the package statistics, in record order
+    stats_keys = [
+        'last_check',
+        'last_change',
+        'next_check',
+        'interval',
+        'delay',
+        'fetch_time'
+    ]
+
+    def __init__(self, pkg_dir, db_file='pkg_db.bin', json_file='pkg_db.json'):
+        """
+        Initialize the backend internal data.
+
+        :json_file: Name of the JSON database file to be migrated.
+
+        """
+        super().__init__(pkg_dir, db_file)
+
+        self.__changes = {}
+
+        if not isfile(self.db_file_path):
+            json_file_path = '{}/{}'.format(pkg_dir, json_file)
+            entries = []
+
+            if isfile(json_file_path):
+                with open(json_file_path, 'r') as f:
+                    entries = load(f)
+
+                for entry in entries:
+                    entry.setdefault('repo', '')
+
+            self.__write(entries)
+
+        self.__map()
+
+    def __map(self):
+        """
+        Map the database file into memory.
+
+        """
+        with open(self.db_file_path, 'rb') as f:
+            self.mm = mmap(f.fileno(), 0, access=ACCESS_READ)
+
+        magic, self.record_count, self.string_count = \
+            self.header.unpack_from(self.mm, 0)
+
+        if magic == self.magic:
+            self.record_format = self.record
+        elif magic == self.magic_v1:
+            self.record_format = self.record_v1
+        else:
+            raise RuntimeError(
+                "the file '{}' is not a package database!".format(
+                    self.db_file_path
+                )
+            )
+
+        self.records_offset = self.header.size
+        self.strings_offset = \
+            self.records_offset + self.record_count * self.record_format.size
+        self.blob_offset = \
+            self.strings_offset + self.string_count * self.string.size
+
+    def __get_string(self, index):
+        """
+        Get a string of the string table.
+
+        :index: Index of the string.
+        :returns: The string.
+
+        """
+        offset, length = self.string.unpack_from(
+            self.mm,
+            self.strings_offset + index * self.string.size
+        )
+        offset += self.blob_offset
+
+        return self.mm[offset:offset + length].decode()
+
+    def __find_string(self, value):
+        """
+        Find the index of a string in the string table.
+
+        :value: The string.
+        :returns: The index of the string or None if it doesn't exist.
+
+        """
+        low, high = 0, self.string_count
+
+        while low < high:
+            mid = (low + high) // 2
+            curr = self.__get_string(mid)
+
+            if curr == value:
+                return mid
+            elif curr < value:
+                low = mid + 1
+            else:
+                high = mid
+
+        return None
+
+    def __get_record(self, index):
+        """
+        Get a record of the database file.
+
+        :index: Index of the record.
+        :returns: The (repo string, name string, remote, local, flags,
+                  <statistics>) record.
+
+        """
+        return self.record_format.unpack_from(
+            self.mm,
+            self.records_offset + index * self.record_format.size
+        )
+
+    def __to_entry(self, record):
+        """
+        Convert a record to a package entry.
+
+        :record: The record.
+        :returns: The package entry.
+
+        """
+        repo, name, remote, local, flags = record[:5]
+
+        entry = {
+            'name': self.__get_string(name),
+            'repo': self.__get_string(repo),
+            'rev': {
+                'remote': remote.hex() if flags & self.has_remote else '',
+                'local': local.hex() if flags & self.has_local else ''
+            }
+        }
+
+        if flags & self.is_lazy:
+            entry['materialized'] = False
+
+        if flags & self.has_stats:
+            entry['stats'] = dict(zip(self.stats_keys, record[5:]))
+
+        return entry
+
+    def __records(self):
+        """
+        Iterate over the records of the database file.
+
+        :returns: A generator of records.
+
+        """
+        for index in range(self.record_count):
+            yield self.__get_record(index)
+
+    def __stored_entry(self, repo_id, pkg_name):
+        """
+        Get a package entry from the database file.
+
+        :repo_id: Identification of the repository of the package.
+        :pkg_name: Name of the package.
+        :returns: The package entry or None if it doesn't exist.
+
+        """
+        repo = self.__find_string(repo_id)
+        name = self.__find_string(pkg_name)
+
+        if repo is None or name is None:
+            return None
+
+        low, high = 0, self.record_count
+
+        while low < high:
+            mid = (low + high) // 2
+            record = self.__get_record(mid)
+
+            if record[:2] == (repo, name):
+                return self.__to_entry(record)
+            elif record[:2] < (repo, name):
+                low = mid + 1
+            else:
+                high = mid
+
+        return None
+
+    def __entries(self):
+        """
+        Iterate over all the package entries, including the pending changes.
+
+        :returns: A generator of package entries.
+
+        """
+        for record in self.__records():
+            entry = self.__to_entry(record)
+            key = (entry['repo'], entry['name'])
+
+            if key not in self.__changes:
+                yield entry
+
+        for entry in self.__changes.values():
+            if entry is not None:
+                yield entry
+
+    def __pack_rev(self, rev):
+        """
+        Pack a revision into the raw bytes of a record.
+
+        :rev: Hash of the revision or '' if there's none.
+        :returns: The raw bytes of the revision (empty if there's none).
+
+        """
+        try:
+            raw_rev = bytes.fromhex(rev)
+        except ValueError:
+            raw_rev = None
+
+        # a longer hash would be truncated, and a shorter one padded
+        if raw_rev is None or len(raw_rev) not in (0, self.rev_size):
+            raise RuntimeError(
+                "the revision '{}' is not a SHA-1 hash, which the binary "
+                "backend can't store!".format(rev)
+            )
+
+        return raw_rev
+
+    def __write(self, entries):
+        """
+        Write the database file with the given entries. The content is
+        written to a temporary file which replaces the database file.
+
+        :entries: List of package entries.
+
+        """
+        strings = sorted(
+            {entry['repo'] for entry in entries} |
+            {entry['name'] for entry in entries}
+        )
+        records = sorted(
+            (
+                bisect_left(strings, entry['repo']),
+                bisect_left(strings, entry['name']),
+                self.__pack_rev(entry['rev']['remote']),
+                self.__pack_rev(entry['rev']['local']),
+                entry.get('materialized', True),
+                entry.get('stats')
+            )
+            for entry in entries
+        )
+
+        blob = bytearray()
+        string_index = bytearray()
+
+        for value in strings:
+            encoded = value.encode()
+            string_index += self.string.pack(len(blob), len(encoded))
+            blob += encoded
+
+        tmp_file_path = self.db_file_path + '.tmp'
+        with open(tmp_file_path, 'wb') as f:
+            f.write(self.header.pack(self.magic, len(records), len(strings)))
+
+            for repo, name, remote, local, materialized, stats in records:
+                f.write(
+                    self.record.pack(
+                        repo,
+                        name,
+                        remote,
+                        local,
+                        (self.has_remote if remote else 0) |
+                        (self.has_local if local else 0) |
+                        (0 if materialized else self.is_lazy) |
+                        (self.has_stats if stats else 0),
+                        *(
+                            stats[key] if stats else 0
+                            for key in self.stats_keys
+                        )
+                    )
+                )
+
+            f.write(string_index)
+            f.write(blob)
+            f.flush()
+            fsync(f.fileno())
+
+        replace(tmp_file_path, self.db_file_path)
+
+    def get_entry(self, repo_id, pkg_name):
+        """
+        Get a package entry.
+
+        :repo_id: Identification of the repository of the package.
+        :pkg_name: Name of the package.
+        :returns: The package entry or None if it doesn't exist.
+
+        """
+        if (repo_id, pkg_name) in self.__changes:
+            return self.__changes[(repo_id, pkg_name)]
+
+        return self.__stored_entry(repo_id, pkg_name)
+
+    def find_entries(self, pkg_name):
+        """
+        Get the entries of a package in all the repositories.
+
+        :pkg_name: Name of the package.
+        :returns: A list of package entries.
+
+        """
+        name = self.__find_string(pkg_name)
+        entries = [
+            self.__to_entry(record) for record in self.__records()
+            if record[1] == name
+        ]
+
+        return [
+            entry for entry in entries
+            if (entry['repo'], pkg_name) not in self.__changes
+        ] + [
+            entry for entry in self.__changes.values()
+            if entry is not None and entry['name'] == pkg_name
+        ]
+
+    def find_all_entries(self):
+        """
+        Get the entries of all the packages in all the repositories.
+
+        :returns: A list of package entries.
+
+        """
+        return list(self.__entries())
+
+    def find_installed_entries(self):
+        """
+        Get the entries of all the installed packages.
+
+        :returns: A list of package entries.
+
+        """
+        return [
+            entry for entry in self.__entries() if entry['rev']['local']
+        ]
+
+    def put_entry(self, entry):
+        """
+        Insert or replace a package entry.
+
+        :entry: The package entry.
+
+        """
+        # rejected before it's pending, so the next commits don't fail
+        self.__pack_rev(entry['rev']['remote'])
+        self.__pack_rev(entry['rev']['local'])
+
+        self.__changes[(entry['repo'], entry['name'])] = entry
+
+    def delete_entry(self, repo_id, pkg_name):
+        """
+        Delete a package entry.
+
+        :repo_id: Identification of the repository of the package.
+        :pkg_name: Name of the package.
+
+        """
+        self.__changes[(repo_id, pkg_name)] = None
+
+    def commit(self):
+        """
+        Rewrite the database file with the pending changes.
+
+        """
+        if not self.__changes:
+            return
+
+        self.__write(list(self.__entries()))
+        self.__changes = {}
+
+        self.mm.close()
+        self.__map()
+
+    def close(self):
+        """
+        Release the resources of the backend (connections, open files and
+        memory maps). The pending changes are discarded.
+
+        """
+        self.mm.close()
+
+class ShardedBackend(PackageDatabaseBackend):
+
+    """
+    Implementation of the backend which splits the package database in one
+    JSON shard per master repository, so the update of a master repository
+    only rewrites its own shard. The shards are listed by a manifest:
+
+        {
+            'generation': <commit count>,
+            'shards': { <repository ID>: <shard file name> }
+        }
+
+    The shards are never rewritten in place: a commit writes the changed
+    shards to new files, named after the generation, and then replaces the
+    manifest, which makes the whole commit visible at once. The manifest and
+    all the shards it lists are loaded in a single pass, so a reader sees
+    either every shard of a commit or none of them.
+
+    On the first use, the entries of the JSON database (if any) are migrated.
+
+    """
+
+    # attempts to load a consistent snapshot while a writer removes the
+    # shards it superseded
+    max_load_attempts = 5
+
+    def __init__(self, pkg_dir, db_file='pkg_db.d', json_file='pkg_db.json'):
+        """
+        Initialize the backend internal data.
+
+        :json_file: Name of the JSON database file to be migrated.
+
+        """
+        super().__init__(pkg_dir, db_file)
+
+        self.manifest_file_path = '{}/manifest.json'.format(self.db_file_path)
+        self.__shards = {}
+        self.__changed = set()
+
+        if not isdir(self.db_file_path):
+            mkdir(self.db_file_path)
+
+        if not isfile(self.manifest_file_path):
+            self.manifest = { 'generation': 0, 'shards': {} }
+
+            json_file_path = '{}/{}'.format(pkg_dir, json_file)
+            if isfile(json_file_path):
+                with open(json_file_path, 'r') as f:
+                    for entry in load(f):
+                        entry.setdefault('repo', '')
+                        self.put_entry(entry)
+
+            self.commit()
+        else:
+            self.__load()
+
+    def __load(self):
+        """
+        Load the manifest and all the shards it lists, in a single pass. If a
+        shard was removed meanwhile by a newer commit, the snapshot of that
+        commit is loaded instead.
+
+        """
+        for attempt in range(self.max_load_attempts):
+            with open(self.manifest_file_path, 'r') as f:
+                manifest = load(f)
+
+            try:
+                self.__shards = {
+                    repo_id: self.__read_shard(shard_file)
+                    for repo_id, shard_file in manifest['shards'].items()
+                }
+            except FileNotFoundError:
+                if attempt + 1 == self.max_load_attempts:
+                    raise
+
+                continue
+
+            self.manifest = manifest
+
+            return
+
+    def __read_shard(self, shard_file):
+        """
+        Read a shard file.
+
+        :shard_file: Name of the shard file.
+        :returns: A dict of the package entries of the shard keyed by package
+                  name.
+
+        """
+        with open('{}/{}'.format(self.db_file_path, shard_file), 'r') as f:
+            return { entry['name']: entry for entry in load(f) }
+
+    def get_entry(self, repo_id, pkg_name):
+        """
+        Get a package entry.
+
+        :repo_id: Identification of the repository of the package.
+        :pkg_name: Name of the package.
+        :returns: The package entry or None if it doesn't exist.
+
+        """
+        return self.__shards.get(repo_id, {}).get(pkg_name)
+
+    def find_entries(self, pkg_name):
+        """
+        Get the entries of a package in all the repositories.
+
+        :pkg_name: Name of the package.
+        :returns: A list of package entries.
+
+        """
+        return [
+            shard[pkg_name] for shard in self.__shards.values()
+            if pkg_name in shard
+        ]
+
+    def find_all_entries(self):
+        """
+        Get the entries of all the packages in all the repositories.
+
+        :returns: A list of package entries.
+
+        """
+        return [
+            entry
+            for shard in self.__shards.values()
+            for entry in shard.values()
+        ]
+
+    def find_installed_entries(self):
+        """
+        Get the entries of all the installed packages.
+
+        :returns: A list of package entries.
+
+        """
+        return [
+            entry
+            for shard in self.__shards.values()
+            for entry in shard.values()
+            if entry['rev']['local']
+        ]
+
+    def put_entry(self, entry):
+        """
+        Insert or replace a package entry.
+
+        :entry: The package entry.
+
+        """
+        self.__shards.setdefault(entry['repo'], {})[entry['name']] = entry
+        self.__changed.add(entry['repo'])
+
+    def delete_entry(self, repo_id, pkg_name):
+        """
+        Delete a package entry.
+
+        :repo_id: Identification of the repository of the package.
+        :pkg_name: Name of the package.
+
+        """
+        if self.__shards.get(repo_id, {}).pop(pkg_name, None) is not None:
+            self.__changed.add(repo_id)
+
+    def commit(self):
+        """
+        Write the changed shards to new files and replace the manifest, so
+        the commit is atomic. The shard files no longer listed are removed
+        afterwards.
+
+        """
+        if not self.__changed and isfile(self.manifest_file_path):
+            return
+
+        generation = self.manifest.get('generation', 0) + 1
+        shards = dict(self.manifest['shards'])
+
+        for repo_id in sorted(self.__changed):
+            shard_file = 'shard-{}.{}.json'.format(
+                quote(repo_id, safe=''),
+                generation
+            )
+
+            with open('{}/{}'.format(self.db_file_path, shard_file), 'w') as f:
+                dump(list(self.__shards[repo_id].values()), f)
+                f.flush()
+                fsync(f.fileno())
+
+            shards[repo_id] = shard_file
+
+        manifest = { 'generation': generation, 'shards': shards }
+
+        tmp_file_path = self.manifest_file_path + '.tmp'
+        with open(tmp_file_path, 'w') as f:
+            dump(manifest, f)
+            f.flush()
+            fsync(f.fileno())
+
+        replace(tmp_file_path, self.manifest_file_path)
+
+        self.manifest = manifest
+        self.__changed = set()
+
+        # the superseded shards and the ones of interrupted commits
+        live_files = set(shards.values()) | {'manifest.json'}
+
+        for file_name in listdir(self.db_file_path):
+            if file_name not in live_files:
+                remove('{}/{}'.format(self.db_file_path, file_name))
+
+# storage backends available for the package database.
+backend_map = {
+    'binary': BinaryBackend,
+    'json': JsonBackend,
+    'journal': JournalBackend,
+    'sharded': ShardedBackend,
+    'sqlite': SqliteBackend
+}
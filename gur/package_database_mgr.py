@@ -1,6 +1,10 @@
-from json import dump, load
+from fcntl import flock, LOCK_EX, LOCK_NB, LOCK_UN
 from os import chdir
-from os.path import isdir, isfile
+from os.path import isdir
+from threading import RLock
+
+from config_mgr import ConfigMgr
+from package_database_backends import backend_map
 
 class PackageDatabaseMgr:
 
@@ -8,15 +12,26 @@ class PackageDatabaseMgr:
     Implementation of the class responsible for the management of the package
     database.
 
+    The entries are stored by a backend (see package_database_backends), keyed
+    by (repo_id, package name). The pending changes are made persistent by
+    'flush'.
+
+    Only one writer is allowed at a time, which must hold the database lock
+    (see 'lock'). The backends replace their files atomically, so readers
+    don't need the lock and always see the last flushed state. Within the
+    writer, the changes made by multiple threads are serialized.
+
     """
 
-    def __init__(self):
+    def __init__(self, backend=None):
         """
         Initialize the package database mgr data.
 
+        :backend: Name of the storage backend. If not specified, the backend
+                  is read from the configuration file ('json' by default).
+
         """
         self.pkg_dir = "/var/db/gur/"
-        self.db_file = "pkg_db.json"
 
         if not isdir(self.pkg_dir):
             raise RuntimeError(
@@ -25,48 +40,248 @@ class PackageDatabaseMgr:
                 )
             )
 
-        db_file_path = '{}/{}'.format(self.pkg_dir, self.db_file)
-        if not isfile(db_file_path):
-            with open(db_file_path, 'w') as f:
-                dump([], f)
+        if backend is None:
+            backend = ConfigMgr.get('database', 'backend', 'json')
+
+        if backend not in backend_map:
+            raise RuntimeError(
+                "the database backend '{}' is not supported!".format(backend)
+            )
+
+        self.backend_name = backend
+        self.backend = backend_map[backend](self.pkg_dir)
+        self.db_file = self.backend.db_file
+        self.lock_file = None
+        self.__thread_lock = RLock()
+
+    def __lookup(self, pkg_name, repo_id):
+        """
+        Look up a package entry, adopting entries written before the database
+        was keyed by repository.
+
+        :pkg_name: Name of the package.
+        :repo_id: Identification of the repository of the package.
+        :returns: The package entry or None if it doesn't exist.
+
+        """
+        entry = self.backend.get_entry(repo_id, pkg_name)
+
+        if entry is None and repo_id:
+            entry = self.backend.get_entry('', pkg_name)
+
+            if entry is not None:
+                self.backend.delete_entry('', pkg_name)
+                entry['repo'] = repo_id
+                self.backend.put_entry(entry)
+
+        return entry
+
+    def get_remote_rev(self, pkg_name, repo_id=''):
+        """
+        Get the remote revision of a package, as of the last update.
+
+        :pkg_name: Name of the package.
+        :repo_id: Identification of the repository of the package.
+        :returns: The hash of the head commit or None if the package doesn't
+                  exist.
+
+        """
+        with self.__thread_lock:
+            entry = self.__lookup(pkg_name, repo_id)
+
+        return entry['rev']['remote'] if entry is not None else None
+
+    def get_stats(self, pkg_name, repo_id=''):
+        """
+        Get the statistics of a package, recorded by the update checks (see
+        poll_scheduler).
+
+        :pkg_name: Name of the package.
+        :repo_id: Identification of the repository of the package.
+        :returns: The statistics of the package or None if it has none.
+
+        """
+        with self.__thread_lock:
+            entry = self.__lookup(pkg_name, repo_id)
+
+        return entry.get('stats') if entry is not None else None
+
+    def set_stats_many(self, entries):
+        """
+        Set the statistics of multiple packages at once. The entries which
+        don't exist in the package database are ignored.
+
+        :entries: Iterable of (pkg_name, repo_id, stats) tuples.
 
-    def add_entry(self, pkg_name, head_commit):
         """
-        Add a new package entry into the package database.
+        with self.__thread_lock:
+            changed = []
+
+            for pkg_name, repo_id, stats in entries:
+                entry = self.__lookup(pkg_name, repo_id)
+
+                if entry is not None:
+                    entry['stats'] = stats
+                    changed.append(entry)
+
+            self.backend.put_entries(changed)
+
+    def add_entry(self, pkg_name, head_commit, repo_id=''):
+        """
+        Add a new package entry into the package database. If the package is
+        already registered, only its remote revision is updated.
 
         :pkg_name: Name of the package.
         :head_commit: Hash of the head commit of the package.
+        :repo_id: Identification of the repository of the package.
 
         """
-        with open(self.db_file, 'r+') as f:
-            pkg_entry = {
-                'name': pkg_name,
-                'rev': { 'remote': head_commit, 'local': '' }
-            }
+        self.add_entries([(pkg_name, head_commit, repo_id)])
 
-            curr_content = load(f)
-            curr_content.append(pkg_entry)
+    def add_entries(self, entries, materialized=True):
+        """
+        Add multiple package entries into the package database at once.
 
-            f.seek(0)
+        :entries: Iterable of (pkg_name, head_commit, repo_id) tuples.
+        :materialized: If False, the packages are tracked by their remote
+                       revision only, without a package repository.
 
-            dump(curr_content, f)
+        """
+        self.upsert_many(entries, materialized=materialized)
 
-    def update_entry(self, pkg_name, head_commit):
+    def update_entry(self, pkg_name, head_commit, repo_id=''):
         """
         Update an existing package entry in the package database.
 
         :pkg_name: Name of the package.
         :head_commit: Hash of the head commit of the package.
+        :repo_id: Identification of the repository of the package.
 
         """
-        with open(self.db_file, 'r+') as f:
-            curr_content = load(f)
+        self.update_entries([(pkg_name, head_commit, repo_id)])
 
-            for entry in curr_content:
-                if entry['name'] == pkg_name:
+    def update_entries(self, entries):
+        """
+        Update multiple existing package entries at once. The entries which
+        don't exist in the package database are ignored.
+
+        :entries: Iterable of (pkg_name, head_commit, repo_id) tuples.
+
+        """
+        self.upsert_many(entries, create=False)
+
+    def upsert_many(self, entries, create=True, materialized=True):
+        """
+        Set the remote revision of multiple packages, handing all the changed
+        entries to the backend in a single batch.
+
+        :entries: Iterable of (pkg_name, head_commit, repo_id) tuples.
+        :create: If True, the missing entries are created; otherwise they are
+                 ignored.
+        :materialized: If the packages have a package repository, with the
+                       objects of their remote revision.
+
+        """
+        with self.__thread_lock:
+            changed = []
+
+            for pkg_name, head_commit, repo_id in entries:
+                entry = self.__lookup(pkg_name, repo_id)
+
+                if entry is None:
+                    if not create:
+                        continue
+
+                    entry = {
+                        'name': pkg_name,
+                        'repo': repo_id,
+                        'rev': { 'remote': head_commit, 'local': '' }
+                    }
+                else:
                     entry['rev']['remote'] = head_commit
-                    f.seek(0)
-                    dump(curr_content, f)
+
+                # the entries are materialized unless stated otherwise
+                if materialized:
+                    entry.pop('materialized', None)
+                else:
+                    entry['materialized'] = False
+
+                changed.append(entry)
+
+            self.backend.put_entries(changed)
+
+    def remove_entry(self, pkg_name, repo_id=''):
+        """
+        Remove a package entry from the package database.
+
+        :pkg_name: Name of the package.
+        :repo_id: Identification of the repository of the package.
+
+        """
+        self.remove_entries([(pkg_name, repo_id)])
+
+    def remove_entries(self, entries):
+        """
+        Remove multiple package entries from the package database at once. The
+        entries which don't exist are ignored.
+
+        :entries: Iterable of (pkg_name, repo_id) tuples.
+
+        """
+        with self.__thread_lock:
+            for pkg_name, repo_id in entries:
+                if self.__lookup(pkg_name, repo_id) is not None:
+                    self.backend.delete_entry(repo_id, pkg_name)
+
+    def lock(self):
+        """
+        Acquire the writer lock of the package database. The database is
+        loaded again once the lock is acquired, so the changes of the previous
+        writer are not lost.
+
+        """
+        lock_file = open('{}/pkg_db.lock'.format(self.pkg_dir), 'w')
+
+        try:
+            flock(lock_file, LOCK_EX | LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+
+            raise RuntimeError(
+                'the package database is locked by another update!'
+            )
+
+        self.lock_file = lock_file
+
+        with self.__thread_lock:
+            self.backend.close()
+            self.backend = backend_map[self.backend_name](self.pkg_dir)
+
+    def unlock(self):
+        """
+        Release the writer lock of the package database, once the maintenance
+        deferred by the flushes (see package_database_backends) has run, off
+        the commit path.
+
+        """
+        if self.lock_file is None:
+            return
+
+        try:
+            with self.__thread_lock:
+                self.backend.optimize()
+        finally:
+            flock(self.lock_file, LOCK_UN)
+            self.lock_file.close()
+            self.lock_file = None
+
+    def flush(self):
+        """
+        Make the pending changes of the package database persistent.
+
+        """
+        with self.__thread_lock:
+            self.backend.commit()
 
     def switch_dir(self):
         """
@@ -75,20 +290,75 @@ class PackageDatabaseMgr:
         """
         chdir(self.pkg_dir)
 
-    def is_pkg_installed(self, pkg_name):
+    def is_pkg_installed(self, pkg_name, repo_id=None):
         """
         Verify if a given package is installed.
 
         :pkg_name: Name of the package.
+        :repo_id: Identification of the repository of the package. If not
+                  specified, the package is searched in all repositories.
         :returns: True if the package is installed; otherwise False.
 
         """
-        with open(self.db_file, 'r') as f:
-            curr_content = load(f)
+        with self.__thread_lock:
+            if repo_id is not None:
+                entry = self.__lookup(pkg_name, repo_id)
+
+                return entry is not None and bool(entry['rev']['local'])
+
+            entries = self.backend.find_entries(pkg_name)
+
+        return any(entry['rev']['local'] for entry in entries)
+
+    def get_entries(self):
+        """
+        Get the entries of all the packages with a single query to the package
+        database.
+
+        :returns: A list of package entries.
 
-            for entry in curr_content:
-                if entry['name'] == pkg_name and entry['rev']['local']:
-                    return True
+        """
+        with self.__thread_lock:
+            return self.backend.find_all_entries()
+
+    def get_lazy_entries(self):
+        """
+        Get the entries of the packages tracked by their remote revision only,
+        which weren't materialized yet.
 
+        :returns: A list of package entries.
+
+        """
+        return [
+            entry for entry in self.get_entries()
+            if not entry.get('materialized', True)
+        ]
+
+    def get_installed_pkgs(self):
+        """
+        Get all the installed packages with a single query to the package
+        database.
+
+        :returns: A set of (repo_id, package name) tuples.
+
+        """
+        with self.__thread_lock:
+            entries = self.backend.find_installed_entries()
+
+        return { (entry['repo'], entry['name']) for entry in entries }
+
+    def get_outdated_pkgs(self):
+        """
+        Get all the installed packages whose remote revision differs from the
+        installed one. Only the package database is queried.
+
+        :returns: A list of package entries, sorted by repository and name.
+
+        """
+        with self.__thread_lock:
+            entries = self.backend.find_outdated_entries()
 
-        return False
+        return sorted(
+            entries,
+            key=lambda entry: (entry['repo'], entry['name'])
+        )
@@ -7,10 +7,16 @@ class PackageDesc:
 
     """
 
-    def __init__(self, parent_repo, pkg_name):
+    def __init__(self, parent_repo, pkg_name, pkg_desc_content=None):
         """
         Initialize the package description internal data.
 
+        :parent_repo: Identification of the master repository.
+        :pkg_name: Name of the package entry in the master repository.
+        :pkg_desc_content: Parsed content of the pkg_desc file. If not
+                           specified, the file is read from the working tree
+                           of the master repository.
+
         """
         desc_file = '{}/src/{}/pkg_desc.json'.format(
             parent_repo,
@@ -21,13 +27,16 @@ class PackageDesc:
         self.__branch = ''
         self.__dir = ''
         self.__repo = ''
+        self.__description = ''
 
-        with open(desc_file, 'r') as pkg_desc:
-            pkg_desc_content = load(pkg_desc)
+        if pkg_desc_content is None:
+            with open(desc_file, 'r') as pkg_desc:
+                pkg_desc_content = load(pkg_desc)
 
-            self.__name = pkg_desc_content['name']
-            self.__branch = pkg_desc_content['branch']
-            self.__repo = pkg_desc_content['repo']
+        self.__name = pkg_desc_content['name']
+        self.__branch = pkg_desc_content['branch']
+        self.__repo = pkg_desc_content['repo']
+        self.__description = pkg_desc_content.get('description', '')
 
         self.__dir = '{}/src/{}/.repo'.format(
             parent_repo,
@@ -73,3 +82,13 @@ class PackageDesc:
 
         """
         return self.__branch
+
+    @property
+    def description(self):
+        """
+        Get the package description according to the pkg_desc file, if any.
+
+        :returns: The package description.
+
+        """
+        return self.__description
@@ -0,0 +1,265 @@
+from os import listdir, rmdir
+from os.path import dirname, isdir, isfile, realpath
+from shutil import rmtree
+
+from config_mgr import ConfigMgr
+from mirrors_mgr import MirrorsMgr
+from object_store import ObjectStore
+from package_desc import PackageDesc
+from utils import Utils
+
+class PackagePruner:
+
+    """
+    Implementation of the class responsible for pruning what is left behind by
+    the packages removed upstream and by the master repositories removed from
+    the mirrors file: their package entries, their repositories and the store
+    repositories no longer borrowed by any package.
+
+    The entries and the package repositories of the installed packages are
+    kept, and so are the master repositories which have installed packages. Nothing is pruned if the
+    mirrors file lists no master repository: an empty or mis-edited mirrors
+    file must not wipe the package directory. All the paths are relative to
+    the package directory.
+
+    """
+
+    def __init__(self, pkg_mgr, search_idx, object_store=None):
+        """
+        Initialize the package pruner internal data.
+
+        :pkg_mgr: The package database mgr.
+        :search_idx: The search index mgr.
+        :object_store: Shared object store of the package repositories. If
+                       not specified, it's used only if enabled in the
+                       configuration file ('shared' option of 'store').
+
+        """
+        if object_store is None and ConfigMgr.get_boolean('store', 'shared'):
+            object_store = ObjectStore()
+
+        self.pkg_mgr = pkg_mgr
+        self.search_idx = search_idx
+        self.object_store = object_store
+
+    @staticmethod
+    def get_mirror_ids():
+        """
+        Get the master repository IDs of the mirrors file.
+
+        :returns: A set of master repository IDs.
+
+        """
+        mirror_ids = set()
+
+        for repo_entry in MirrorsMgr.get_mirrors():
+            if ',' in repo_entry:
+                mirror_ids.add(Utils.get_repo_id(repo_entry.split(',')[1]))
+
+        return mirror_ids
+
+    @staticmethod
+    def find_master_repos():
+        """
+        Find the master repositories in the package directory.
+
+        :returns: A list of master repository IDs.
+
+        """
+        repo_ids = []
+
+        for user in sorted(listdir('.')):
+            if not isdir(user):
+                continue
+
+            for repo_name in sorted(listdir(user)):
+                repo_id = '{}/{}'.format(user, repo_name)
+
+                if isdir(repo_id + '/.git'):
+                    repo_ids.append(repo_id)
+
+        return repo_ids
+
+    def prune_master_repos(self, full=False):
+        """
+        Remove the master repositories which are no longer in the mirrors file,
+        along with their package entries, unless they have installed packages.
+
+        :full: If True, the master repositories are searched in the package
+               directory as well; otherwise only the ones known by the package
+               database are checked.
+        :returns: A dict of the removed package names by master repository ID.
+
+        """
+        mirror_ids = self.get_mirror_ids()
+
+        if not mirror_ids:
+            return {}
+
+        entries = self.pkg_mgr.get_entries()
+        repo_ids = {entry['repo'] for entry in entries if entry['repo']}
+
+        if full:
+            repo_ids.update(self.find_master_repos())
+
+        # the package repositories of the installed packages are kept
+        repo_ids -= {
+            entry['repo'] for entry in entries if entry['rev']['local']
+        }
+
+        pruned = {}
+
+        for repo_id in sorted(repo_ids - mirror_ids):
+            pkg_names = [
+                entry['name'] for entry in entries if entry['repo'] == repo_id
+            ]
+
+            if not pkg_names and not isdir(repo_id):
+                continue
+
+            if isdir(repo_id):
+                rmtree(repo_id)
+
+                try:
+                    rmdir(dirname(repo_id))
+                except OSError:
+                    pass # other master repositories of the same user
+
+            self.search_idx.discard_repo(repo_id)
+            self.search_idx.commit_repo(repo_id)
+
+            pruned[repo_id] = pkg_names
+
+        self.__remove_entries(pruned)
+
+        return pruned
+
+    def prune_pkgs(self):
+        """
+        Remove the packages whose description is no longer in the working tree
+        of their master repository: their package entries and the package
+        repositories left in the 'src' dir, unless they're installed. The
+        master repositories which weren't initialized yet are skipped.
+
+        :returns: A dict of the removed package names by master repository ID.
+
+        """
+        mirror_ids = self.get_mirror_ids()
+
+        if not mirror_ids:
+            return {}
+
+        entries = self.pkg_mgr.get_entries()
+        pkg_names = set()
+        pruned = {}
+
+        for repo_id in sorted(mirror_ids):
+            src_dir = '{}/src'.format(repo_id)
+
+            if not isdir(src_dir):
+                pkg_names.update(
+                    entry['name'] for entry in entries
+                    if entry['repo'] == repo_id
+                )
+                continue
+
+            repo_pkg_names = set()
+            installed_names = {
+                entry['name'] for entry in entries
+                if entry['repo'] == repo_id and entry['rev']['local']
+            }
+
+            for pkg_entry in listdir(src_dir):
+                if isfile('{}/{}/pkg_desc.json'.format(src_dir, pkg_entry)):
+                    repo_pkg_names.add(PackageDesc(repo_id, pkg_entry).name)
+                elif pkg_entry not in installed_names:
+                    # without a description, the package entry is known by
+                    # its dir, which is named after the package
+                    rmtree('{}/{}'.format(src_dir, pkg_entry), True)
+
+            pkg_names.update(repo_pkg_names)
+            pruned[repo_id] = [
+                entry['name'] for entry in entries
+                if entry['repo'] == repo_id
+                and entry['name'] not in repo_pkg_names
+                and not entry['rev']['local']
+            ]
+
+        # entries written before the database was keyed by repository
+        pruned[''] = [
+            entry['name'] for entry in entries
+            if not entry['repo']
+            and entry['name'] not in pkg_names
+            and not entry['rev']['local']
+        ]
+
+        pruned = {
+            repo_id: names for repo_id, names in pruned.items() if names
+        }
+
+        self.__remove_entries(pruned)
+
+        return pruned
+
+    def prune_object_store(self):
+        """
+        Remove the store repositories which aren't borrowed by any package
+        repository anymore.
+
+        :returns: A list of the removed store repository paths.
+
+        """
+        if self.object_store is None:
+            return []
+
+        store_dir = self.object_store.store_dir
+
+        if not isdir(store_dir):
+            return []
+
+        borrowed = set()
+
+        for repo_id in self.find_master_repos():
+            src_dir = '{}/src'.format(repo_id)
+
+            if not isdir(src_dir):
+                continue
+
+            for pkg_entry in listdir(src_dir):
+                alternates_file = '{}/{}/.repo/.git/objects/info/alternates'.format(
+                    src_dir,
+                    pkg_entry
+                )
+
+                if isfile(alternates_file):
+                    with open(alternates_file, 'r') as f:
+                        borrowed.update(
+                            realpath(path) for path in f.read().splitlines()
+                        )
+
+        removed = []
+
+        for store_repo in sorted(listdir(store_dir)):
+            store_path = '{}/{}'.format(store_dir, store_repo)
+
+            if realpath('{}/objects'.format(store_path)) not in borrowed:
+                rmtree(store_path, True)
+                removed.append(store_path)
+
+        return removed
+
+    def __remove_entries(self, pruned):
+        """
+        Remove the package entries of the pruned packages, in a single batch.
+
+        :pruned: A dict of the package names by master repository ID.
+
+        """
+        removed_entries = [
+            (pkg_name, repo_id)
+            for repo_id, pkg_names in pruned.items()
+            for pkg_name in pkg_names
+        ]
+
+        if removed_entries:
+            self.pkg_mgr.remove_entries(removed_entries)
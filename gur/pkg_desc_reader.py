@@ -0,0 +1,155 @@
+from json import dump, load, loads
+from os import fsync, replace
+from os.path import isfile
+from threading import Lock
+
+from git_plumbing import GitPlumbing
+from package_desc import PackageDesc
+
+class PkgDescReader:
+
+    """
+    Implementation of the class responsible for reading the package
+    descriptions (src/<pkg>/pkg_desc.json) of the master repositories straight
+    from the HEAD tree of their object database, without the working tree.
+
+    The blobs are read through the persistent 'git cat-file --batch' process of
+    each repository, and the parsed descriptions are cached by master
+    repository and blob hash, so an unchanged pkg_desc.json is neither read nor
+    parsed again in the next updates. The master repositories are opened through the git plumbing, so
+    their handles are shared with the update and the reads count as git
+    processes (see git_plumbing).
+
+    """
+
+    def __init__(
+            self,
+            pkg_dir='/var/db/gur/',
+            cache_file='pkg_desc_cache.json',
+            plumbing=None):
+        """
+        Initialize the reader internal data.
+
+        :pkg_dir: Directory of the package database.
+        :cache_file: Name of the cache file.
+        :plumbing: Git plumbing which opens the master repositories. If not
+                   specified, the reader has its own.
+
+        """
+        self.cache_file_path = '{}/{}'.format(pkg_dir, cache_file)
+        self.plumbing = GitPlumbing() if plumbing is None else plumbing
+        self.__cache = None
+        self.__listed = {}
+        self.__dirty = False
+        self.__blobs = {}
+        self.__lock = Lock()
+
+    def __get_cache(self):
+        """
+        Get the cache of parsed descriptions, loading it from the cache file on
+        the first access.
+
+        :returns: A dict of parsed descriptions by blob hash, by master
+                  repository.
+
+        """
+        if self.__cache is None:
+            self.__cache = {}
+
+            if isfile(self.cache_file_path):
+                with open(self.cache_file_path, 'r') as f:
+                    self.__cache = load(f)
+
+        return self.__cache
+
+    def list_pkgs(self, repo_id):
+        """
+        List the packages of a master repository, according to its HEAD tree.
+
+        :repo_id: Identification of the master repository.
+        :returns: A list of package entries (directory names under src).
+
+        """
+        repo = self.plumbing.open_master_repo(repo_id)
+        blobs = {}
+
+        with self.plumbing.process('read_tree'):
+            try:
+                src_tree = repo.head.commit.tree / 'src'
+            except KeyError:
+                src_tree = None
+
+            if src_tree is not None:
+                for pkg_tree in src_tree.trees:
+                    try:
+                        blobs[pkg_tree.name] = pkg_tree / 'pkg_desc.json'
+                    except KeyError:
+                        continue
+
+        with self.__lock:
+            self.__blobs[repo_id] = blobs
+            self.__listed[repo_id] = {blob.hexsha for blob in blobs.values()}
+
+        return list(blobs)
+
+    def get_pkg_desc(self, repo_id, pkg_entry):
+        """
+        Get the description of a package listed by list_pkgs.
+
+        :repo_id: Identification of the master repository.
+        :pkg_entry: Name of the package entry.
+        :returns: The package description.
+
+        """
+        with self.__lock:
+            blob = self.__blobs[repo_id][pkg_entry]
+            cache = self.__get_cache().setdefault(repo_id, {})
+            content = cache.get(blob.hexsha)
+
+            if content is None:
+                # the batch process of the repository is not thread-safe
+                with self.plumbing.process('read_blob'):
+                    content = loads(blob.data_stream.read().decode('utf-8'))
+                cache[blob.hexsha] = content
+                self.__dirty = True
+
+        return PackageDesc(repo_id, pkg_entry, content)
+
+    def save(self):
+        """
+        Write the cached descriptions to the cache file, atomically. The
+        master repositories are released by the git plumbing.
+
+        """
+        with self.__lock:
+            self.__blobs = {}
+
+            cache = self.__get_cache()
+
+            # only the master repositories listed during this run are known to
+            # no longer reference some of their descriptions, the other ones
+            # are kept as they are
+            for repo_id, listed in self.__listed.items():
+                repo_cache = cache.get(repo_id, {})
+
+                if any(blob_sha not in listed for blob_sha in repo_cache):
+                    cache[repo_id] = {
+                        blob_sha: content
+                        for blob_sha, content in repo_cache.items()
+                        if blob_sha in listed
+                    }
+                    self.__dirty = True
+
+            self.__listed = {}
+
+            if not self.__dirty:
+                return
+
+            tmp_file_path = self.cache_file_path + '.tmp'
+            with open(tmp_file_path, 'w') as f:
+                dump(cache, f)
+                f.flush()
+                fsync(f.fileno())
+
+            replace(tmp_file_path, self.cache_file_path)
+            self.__dirty = False
@@ -0,0 +1,127 @@
+from time import time
+
+from config_mgr import ConfigMgr
+
+class PollScheduler:
+
+    """
+    Implementation of the class responsible for scheduling the checks of the
+    package repositories from the history of their changes.
+
+    The statistics of each package are kept in its package entry:
+
+        last_check:  time of the last check.
+        last_change: time of the last check which found a new revision.
+        next_check:  time from which the package is checked again.
+        interval:    observed change interval, as an exponential moving
+                     average of the intervals between the changes (0 until
+                     the first change is observed).
+        delay:       delay between the last check and the next one.
+        fetch_time:  duration of the last check, in seconds.
+
+    A package which changed is checked again after half of its change interval
+    and every check without changes multiplies the delay by the backoff
+    factor, always within [min_interval, max_interval]. The packages without
+    statistics are always due.
+
+    """
+
+    def __init__(
+            self,
+            min_interval=3600,
+            max_interval=604800,
+            backoff=2.0,
+            full=False):
+        """
+        Initialize the poll scheduler internal data.
+
+        :min_interval: Minimum delay between two checks, in seconds.
+        :max_interval: Maximum delay between two checks, in seconds.
+        :backoff: Factor by which the delay grows on each check without
+                  changes.
+        :full: If True, all the packages are due, no matter their schedule.
+
+        """
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.full = full
+
+    @classmethod
+    def from_config(cls, full=False):
+        """
+        Create the poll scheduler from the 'schedule' section of the
+        configuration file.
+
+        :full: If True, all the packages are due, no matter their schedule.
+        :returns: The poll scheduler.
+
+        """
+        return cls(
+            float(ConfigMgr.get('schedule', 'min_interval', 3600)),
+            float(ConfigMgr.get('schedule', 'max_interval', 604800)),
+            float(ConfigMgr.get('schedule', 'backoff', 2.0)),
+            full
+        )
+
+    def __clamp(self, delay):
+        """
+        Bound a delay to the scheduler interval.
+
+        :delay: The delay, in seconds.
+        :returns: The bounded delay.
+
+        """
+        return min(max(delay, self.min_interval), self.max_interval)
+
+    def is_due(self, stats, now=None):
+        """
+        Verify if a package must be checked.
+
+        :stats: The statistics of the package, if any.
+        :now: The current time. If not specified, the system time is used.
+        :returns: True if the package must be checked; otherwise False.
+
+        """
+        if self.full or not stats:
+            return True
+
+        return (time() if now is None else now) >= stats['next_check']
+
+    def record_check(self, stats, changed, fetch_time, now=None):
+        """
+        Record a check of a package and schedule the next one.
+
+        :stats: The statistics of the package, if any.
+        :changed: If the check found a new revision.
+        :fetch_time: Duration of the check, in seconds.
+        :now: The current time. If not specified, the system time is used.
+        :returns: The new statistics of the package.
+
+        """
+        now = time() if now is None else now
+
+        if not stats:
+            # first check, so the package is taken as just changed
+            stats = { 'last_change': now, 'interval': 0.0 }
+            delay = self.min_interval
+        elif changed:
+            interval = now - stats['last_change']
+
+            if stats['interval']:
+                interval = (stats['interval'] + interval) / 2
+
+            stats = dict(stats, last_change=now, interval=interval)
+            delay = self.__clamp(interval / 2)
+        else:
+            stats = dict(stats)
+            delay = self.__clamp(stats['delay'] * self.backoff)
+
+        stats.update(
+            last_check=now,
+            next_check=now + delay,
+            delay=delay,
+            fetch_time=fetch_time
+        )
+
+        return stats
@@ -0,0 +1,51 @@
+from abc import ABC, abstractmethod
+
+class PruneListener(ABC):
+
+    """
+    Definition of the interface for the prune command events.
+
+    """
+
+    @abstractmethod
+    def on_prune_start(self):
+        """
+        Trigger an on_prune_start event, which indicates the start of prune
+        operation.
+
+        """
+        pass # pragma: no cover
+
+    @abstractmethod
+    def on_prune_finish(self, count):
+        """
+        Trigger an on_prune_finish event, which indicates the end of prune
+        operation.
+
+        :count: Number of pruned packages.
+
+        """
+        pass # pragma: no cover
+
+    @abstractmethod
+    def on_master_repo_prune(self, repo_id):
+        """
+        Trigger an on_master_repo_prune event, which indicates that a master
+        repository which is no longer in the mirrors file was removed.
+
+        :repo_id: Identification of the master repository.
+
+        """
+        pass # pragma: no cover
+
+    @abstractmethod
+    def on_pkg_prune(self, repo_id, pkg_name):
+        """
+        Trigger an on_pkg_prune event, which indicates that a package removed
+        upstream was pruned.
+
+        :repo_id: Identification of the master repository of the package.
+        :pkg_name: Name of the package.
+
+        """
+        pass # pragma: no cover
@@ -0,0 +1,180 @@
+from collections import OrderedDict
+from os import stat
+from re import match
+from threading import Lock
+
+class RefResolver:
+
+    """
+    Implementation of the class responsible for resolving the remote branches
+    of the repositories straight from their files, with no git process:
+
+        1. the loose ref (refs/remotes/origin/<branch>).
+        2. the 'packed-refs' file.
+        3. the 'FETCH_HEAD' file of the last fetch.
+
+    The parsed 'packed-refs' and 'FETCH_HEAD' files are cached by repository
+    (the least recently used are dropped first) and parsed again when they
+    change on disk.
+
+    """
+
+    max_symref_depth = 5
+
+    def __init__(self, cache_size=256):
+        """
+        Initialize the ref resolver internal data.
+
+        :cache_size: Maximum number of parsed files kept in the cache.
+
+        """
+        self.cache_size = cache_size
+        self.__cache = OrderedDict()
+        self.__lock = Lock()
+
+    def resolve(self, git_dir, branch_name):
+        """
+        Resolve a remote branch of a repository.
+
+        :git_dir: Path of the git dir of the repository.
+        :branch_name: Name of the branch of the origin remote.
+        :returns: The hash of the head commit or None if it couldn't be
+                  resolved.
+
+        """
+        ref_path = 'refs/remotes/origin/{}'.format(branch_name)
+
+        for _ in range(self.max_symref_depth):
+            target = self.__read_loose_ref(git_dir, ref_path)
+
+            if target is None:
+                break
+
+            if not target.startswith('ref: '):
+                return target
+
+            ref_path = target[5:]
+
+        head_commit = self.__get_packed_refs(git_dir).get(ref_path)
+
+        if head_commit is None:
+            head_commit = self.__get_fetch_heads(git_dir).get(branch_name)
+
+        return head_commit
+
+    def resolve_many(self, branches):
+        """
+        Resolve the remote branches of multiple repositories in a single pass.
+
+        :branches: Iterable of (git_dir, branch_name) tuples.
+        :returns: A list of head commit hashes (or None for the ones which
+                  couldn't be resolved), in the same order.
+
+        """
+        return [
+            self.resolve(git_dir, branch_name)
+            for git_dir, branch_name in branches
+        ]
+
+    @staticmethod
+    def __read_loose_ref(git_dir, ref_path):
+        """
+        Read a loose ref.
+
+        :git_dir: Path of the git dir of the repository.
+        :ref_path: Full path of the ref.
+        :returns: The content of the ref or None if it doesn't exist.
+
+        """
+        try:
+            with open('{}/{}'.format(git_dir, ref_path), 'r') as f:
+                return f.read().strip()
+        except (OSError, ValueError):
+            return None
+
+    def __get_cached(self, file_path, parse):
+        """
+        Get a parsed file from the cache, parsing it again if it changed.
+
+        :file_path: Path of the file.
+        :parse: Function which parses the lines of the file into a dict.
+        :returns: The parsed file (empty if it doesn't exist).
+
+        """
+        try:
+            file_stat = stat(file_path)
+        except (OSError, ValueError):
+            return {}
+
+        signature = (file_stat.st_mtime_ns, file_stat.st_size)
+
+        with self.__lock:
+            cached = self.__cache.get(file_path)
+
+            if cached is not None and cached[0] == signature:
+                self.__cache.move_to_end(file_path)
+                return cached[1]
+
+        try:
+            with open(file_path, 'r') as f:
+                parsed = parse(f.read().splitlines())
+        except OSError:
+            return {}
+
+        with self.__lock:
+            self.__cache[file_path] = (signature, parsed)
+            self.__cache.move_to_end(file_path)
+
+            while len(self.__cache) > self.cache_size:
+                self.__cache.popitem(last=False)
+
+        return parsed
+
+    def __get_packed_refs(self, git_dir):
+        """
+        Get the packed refs of a repository.
+
+        :git_dir: Path of the git dir of the repository.
+        :returns: A dict of the head commit hashes by full ref path.
+
+        """
+        def parse(lines):
+            refs = {}
+
+            for line in lines:
+                # header and peeled tags
+                if line.startswith('#') or line.startswith('^'):
+                    continue
+
+                fields = line.split(' ', 1)
+
+                if len(fields) == 2:
+                    refs[fields[1]] = fields[0]
+
+            return refs
+
+        return self.__get_cached('{}/packed-refs'.format(git_dir), parse)
+
+    def __get_fetch_heads(self, git_dir):
+        """
+        Get the branches of the last fetch of a repository.
+
+        :git_dir: Path of the git dir of the repository.
+        :returns: A dict of the head commit hashes by branch name.
+
+        """
+        def parse(lines):
+            heads = {}
+
+            for line in lines:
+                found = match(
+                    "^([0-9a-f]{40})\t(?:not-for-merge)?\tbranch '(.+)' of ",
+                    line
+                )
+
+                if found is not None:
+                    heads.setdefault(found.group(2), found.group(1))
+
+            return heads
+
+        return self.__get_cached('{}/FETCH_HEAD'.format(git_dir), parse)
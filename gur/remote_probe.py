@@ -0,0 +1,111 @@
+from threading import Lock
+
+import git
+
+from git_plumbing import GitPlumbing
+from job_pool import JobPool
+from transfer_guard import TransferTimeout
+
+class RemoteProbe:
+
+    """
+    Implementation of the class responsible for probing the heads of remote
+    repositories with 'git ls-remote', which only lists the remote refs,
+    without the pack negotiation of a fetch.
+
+    The heads of each url are queried only once and cached, so the probes can
+    be shared by the jobs of an update. The urls of many repositories can be
+    probed in a batch of concurrent queries beforehand (see 'probe_many'), so
+    their probes don't wait for a query each. The queries are git transfers of
+    the git plumbing, so they're bounded by its transfer guard and by its
+    maximum number of git processes (see git_plumbing).
+
+    """
+
+    def __init__(self, plumbing=None, batch_size=16):
+        """
+        Initialize the probe internal data.
+
+        :plumbing: Git plumbing which runs the queries. If not specified, the
+                   probe has its own.
+        :batch_size: Maximum number of queries of a batch running at the same
+                     time (the git process limit of the plumbing still
+                     applies).
+
+        """
+        self.plumbing = GitPlumbing() if plumbing is None else plumbing
+        self.batch_size = batch_size
+        self.__heads = {}
+        self.__lock = Lock()
+
+    def get_head(self, repo_url, branch_name):
+        """
+        Get the head commit of a remote branch.
+
+        :repo_url: Url of the repository.
+        :branch_name: Name of the branch.
+        :returns: The hash of the head commit or None if it couldn't be
+                  probed.
+
+        """
+        heads = self.__get_heads(repo_url)
+
+        if heads is None:
+            return None
+
+        return heads.get('refs/heads/{}'.format(branch_name))
+
+    def probe_many(self, repo_urls):
+        """
+        Probe the heads of multiple remote repositories in a batch of
+        concurrent queries. The urls already probed are skipped.
+
+        :repo_urls: Iterable of repository urls.
+
+        """
+        with self.__lock:
+            repo_urls = sorted(set(repo_urls) - set(self.__heads))
+
+        if not repo_urls:
+            return
+
+        with JobPool(min(self.batch_size, len(repo_urls))) as pool:
+            for _ in pool.map(self.__get_heads, repo_urls):
+                pass
+
+    def __get_heads(self, repo_url):
+        """
+        Get the heads of a remote repository.
+
+        :repo_url: Url of the repository.
+        :returns: A dict of head commits by ref name or None if the remote
+                  couldn't be reached.
+
+        """
+        with self.__lock:
+            if repo_url in self.__heads:
+                return self.__heads[repo_url]
+
+        heads = None
+
+        try:
+            # a probe must never wait for credentials (see transfer_guard)
+            with self.plumbing.transfer('ls_remote') as transfer:
+                output = git.cmd.Git().ls_remote(
+                    '--heads',
+                    repo_url,
+                    env=transfer.env
+                )
+        except (git.GitCommandError, TransferTimeout):
+            pass
+        else:
+            heads = {}
+
+            for line in output.splitlines():
+                commit, _, ref = line.partition('\t')
+                heads[ref] = commit
+
+        with self.__lock:
+            self.__heads[repo_url] = heads
+
+        return heads
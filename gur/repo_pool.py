@@ -0,0 +1,170 @@
+from collections import OrderedDict
+from os.path import abspath
+from threading import Lock
+
+class RepoPool:
+
+    """
+    Implementation of the class responsible for keeping a bounded number of
+    repository handles open. The handles are kept by path, and the least
+    recently used ones are closed once there are more than 'max_size' of
+    them, which releases their helper processes, file descriptors and memory
+    maps (the handles are still usable, reacquiring them on demand).
+
+    Each repository is opened once, even if multiple threads get it at the
+    same time: they wait for the handle opened by the first one.
+
+    """
+
+    def __init__(self, close, max_size=64):
+        """
+        Initialize the repository pool internal data.
+
+        :close: Function which closes a repository handle.
+        :max_size: Maximum number of handles kept open.
+
+        """
+        self.close = close
+        self.max_size = max_size
+        self.__repos = OrderedDict()
+        self.__lock = Lock()
+        self.__opening = {}
+        self.__counters = { 'opened': 0, 'reused': 0, 'closed': 0, 'peak': 0 }
+
+    def get(self, path, open_repo):
+        """
+        Get the handle of a repository, opening it if it isn't in the pool.
+
+        :path: Path of the repository.
+        :open_repo: Function which opens the repository, given its path.
+        :returns: The repository handle.
+
+        """
+        key = abspath(path)
+
+        with self.__lock:
+            repo = self.__reuse(key)
+
+            if repo is not None:
+                return repo
+
+            # [lock, number of threads using it]
+            opening = self.__opening.setdefault(key, [Lock(), 0])
+            opening[1] += 1
+
+        try:
+            # the other repositories are opened meanwhile
+            with opening[0]:
+                with self.__lock:
+                    repo = self.__reuse(key)
+
+                if repo is not None:
+                    return repo
+
+                repo = open_repo(path)
+
+                with self.__lock:
+                    self.__counters['opened'] += 1
+
+                return self.put(path, repo)
+        finally:
+            with self.__lock:
+                opening[1] -= 1
+
+                if not opening[1]:
+                    del self.__opening[key]
+
+    def __reuse(self, key):
+        """
+        Get a handle of the pool, marking it as the most recently used. The
+        pool lock must be held.
+
+        :key: Absolute path of the repository.
+        :returns: The repository handle or None if it isn't in the pool.
+
+        """
+        repo = self.__repos.get(key)
+
+        if repo is not None:
+            self.__repos.move_to_end(key)
+            self.__counters['reused'] += 1
+
+        return repo
+
+    def put(self, path, repo):
+        """
+        Add the handle of a repository to the pool, closing the handle it
+        replaces and the least recently used ones beyond the pool size.
+
+        :path: Path of the repository.
+        :repo: The repository handle.
+        :returns: The repository handle.
+
+        """
+        key = abspath(path)
+        evicted = []
+
+        with self.__lock:
+            old_repo = self.__repos.pop(key, None)
+
+            if old_repo is not None and old_repo is not repo:
+                evicted.append(old_repo)
+
+            self.__repos[key] = repo
+
+            while len(self.__repos) > self.max_size:
+                evicted.append(self.__repos.popitem(last=False)[1])
+
+            self.__counters['peak'] = max(
+                self.__counters['peak'],
+                len(self.__repos)
+            )
+
+            self.__counters['closed'] += len(evicted)
+
+        # closing may wait for helper processes, so it's done unlocked
+        for old_repo in evicted:
+            self.close(old_repo)
+
+        return repo
+
+    def discard(self, path):
+        """
+        Remove the handle of a repository from the pool, closing it.
+
+        :path: Path of the repository.
+
+        """
+        with self.__lock:
+            repo = self.__repos.pop(abspath(path), None)
+
+            if repo is None:
+                return
+
+            self.__counters['closed'] += 1
+
+        self.close(repo)
+
+    def clear(self):
+        """
+        Close all the handles of the pool.
+
+        """
+        with self.__lock:
+            repos = list(self.__repos.values())
+            self.__repos.clear()
+            self.__counters['closed'] += len(repos)
+
+        for repo in repos:
+            self.close(repo)
+
+    def get_counters(self):
+        """
+        Get the counters of the pool.
+
+        :returns: A dict with the number of handles open, opened by the
+                  pool, reused, closed and the peak of open handles.
+
+        """
+        with self.__lock:
+            return dict(self.__counters, open=len(self.__repos))
@@ -0,0 +1,373 @@
+from json import load
+from os.path import isfile
+from re import findall
+from threading import Lock
+
+import sqlite3
+
+class SearchIndexMgr:
+
+    """
+    Implementation of the class responsible for the management of the package
+    search index.
+
+    The index is a SQLite database, built at update time from the package
+    descriptions, whose indexed tables answer the searches without loading
+    the index:
+
+        docs:     the indexed documents, by lowercase name (prefix matches).
+        trigrams: the documents by trigram of their names (substring matches).
+        tokens:   the documents by token of all their fields (token matches).
+
+    The packages of each master repository are staged, then committed once the
+    repository was updated. The committed repositories are written by 'save',
+    in a single transaction, except the ones whose packages didn't change.
+
+    On the first use, the documents of the JSON index (if any) are migrated.
+
+    """
+
+    schema = [
+        """
+        CREATE TABLE docs (
+            id INTEGER PRIMARY KEY,
+            repo_id TEXT NOT NULL,
+            name TEXT NOT NULL,
+            lname TEXT NOT NULL,
+            repo TEXT NOT NULL,
+            branch TEXT NOT NULL,
+            description TEXT NOT NULL
+        )
+        """,
+        'CREATE INDEX docs_lname ON docs (lname)',
+        'CREATE INDEX docs_repo_id ON docs (repo_id)',
+        """
+        CREATE TABLE trigrams (
+            trigram TEXT NOT NULL,
+            doc_id INTEGER NOT NULL,
+            PRIMARY KEY (trigram, doc_id)
+        ) WITHOUT ROWID
+        """,
+        'CREATE INDEX trigrams_doc_id ON trigrams (doc_id)',
+        """
+        CREATE TABLE tokens (
+            token TEXT NOT NULL,
+            doc_id INTEGER NOT NULL,
+            PRIMARY KEY (token, doc_id)
+        ) WITHOUT ROWID
+        """,
+        'CREATE INDEX tokens_doc_id ON tokens (doc_id)'
+    ]
+
+    fields = ['repo_id', 'name', 'repo', 'branch', 'description']
+
+    select = 'SELECT d.id, d.repo_id, d.name, d.repo, d.branch, d.description '
+
+    def __init__(
+            self,
+            pkg_dir='/var/db/gur/',
+            idx_file='search_idx.sqlite',
+            json_file='search_idx.json'):
+        """
+        Initialize the search index mgr data.
+
+        :pkg_dir: Directory of the package database.
+        :idx_file: Name of the index file.
+        :json_file: Name of the JSON index file to be migrated.
+
+        """
+        self.idx_file_path = '{}/{}'.format(pkg_dir, idx_file)
+        self.json_file_path = '{}/{}'.format(pkg_dir, json_file)
+        self.__conn = None
+        self.__pending = {}
+        self.__committed = {}
+        self.__lock = Lock()
+
+    @staticmethod
+    def tokenize(text):
+        """
+        Split a text into lowercase alphanumeric tokens.
+
+        :text: The text.
+        :returns: A list of tokens.
+
+        """
+        return findall('[a-z0-9]+', text.lower())
+
+    @staticmethod
+    def trigrams(text):
+        """
+        Get the trigrams of a text.
+
+        :text: The text.
+        :returns: A set of trigrams.
+
+        """
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+
+    def __get_conn(self):
+        """
+        Get the connection to the index file, opening it on the first access.
+        The lock must be held.
+
+        :returns: The connection.
+
+        """
+        if self.__conn is None:
+            is_new = not isfile(self.idx_file_path)
+
+            # saved and searched from any thread, serialized by the lock
+            self.__conn = sqlite3.connect(
+                self.idx_file_path,
+                check_same_thread=False
+            )
+
+            if is_new:
+                with self.__conn:
+                    for statement in self.schema:
+                        self.__conn.execute(statement)
+
+                    if isfile(self.json_file_path):
+                        with open(self.json_file_path, 'r') as f:
+                            self.__insert(load(f)['docs'])
+
+        return self.__conn
+
+    def add_pkg(self, repo_id, pkg):
+        """
+        Stage a package of a master repository to be indexed.
+
+        :repo_id: Identification of the master repository.
+        :pkg: The package description.
+
+        """
+        doc = {
+            'repo_id': repo_id,
+            'name': pkg.name,
+            'repo': pkg.repo,
+            'branch': pkg.branch,
+            'description': pkg.description or ''
+        }
+
+        with self.__lock:
+            self.__pending.setdefault(repo_id, []).append(doc)
+
+    def discard_repo(self, repo_id):
+        """
+        Discard the staged packages of a master repository.
+
+        :repo_id: Identification of the master repository.
+
+        """
+        with self.__lock:
+            self.__pending.pop(repo_id, None)
+
+    def commit_repo(self, repo_id):
+        """
+        Replace the indexed packages of a master repository by the staged
+        ones, once the index is saved.
+
+        :repo_id: Identification of the master repository.
+
+        """
+        with self.__lock:
+            self.__committed[repo_id] = self.__pending.pop(repo_id, [])
+
+    def __get_docs(self, repo_id):
+        """
+        Get the indexed documents of a master repository. The lock must be
+        held.
+
+        :repo_id: Identification of the master repository.
+        :returns: A sorted list of document tuples, in 'fields' order.
+
+        """
+        return self.__conn.execute(
+            'SELECT {} FROM docs WHERE repo_id = ? '
+            'ORDER BY name, repo, branch, description'.format(
+                ', '.join(self.fields)
+            ),
+            (repo_id,)
+        ).fetchall()
+
+    def __insert(self, docs):
+        """
+        Index documents. The lock must be held.
+
+        :docs: List of documents to be indexed.
+
+        """
+        doc_id = self.__conn.execute(
+            'SELECT coalesce(max(id), 0) FROM docs'
+        ).fetchone()[0]
+
+        doc_rows = []
+        trigram_rows = []
+        token_rows = []
+
+        for doc in docs:
+            doc_id += 1
+            lname = doc['name'].lower()
+            fields = ' '.join(
+                [doc['name'], doc['repo'], doc['branch'], doc['description']]
+            )
+
+            doc_rows.append(
+                (
+                    doc_id,
+                    doc['repo_id'],
+                    doc['name'],
+                    lname,
+                    doc['repo'],
+                    doc['branch'],
+                    doc['description']
+                )
+            )
+            # the end marker indexes the last two characters of the name too
+            trigram_rows += [
+                (trigram, doc_id) for trigram in self.trigrams(lname + '\n')
+            ]
+            token_rows += [
+                (token, doc_id) for token in set(self.tokenize(fields))
+            ]
+
+        self.__conn.executemany(
+            'INSERT INTO docs VALUES (?, ?, ?, ?, ?, ?, ?)',
+            doc_rows
+        )
+        self.__conn.executemany(
+            'INSERT INTO trigrams (trigram, doc_id) VALUES (?, ?)',
+            trigram_rows
+        )
+        self.__conn.executemany(
+            'INSERT INTO tokens (token, doc_id) VALUES (?, ?)',
+            token_rows
+        )
+
+    def save(self):
+        """
+        Write the packages of the committed master repositories to the index
+        file, atomically.
+
+        """
+        with self.__lock:
+            if not self.__committed:
+                return
+
+            conn = self.__get_conn()
+            new_docs = []
+
+            with conn:
+                for repo_id, docs in self.__committed.items():
+                    # the staging order depends on the update threads
+                    if self.__get_docs(repo_id) == sorted(
+                            tuple(doc[field] for field in self.fields)
+                            for doc in docs):
+                        continue
+
+                    for table in ['trigrams', 'tokens']:
+                        conn.execute(
+                            'DELETE FROM {} WHERE doc_id IN '
+                            '(SELECT id FROM docs WHERE repo_id = ?)'.format(
+                                table
+                            ),
+                            (repo_id,)
+                        )
+
+                    conn.execute(
+                        'DELETE FROM docs WHERE repo_id = ?',
+                        (repo_id,)
+                    )
+
+                    new_docs += docs
+
+                self.__insert(new_docs)
+
+            self.__committed = {}
+
+    def search(self, query):
+        """
+        Search for packages. The results are the packages whose name starts
+        with the query, followed by the ones whose name contains the query
+        and by the ones with all the tokens of the query in any field.
+
+        :query: The search query.
+        :returns: A list of documents, in the format:
+
+            {
+                'repo_id': <master repository ID>,
+                'name': <package name>,
+                'repo': <package repository url>,
+                'branch': <package branch>,
+                'description': <package description>
+            }
+
+        """
+        query = query.lower()
+
+        with self.__lock:
+            if self.__conn is None and not isfile(self.idx_file_path) and \
+                    not isfile(self.json_file_path):
+                return []
+
+            conn = self.__get_conn()
+
+            # prefix matches
+            rows = conn.execute(
+                self.select + 'FROM docs d '
+                'WHERE d.lname >= ? AND d.lname < ? ORDER BY d.lname, d.id',
+                (query, query + '\U0010ffff')
+            ).fetchall()
+
+            # substring matches, narrowed by the trigrams of the query
+            trigrams = self.trigrams(query)
+
+            if len(query) == 2:
+                # the trigrams which start with the query
+                rows += conn.execute(
+                    self.select + 'FROM docs d WHERE d.id IN ('
+                    'SELECT doc_id FROM trigrams '
+                    'WHERE trigram >= ? AND trigram < ?) '
+                    'ORDER BY d.lname, d.id',
+                    (query, query + '\U0010ffff')
+                ).fetchall()
+            elif trigrams:
+                rows += conn.execute(
+                    self.select + 'FROM docs d WHERE d.id IN ('
+                    'SELECT doc_id FROM trigrams WHERE trigram IN ({}) '
+                    'GROUP BY doc_id HAVING count(*) = ?) '
+                    'AND instr(d.lname, ?) ORDER BY d.name, d.id'.format(
+                        ', '.join('?' * len(trigrams))
+                    ),
+                    (*trigrams, len(trigrams), query)
+                ).fetchall()
+            else:
+                rows += conn.execute(
+                    self.select + 'FROM docs d '
+                    'WHERE instr(d.lname, ?) ORDER BY d.lname, d.id',
+                    (query,)
+                ).fetchall()
+
+            # token matches
+            tokens = set(self.tokenize(query))
+
+            if tokens:
+                rows += conn.execute(
+                    self.select + 'FROM docs d WHERE d.id IN ('
+                    'SELECT doc_id FROM tokens WHERE token IN ({}) '
+                    'GROUP BY doc_id HAVING count(*) = ?) '
+                    'ORDER BY d.name, d.id'.format(
+                        ', '.join('?' * len(tokens))
+                    ),
+                    (*tokens, len(tokens))
+                ).fetchall()
+
+        seen = set()
+        results = []
+
+        for row in rows:
+            if row[0] not in seen:
+                seen.add(row[0])
+                results.append(dict(zip(self.fields, row[1:])))
+
+        return results
@@ -0,0 +1,44 @@
+from abc import ABC, abstractmethod
+
+class SearchListener(ABC):
+
+    """
+    Definition of the interface for the search command events.
+
+    """
+
+    @abstractmethod
+    def on_search_start(self, query):
+        """
+        Trigger an on_search_start event, which indicates the start of search
+        operation.
+
+        :query: The search query.
+
+        """
+        pass # pragma: no cover
+
+    @abstractmethod
+    def on_search_finish(self, query, count):
+        """
+        Trigger an on_search_finish event, which indicates the end of search
+        operation.
+
+        :query: The search query.
+        :count: Number of packages found.
+
+        """
+        pass # pragma: no cover
+
+    @abstractmethod
+    def on_pkg_found(self, repo_id, pkg_name, description):
+        """
+        Trigger an on_pkg_found event, which indicates that a package matching
+        the query was found.
+
+        :repo_id: Identification of the master repository of the package.
+        :pkg_name: Name of the package.
+        :description: Description of the package.
+
+        """
+        pass # pragma: no cover
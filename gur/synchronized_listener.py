@@ -0,0 +1,36 @@
+from threading import RLock
+
+class SynchronizedListener:
+
+    """
+    Implementation of a listener proxy which serializes the events of a
+    listener shared by multiple worker threads.
+
+    """
+
+    def __init__(self, listener):
+        """
+        Initialize the proxy internal data.
+
+        :listener: The proxied listener.
+
+        """
+        self.__listener = listener
+        self.__lock = RLock()
+
+    def __getattr__(self, name):
+        """
+        Get an attribute of the proxied listener. The events (methods) are
+        wrapped, so only one of them runs at a time.
+
+        """
+        attr = getattr(self.__listener, name)
+
+        if not callable(attr):
+            return attr
+
+        def synchronized(*args, **kwargs):
+            with self.__lock:
+                return attr(*args, **kwargs)
+
+        return synchronized
@@ -0,0 +1,394 @@
+import os
+import shlex
+import signal
+from contextlib import contextmanager
+from itertools import count
+from threading import Lock, Timer, current_thread, main_thread
+from time import monotonic
+
+from config_mgr import ConfigMgr
+
+class TransferError(RuntimeError):
+
+    """
+    Base of the errors of the git transfers aborted by the transfer guard.
+    The 'error_key' is the key of the error in the error map (see errors).
+
+    """
+
+    error_key = 'unknown'
+
+class TransferTimeout(TransferError):
+
+    """
+    Error of a git transfer which took longer than its timeout.
+
+    """
+
+    error_key = 'timeout'
+
+class TransferCancelled(TransferError):
+
+    """
+    Error of a git transfer aborted because the update was cancelled.
+
+    """
+
+    error_key = 'cancel'
+
+class Transfer:
+
+    """
+    Implementation of a git transfer watched by the transfer guard.
+
+    The git processes of the transfer are run with its environment, which
+    marks them, so the guard can kill them. The backends which transfer in
+    process (see fetch_backends) call 'check' from their progress callbacks
+    instead.
+
+    """
+
+    def __init__(self, guard, transfer_id, op_name):
+        """
+        Initialize the transfer internal data.
+
+        :guard: The transfer guard.
+        :transfer_id: Identification of the transfer.
+        :op_name: Name of the kind of git operation.
+
+        """
+        self.guard = guard
+        self.transfer_id = transfer_id
+        self.op_name = op_name
+        self.env = guard.get_env(transfer_id)
+        self.expired = False
+        self.__window = (monotonic(), 0)
+
+    def check(self, received_bytes=0):
+        """
+        Abort the transfer if it was cancelled, if it expired or if less than
+        'low_speed_limit' bytes per second were received during the last
+        'idle_timeout' seconds.
+
+        :received_bytes: Number of bytes received so far.
+
+        """
+        if self.guard.cancelled:
+            raise TransferCancelled('the update was cancelled!')
+
+        if self.expired:
+            raise self.guard.get_timeout_error(self)
+
+        if self.guard.idle_timeout <= 0:
+            return
+
+        window_start, window_bytes = self.__window
+        elapsed = monotonic() - window_start
+
+        if elapsed < self.guard.idle_timeout:
+            return
+
+        if received_bytes - window_bytes < \
+                self.guard.low_speed_limit * elapsed:
+            raise TransferTimeout(
+                'the git {} was slower than {} bytes/s for {} seconds!'.format(
+                    self.op_name,
+                    self.guard.low_speed_limit,
+                    self.guard.idle_timeout
+                )
+            )
+
+        self.__window = (monotonic(), received_bytes)
+
+class TransferGuard:
+
+    """
+    Implementation of the class responsible for bounding the git transfers,
+    so a stalled upstream can't block the update:
+
+    - The connections time out after 'connect_timeout' seconds (ssh).
+    - The transfers are aborted once they're slower than 'low_speed_limit'
+      bytes per second for 'idle_timeout' seconds (http, by git itself) or
+      once the server stops answering for 'idle_timeout' seconds (ssh).
+    - The git processes of a transfer which takes longer than 'timeout'
+      seconds are killed.
+
+    No git process may wait for credentials either. A timeout of 0 disables
+    the corresponding limit.
+
+    The update can be cancelled (see 'handle_signals'): the git processes
+    running are killed at once and no transfer starts afterwards.
+
+    """
+
+    env_marker = 'GUR_TRANSFER'
+
+    def __init__(
+            self,
+            timeout=600,
+            connect_timeout=30,
+            idle_timeout=60,
+            low_speed_limit=1000):
+        """
+        Initialize the transfer guard internal data.
+
+        :timeout: Maximum duration of a transfer, in seconds.
+        :connect_timeout: Maximum duration of the connection, in seconds.
+        :idle_timeout: Time a transfer may stay below the low speed limit, in
+                       seconds.
+        :low_speed_limit: Minimum speed of a transfer, in bytes per second.
+
+        """
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.idle_timeout = idle_timeout
+        self.low_speed_limit = low_speed_limit
+        self.cancelled = False
+        self.__transfer_ids = count(1)
+        self.__lock = Lock()
+
+    @classmethod
+    def from_config(cls):
+        """
+        Create the transfer guard from the 'fetch' section of the
+        configuration file.
+
+        :returns: The transfer guard.
+
+        """
+        return cls(
+            int(ConfigMgr.get('fetch', 'timeout', 600)),
+            int(ConfigMgr.get('fetch', 'connect_timeout', 30)),
+            int(ConfigMgr.get('fetch', 'idle_timeout', 60)),
+            int(ConfigMgr.get('fetch', 'low_speed_limit', 1000))
+        )
+
+    def get_env(self, transfer_id=None):
+        """
+        Get the environment of the git processes of a transfer.
+
+        :transfer_id: Identification of the transfer, which marks its
+                      processes.
+        :returns: A dict of environment variables.
+
+        """
+        env = { 'GIT_TERMINAL_PROMPT': '0' }
+
+        if transfer_id is not None:
+            env[self.env_marker] = str(transfer_id)
+
+        ssh_options = ['-o', 'BatchMode=yes']
+
+        if self.connect_timeout > 0:
+            ssh_options += [
+                '-o', 'ConnectTimeout={}'.format(self.connect_timeout)
+            ]
+
+        if self.idle_timeout > 0:
+            env['GIT_HTTP_LOW_SPEED_LIMIT'] = str(self.low_speed_limit)
+            env['GIT_HTTP_LOW_SPEED_TIME'] = str(self.idle_timeout)
+
+            # the connection is dropped after 3 unanswered keepalives
+            ssh_options += [
+                '-o', 'ServerAliveInterval={}'.format(
+                    max(1, self.idle_timeout // 3)
+                ),
+                '-o', 'ServerAliveCountMax=3'
+            ]
+
+        # the ssh command of the user, if any, is kept
+        ssh_command = os.environ.get('GIT_SSH_COMMAND')
+
+        if not ssh_command:
+            ssh_command = shlex.quote(os.environ.get('GIT_SSH', 'ssh'))
+
+        env['GIT_SSH_COMMAND'] = ' '.join(
+            [ssh_command] + [shlex.quote(option) for option in ssh_options]
+        )
+
+        return env
+
+    def get_timeout_error(self, transfer):
+        """
+        Get the error of an expired transfer.
+
+        :transfer: The transfer.
+        :returns: The error.
+
+        """
+        return TransferTimeout(
+            'the git {} timed out after {} seconds!'.format(
+                transfer.op_name,
+                self.timeout
+            )
+        )
+
+    @contextmanager
+    def watch(self, op_name):
+        """
+        Watch a git transfer, killing its git processes if it takes longer
+        than the timeout. The errors of the killed processes are raised as
+        transfer errors.
+
+        :op_name: Name of the kind of git operation.
+
+        """
+        if self.cancelled:
+            raise TransferCancelled('the update was cancelled!')
+
+        with self.__lock:
+            transfer = Transfer(self, next(self.__transfer_ids), op_name)
+
+        timer = None
+
+        if self.timeout > 0:
+            timer = Timer(self.timeout, self.__expire, [transfer])
+            timer.daemon = True
+            timer.start()
+
+        try:
+            yield transfer
+        except TransferError:
+            raise
+        except Exception as err:
+            if self.cancelled:
+                raise TransferCancelled('the update was cancelled!') from err
+
+            if transfer.expired:
+                raise self.get_timeout_error(transfer) from err
+
+            raise
+        finally:
+            if timer is not None:
+                timer.cancel()
+
+    def __expire(self, transfer):
+        """
+        Expire a transfer, killing its git processes.
+
+        :transfer: The transfer.
+
+        """
+        transfer.expired = True
+        self.__kill(transfer.transfer_id)
+
+    def cancel(self):
+        """
+        Cancel the update: kill all the git processes and refuse any new
+        transfer.
+
+        """
+        self.cancelled = True
+        self.__kill()
+
+    @contextmanager
+    def handle_signals(self):
+        """
+        Cancel the update on SIGINT or SIGTERM. Once the update has wound up,
+        the signal is raised again: SIGINT as a KeyboardInterrupt, SIGTERM
+        as a SystemExit.
+
+        The handlers can only be installed from the main thread, so nothing
+        is handled elsewhere.
+
+        """
+        if current_thread() is not main_thread():
+            yield
+            return
+
+        received = []
+
+        def on_signal(signum, _):
+            received.append(signum)
+            self.cancel()
+
+        old_handlers = {
+            signum: signal.signal(signum, on_signal)
+            for signum in [signal.SIGINT, signal.SIGTERM]
+        }
+
+        try:
+            yield
+        finally:
+            for signum, old_handler in old_handlers.items():
+                signal.signal(signum, old_handler)
+
+        if signal.SIGINT in received:
+            raise KeyboardInterrupt()
+
+        if received:
+            raise SystemExit(128 + received[0])
+
+    def __kill(self, transfer_id=None):
+        """
+        Kill the git processes of a transfer, or all of them.
+
+        :transfer_id: Identification of the transfer. If not specified, all
+                      the descendant processes are killed.
+
+        """
+        marker = '{}={}'.format(self.env_marker, transfer_id).encode()
+
+        for pid in self.__get_descendants(os.getpid()):
+            if transfer_id is not None and \
+                    marker not in self.__get_environ(pid):
+                continue
+
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except OSError:
+                pass
+
+    def __get_descendants(self, pid):
+        """
+        Get the descendant processes of a process, from /proc.
+
+        :pid: Identification of the process.
+        :returns: A list of process identifications (empty if /proc isn't
+                  available).
+
+        """
+        children = {}
+
+        try:
+            entries = os.listdir('/proc')
+        except OSError:
+            return []
+
+        for entry in entries:
+            if not entry.isdigit():
+                continue
+
+            try:
+                with open('/proc/{}/stat'.format(entry), 'rb') as stat_file:
+                    stat = stat_file.read()
+            except OSError:
+                continue
+
+            # the process name, in parenthesis, may contain spaces
+            ppid = int(stat.rpartition(b')')[2].split()[1])
+            children.setdefault(ppid, []).append(int(entry))
+
+        descendants = []
+        pending = [pid]
+
+        while pending:
+            for child in children.get(pending.pop(), []):
+                descendants.append(child)
+                pending.append(child)
+
+        return descendants
+
+    def __get_environ(self, pid):
+        """
+        Get the initial environment of a process, from /proc.
+
+        :pid: Identification of the process.
+        :returns: A list of 'name=value' byte strings.
+
+        """
+        try:
+            with open('/proc/{}/environ'.format(pid), 'rb') as environ_file:
+                return environ_file.read().split(b'\0')
+        except OSError:
+            return []
@@ -97,6 +97,55 @@ class UpdateListener(ABC):
         """
         pass # pragma: no cover
 
+    @abstractmethod
+    def on_pkg_remove(self, pkg_name):
+        """
+        Trigger an pkg_remove event, which indicates that a package was removed
+        from its master repository and from the package database.
+
+        :pkg_name: Name of the package which was removed.
+
+        """
+        pass # pragma: no cover
+
+    @abstractmethod
+    def on_master_repo_remove(self, repo_id):
+        """
+        Trigger an master_repo_remove event, which indicates that a master
+        repository was removed from the mirrors file and pruned, along with its
+        packages.
+
+        :repo_id: Identification of the master repository which was removed.
+
+        """
+        pass # pragma: no cover
+
+    @abstractmethod
+    def on_pkgs_unfinished(self, repo_id, pkg_names):
+        """
+        Trigger a pkgs_unfinished event, which reports the packages of a
+        master repository left unfinished because its update was interrupted
+        (by an error, a timeout or a cancellation).
+
+        :repo_id: Identification of the master repository.
+        :pkg_names: Names of the packages left unfinished.
+
+        """
+        pass # pragma: no cover
+
+    @abstractmethod
+    def on_git_timings(self, timings, counters):
+        """
+        Trigger a git_timings event, which reports the time spent by each kind
+        of git operation and the usage of the repository handles and git
+        processes, once the update has finished.
+
+        :timings: A dict of (count, total seconds) tuples by operation name.
+        :counters: A dict of usage counters by name.
+
+        """
+        pass # pragma: no cover
+
     @abstractmethod
     def on_update_progress(self, op_code, cur_count, max_count, msg):
         """
@@ -1,9 +1,20 @@
 from tqdm import tqdm
 
-from os import get_terminal_size
-from commands import UpdateCmd, ListPkgsCmd
+from shutil import get_terminal_size
+from threading import get_ident
+from commands import (
+    UpdateCmd,
+    MaterializeCmd,
+    ListPkgsCmd,
+    ListOutdatedCmd,
+    SearchCmd,
+    PruneCmd
+)
 from update_listener import UpdateListener
 from list_pkgs_listener import ListPkgsListener
+from list_outdated_listener import ListOutdatedListener
+from search_listener import SearchListener
+from prune_listener import PruneListener
 
 class CliUpdateView:
 
@@ -111,6 +122,53 @@ class CliUpdateView:
             """
             self.view.on_pkg_update_finish(pkg_name, branch_name)
 
+        def on_pkg_remove(self, pkg_name):
+            """
+            Trigger an pkg_remove event, which indicates that a package was
+            removed from its master repository and from the package database.
+
+            :pkg_name: Name of the package which was removed.
+
+            """
+            self.view.on_pkg_remove(pkg_name)
+
+        def on_master_repo_remove(self, repo_id):
+            """
+            Trigger an master_repo_remove event, which indicates that a master
+            repository was removed from the mirrors file and pruned, along
+            with its packages.
+
+            :repo_id: Identification of the master repository which was
+                      removed.
+
+            """
+            self.view.on_master_repo_remove(repo_id)
+
+        def on_pkgs_unfinished(self, repo_id, pkg_names):
+            """
+            Trigger a pkgs_unfinished event, which reports the packages of a
+            master repository left unfinished because its update was
+            interrupted (by an error, a timeout or a cancellation).
+
+            :repo_id: Identification of the master repository.
+            :pkg_names: Names of the packages left unfinished.
+
+            """
+            self.view.on_pkgs_unfinished(repo_id, pkg_names)
+
+        def on_git_timings(self, timings, counters):
+            """
+            Trigger a git_timings event, which reports the time spent by each
+            kind of git operation and the usage of the repository handles and
+            git processes, once the update has finished.
+
+            :timings: A dict of (count, total seconds) tuples by operation
+                      name.
+            :counters: A dict of usage counters by name.
+
+            """
+            self.view.on_git_timings(timings, counters)
+
         def on_update_progress(self, op_code, cur_count, max_count, msg):
             """
             Trigger an update_progress event, which reports the current progress
@@ -129,14 +187,29 @@ class CliUpdateView:
             """
             self.view.on_error(msg)
 
-    def __init__(self):
+    def __init__(self, jobs=1, full=False, timings=False, fetch_backend=None):
         """
         Initialize the update view internal data.
 
+        :jobs: Maximum number of repositories updated at the same time.
+        :full: If True, all the packages are checked, no matter their
+               schedule.
+        :timings: If True, the time spent by each kind of git operation is
+                  shown at the end.
+        :fetch_backend: Name of the backend which clones and fetches the
+                        repositories. If not specified, it's read from the
+                        configuration file.
+
         """
-        self.cmd = UpdateCmd()
+        self.cmd = UpdateCmd(jobs=jobs, full=full, fetch_backend=fetch_backend)
+        self.jobs = jobs
+        self.fetch_backend = fetch_backend
+        self.timings = timings
         self.event_handler = CliUpdateView.EventHandler(self)
-        self.prog_bar = None
+
+        # the repositories updated at the same time run on different threads,
+        # each one with its own progress bar
+        self.prog_bars = {}
 
     def update(self):
         """
@@ -145,6 +218,54 @@ class CliUpdateView:
         """
         self.cmd.execute(self.event_handler)
 
+    def materialize(self, pkg_names):
+        """
+        Trigger the materialize command.
+
+        :pkg_names: Names of the packages to be materialized. If empty, all
+                    the lazily tracked packages are.
+
+        """
+        MaterializeCmd(
+            pkg_names,
+            jobs=self.jobs,
+            fetch_backend=self.fetch_backend
+        ).execute(self.event_handler)
+
+    def __new_prog_bar(self):
+        """
+        Create the progress bar of the current thread.
+
+        :returns: The progress bar.
+
+        """
+        # the bar of a job which failed on this thread is left behind
+        self.__close_prog_bar(' ERROR')
+
+        bar_width = int(get_terminal_size().columns * 0.3)
+
+        prog_bar = tqdm(
+            bar_format=
+                '    {percentage:3.0f}% |{bar:' + str(bar_width) + '}|' +
+                ' [{elapsed}/{remaining}]{desc}'
+        )
+        self.prog_bars[get_ident()] = prog_bar
+
+        return prog_bar
+
+    def __close_prog_bar(self, suffix):
+        """
+        Close the progress bar of the current thread.
+
+        :suffix: Suffix appended to the progress bar description.
+
+        """
+        prog_bar = self.prog_bars.pop(get_ident(), None)
+
+        if prog_bar is not None:
+            prog_bar.set_description_str(prog_bar.desc + suffix)
+            prog_bar.close()
+
     def on_update_start(self):
         """
         Trigger an update_start event, which indicates that a update
@@ -162,14 +283,8 @@ class CliUpdateView:
         :branch_name: Name of the branch.
 
         """
-        bar_width = int(get_terminal_size().columns * 0.3)
-
-        self.prog_bar = tqdm(
-            bar_format=
-                '    {percentage:3.0f}% |{bar:' + str(bar_width) + '}|' +
-                ' [{elapsed}/{remaining}]{desc}'
-        )
-        self.prog_bar.write('{} from {} branch'.format(repo_name, branch_name))
+        prog_bar = self.__new_prog_bar()
+        prog_bar.write('{} from {} branch'.format(repo_name, branch_name))
 
     def on_repo_update_finish(self, repo_name, branch_name):
         """
@@ -180,9 +295,7 @@ class CliUpdateView:
         :branch_name: Name of the branch.
 
         """
-        self.prog_bar.set_description_str(self.prog_bar.desc + ' OK')
-        self.prog_bar.close()
-        self.prog_bar = None
+        self.__close_prog_bar(' OK')
 
     def on_master_repo_update_finish(self, repo_name, branch_name):
         """
@@ -204,13 +317,7 @@ class CliUpdateView:
         :branch_name: Name of the branch.
 
         """
-        bar_width = int(get_terminal_size().columns * 0.3)
-
-        self.prog_bar = tqdm(
-            bar_format=
-                '    {percentage:3.0f}% |{bar:' + str(bar_width) + '}|' +
-                ' [{elapsed}/{remaining}]{desc}'
-        )
+        self.__new_prog_bar()
 
     def on_pkg_update_finish(self, pkg_name, branch_name):
         """
@@ -221,9 +328,76 @@ class CliUpdateView:
         :branch_name: Name of the branch.
 
         """
-        self.prog_bar.set_description_str(self.prog_bar.desc + ' OK')
-        self.prog_bar.close()
-        self.prog_bar = None
+        self.__close_prog_bar(' OK')
+
+    def on_pkg_remove(self, pkg_name):
+        """
+        Trigger an pkg_remove event, which indicates that a package was removed
+        from its master repository and from the package database.
+
+        :pkg_name: Name of the package which was removed.
+
+        """
+        tqdm.write('    {} removed'.format(pkg_name))
+
+    def on_master_repo_remove(self, repo_id):
+        """
+        Trigger an master_repo_remove event, which indicates that a master
+        repository was removed from the mirrors file and pruned, along with its
+        packages.
+
+        :repo_id: Identification of the master repository which was removed.
+
+        """
+        tqdm.write('{} removed'.format(repo_id))
+
+    def on_pkgs_unfinished(self, repo_id, pkg_names):
+        """
+        Trigger a pkgs_unfinished event, which reports the packages of a
+        master repository left unfinished because its update was interrupted
+        (by an error, a timeout or a cancellation).
+
+        :repo_id: Identification of the master repository.
+        :pkg_names: Names of the packages left unfinished.
+
+        """
+        tqdm.write(
+            '{} unfinished packages of {}: {}'.format(
+                len(pkg_names),
+                repo_id,
+                ', '.join(pkg_names)
+            )
+        )
+
+    def on_git_timings(self, timings, counters):
+        """
+        Trigger a git_timings event, which reports the time spent by each kind
+        of git operation and the usage of the repository handles and git
+        processes, once the update has finished.
+
+        :timings: A dict of (count, total seconds) tuples by operation name.
+        :counters: A dict of usage counters by name.
+
+        """
+        if not self.timings:
+            return
+
+        print('{:<12} {:>8} {:>10} {:>10}'.format(
+            'operation', 'count', 'total (s)', 'mean (ms)'
+        ))
+
+        for op_name, (count, total) in sorted(timings.items()):
+            print('{:<12} {:>8} {:>10.2f} {:>10.1f}'.format(
+                op_name,
+                count,
+                total,
+                total * 1000 / count
+            ))
+
+        print()
+
+        for name, value in sorted(counters.items()):
+            print('{:<16} {:>8}'.format(name, value))
 
     def on_update_progress(self, op_code, cur_count, max_count, msg):
         """
@@ -231,15 +405,17 @@ class CliUpdateView:
         of the update operation.
 
         """
+        prog_bar = self.prog_bars.get(get_ident())
+
         # if an 'on_error' event is received before the end of the command (when
         # we receive a progress event), the bar will be destroyed
-        if self.prog_bar is not None:
-            if self.prog_bar.total != max_count:
-                self.prog_bar.total = max_count
-                self.prog_bar.set_description_str(' ' + msg)
+        if prog_bar is not None:
+            if prog_bar.total != max_count:
+                prog_bar.total = max_count
+                prog_bar.set_description_str(' ' + msg)
 
-            self.prog_bar.n = cur_count
-            self.prog_bar.refresh()
+            prog_bar.n = cur_count
+            prog_bar.refresh()
 
     def on_error(self, msg):
         """
@@ -249,11 +425,13 @@ class CliUpdateView:
         :msg: The error message.
 
         """
-        self.prog_bar.set_description_str(self.prog_bar.desc + ' ERROR: ' + msg)
-        self.prog_bar.close()
-        self.prog_bar = None
+        if get_ident() in self.prog_bars:
+            self.__close_prog_bar(' ERROR: ' + msg)
 
-        print('')
+            print('')
+        else:
+            # errors before any progress event, or on a job without bar
+            tqdm.write('ERROR: ' + msg)
 
 class CliListPkgsView:
 
@@ -357,3 +535,334 @@ class CliListPkgsView:
         print('[{}] {}'.format(
             '+' if is_installed else '-', pkg_name)
         )
+
+class CliListOutdatedView:
+
+    """
+    Implementation of list-outdated view.
+
+    """
+
+    class EventHandler(ListOutdatedListener):
+
+        """
+        Implementation of the event handler class, which will be responsible to
+        receive the operation events and propagate them to the view.
+
+        """
+
+        def __init__(self, view):
+            """
+            Initialize the event handler internal data.
+
+            """
+            super().__init__()
+
+            self.view = view
+
+        def on_outdated_list_start(self):
+            """
+            Trigger an on_outdated_list_start event, which indicates the start
+            of list operation.
+
+            """
+            self.view.on_outdated_list_start()
+
+        def on_outdated_list_finish(self, count):
+            """
+            Trigger an on_outdated_list_finish event, which indicates the end of
+            list operation.
+
+            :count: Number of outdated packages.
+
+            """
+            self.view.on_outdated_list_finish(count)
+
+        def on_pkg_outdated(self, repo_id, pkg_name, local_rev, remote_rev):
+            """
+            Trigger an on_pkg_outdated event, which indicates that an outdated
+            package was found.
+
+            :repo_id: Identification of the master repository of the package.
+            :pkg_name: Name of the package.
+            :local_rev: Installed revision of the package.
+            :remote_rev: Remote revision of the package.
+
+            """
+            self.view.on_pkg_outdated(repo_id, pkg_name, local_rev, remote_rev)
+
+    def __init__(self):
+        """
+        Initialize the list-outdated view internal data.
+
+        """
+        self.cmd = ListOutdatedCmd()
+        self.event_handler = CliListOutdatedView.EventHandler(self)
+
+    def list_outdated(self):
+        """
+        Trigger the list-outdated command.
+
+        """
+        self.cmd.execute(self.event_handler)
+
+    def on_outdated_list_start(self):
+        """
+        Trigger an on_outdated_list_start event, which indicates the start of
+        list operation.
+
+        """
+        print('Outdated packages\n')
+
+    def on_outdated_list_finish(self, count):
+        """
+        Trigger an on_outdated_list_finish event, which indicates the end of
+        list operation.
+
+        :count: Number of outdated packages.
+
+        """
+        print('')
+
+    def on_pkg_outdated(self, repo_id, pkg_name, local_rev, remote_rev):
+        """
+        Trigger an on_pkg_outdated event, which indicates that an outdated
+        package was found.
+
+        :repo_id: Identification of the master repository of the package.
+        :pkg_name: Name of the package.
+        :local_rev: Installed revision of the package.
+        :remote_rev: Remote revision of the package.
+
+        """
+        print('{}/{} {} -> {}'.format(
+            repo_id, pkg_name, local_rev[:7], remote_rev[:7])
+        )
+
+class CliSearchView:
+
+    """
+    Implementation of search view.
+
+    """
+
+    class EventHandler(SearchListener):
+
+        """
+        Implementation of the event handler class, which will be responsible to
+        receive the operation events and propagate them to the view.
+
+        """
+
+        def __init__(self, view):
+            """
+            Initialize the event handler internal data.
+
+            """
+            super().__init__()
+
+            self.view = view
+
+        def on_search_start(self, query):
+            """
+            Trigger an on_search_start event, which indicates the start of search
+            operation.
+
+            :query: The search query.
+
+            """
+            self.view.on_search_start(query)
+
+        def on_search_finish(self, query, count):
+            """
+            Trigger an on_search_finish event, which indicates the end of search
+            operation.
+
+            :query: The search query.
+            :count: Number of packages found.
+
+            """
+            self.view.on_search_finish(query, count)
+
+        def on_pkg_found(self, repo_id, pkg_name, description):
+            """
+            Trigger an on_pkg_found event, which indicates that a package
+            matching the query was found.
+
+            :repo_id: Identification of the master repository of the package.
+            :pkg_name: Name of the package.
+            :description: Description of the package.
+
+            """
+            self.view.on_pkg_found(repo_id, pkg_name, description)
+
+    def __init__(self, query):
+        """
+        Initialize the search view internal data.
+
+        :query: The search query.
+
+        """
+        self.cmd = SearchCmd(query)
+        self.event_handler = CliSearchView.EventHandler(self)
+
+    def search(self):
+        """
+        Trigger the search command.
+
+        """
+        self.cmd.execute(self.event_handler)
+
+    def on_search_start(self, query):
+        """
+        Trigger an on_search_start event, which indicates the start of search
+        operation.
+
+        :query: The search query.
+
+        """
+        print('Search results for \'{}\'\n'.format(query))
+
+    def on_search_finish(self, query, count):
+        """
+        Trigger an on_search_finish event, which indicates the end of search
+        operation.
+
+        :query: The search query.
+        :count: Number of packages found.
+
+        """
+        print('\n{} package(s) found'.format(count))
+
+    def on_pkg_found(self, repo_id, pkg_name, description):
+        """
+        Trigger an on_pkg_found event, which indicates that a package matching
+        the query was found.
+
+        :repo_id: Identification of the master repository of the package.
+        :pkg_name: Name of the package.
+        :description: Description of the package.
+
+        """
+        print('{}/{}'.format(repo_id, pkg_name))
+
+        if description:
+            print('    {}'.format(description))
+
+class CliPruneView:
+
+    """
+    Implementation of prune view.
+
+    """
+
+    class EventHandler(PruneListener):
+
+        """
+        Implementation of the event handler class, which will be responsible to
+        receive the operation events and propagate them to the view.
+
+        """
+
+        def __init__(self, view):
+            """
+            Initialize the event handler internal data.
+
+            """
+            super().__init__()
+
+            self.view = view
+
+        def on_prune_start(self):
+            """
+            Trigger an on_prune_start event, which indicates the start of prune
+            operation.
+
+            """
+            self.view.on_prune_start()
+
+        def on_prune_finish(self, count):
+            """
+            Trigger an on_prune_finish event, which indicates the end of prune
+            operation.
+
+            :count: Number of pruned packages.
+
+            """
+            self.view.on_prune_finish(count)
+
+        def on_master_repo_prune(self, repo_id):
+            """
+            Trigger an on_master_repo_prune event, which indicates that a
+            master repository which is no longer in the mirrors file was
+            removed.
+
+            :repo_id: Identification of the master repository.
+
+            """
+            self.view.on_master_repo_prune(repo_id)
+
+        def on_pkg_prune(self, repo_id, pkg_name):
+            """
+            Trigger an on_pkg_prune event, which indicates that a package
+            removed upstream was pruned.
+
+            :repo_id: Identification of the master repository of the package.
+            :pkg_name: Name of the package.
+
+            """
+            self.view.on_pkg_prune(repo_id, pkg_name)
+
+    def __init__(self):
+        """
+        Initialize the prune view internal data.
+
+        """
+        self.cmd = PruneCmd()
+        self.event_handler = CliPruneView.EventHandler(self)
+
+    def prune(self):
+        """
+        Trigger the prune command.
+
+        """
+        self.cmd.execute(self.event_handler)
+
+    def on_prune_start(self):
+        """
+        Trigger an on_prune_start event, which indicates the start of prune
+        operation.
+
+        """
+        print('Pruning packages\n')
+
+    def on_prune_finish(self, count):
+        """
+        Trigger an on_prune_finish event, which indicates the end of prune
+        operation.
+
+        :count: Number of pruned packages.
+
+        """
+        print('\n{} package(s) pruned'.format(count))
+
+    def on_master_repo_prune(self, repo_id):
+        """
+        Trigger an on_master_repo_prune event, which indicates that a master
+        repository which is no longer in the mirrors file was removed.
+
+        :repo_id: Identification of the master repository.
+
+        """
+        print('{} removed'.format(repo_id))
+
+    def on_pkg_prune(self, repo_id, pkg_name):
+        """
+        Trigger an on_pkg_prune event, which indicates that a package removed
+        upstream was pruned.
+
+        :repo_id: Identification of the master repository of the package.
+        :pkg_name: Name of the package.
+
+        """
+        print('{}/{} removed'.format(repo_id, pkg_name))
@@ -0,0 +1,153 @@
+"""
+Benchmark of the fetch backends (see fetch_backends): the same package
+repositories are fetched from local upstreams by each backend, first into
+new repositories, then again with nothing new upstream, as most of the
+fetches of an update are.
+
+Usage: python tests/benchmark_fetch_backends.py [-p PKGS] [-c COMMITS] [-j JOBS]
+
+"""
+
+from argparse import ArgumentParser
+from importlib.util import find_spec
+from os.path import abspath, dirname
+from shutil import rmtree
+from sys import path
+from tempfile import mkdtemp
+from time import monotonic
+
+import git
+
+path.insert(0, '{}/../gur'.format(dirname(abspath(__file__))))
+
+from git_plumbing import GitPlumbing
+from job_pool import JobPool
+from transfer_guard import TransferGuard
+
+def create_upstreams(tmp_dir, pkgs, commits):
+    """
+    Create the upstream repositories of the packages.
+
+    :tmp_dir: Directory of the upstream repositories.
+    :pkgs: Number of packages.
+    :commits: Number of commits of each upstream repository.
+    :returns: A list of upstream urls.
+
+    """
+    env = {
+        'GIT_AUTHOR_NAME': 'fake',
+        'GIT_AUTHOR_EMAIL': 'fake@fake',
+        'GIT_COMMITTER_NAME': 'fake',
+        'GIT_COMMITTER_EMAIL': 'fake@fake'
+    }
+    upstream_urls = []
+
+    for pkg_idx in range(pkgs):
+        repo_path = '{}/upstream/pkg_{}'.format(tmp_dir, pkg_idx)
+        repo = git.Repo.init(repo_path)
+        repo.git.checkout('-b', 'master')
+
+        for commit_idx in range(commits):
+            with open('{}/file'.format(repo_path), 'w') as f:
+                f.write('{}\n'.format(commit_idx) * 100)
+
+            repo.git.add('file')
+            repo.git.commit('-m', 'commit {}'.format(commit_idx), env=env)
+
+        repo.close()
+        upstream_urls.append('file://{}'.format(repo_path))
+
+    return upstream_urls
+
+def run_backend(backend, tmp_dir, upstream_urls, jobs):
+    """
+    Fetch the package repositories with a fetch backend, twice.
+
+    :backend: Name of the fetch backend.
+    :tmp_dir: Directory of the package repositories.
+    :upstream_urls: Urls of the upstream repositories.
+    :jobs: Number of packages fetched at the same time.
+    :returns: A tuple of the seconds of both rounds and the git timings.
+
+    """
+    plumbing = GitPlumbing(backend, guard=TransferGuard(timeout=0))
+    pkg_dirs = [
+        '{}/{}/pkg_{}'.format(tmp_dir, backend, pkg_idx)
+        for pkg_idx in range(len(upstream_urls))
+    ]
+
+    def fetch_new(pkg):
+        pkg_dir, upstream_url = pkg
+        pkg_repo = plumbing.init_repo(pkg_dir, upstream_url)
+        plumbing.fetch(pkg_repo)
+
+        return plumbing.resolve_head(pkg_repo, 'master')
+
+    def fetch_again(pkg):
+        pkg_dir, _ = pkg
+        pkg_repo = plumbing.open_repo(pkg_dir)
+        plumbing.fetch(pkg_repo)
+
+        return plumbing.resolve_head(pkg_repo, 'master')
+
+    elapsed = []
+
+    with JobPool(jobs) as pool:
+        for fetch_pkg in [fetch_new, fetch_again]:
+            # the second round opens the repositories again
+            plumbing.close()
+
+            start = monotonic()
+            list(pool.map(fetch_pkg, zip(pkg_dirs, upstream_urls)))
+            elapsed.append(monotonic() - start)
+
+    plumbing.close()
+
+    return elapsed[0], elapsed[1], plumbing.get_timings()
+
+def main():
+    """
+    Run the benchmark with every fetch backend available.
+
+    """
+    parser = ArgumentParser(description='benchmark of the fetch backends')
+    parser.add_argument('-p', '--pkgs', type=int, default=50)
+    parser.add_argument('-c', '--commits', type=int, default=20)
+    parser.add_argument('-j', '--jobs', type=int, default=1)
+    args = parser.parse_args()
+
+    backends = ['gitpython']
+
+    if find_spec('pygit2'):
+        backends.append('pygit2')
+    else:
+        print('pygit2 is not installed, skipping its backend')
+
+    tmp_dir = mkdtemp()
+
+    try:
+        upstream_urls = create_upstreams(tmp_dir, args.pkgs, args.commits)
+
+        for backend in backends:
+            new_secs, again_secs, timings = run_backend(
+                backend,
+                tmp_dir,
+                upstream_urls,
+                args.jobs
+            )
+
+            print('\n{}: {} packages, {} job(s)'.format(
+                backend,
+                args.pkgs,
+                args.jobs
+            ))
+            print('  new fetches:   {:8.3f} s'.format(new_secs))
+            print('  fetches again: {:8.3f} s'.format(again_secs))
+
+            for op_name, (count, total) in sorted(timings.items()):
+                print('  {:<12} {:>6} {:>10.3f} s'.format(op_name, count, total))
+    finally:
+        rmtree(tmp_dir)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+from unittest import TestCase, main
+
+from os import remove
+
+from config_mgr import ConfigMgr
+
+class ConfigMgrTest(TestCase):
+
+    """
+    Implementation of unit tests for ConfigMgr class.
+
+    """
+
+    def tearDown(self):
+        """
+        Suite teardown.
+
+        """
+        remove(ConfigMgr.config_file)
+
+    def test_get_existing_option(self):
+        """
+        GIVEN the config file contains the requested option.
+        WHEN  the user retrieves the option.
+        THEN  the call must return the option value.
+
+        """
+        with open(ConfigMgr.config_file, 'w') as config_file:
+            config_file.write('[database]\nbackend = sqlite\n')
+
+        self.assertEqual(ConfigMgr.get('database', 'backend', 'json'), 'sqlite')
+
+    def test_get_missing_option(self):
+        """
+        GIVEN the config file doesn't contain the requested option.
+        WHEN  the user retrieves the option.
+        THEN  the call must return the fallback value.
+
+        """
+        with open(ConfigMgr.config_file, 'w') as config_file:
+            config_file.write('')
+
+        self.assertEqual(ConfigMgr.get('database', 'backend', 'json'), 'json')
+
+    def test_get_boolean_option(self):
+        """
+        GIVEN the config file contains a boolean option.
+        WHEN  the user retrieves the option and a missing one.
+        THEN  the call must return the option value and the fallback value.
+
+        """
+        with open(ConfigMgr.config_file, 'w') as config_file:
+            config_file.write('[fetch]\ntags = no\n')
+
+        self.assertFalse(ConfigMgr.get_boolean('fetch', 'tags', True))
+        self.assertTrue(ConfigMgr.get_boolean('fetch', 'single_branch', True))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+from unittest import TestCase, main
+
+from os import remove
+
+from config_mgr import ConfigMgr
+from fetch_profile import FetchProfile
+
+class FetchProfileTest(TestCase):
+
+    """
+    Implementation of unit tests for FetchProfile class.
+
+    """
+
+    def tearDown(self):
+        """
+        Suite teardown.
+
+        """
+        remove(ConfigMgr.config_file)
+
+    def test_default_profile(self):
+        """
+        GIVEN the config file has no fetch section.
+        WHEN  the fetch profile is read from the config file.
+        THEN  the fetches must have no extra arguments.
+
+        """
+        with open(ConfigMgr.config_file, 'w') as config_file:
+            config_file.write('')
+
+        profile = FetchProfile.from_config()
+
+        self.assertEqual(profile.get_fetch_args('foo_branch'), {})
+
+    def test_shallow_profile(self):
+        """
+        GIVEN the config file contains a shallow, partial and single-branch
+              fetch profile without tags.
+        WHEN  the fetch profile is read from the config file.
+        THEN  the fetches must be limited accordingly.
+
+        """
+        with open(ConfigMgr.config_file, 'w') as config_file:
+            config_file.write(
+                '[fetch]\n'
+                'depth = 1\n'
+                'filter = blob:none\n'
+                'single_branch = yes\n'
+                'tags = no\n'
+            )
+
+        profile = FetchProfile.from_config()
+
+        self.assertEqual(
+            profile.get_fetch_args('foo_branch'),
+            {
+                'refspec': '+refs/heads/foo_branch:refs/remotes/origin/foo_branch',
+                'depth': 1,
+                'filter': 'blob:none',
+                'no_tags': True
+            }
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+from unittest import TestCase, main, skipUnless
+
+from importlib.util import find_spec
+from shutil import rmtree
+from tempfile import mkdtemp
+
+import git
+
+from git_plumbing import GitPlumbing
+from object_store import ObjectStore
+
+class GitPlumbingTest(TestCase):
+
+    """
+    Implementation of unit tests for GitPlumbing class.
+
+    """
+
+    def setUp(self):
+        """
+        Suite setup: create an upstream repository with one commit.
+
+        """
+        self.tmp_dir = mkdtemp()
+        self.upstream_url = 'file://{}/upstream'.format(self.tmp_dir)
+
+        upstream = git.Repo.init('{}/upstream'.format(self.tmp_dir))
+        upstream.git.checkout('-b', 'master')
+        upstream.git.commit(
+            '--allow-empty',
+            '-m', 'fake commit',
+            '--author', 'fake <fake@fake>',
+            env={
+                'GIT_COMMITTER_NAME': 'fake',
+                'GIT_COMMITTER_EMAIL': 'fake@fake'
+            }
+        )
+        self.head_commit = upstream.head.commit.hexsha
+
+        self.plumbing = GitPlumbing()
+
+    def tearDown(self):
+        """
+        Suite teardown.
+
+        """
+        rmtree(self.tmp_dir)
+
+    def __fetch_pkg_repo(self, plumbing):
+        """
+        Initialize, fetch and resolve a package repository.
+
+        :plumbing: The git plumbing.
+
+        """
+        pkg_dir = '{}/pkg'.format(self.tmp_dir)
+
+        pkg_repo = plumbing.init_repo(pkg_dir, 'fake_url')
+        plumbing.set_origin(pkg_repo, self.upstream_url)
+        plumbing.fetch(pkg_repo)
+
+        pkg_repo = plumbing.open_repo(pkg_dir)
+
+        self.assertEqual(plumbing.get_origin_url(pkg_repo), self.upstream_url)
+        self.assertEqual(
+            plumbing.resolve_head(pkg_repo, 'master'),
+            self.head_commit
+        )
+
+        # the head was read from the ref files
+        timings = plumbing.get_timings()
+
+        self.assertEqual(
+            sorted(timings),
+            ['config', 'fetch', 'init', 'open', 'resolve']
+        )
+        self.assertEqual(timings['fetch'][0], 1)
+
+    def test_fetch_pkg_repo(self):
+        """
+        GIVEN a new package repository.
+        WHEN  it's initialized, fetched and opened again through GitPython.
+        THEN  its origin must point to the upstream, its head must be read
+              from its ref files and every operation must be timed.
+
+        """
+        self.__fetch_pkg_repo(self.plumbing)
+
+    @skipUnless(find_spec('pygit2'), 'pygit2 is not installed')
+    def test_fetch_pkg_repo_with_pygit2(self):
+        """
+        GIVEN a new package repository.
+        WHEN  it's initialized, fetched and opened again through pygit2.
+        THEN  its origin must point to the upstream, its head must be read
+              from its ref files and every operation must be timed.
+
+        """
+        self.__fetch_pkg_repo(GitPlumbing('pygit2'))
+
+    def test_unsupported_backend(self):
+        """
+        GIVEN a fetch backend which doesn't exist.
+        WHEN  the git plumbing is created.
+        THEN  an error must be raised.
+
+        """
+        with self.assertRaises(RuntimeError):
+            GitPlumbing('fake_backend')
+
+    def test_bounded_repos_and_processes(self):
+        """
+        GIVEN a git plumbing which keeps one repository handle open and runs
+              one git process at a time.
+        WHEN  two package repositories are initialized, fetched and reopened
+              and a master repository is opened twice and released.
+        THEN  at most one handle must be open, the evicted ones must be closed,
+              the master repository must be opened once and at most one git
+              process must have run at a time.
+
+        """
+        plumbing = GitPlumbing(max_repos=1, max_processes=1)
+
+        for pkg_name in ['foo', 'bar']:
+            pkg_repo = plumbing.init_repo(
+                '{}/{}'.format(self.tmp_dir, pkg_name),
+                self.upstream_url
+            )
+            plumbing.fetch(pkg_repo)
+
+        pkg_repo = plumbing.open_repo('{}/foo'.format(self.tmp_dir))
+
+        self.assertEqual(plumbing.resolve_head(pkg_repo, 'master'), self.head_commit)
+
+        master_path = '{}/upstream'.format(self.tmp_dir)
+        master_repo = plumbing.open_master_repo(master_path)
+
+        self.assertIs(plumbing.open_master_repo(master_path), master_repo)
+
+        plumbing.release_master_repo(master_path)
+        plumbing.close()
+
+        self.assertEqual(
+            plumbing.get_counters(),
+            {
+                'open_repos': 0,
+                'opened_repos': 1,
+                'reused_repos': 0,
+                'closed_repos': 3,
+                'peak_repos': 1,
+                'open_master_repos': 0,
+                'opened_master_repos': 1,
+                'reused_master_repos': 1,
+                'closed_master_repos': 1,
+                'peak_master_repos': 1,
+                'live_processes': 0,
+                'peak_processes': 1
+            }
+        )
+
+    def test_update_ref_to_borrowed_commit(self):
+        """
+        GIVEN a package repository which borrows the objects of a store
+              repository.
+        WHEN  its origin branch is pointed to the head of the store repository.
+        THEN  the branch must be resolved through the alternates.
+
+        """
+        store = ObjectStore(self.tmp_dir, plumbing=self.plumbing)
+        store_repo = store.fetch(self.upstream_url)
+
+        pkg_repo = self.plumbing.init_repo(
+            '{}/pkg'.format(self.tmp_dir),
+            self.upstream_url
+        )
+        store.link(pkg_repo, store_repo)
+
+        self.plumbing.update_ref(
+            pkg_repo,
+            'refs/remotes/origin/master',
+            self.plumbing.rev_parse(store_repo, 'origin/master')
+        )
+
+        self.assertEqual(
+            self.plumbing.rev_parse(pkg_repo, 'origin/master'),
+            self.head_commit
+        )
+        self.assertEqual(self.plumbing.get_timings()['update_ref'][0], 1)
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 from unittest import TestCase, main
-from unittest.mock import patch, call, ANY
+from unittest.mock import patch, call, ANY, MagicMock
 
 from os import chdir
 import git
@@ -52,6 +52,8 @@ class InitializeRepoTest(TestCase):
         master_repo_id = '{}/{}'.format(master_user, master_repo_name)
 
         listdir_mock.return_value = [pkg_name]
+        # no ref files, so the heads are resolved by rev_parse
+        git_mock.init.return_value.git_dir = 'fake_git_dir'
         mirrors_mock.return_value = [
             '{},{}'.format(master_branch_name, repo_url)
         ]
@@ -78,7 +80,11 @@ class InitializeRepoTest(TestCase):
 
         pkg_mgr_mock.assert_has_calls(
             [
-                call.add_entry(pkg_name, ANY) # TODO: 'fake_hash'
+                call.add_entries(
+                    [
+                        (pkg_name, ANY, master_repo_id)
+                    ]
+                )
             ]
         )
 
@@ -88,11 +94,22 @@ class InitializeRepoTest(TestCase):
                     repo_url,
                     master_repo_id,
                     branch=master_branch_name,
-                    progress=ANY
+                    no_checkout=True,
+                    progress=ANY,
+                    env=ANY
+                ),
+                call.clone_from().git.sparse_checkout(
+                    'set',
+                    '--no-cone',
+                    '/src/*/pkg_desc.json'
                 ),
-                call.init('{}/src/{}/.repo'.format(master_repo_id, pkg_name)),
-                call.init().create_remote('origin', pkg_repo),
-                call.init().create_remote().fetch(progress=ANY),
+                call.clone_from().git.reset('--hard'),
+                call.init('{}/src/{}/.repo'.format(master_repo_id, pkg_name), odbt=ANY),
+                call.init().config_writer(),
+                call.init().config_writer().set_value('remote "origin"', 'url', pkg_repo),
+                call.init().config_writer().set_value('remote "origin"', 'fetch', ANY),
+                call.init().config_writer().release(),
+                call.init().remotes.origin.fetch(progress=ANY, env=ANY),
                 call.init().rev_parse('origin/{}'.format(pkg_branch))
             ]
         )
@@ -131,6 +148,8 @@ class InitializeRepoTest(TestCase):
         master_repo_id = '{}/{}'.format(master_user, master_repo_name)
 
         listdir_mock.return_value = pkg_names
+        # no ref files, so the heads are resolved by rev_parse
+        git_mock.init.return_value.git_dir = 'fake_git_dir'
         mirrors_mock.return_value = [
             '{},{}'.format(master_branch_name, repo_url)
         ]
@@ -165,10 +184,14 @@ class InitializeRepoTest(TestCase):
 
         pkg_mgr_mock.assert_has_calls(
             [
-                call.add_entry(pkg_names[0], ANY), # TODO: fake_hash
-                call.add_entry(pkg_names[1], ANY), # TODO: fake_hash
-                call.add_entry(pkg_names[2], ANY), # TODO: fake_hash
-                call.add_entry(pkg_names[3], ANY), # TODO: fake_hash
+                call.add_entries(
+                    [
+                        (pkg_names[0], ANY, master_repo_id),
+                        (pkg_names[1], ANY, master_repo_id),
+                        (pkg_names[2], ANY, master_repo_id),
+                        (pkg_names[3], ANY, master_repo_id)
+                    ]
+                )
             ]
         )
 
@@ -178,27 +201,47 @@ class InitializeRepoTest(TestCase):
                     repo_url,
                     master_repo_id,
                     branch=master_branch_name,
-                    progress=ANY
+                    no_checkout=True,
+                    progress=ANY,
+                    env=ANY
                 ),
-
-                call.init('{}/src/{}/.repo'.format(master_repo_id, pkg_names[0])),
-                call.init().create_remote('origin', pkg_repos[0]),
-                call.init().create_remote().fetch(progress=ANY),
+                call.clone_from().git.sparse_checkout(
+                    'set',
+                    '--no-cone',
+                    '/src/*/pkg_desc.json'
+                ),
+                call.clone_from().git.reset('--hard'),
+
+                call.init('{}/src/{}/.repo'.format(master_repo_id, pkg_names[0]), odbt=ANY),
+                call.init().config_writer(),
+                call.init().config_writer().set_value('remote "origin"', 'url', pkg_repos[0]),
+                call.init().config_writer().set_value('remote "origin"', 'fetch', ANY),
+                call.init().config_writer().release(),
+                call.init().remotes.origin.fetch(progress=ANY, env=ANY),
+
+                call.init('{}/src/{}/.repo'.format(master_repo_id, pkg_names[1]), odbt=ANY),
+                call.init().config_writer(),
+                call.init().config_writer().set_value('remote "origin"', 'url', pkg_repos[1]),
+                call.init().config_writer().set_value('remote "origin"', 'fetch', ANY),
+                call.init().config_writer().release(),
+                call.init().remotes.origin.fetch(progress=ANY, env=ANY),
+
+                call.init('{}/src/{}/.repo'.format(master_repo_id, pkg_names[2]), odbt=ANY),
+                call.init().config_writer(),
+                call.init().config_writer().set_value('remote "origin"', 'url', pkg_repos[2]),
+                call.init().config_writer().set_value('remote "origin"', 'fetch', ANY),
+                call.init().config_writer().release(),
+                call.init().remotes.origin.fetch(progress=ANY, env=ANY),
+
+                call.init('{}/src/{}/.repo'.format(master_repo_id, pkg_names[3]), odbt=ANY),
+                call.init().config_writer(),
+                call.init().config_writer().set_value('remote "origin"', 'url', pkg_repos[3]),
+                call.init().config_writer().set_value('remote "origin"', 'fetch', ANY),
+                call.init().config_writer().release(),
+                call.init().remotes.origin.fetch(progress=ANY, env=ANY),
                 call.init().rev_parse('origin/{}'.format(pkg_branches[0])),
-
-                call.init('{}/src/{}/.repo'.format(master_repo_id, pkg_names[1])),
-                call.init().create_remote('origin', pkg_repos[1]),
-                call.init().create_remote().fetch(progress=ANY),
                 call.init().rev_parse('origin/{}'.format(pkg_branches[1])),
-
-                call.init('{}/src/{}/.repo'.format(master_repo_id, pkg_names[2])),
-                call.init().create_remote('origin', pkg_repos[2]),
-                call.init().create_remote().fetch(progress=ANY),
                 call.init().rev_parse('origin/{}'.format(pkg_branches[2])),
-
-                call.init('{}/src/{}/.repo'.format(master_repo_id, pkg_names[3])),
-                call.init().create_remote('origin', pkg_repos[3]),
-                call.init().create_remote().fetch(progress=ANY),
                 call.init().rev_parse('origin/{}'.format(pkg_branches[3]))
             ]
         )
@@ -243,6 +286,8 @@ class InitializeRepoTest(TestCase):
         ]
 
         listdir_mock.return_value = [pkg_name]
+        # no ref files, so the heads are resolved by rev_parse
+        git_mock.init.return_value.git_dir = 'fake_git_dir'
         mirrors_mock.return_value = [
             '{},{}\n'.format(master_branch_name, repo_urls[0]),
             '{},{}\n'.format(master_branch_name, repo_urls[1]),
@@ -285,9 +330,21 @@ class InitializeRepoTest(TestCase):
 
         pkg_mgr_mock.assert_has_calls(
             [
-                call.add_entry(pkg_name, ANY), # TODO: fake_hash
-                call.add_entry(pkg_name, ANY), # TODO: fake_hash
-                call.add_entry(pkg_name, ANY), # TODO: fake_hash
+                call.add_entries(
+                    [
+                        (pkg_name, ANY, master_repo_ids[0])
+                    ]
+                ),
+                call.add_entries(
+                    [
+                        (pkg_name, ANY, master_repo_ids[1])
+                    ]
+                ),
+                call.add_entries(
+                    [
+                        (pkg_name, ANY, master_repo_ids[2])
+                    ]
+                )
             ]
         )
 
@@ -297,36 +354,77 @@ class InitializeRepoTest(TestCase):
                     repo_urls[0],
                     master_repo_ids[0],
                     branch=master_branch_name,
-                    progress=ANY
+                    no_checkout=True,
+                    progress=ANY,
+                    env=ANY
                 ),
-
-                call.init('{}/src/{}/.repo'.format(master_repo_ids[0], pkg_name)),
-                call.init().create_remote('origin', pkg_repo),
-                call.init().create_remote().fetch(progress=ANY),
+                call.clone_from().git.sparse_checkout(
+                    'set',
+                    '--no-cone',
+                    '/src/*/pkg_desc.json'
+                ),
+                call.clone_from().git.reset('--hard'),
+
+                call.init('{}/src/{}/.repo'.format(master_repo_ids[0], pkg_name), odbt=ANY),
+                call.init().config_writer(),
+                call.init().config_writer().set_value('remote "origin"', 'url', pkg_repo),
+                call.init().config_writer().set_value('remote "origin"', 'fetch', ANY),
+                call.init().config_writer().release(),
+                call.init().remotes.origin.fetch(progress=ANY, env=ANY),
                 call.init().rev_parse('origin/{}'.format(pkg_branch)),
 
+                call.clone_from().close(),
+
                 call.clone_from(
                     repo_urls[1],
                     master_repo_ids[1],
                     branch=master_branch_name,
-                    progress=ANY
+                    no_checkout=True,
+                    progress=ANY,
+                    env=ANY
+                ),
+
+                call.clone_from().git.sparse_checkout(
+                    'set',
+                    '--no-cone',
+                    '/src/*/pkg_desc.json'
                 ),
 
-                call.init('{}/src/{}/.repo'.format(master_repo_ids[1], pkg_name)),
-                call.init().create_remote('origin', pkg_repo),
-                call.init().create_remote().fetch(progress=ANY),
+                call.clone_from().git.reset('--hard'),
+
+                call.init('{}/src/{}/.repo'.format(master_repo_ids[1], pkg_name), odbt=ANY),
+                call.init().config_writer(),
+                call.init().config_writer().set_value('remote "origin"', 'url', pkg_repo),
+                call.init().config_writer().set_value('remote "origin"', 'fetch', ANY),
+                call.init().config_writer().release(),
+                call.init().remotes.origin.fetch(progress=ANY, env=ANY),
                 call.init().rev_parse('origin/{}'.format(pkg_branch)),
 
+                call.clone_from().close(),
+
                 call.clone_from(
                     repo_urls[2],
                     master_repo_ids[2],
                     branch=master_branch_name,
-                    progress=ANY
+                    no_checkout=True,
+                    progress=ANY,
+                    env=ANY
+                ),
+
+                call.clone_from().git.sparse_checkout(
+                    'set',
+                    '--no-cone',
+                    '/src/*/pkg_desc.json'
                 ),
 
-                call.init('{}/src/{}/.repo'.format(master_repo_ids[2], pkg_name)),
-                call.init().create_remote('origin', pkg_repo),
-                call.init().create_remote().fetch(progress=ANY),
+                call.clone_from().git.reset('--hard'),
+
+                call.init('{}/src/{}/.repo'.format(master_repo_ids[2], pkg_name), odbt=ANY),
+                call.init().config_writer(),
+                call.init().config_writer().set_value('remote "origin"', 'url', pkg_repo),
+                call.init().config_writer().set_value('remote "origin"', 'fetch', ANY),
+                call.init().config_writer().release(),
+                call.init().remotes.origin.fetch(progress=ANY, env=ANY),
                 call.init().rev_parse('origin/{}'.format(pkg_branch))
             ]
         )
@@ -370,6 +468,8 @@ class InitializeRepoTest(TestCase):
         ]
 
         listdir_mock.return_value = pkg_names
+        # no ref files, so the heads are resolved by rev_parse
+        git_mock.init.return_value.git_dir = 'fake_git_dir'
         mirrors_mock.return_value = [
             '{},{}\n'.format(master_branch_name, repo_urls[0]),
             '{},{}\n'.format(master_branch_name, repo_urls[1]),
@@ -430,15 +530,27 @@ class InitializeRepoTest(TestCase):
 
         pkg_mgr_mock.assert_has_calls(
             [
-                call.add_entry(pkg_names[0], ANY), # TODO: fake_hash
-                call.add_entry(pkg_names[1], ANY), # TODO: fake_hash
-                call.add_entry(pkg_names[2], ANY), # TODO: fake_hash
-                call.add_entry(pkg_names[0], ANY), # TODO: fake_hash
-                call.add_entry(pkg_names[1], ANY), # TODO: fake_hash
-                call.add_entry(pkg_names[2], ANY), # TODO: fake_hash
-                call.add_entry(pkg_names[0], ANY), # TODO: fake_hash
-                call.add_entry(pkg_names[1], ANY), # TODO: fake_hash
-                call.add_entry(pkg_names[2], ANY) # TODO: fake_hash
+                call.add_entries(
+                    [
+                        (pkg_names[0], ANY, master_repo_ids[0]),
+                        (pkg_names[1], ANY, master_repo_ids[0]),
+                        (pkg_names[2], ANY, master_repo_ids[0])
+                    ]
+                ),
+                call.add_entries(
+                    [
+                        (pkg_names[0], ANY, master_repo_ids[1]),
+                        (pkg_names[1], ANY, master_repo_ids[1]),
+                        (pkg_names[2], ANY, master_repo_ids[1])
+                    ]
+                ),
+                call.add_entries(
+                    [
+                        (pkg_names[0], ANY, master_repo_ids[2]),
+                        (pkg_names[1], ANY, master_repo_ids[2]),
+                        (pkg_names[2], ANY, master_repo_ids[2])
+                    ]
+                )
             ]
         )
 
@@ -448,63 +560,122 @@ class InitializeRepoTest(TestCase):
                     repo_urls[0],
                     master_repo_ids[0],
                     branch=master_branch_name,
-                    progress=ANY
+                    no_checkout=True,
+                    progress=ANY,
+                    env=ANY
+                ),
+                call.clone_from().git.sparse_checkout(
+                    'set',
+                    '--no-cone',
+                    '/src/*/pkg_desc.json'
                 ),
-                call.init('{}/src/{}/.repo'.format(master_repo_ids[0], pkg_names[0])),
-                call.init().create_remote('origin', pkg_repos[0]),
-                call.init().create_remote().fetch(progress=ANY),
+                call.clone_from().git.reset('--hard'),
+                call.init('{}/src/{}/.repo'.format(master_repo_ids[0], pkg_names[0]), odbt=ANY),
+                call.init().config_writer(),
+                call.init().config_writer().set_value('remote "origin"', 'url', pkg_repos[0]),
+                call.init().config_writer().set_value('remote "origin"', 'fetch', ANY),
+                call.init().config_writer().release(),
+                call.init().remotes.origin.fetch(progress=ANY, env=ANY),
+
+                call.init('{}/src/{}/.repo'.format(master_repo_ids[0], pkg_names[1]), odbt=ANY),
+                call.init().config_writer(),
+                call.init().config_writer().set_value('remote "origin"', 'url', pkg_repos[1]),
+                call.init().config_writer().set_value('remote "origin"', 'fetch', ANY),
+                call.init().config_writer().release(),
+                call.init().remotes.origin.fetch(progress=ANY, env=ANY),
+
+                call.init('{}/src/{}/.repo'.format(master_repo_ids[0], pkg_names[2]), odbt=ANY),
+                call.init().config_writer(),
+                call.init().config_writer().set_value('remote "origin"', 'url', pkg_repos[2]),
+                call.init().config_writer().set_value('remote "origin"', 'fetch', ANY),
+                call.init().config_writer().release(),
+                call.init().remotes.origin.fetch(progress=ANY, env=ANY),
                 call.init().rev_parse('origin/{}'.format(pkg_branches[0])),
-
-                call.init('{}/src/{}/.repo'.format(master_repo_ids[0], pkg_names[1])),
-                call.init().create_remote('origin', pkg_repos[1]),
-                call.init().create_remote().fetch(progress=ANY),
                 call.init().rev_parse('origin/{}'.format(pkg_branches[1])),
-
-                call.init('{}/src/{}/.repo'.format(master_repo_ids[0], pkg_names[2])),
-                call.init().create_remote('origin', pkg_repos[2]),
-                call.init().create_remote().fetch(progress=ANY),
                 call.init().rev_parse('origin/{}'.format(pkg_branches[2])),
 
+                call.clone_from().close(),
+
                 call.clone_from(
                     repo_urls[1],
                     master_repo_ids[1],
                     branch=master_branch_name,
-                    progress=ANY
+                    no_checkout=True,
+                    progress=ANY,
+                    env=ANY
                 ),
-                call.init('{}/src/{}/.repo'.format(master_repo_ids[1], pkg_names[0])),
-                call.init().create_remote('origin', pkg_repos[0]),
-                call.init().create_remote().fetch(progress=ANY),
-                call.init().rev_parse('origin/{}'.format(pkg_branches[0])),
 
-                call.init('{}/src/{}/.repo'.format(master_repo_ids[1], pkg_names[1])),
-                call.init().create_remote('origin', pkg_repos[1]),
-                call.init().create_remote().fetch(progress=ANY),
-                call.init().rev_parse('origin/{}'.format(pkg_branches[1])),
+                call.clone_from().git.sparse_checkout(
+                    'set',
+                    '--no-cone',
+                    '/src/*/pkg_desc.json'
+                ),
 
-                call.init('{}/src/{}/.repo'.format(master_repo_ids[1], pkg_names[2])),
-                call.init().create_remote('origin', pkg_repos[2]),
-                call.init().create_remote().fetch(progress=ANY),
+                call.clone_from().git.reset('--hard'),
+                call.init('{}/src/{}/.repo'.format(master_repo_ids[1], pkg_names[0]), odbt=ANY),
+                call.init().config_writer(),
+                call.init().config_writer().set_value('remote "origin"', 'url', pkg_repos[0]),
+                call.init().config_writer().set_value('remote "origin"', 'fetch', ANY),
+                call.init().config_writer().release(),
+                call.init().remotes.origin.fetch(progress=ANY, env=ANY),
+
+                call.init('{}/src/{}/.repo'.format(master_repo_ids[1], pkg_names[1]), odbt=ANY),
+                call.init().config_writer(),
+                call.init().config_writer().set_value('remote "origin"', 'url', pkg_repos[1]),
+                call.init().config_writer().set_value('remote "origin"', 'fetch', ANY),
+                call.init().config_writer().release(),
+                call.init().remotes.origin.fetch(progress=ANY, env=ANY),
+
+                call.init('{}/src/{}/.repo'.format(master_repo_ids[1], pkg_names[2]), odbt=ANY),
+                call.init().config_writer(),
+                call.init().config_writer().set_value('remote "origin"', 'url', pkg_repos[2]),
+                call.init().config_writer().set_value('remote "origin"', 'fetch', ANY),
+                call.init().config_writer().release(),
+                call.init().remotes.origin.fetch(progress=ANY, env=ANY),
+                call.init().rev_parse('origin/{}'.format(pkg_branches[0])),
+                call.init().rev_parse('origin/{}'.format(pkg_branches[1])),
                 call.init().rev_parse('origin/{}'.format(pkg_branches[2])),
 
+                call.clone_from().close(),
+
                 call.clone_from(
                     repo_urls[2],
                     master_repo_ids[2],
                     branch=master_branch_name,
-                    progress=ANY
+                    no_checkout=True,
+                    progress=ANY,
+                    env=ANY
                 ),
-                call.init('{}/src/{}/.repo'.format(master_repo_ids[2], pkg_names[0])),
-                call.init().create_remote('origin', pkg_repos[0]),
-                call.init().create_remote().fetch(progress=ANY),
-                call.init().rev_parse('origin/{}'.format(pkg_branches[0])),
 
-                call.init('{}/src/{}/.repo'.format(master_repo_ids[2], pkg_names[1])),
-                call.init().create_remote('origin', pkg_repos[1]),
-                call.init().create_remote().fetch(progress=ANY),
-                call.init().rev_parse('origin/{}'.format(pkg_branches[1])),
+                call.clone_from().git.sparse_checkout(
+                    'set',
+                    '--no-cone',
+                    '/src/*/pkg_desc.json'
+                ),
 
-                call.init('{}/src/{}/.repo'.format(master_repo_ids[2], pkg_names[2])),
-                call.init().create_remote('origin', pkg_repos[2]),
-                call.init().create_remote().fetch(progress=ANY),
+                call.clone_from().git.reset('--hard'),
+                call.init('{}/src/{}/.repo'.format(master_repo_ids[2], pkg_names[0]), odbt=ANY),
+                call.init().config_writer(),
+                call.init().config_writer().set_value('remote "origin"', 'url', pkg_repos[0]),
+                call.init().config_writer().set_value('remote "origin"', 'fetch', ANY),
+                call.init().config_writer().release(),
+                call.init().remotes.origin.fetch(progress=ANY, env=ANY),
+
+                call.init('{}/src/{}/.repo'.format(master_repo_ids[2], pkg_names[1]), odbt=ANY),
+                call.init().config_writer(),
+                call.init().config_writer().set_value('remote "origin"', 'url', pkg_repos[1]),
+                call.init().config_writer().set_value('remote "origin"', 'fetch', ANY),
+                call.init().config_writer().release(),
+                call.init().remotes.origin.fetch(progress=ANY, env=ANY),
+
+                call.init('{}/src/{}/.repo'.format(master_repo_ids[2], pkg_names[2]), odbt=ANY),
+                call.init().config_writer(),
+                call.init().config_writer().set_value('remote "origin"', 'url', pkg_repos[2]),
+                call.init().config_writer().set_value('remote "origin"', 'fetch', ANY),
+                call.init().config_writer().release(),
+                call.init().remotes.origin.fetch(progress=ANY, env=ANY),
+                call.init().rev_parse('origin/{}'.format(pkg_branches[0])),
+                call.init().rev_parse('origin/{}'.format(pkg_branches[1])),
                 call.init().rev_parse('origin/{}'.format(pkg_branches[2]))
             ]
         )
@@ -576,7 +747,7 @@ class InitializeRepoTest(TestCase):
 
         listener_mock.on_pkg_update_start.assert_not_called()
         listener_mock.on_pkg_update_finish.assert_not_called()
-        pkg_mgr_mock.add_entry.assert_not_called()
+        pkg_mgr_mock.add_entries.assert_not_called()
 
         git_mock.assert_has_calls(
             [
@@ -584,26 +755,158 @@ class InitializeRepoTest(TestCase):
                     repo_urls[0],
                     master_repo_ids[0],
                     branch=master_branch_name,
-                    progress=ANY
+                    no_checkout=True,
+                    progress=ANY,
+                    env=ANY
                 ),
+                call.clone_from().git.sparse_checkout(
+                    'set',
+                    '--no-cone',
+                    '/src/*/pkg_desc.json'
+                ),
+                call.clone_from().git.reset('--hard'),
+                call.clone_from().close(),
+
                 call.clone_from(
                     repo_urls[1],
                     master_repo_ids[1],
                     branch=master_branch_name,
-                    progress=ANY
+                    no_checkout=True,
+                    progress=ANY,
+                    env=ANY
                 ),
+                call.clone_from().git.sparse_checkout(
+                    'set',
+                    '--no-cone',
+                    '/src/*/pkg_desc.json'
+                ),
+                call.clone_from().git.reset('--hard'),
+                call.clone_from().close(),
+
                 call.clone_from(
                     repo_urls[2],
                     master_repo_ids[2],
                     branch=master_branch_name,
-                    progress=ANY
-                )
+                    no_checkout=True,
+                    progress=ANY,
+                    env=ANY
+                ),
+                call.clone_from().git.sparse_checkout(
+                    'set',
+                    '--no-cone',
+                    '/src/*/pkg_desc.json'
+                ),
+                call.clone_from().git.reset('--hard')
             ]
         )
 
         git_mock.init.assert_not_called()
-        git_mock.init.create_remote.assert_not_called()
-        git_mock.init.create_remote.fetch.assert_not_called()
+        git_mock.init.config_writer.assert_not_called()
+        git_mock.init.remotes.origin.fetch.assert_not_called()
+
+    @patch('config_mgr.ConfigMgr.get_boolean')
+    @patch('os.path.isdir')
+    @patch('os.listdir')
+    @patch('package_database_mgr.PackageDatabaseMgr')
+    @patch('git.Repo')
+    @patch('views.CliUpdateView')
+    def test_initialize_repo_lazily(
+        self,
+        listener_mock,
+        git_mock,
+        pkg_mgr_mock,
+        listdir_mock,
+        isdir_mock,
+        get_boolean_mock):
+        """
+        GIVEN the lazy mode is enabled and the master repo contains a package
+              which isn't installed.
+        WHEN  the user issues an Update/InitializeRepo command.
+        THEN  the package must be added into the package database with its
+              upstream head, as not materialized, without fetching it.
+
+        """
+        pkg_name = 'foo_pkg'
+        pkg_branch = 'foo_branch'
+        pkg_repo = 'foo_repo'
+        master_repo_id = 'fake_user/fake_repo_1'
+        repo_url = 'https://github.com/{}.git'.format(master_repo_id)
+
+        get_boolean_mock.side_effect = \
+            lambda section, option, fallback=False: option == 'lazy' or fallback
+        isdir_mock.return_value = False
+        listdir_mock.return_value = [pkg_name]
+        pkg_mgr_mock.is_pkg_installed.return_value = False
+
+        probe_mock = MagicMock()
+        probe_mock.get_head.return_value = 'fake_hash'
+
+        cmd = UpdateCmd.InitializeRepoCmd(
+            pkg_mgr_mock,
+            master_repo_id,
+            'master',
+            repo_url,
+            probe=probe_mock
+        )
+        cmd.execute(listener_mock)
+
+        probe_mock.get_head.assert_called_once_with(pkg_repo, pkg_branch)
+        git_mock.init.assert_not_called()
+
+        pkg_mgr_mock.add_entries.assert_called_once_with(
+            [(pkg_name, 'fake_hash', master_repo_id)],
+            materialized=False
+        )
+        listener_mock.on_pkg_update_finish.assert_called_once_with(
+            pkg_name,
+            pkg_branch
+        )
+
+    @patch('os.listdir')
+    @patch('package_database_mgr.PackageDatabaseMgr')
+    @patch('git.Repo')
+    @patch('views.CliUpdateView')
+    def test_initialize_repo_interrupted(
+        self,
+        listener_mock,
+        git_mock,
+        pkg_mgr_mock,
+        listdir_mock):
+        """
+        GIVEN a repo which contains multiple packages.
+        WHEN  the user issues an Update/InitializeRepo command and the fetch of
+              the second package fails.
+        THEN  the first package must be added into the package database and
+              the other ones must be reported as unfinished.
+
+        """
+        pkg_names = ['foo_pkg', 'bar_pkg', 'baz_pkg', 'qux_pkg']
+        master_repo_id = 'fake_user/fake_repo_1'
+
+        listdir_mock.return_value = pkg_names
+        git_mock.init.return_value.git_dir = 'fake_git_dir'
+        git_mock.init.return_value.remotes.origin.fetch.side_effect = [
+            None,
+            git.GitCommandError('fetch', 128)
+        ]
+
+        cmd = UpdateCmd.InitializeRepoCmd(
+            pkg_mgr_mock,
+            master_repo_id,
+            'master',
+            'https://github.com/fake_user/fake_repo_1.git'
+        )
+
+        with self.assertRaises(git.GitCommandError):
+            cmd.execute(listener_mock)
+
+        pkg_mgr_mock.add_entries.assert_called_once_with(
+            [('foo_pkg', ANY, master_repo_id)]
+        )
+        listener_mock.on_pkgs_unfinished.assert_called_once_with(
+            master_repo_id,
+            ['bar_pkg', 'baz_pkg', 'qux_pkg']
+        )
 
 if __name__ == "__main__":
     main()
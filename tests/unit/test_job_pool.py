@@ -0,0 +1,82 @@
+from unittest import TestCase, main
+
+from threading import Barrier, current_thread, main_thread
+
+from job_pool import JobPool
+
+class JobPoolTest(TestCase):
+
+    """
+    Implementation of unit tests for JobPool class.
+
+    """
+
+    def test_single_job_runs_in_order(self):
+        """
+        GIVEN a pool of a single job.
+        WHEN  we run a function for multiple items.
+        THEN  the function must be run in the caller thread, in order.
+
+        """
+        threads = []
+
+        def job(item):
+            threads.append(current_thread())
+            return item * 2
+
+        with JobPool() as pool:
+            self.assertEqual(list(pool.map(job, [1, 2, 3])), [2, 4, 6])
+
+        self.assertEqual(threads, [main_thread()] * 3)
+
+    def test_multiple_jobs_run_at_the_same_time(self):
+        """
+        GIVEN a pool of multiple jobs.
+        WHEN  we run a function which waits for the other jobs.
+        THEN  the jobs must run at the same time.
+
+        """
+        barrier = Barrier(3, timeout=5)
+
+        def job(item):
+            barrier.wait()
+            return item
+
+        with JobPool(3) as pool:
+            self.assertEqual(sorted(pool.map(job, [1, 2, 3])), [1, 2, 3])
+
+    def test_failed_job(self):
+        """
+        GIVEN a pool of multiple jobs.
+        WHEN  one of the jobs fails.
+        THEN  the results of the other jobs must be yielded before the error
+              is raised.
+
+        """
+        def job(item):
+            if item == 2:
+                raise ValueError('fake error')
+
+            return item
+
+        results = []
+
+        with JobPool(2) as pool:
+            with self.assertRaises(ValueError):
+                for result in pool.map(job, [1, 2]):
+                    results.append(result)
+
+        self.assertEqual(results, [1])
+
+    def test_invalid_number_of_jobs(self):
+        """
+        GIVEN an invalid number of jobs.
+        WHEN  we create a pool.
+        THEN  an error must be raised.
+
+        """
+        with self.assertRaises(RuntimeError):
+            JobPool(0)
+
+if __name__ == "__main__":
+    main()
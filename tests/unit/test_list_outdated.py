@@ -0,0 +1,75 @@
+from unittest import TestCase, main
+from unittest.mock import patch, call
+
+from commands import ListOutdatedCmd
+
+class ListOutdatedTest(TestCase):
+
+    """
+    Implementation of unit tests for list-outdated command.
+
+    """
+
+    @patch('package_database_mgr.PackageDatabaseMgr')
+    @patch('views.CliListOutdatedView')
+    def test_list_outdated_packages(self, listener_mock, pkg_mgr_mock):
+        """
+        GIVEN the package database contains one outdated package.
+        WHEN  the user issues a list-outdated command.
+        THEN  the outdated package must be reported to the view, without any
+              access to the package dir.
+
+        """
+        repo_id = 'fake_user/fake_repo'
+
+        pkg_mgr_mock.get_outdated_pkgs.return_value = [
+            {
+                'name': 'fake_pkg',
+                'repo': repo_id,
+                'rev': { 'remote': 'remote_fake_hash', 'local': 'local_fake_hash' }
+            }
+        ]
+
+        cmd = ListOutdatedCmd(pkg_mgr_mock)
+        cmd.execute(listener_mock)
+
+        listener_mock.assert_has_calls(
+            [
+                call.on_outdated_list_start(),
+                call.on_pkg_outdated(
+                    repo_id,
+                    'fake_pkg',
+                    'local_fake_hash',
+                    'remote_fake_hash'
+                ),
+                call.on_outdated_list_finish(1)
+            ]
+        )
+
+        pkg_mgr_mock.switch_dir.assert_not_called()
+
+    @patch('package_database_mgr.PackageDatabaseMgr')
+    @patch('views.CliListOutdatedView')
+    def test_list_without_outdated_packages(self, listener_mock, pkg_mgr_mock):
+        """
+        GIVEN the package database contains no outdated packages.
+        WHEN  the user issues a list-outdated command.
+        THEN  no package must be reported to the view.
+
+        """
+        pkg_mgr_mock.get_outdated_pkgs.return_value = []
+
+        cmd = ListOutdatedCmd(pkg_mgr_mock)
+        cmd.execute(listener_mock)
+
+        listener_mock.assert_has_calls(
+            [
+                call.on_outdated_list_start(),
+                call.on_outdated_list_finish(0)
+            ]
+        )
+
+        listener_mock.on_pkg_outdated.assert_not_called()
+
+if __name__ == "__main__":
+    main()
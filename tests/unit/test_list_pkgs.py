@@ -1,7 +1,14 @@
 from unittest import TestCase, main
-from unittest.mock import patch, call, ANY
+from unittest.mock import patch, call, ANY, MagicMock
 
-from commands import ListPkgsCmd
+from os import chdir, getcwd, listdir, makedirs, remove
+from os.path import isdir
+from json import dump, load
+from shutil import rmtree
+import git
+
+from commands import ListPkgsCmd, UpdateCmd
+from package_database_mgr import PackageDatabaseMgr
 from views import CliListPkgsView
 
 class ListPkgsTest(TestCase):
@@ -33,7 +40,7 @@ class ListPkgsTest(TestCase):
         master_user = 'fake_user'
         master_repo_id = '{}/{}'.format(master_user, master_repo_name)
 
-        pkg_mgr_mock.is_pkg_installed.return_value = False
+        pkg_mgr_mock.get_installed_pkgs.return_value = set()
         isdir_mock.return_value = True
         listdir_mock.side_effect = [
             [master_user],
@@ -47,7 +54,7 @@ class ListPkgsTest(TestCase):
         pkg_mgr_mock.assert_has_calls(
             [
                 call.switch_dir(),
-                call.is_pkg_installed(pkg_name)
+                call.get_installed_pkgs()
             ]
         )
 
@@ -59,7 +66,13 @@ class ListPkgsTest(TestCase):
             ]
         )
 
-        isdir_mock.assert_called_once_with(master_user)
+        isdir_mock.assert_has_calls(
+            [
+                call(master_user),
+                call('{}/.git'.format(master_repo_id)),
+                call('{}/src'.format(master_repo_id))
+            ]
+        )
         listdir_mock.assert_has_calls(
             [
                 call(),
@@ -90,7 +103,7 @@ class ListPkgsTest(TestCase):
         master_user = 'fake_user'
         master_repo_id = '{}/{}'.format(master_user, master_repo_name)
 
-        pkg_mgr_mock.is_pkg_installed.return_value = True
+        pkg_mgr_mock.get_installed_pkgs.return_value = {(master_repo_id, pkg_name)}
         isdir_mock.return_value = True
         listdir_mock.side_effect = [
             [master_user],
@@ -104,7 +117,7 @@ class ListPkgsTest(TestCase):
         pkg_mgr_mock.assert_has_calls(
             [
                 call.switch_dir(),
-                call.is_pkg_installed(pkg_name)
+                call.get_installed_pkgs()
             ]
         )
 
@@ -116,7 +129,13 @@ class ListPkgsTest(TestCase):
             ]
         )
 
-        isdir_mock.assert_called_once_with(master_user)
+        isdir_mock.assert_has_calls(
+            [
+                call(master_user),
+                call('{}/.git'.format(master_repo_id)),
+                call('{}/src'.format(master_repo_id))
+            ]
+        )
         listdir_mock.assert_has_calls(
             [
                 call(),
@@ -147,7 +166,7 @@ class ListPkgsTest(TestCase):
         master_user = 'fake_user'
         master_repo_id = '{}/{}'.format(master_user, master_repo_name)
 
-        pkg_mgr_mock.is_pkg_installed.return_value = False
+        pkg_mgr_mock.get_installed_pkgs.return_value = set()
         isdir_mock.return_value = True
         listdir_mock.side_effect = [
             [master_user],
@@ -161,9 +180,7 @@ class ListPkgsTest(TestCase):
         pkg_mgr_mock.assert_has_calls(
             [
                 call.switch_dir(),
-                call.is_pkg_installed(pkg_names[0]),
-                call.is_pkg_installed(pkg_names[1]),
-                call.is_pkg_installed(pkg_names[2])
+                call.get_installed_pkgs()
             ]
         )
 
@@ -177,7 +194,13 @@ class ListPkgsTest(TestCase):
             ]
         )
 
-        isdir_mock.assert_called_once_with(master_user)
+        isdir_mock.assert_has_calls(
+            [
+                call(master_user),
+                call('{}/.git'.format(master_repo_id)),
+                call('{}/src'.format(master_repo_id))
+            ]
+        )
         listdir_mock.assert_has_calls(
             [
                 call(),
@@ -208,7 +231,9 @@ class ListPkgsTest(TestCase):
         master_user = 'fake_user'
         master_repo_id = '{}/{}'.format(master_user, master_repo_name)
 
-        pkg_mgr_mock.is_pkg_installed.return_value = True
+        pkg_mgr_mock.get_installed_pkgs.return_value = {
+            (master_repo_id, pkg_name) for pkg_name in pkg_names
+        }
         isdir_mock.return_value = True
         listdir_mock.side_effect = [
             [master_user],
@@ -222,9 +247,7 @@ class ListPkgsTest(TestCase):
         pkg_mgr_mock.assert_has_calls(
             [
                 call.switch_dir(),
-                call.is_pkg_installed(pkg_names[0]),
-                call.is_pkg_installed(pkg_names[1]),
-                call.is_pkg_installed(pkg_names[2])
+                call.get_installed_pkgs()
             ]
         )
 
@@ -238,7 +261,13 @@ class ListPkgsTest(TestCase):
             ]
         )
 
-        isdir_mock.assert_called_once_with(master_user)
+        isdir_mock.assert_has_calls(
+            [
+                call(master_user),
+                call('{}/.git'.format(master_repo_id)),
+                call('{}/src'.format(master_repo_id))
+            ]
+        )
         listdir_mock.assert_has_calls(
             [
                 call(),
@@ -267,7 +296,7 @@ class ListPkgsTest(TestCase):
         master_user = 'fake_user'
         master_repo_id = '{}/{}'.format(master_user, master_repo_name)
 
-        pkg_mgr_mock.is_pkg_installed.return_value = False
+        pkg_mgr_mock.get_installed_pkgs.return_value = set()
         isdir_mock.return_value = True
         listdir_mock.side_effect = [
             [master_user],
@@ -284,7 +313,7 @@ class ListPkgsTest(TestCase):
             ]
         )
 
-        pkg_mgr_mock.is_pkg_installed.assert_not_called()
+        pkg_mgr_mock.get_installed_pkgs.assert_called_once_with()
 
         listener_mock.assert_has_calls(
             [
@@ -295,7 +324,13 @@ class ListPkgsTest(TestCase):
 
         listener_mock.on_pkg_show.assert_not_called()
 
-        isdir_mock.assert_called_once_with(master_user)
+        isdir_mock.assert_has_calls(
+            [
+                call(master_user),
+                call('{}/.git'.format(master_repo_id)),
+                call('{}/src'.format(master_repo_id))
+            ]
+        )
         listdir_mock.assert_has_calls(
             [
                 call(),
@@ -305,6 +340,186 @@ class ListPkgsTest(TestCase):
         )
         pass
 
+    @patch('package_database_backends.load', wraps=load)
+    @patch('os.path.isdir')
+    @patch('os.listdir')
+    @patch('views.CliListPkgsView')
+    def test_list_reads_database_once(
+        self,
+        listener_mock,
+        listdir_mock,
+        isdir_mock,
+        load_mock):
+        """
+        GIVEN the package dir contains a large number of packages, some of
+              them installed.
+        WHEN  the user issues an list-pkgs command.
+        THEN  the package database must be read only once and the status of
+              every package must be reported properly.
+
+        """
+        pkg_names = ['pkg_{}'.format(i) for i in range(500)]
+        master_repo_name = 'fake_repo_1'
+        master_user = 'fake_user'
+        master_repo_id = '{}/{}'.format(master_user, master_repo_name)
+        old_dir = getcwd()
+
+        pkg_mgr = PackageDatabaseMgr('json')
+        pkg_mgr.switch_dir()
+
+        with open(pkg_mgr.db_file, 'w') as f:
+            dump(
+                [
+                    {
+                        'name': pkg_name,
+                        'repo': master_repo_id,
+                        'rev': {
+                            'remote': 'fake_hash',
+                            'local': 'fake_hash' if i % 2 else ''
+                        }
+                    }
+                    for i, pkg_name in enumerate(pkg_names)
+                ],
+                f
+            )
+
+        isdir_mock.return_value = True
+        listdir_mock.side_effect = [
+            [master_user],
+            [master_repo_name],
+            pkg_names
+        ]
+
+        try:
+            cmd = ListPkgsCmd(pkg_mgr)
+            cmd.execute(listener_mock)
+        finally:
+            remove(pkg_mgr.db_file)
+            chdir(old_dir)
+
+        load_mock.assert_called_once()
+        listener_mock.on_pkg_show.assert_has_calls(
+            [
+                call(pkg_name, bool(i % 2))
+                for i, pkg_name in enumerate(pkg_names)
+            ]
+        )
+
+    def __list_after_update(self, backend):
+        """
+        Run an update, whose master repo command only leaves the package dir
+        as a real one does, followed by a list-pkgs command.
+
+        :backend: Name of the package database backend.
+        :returns: The IDs of the listed master repos.
+
+        """
+        master_repo_id = 'fake_user/fake_repo_1'
+        pkg_repo_url = 'https://github.com/fake_user/foo_pkg.git'
+        store_paths = []
+
+        def create_cmd(pkg_mgr, repo_id, branch_name, repo_url, search_idx,
+                pkg_pool, probe, object_store, *args, **kwargs):
+            def execute(listener):
+                git.Repo.init(repo_id).close()
+                makedirs('{}/src/foo_pkg'.format(repo_id))
+
+                if object_store is not None:
+                    store_path = object_store.get_store_path(pkg_repo_url)
+                    store_paths.append(store_path)
+
+                    makedirs(object_store.store_dir, exist_ok=True)
+                    store_repo = object_store.plumbing.init_repo(
+                        store_path,
+                        pkg_repo_url,
+                        bare=True
+                    )
+                    pkg_repo = object_store.plumbing.init_repo(
+                        '{}/src/foo_pkg/.repo'.format(repo_id),
+                        pkg_repo_url
+                    )
+                    object_store.link(pkg_repo, store_repo)
+
+                pkg_mgr.add_entries([('foo_pkg', 'a' * 40, repo_id)])
+
+            inner_cmd = MagicMock()
+            inner_cmd.execute.side_effect = execute
+
+            return inner_cmd
+
+        listener_mock = MagicMock()
+        old_dir = getcwd()
+        pkg_dir = PackageDatabaseMgr().pkg_dir
+        old_files = set(listdir(pkg_dir))
+
+        try:
+            with patch('mirrors_mgr.MirrorsMgr.get_mirrors') as mirrors_mock, \
+                    patch('commands.UpdateCmd.InitializeRepoCmd') as cmd_mock:
+                mirrors_mock.return_value = [
+                    'master,https://github.com/{}.git'.format(master_repo_id)
+                ]
+                cmd_mock.side_effect = create_cmd
+
+                cmd = UpdateCmd(PackageDatabaseMgr(backend), MagicMock())
+                cmd.execute(listener_mock)
+
+            listener_mock.on_error.assert_not_called()
+
+            cmd = ListPkgsCmd(PackageDatabaseMgr(backend))
+            cmd.execute(listener_mock)
+        finally:
+            chdir(old_dir)
+
+            for file_path in store_paths + [
+                    '{}/{}'.format(pkg_dir, file_name)
+                    for file_name in set(listdir(pkg_dir)) - old_files]:
+                if isdir(file_path):
+                    rmtree(file_path)
+                else:
+                    remove(file_path)
+
+        listener_mock.on_pkg_show.assert_any_call('foo_pkg', False)
+
+        return [
+            args[0] for args, _ in listener_mock.on_pkg_list_start.call_args_list
+        ]
+
+    @patch('config_mgr.ConfigMgr.get_boolean')
+    def test_list_after_update_with_shared_store(self, get_boolean_mock):
+        """
+        GIVEN the shared object store is enabled.
+        WHEN  the user issues an update command, followed by a list-pkgs
+              command.
+        THEN  the packages of the master repo must be listed and the object
+              store must not be taken for a master repo.
+
+        """
+        get_boolean_mock.side_effect = \
+            lambda section, option, fallback=False: option == 'shared' or fallback
+
+        repo_ids = self.__list_after_update('json')
+
+        self.assertIn('fake_user/fake_repo_1', repo_ids)
+        self.assertFalse(
+            [repo_id for repo_id in repo_ids if repo_id.startswith('objects/')]
+        )
+
+    def test_list_after_update_with_sharded_backend(self):
+        """
+        GIVEN the package database uses the sharded backend.
+        WHEN  the user issues an update command, followed by a list-pkgs
+              command.
+        THEN  the packages of the master repo must be listed and the dir of the
+              database shards must not be taken for a master repo.
+
+        """
+        repo_ids = self.__list_after_update('sharded')
+
+        self.assertIn('fake_user/fake_repo_1', repo_ids)
+        self.assertFalse(
+            [repo_id for repo_id in repo_ids if repo_id.startswith('pkg_db.d/')]
+        )
+
     # TODO: multiple users and multiple repos
 
 if __name__ == "__main__":
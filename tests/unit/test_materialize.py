@@ -0,0 +1,90 @@
+from unittest import TestCase, main
+from unittest.mock import patch, call, ANY
+
+from os import chdir
+
+from commands import MaterializeCmd
+
+class MaterializeTest(TestCase):
+
+    """
+    Implementation of unit tests for materialize command.
+
+    """
+
+    def setUpClass():
+        chdir('resources/')
+
+    def tearDownClass():
+        chdir('../')
+
+    @patch('os.listdir')
+    @patch('package_database_mgr.PackageDatabaseMgr')
+    @patch('git.Repo')
+    @patch('views.CliUpdateView')
+    def test_materialize_pkg(
+        self,
+        listener_mock,
+        git_mock,
+        pkg_mgr_mock,
+        listdir_mock):
+        """
+        GIVEN the package database contains lazily tracked packages.
+        WHEN  the user issues a materialize command for one of them.
+        THEN  only its package repository must be fetched and its entry must
+              be recorded as materialized.
+
+        """
+        master_repo_id = 'fake_user/fake_repo_1'
+
+        listdir_mock.return_value = ['foo_pkg', 'bar_pkg']
+        # no ref files, so the heads are resolved by rev_parse
+        git_mock.init.return_value.git_dir = 'fake_git_dir'
+        pkg_mgr_mock.get_lazy_entries.return_value = [
+            {
+                'name': pkg_name,
+                'repo': master_repo_id,
+                'rev': { 'remote': 'fake_hash', 'local': '' },
+                'materialized': False
+            }
+            for pkg_name in ['foo_pkg', 'bar_pkg']
+        ]
+        cmd = MaterializeCmd(['foo_pkg'], pkg_mgr_mock)
+        cmd.execute(listener_mock)
+
+        listener_mock.assert_has_calls(
+            [
+                call.on_update_start(),
+                call.on_pkg_update_start('foo_pkg', 'foo_branch'),
+                call.on_update_progress(0, 0, 0, 'Fetching foo_pkg ...'),
+                call.on_pkg_update_finish('foo_pkg', 'foo_branch'),
+                call.on_update_finish()
+            ]
+        )
+
+        git_mock.assert_has_calls(
+            [
+                call.init('{}/src/foo_pkg/.repo'.format(master_repo_id), odbt=ANY),
+                call.init().config_writer(),
+                call.init().config_writer().set_value('remote "origin"', 'url', 'foo_repo'),
+                call.init().config_writer().set_value('remote "origin"', 'fetch', ANY),
+                call.init().config_writer().release(),
+                call.init().remotes.origin.fetch(progress=ANY, env=ANY),
+                call.init().rev_parse('origin/foo_branch')
+            ]
+        )
+        self.assertEqual(git_mock.init.call_count, 1)
+
+        pkg_mgr_mock.add_entries.assert_called_once_with(
+            [('foo_pkg', ANY, master_repo_id)]
+        )
+        pkg_mgr_mock.assert_has_calls(
+            [
+                call.switch_dir(),
+                call.lock()
+            ]
+        )
+        pkg_mgr_mock.unlock.assert_called_once_with()
+
+if __name__ == "__main__":
+    main()
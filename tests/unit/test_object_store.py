@@ -0,0 +1,101 @@
+from unittest import TestCase, main
+from unittest.mock import patch
+
+from os import listdir
+from shutil import rmtree
+from tempfile import mkdtemp
+
+import git
+
+from object_store import ObjectStore
+
+class ObjectStoreTest(TestCase):
+
+    """
+    Implementation of unit tests for ObjectStore class.
+
+    """
+
+    def setUp(self):
+        """
+        Suite setup: create an upstream repository with one commit.
+
+        """
+        self.tmp_dir = mkdtemp()
+        self.upstream_url = 'file://{}/upstream'.format(self.tmp_dir)
+
+        upstream = git.Repo.init('{}/upstream'.format(self.tmp_dir))
+        upstream.git.checkout('-b', 'master')
+        upstream.git.commit(
+            '--allow-empty',
+            '-m', 'fake commit',
+            '--author', 'fake <fake@fake>',
+            env={
+                'GIT_COMMITTER_NAME': 'fake',
+                'GIT_COMMITTER_EMAIL': 'fake@fake'
+            }
+        )
+        self.head_commit = upstream.head.commit.hexsha
+
+        self.store = ObjectStore(self.tmp_dir)
+
+    def tearDown(self):
+        """
+        Suite teardown.
+
+        """
+        rmtree(self.tmp_dir)
+
+    def test_normalize_url(self):
+        """
+        GIVEN the different urls of the same upstream repository.
+        WHEN  the urls are normalized.
+        THEN  all of them must have the same key.
+
+        """
+        for url in [
+            'https://github.com/fake_user/fake_pkg.git',
+            'https://GitHub.com/fake_user/fake_pkg/',
+            'git@github.com:fake_user/fake_pkg.git',
+            'ssh://git@github.com:22/fake_user/fake_pkg'
+        ]:
+            self.assertEqual(
+                ObjectStore.normalize_url(url),
+                'github.com/fake_user/fake_pkg'
+            )
+
+    def test_fetch_into_multiple_pkg_repos(self):
+        """
+        GIVEN two package repositories with the same upstream repository.
+        WHEN  both are fetched through the object store.
+        THEN  the upstream must be fetched only once, into a single store
+              repository, and both package repositories must point to its
+              head commit.
+
+        """
+        pkg_repos = [
+            git.Repo.init('{}/pkg_{}'.format(self.tmp_dir, i)) for i in range(2)
+        ]
+
+        with patch.object(
+                git.Remote,
+                'fetch',
+                autospec=True,
+                side_effect=git.Remote.fetch) as fetch_mock:
+            for pkg_repo in pkg_repos:
+                self.store.fetch_into(pkg_repo, self.upstream_url, 'master')
+
+        self.assertEqual(fetch_mock.call_count, 1)
+        self.assertEqual(len(listdir(self.store.store_dir)), 1)
+
+        for pkg_repo in pkg_repos:
+            self.assertEqual(
+                pkg_repo.rev_parse('origin/master').hexsha,
+                self.head_commit
+            )
+            self.assertEqual(len(listdir(
+                '{}/objects/pack'.format(pkg_repo.git_dir)
+            )), 0)
+
+if __name__ == "__main__":
+    main()
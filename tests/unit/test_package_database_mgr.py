@@ -1,8 +1,13 @@
 from unittest import TestCase, main
+from unittest.mock import patch
 
-from os import remove, getcwd, chdir
+from os import listdir, remove, getcwd, chdir
+from os.path import getsize, getmtime
+from shutil import rmtree
 from json import load, dump
+import sqlite3
 
+from package_database_backends import ShardedBackend
 from package_database_mgr import PackageDatabaseMgr
 
 class PackageDatabaseMgrTest(TestCase):
@@ -42,12 +47,15 @@ class PackageDatabaseMgrTest(TestCase):
         expected_content = [
             {
                 'name': pkg_name,
+                'repo': '',
                 'rev': { 'remote': pkg_hash, 'local': '' }
             }
         ]
 
         self.mgr.add_entry(pkg_name, pkg_hash)
 
+        self.mgr.flush()
+
         with open(self.mgr.db_file, 'r') as f:
             read_content = load(f)
 
@@ -66,14 +74,17 @@ class PackageDatabaseMgrTest(TestCase):
         expected_content = [
             {
                 'name': pkg_names[0],
+                'repo': '',
                 'rev': { 'remote': pkg_hashes[0], 'local': '' }
             },
             {
                 'name': pkg_names[1],
+                'repo': '',
                 'rev': { 'remote': pkg_hashes[1], 'local': '' }
             },
             {
                 'name': pkg_names[2],
+                'repo': '',
                 'rev': { 'remote': pkg_hashes[2], 'local': '' }
             }
         ]
@@ -82,6 +93,8 @@ class PackageDatabaseMgrTest(TestCase):
         self.mgr.add_entry(pkg_names[1], pkg_hashes[1])
         self.mgr.add_entry(pkg_names[2], pkg_hashes[2])
 
+        self.mgr.flush()
+
         with open(self.mgr.db_file, 'r') as f:
             read_content = load(f)
 
@@ -100,6 +113,7 @@ class PackageDatabaseMgrTest(TestCase):
         expected_content = [
             {
                 'name': pkg_name,
+                'repo': '',
                 'rev': { 'remote': new_pkg_hash, 'local': '' }
             }
         ]
@@ -107,6 +121,8 @@ class PackageDatabaseMgrTest(TestCase):
         self.mgr.add_entry(pkg_name, old_pkg_hash)
         self.mgr.update_entry(pkg_name, new_pkg_hash)
 
+        self.mgr.flush()
+
         with open(self.mgr.db_file, 'r') as f:
             read_content = load(f)
 
@@ -126,14 +142,17 @@ class PackageDatabaseMgrTest(TestCase):
         expected_content = [
             {
                 'name': pkg_names[0],
+                'repo': '',
                 'rev': { 'remote': new_pkg_hashes[0], 'local': '' }
             },
             {
                 'name': pkg_names[1],
+                'repo': '',
                 'rev': { 'remote': new_pkg_hashes[1], 'local': '' }
             },
             {
                 'name': pkg_names[2],
+                'repo': '',
                 'rev': { 'remote': new_pkg_hashes[2], 'local': '' }
             }
         ]
@@ -146,6 +165,8 @@ class PackageDatabaseMgrTest(TestCase):
         self.mgr.update_entry(pkg_names[1], new_pkg_hashes[1])
         self.mgr.update_entry(pkg_names[2], new_pkg_hashes[2])
 
+        self.mgr.flush()
+
         with open(self.mgr.db_file, 'r') as f:
             read_content = load(f)
 
@@ -165,14 +186,17 @@ class PackageDatabaseMgrTest(TestCase):
         expected_content = [
             {
                 'name': pkg_names[0],
+                'repo': '',
                 'rev': { 'remote': old_pkg_hashes[0], 'local': '' }
             },
             {
                 'name': pkg_names[1],
+                'repo': '',
                 'rev': { 'remote': new_pkg_hashes[1], 'local': '' }
             },
             {
                 'name': pkg_names[2],
+                'repo': '',
                 'rev': { 'remote': old_pkg_hashes[2], 'local': '' }
             }
         ]
@@ -183,6 +207,8 @@ class PackageDatabaseMgrTest(TestCase):
 
         self.mgr.update_entry(pkg_names[1], new_pkg_hashes[1])
 
+        self.mgr.flush()
+
         with open(self.mgr.db_file, 'r') as f:
             read_content = load(f)
 
@@ -200,6 +226,7 @@ class PackageDatabaseMgrTest(TestCase):
         expected_content = [
             {
                 'name': pkg_name,
+                'repo': '',
                 'rev': { 'remote': pkg_hash, 'local': '' }
             }
         ]
@@ -207,6 +234,8 @@ class PackageDatabaseMgrTest(TestCase):
         self.mgr.add_entry(pkg_name, pkg_hash)
         self.mgr.update_entry('non_existing_package', 'fake_hash')
 
+        self.mgr.flush()
+
         with open(self.mgr.db_file, 'r') as f:
             read_content = load(f)
 
@@ -237,6 +266,7 @@ class PackageDatabaseMgrTest(TestCase):
         local_pkg_hash = 'local_fake_hash'
 
         self.mgr.add_entry(pkg_name, remote_pkg_hash)
+        self.mgr.flush()
 
         # simulate a package installation at database level.
         with open(self.mgr.db_file, 'r+') as f:
@@ -248,6 +278,7 @@ class PackageDatabaseMgrTest(TestCase):
                     f.seek(0)
                     dump(curr_content, f)
 
+        self.mgr = PackageDatabaseMgr()
         self.assertTrue(self.mgr.is_pkg_installed(pkg_name))
 
     def test_is_installed_with_non_existing_pkg(self):
@@ -261,5 +292,969 @@ class PackageDatabaseMgrTest(TestCase):
 
         self.assertFalse(self.mgr.is_pkg_installed(pkg_name))
 
+    def test_add_existing_entry(self):
+        """
+        GIVEN the package database already contains an entry.
+        WHEN  the same package is added again for the same repository.
+        THEN  the existing entry must be updated instead of duplicated.
+
+        """
+        pkg_name = 'fake_pkg'
+        repo_id = 'fake_user/fake_repo'
+        expected_content = [
+            {
+                'name': pkg_name,
+                'repo': repo_id,
+                'rev': { 'remote': 'new_fake_hash', 'local': '' }
+            }
+        ]
+
+        self.mgr.add_entry(pkg_name, 'old_fake_hash', repo_id)
+        self.mgr.add_entry(pkg_name, 'new_fake_hash', repo_id)
+        self.mgr.flush()
+
+        with open(self.mgr.db_file, 'r') as f:
+            read_content = load(f)
+
+            self.assertEqual(read_content, expected_content)
+
+    def test_same_pkg_on_multiple_repos(self):
+        """
+        GIVEN the same package is provided by multiple repositories.
+        WHEN  the package is updated for one of the repositories.
+        THEN  only the entry of the given repository must be changed.
+
+        """
+        pkg_name = 'fake_pkg'
+        repo_ids = ['fake_user/fake_repo_1', 'fake_user/fake_repo_2']
+        expected_content = [
+            {
+                'name': pkg_name,
+                'repo': repo_ids[0],
+                'rev': { 'remote': 'fake_hash_1', 'local': '' }
+            },
+            {
+                'name': pkg_name,
+                'repo': repo_ids[1],
+                'rev': { 'remote': 'new_fake_hash_2', 'local': '' }
+            }
+        ]
+
+        self.mgr.add_entry(pkg_name, 'fake_hash_1', repo_ids[0])
+        self.mgr.add_entry(pkg_name, 'fake_hash_2', repo_ids[1])
+        self.mgr.update_entry(pkg_name, 'new_fake_hash_2', repo_ids[1])
+        self.mgr.flush()
+
+        with open(self.mgr.db_file, 'r') as f:
+            read_content = load(f)
+
+            self.assertEqual(read_content, expected_content)
+
+    def test_changes_are_written_on_flush(self):
+        """
+        GIVEN the package database is initially empty.
+        WHEN  we add new entries without flushing the database.
+        THEN  the database file must not be changed until the flush.
+
+        """
+        self.mgr.add_entry('fake_pkg_1', 'fake_hash_1')
+        self.mgr.add_entry('fake_pkg_2', 'fake_hash_2')
+
+        with open(self.mgr.db_file, 'r') as f:
+            self.assertEqual(load(f), [])
+
+        self.mgr.flush()
+
+        with open(self.mgr.db_file, 'r') as f:
+            self.assertEqual(len(load(f)), 2)
+
+    def test_bulk_add_and_update_entries(self):
+        """
+        GIVEN the package database is initially empty.
+        WHEN  we add and update multiple entries at once.
+        THEN  the package database must contain the added entries with the
+              updated hashes, ignoring the updates of non existing entries.
+
+        """
+        repo_id = 'fake_user/fake_repo'
+        expected_content = [
+            {
+                'name': 'fake_pkg_1',
+                'repo': repo_id,
+                'rev': { 'remote': 'new_fake_hash_1', 'local': '' }
+            },
+            {
+                'name': 'fake_pkg_2',
+                'repo': repo_id,
+                'rev': { 'remote': 'fake_hash_2', 'local': '' }
+            }
+        ]
+
+        self.mgr.add_entries(
+            [
+                ('fake_pkg_1', 'fake_hash_1', repo_id),
+                ('fake_pkg_2', 'fake_hash_2', repo_id)
+            ]
+        )
+        self.mgr.update_entries(
+            [
+                ('fake_pkg_1', 'new_fake_hash_1', repo_id),
+                ('fake_pkg_3', 'fake_hash_3', repo_id)
+            ]
+        )
+        self.mgr.flush()
+
+        with open(self.mgr.db_file, 'r') as f:
+            read_content = load(f)
+
+            self.assertEqual(read_content, expected_content)
+
+    def test_get_outdated_pkgs(self):
+        """
+        GIVEN the package database contains installed packages with and
+              without a new remote revision, and not installed packages.
+        WHEN  the user issues a get_outdated_pkgs call.
+        THEN  only the installed packages with a new remote revision must be
+              returned.
+
+        """
+        repo_id = 'fake_user/fake_repo'
+
+        self.mgr.add_entries(
+            [
+                ('fake_pkg_1', 'fake_hash_1', repo_id),
+                ('fake_pkg_2', 'fake_hash_2', repo_id),
+                ('fake_pkg_3', 'fake_hash_3', repo_id)
+            ]
+        )
+
+        # simulate the installation of the first two packages
+        for pkg_name in ['fake_pkg_1', 'fake_pkg_2']:
+            entry = self.mgr.backend.get_entry(repo_id, pkg_name)
+            entry['rev']['local'] = entry['rev']['remote']
+            self.mgr.backend.put_entry(entry)
+
+        self.mgr.update_entry('fake_pkg_2', 'new_fake_hash_2', repo_id)
+        self.mgr.flush()
+
+        self.assertEqual(
+            self.mgr.get_outdated_pkgs(),
+            [
+                {
+                    'name': 'fake_pkg_2',
+                    'repo': repo_id,
+                    'rev': { 'remote': 'new_fake_hash_2', 'local': 'fake_hash_2' }
+                }
+            ]
+        )
+
+    def test_lazy_entries(self):
+        """
+        GIVEN the package database contains lazily tracked packages.
+        WHEN  one of them is fetched and the database is loaded again.
+        THEN  only the other one must be returned as lazy.
+
+        """
+        repo_id = 'fake_user/fake_repo'
+
+        self.mgr.add_entries(
+            [
+                ('fake_pkg_1', 'fake_hash_1', repo_id),
+                ('fake_pkg_2', 'fake_hash_2', repo_id)
+            ],
+            materialized=False
+        )
+        self.mgr.add_entry('fake_pkg_3', 'fake_hash_3', repo_id)
+        self.mgr.flush()
+        self.mgr.add_entry('fake_pkg_1', 'fake_hash_1', repo_id)
+        self.mgr.flush()
+
+        self.mgr = PackageDatabaseMgr()
+
+        self.assertEqual(
+            self.mgr.get_lazy_entries(),
+            [
+                {
+                    'name': 'fake_pkg_2',
+                    'repo': repo_id,
+                    'rev': { 'remote': 'fake_hash_2', 'local': '' },
+                    'materialized': False
+                }
+            ]
+        )
+
+    def test_lock_with_another_writer(self):
+        """
+        GIVEN the package database is locked by a writer.
+        WHEN  another writer tries to lock the package database.
+        THEN  the lock must fail until the first writer releases it.
+
+        """
+        other_mgr = PackageDatabaseMgr()
+
+        self.mgr.lock()
+
+        try:
+            with self.assertRaises(RuntimeError):
+                other_mgr.lock()
+        finally:
+            self.mgr.unlock()
+
+        other_mgr.lock()
+        other_mgr.unlock()
+
+    def test_lock_reloads_database(self):
+        """
+        GIVEN the package database was loaded before another writer changed
+              it.
+        WHEN  the package database is locked.
+        THEN  the changes of the other writer must be visible.
+
+        """
+        self.assertFalse(self.mgr.is_pkg_installed('fake_pkg'))
+
+        other_mgr = PackageDatabaseMgr()
+        other_mgr.lock()
+        other_mgr.add_entry('fake_pkg', 'fake_hash', 'fake_user/fake_repo')
+        other_mgr.flush()
+        other_mgr.unlock()
+
+        self.mgr.lock()
+        self.mgr.update_entry('fake_pkg', 'new_fake_hash', 'fake_user/fake_repo')
+        self.mgr.flush()
+        self.mgr.unlock()
+
+        with open(self.mgr.db_file, 'r') as f:
+            self.assertEqual(load(f)[0]['rev']['remote'], 'new_fake_hash')
+
+class SqlitePackageDatabaseMgrTest(TestCase):
+
+    """
+    Implementation of unit tests for PackageDatabaseMgr class with the SQLite
+    backend.
+
+    """
+
+    def setUp(self):
+        """
+        Suite setup.
+
+        """
+        self.mgr = PackageDatabaseMgr('sqlite')
+        self.old_dir = getcwd()
+        self.mgr.switch_dir()
+
+    def tearDown(self):
+        """
+        Suite teardown.
+
+        """
+        self.mgr.backend.conn.close()
+        remove(self.mgr.db_file)
+        chdir(self.old_dir)
+
+    def __set_local_rev(self, pkg_name, local_hash):
+        """
+        Simulate a package installation at database level.
+
+        """
+        with sqlite3.connect(self.mgr.db_file) as conn:
+            conn.execute(
+                'UPDATE packages SET local = ? WHERE name = ?',
+                (local_hash, pkg_name)
+            )
+
+    def test_add_and_update_entries(self):
+        """
+        GIVEN the package database is initially empty.
+        WHEN  we add and update entries of multiple repositories.
+        THEN  the entries must be stored by repository with their respective
+              properties.
+
+        """
+        repo_ids = ['fake_user/fake_repo_1', 'fake_user/fake_repo_2']
+
+        self.mgr.add_entry('fake_pkg', 'fake_hash_1', repo_ids[0])
+        self.mgr.add_entry('fake_pkg', 'fake_hash_2', repo_ids[1])
+        self.mgr.add_entry('fake_pkg', 'new_fake_hash_1', repo_ids[0])
+        self.mgr.update_entry('fake_pkg', 'new_fake_hash_2', repo_ids[1])
+        self.mgr.update_entry('non_existing_package', 'fake_hash', repo_ids[1])
+        self.mgr.flush()
+
+        with sqlite3.connect(self.mgr.db_file) as conn:
+            rows = conn.execute(
+                'SELECT repo, name, remote, local FROM packages ORDER BY repo'
+            ).fetchall()
+
+        self.assertEqual(
+            rows,
+            [
+                (repo_ids[0], 'fake_pkg', 'new_fake_hash_1', ''),
+                (repo_ids[1], 'fake_pkg', 'new_fake_hash_2', '')
+            ]
+        )
+
+    def test_lock_closes_previous_connection(self):
+        """
+        GIVEN the package database was loaded.
+        WHEN  the package database is locked, which loads it again.
+        THEN  the connection of the previous load must be closed.
+
+        """
+        old_conn = self.mgr.backend.conn
+
+        self.mgr.lock()
+        self.mgr.unlock()
+
+        self.assertIsNot(self.mgr.backend.conn, old_conn)
+
+        with self.assertRaises(sqlite3.ProgrammingError):
+            old_conn.execute('SELECT 1')
+
+    def test_is_installed(self):
+        """
+        GIVEN the package database contains installed and not installed
+              packages.
+        WHEN  the user issues an is_pkg_installed call for them.
+        THEN  the return must match the installation state of the package.
+
+        """
+        repo_id = 'fake_user/fake_repo'
+
+        self.mgr.add_entry('fake_pkg_1', 'fake_hash_1', repo_id)
+        self.mgr.add_entry('fake_pkg_2', 'fake_hash_2', repo_id)
+        self.mgr.flush()
+        self.__set_local_rev('fake_pkg_1', 'fake_hash_1')
+
+        self.assertTrue(self.mgr.is_pkg_installed('fake_pkg_1'))
+        self.assertTrue(self.mgr.is_pkg_installed('fake_pkg_1', repo_id))
+        self.assertFalse(self.mgr.is_pkg_installed('fake_pkg_2', repo_id))
+        self.assertFalse(self.mgr.is_pkg_installed('fake_pkg_3'))
+        self.assertEqual(
+            self.mgr.get_installed_pkgs(),
+            {(repo_id, 'fake_pkg_1')}
+        )
+
+    def test_get_outdated_pkgs(self):
+        """
+        GIVEN the package database contains installed packages with and
+              without a new remote revision.
+        WHEN  the user issues a get_outdated_pkgs call.
+        THEN  only the outdated packages must be returned, through the index
+              of outdated packages.
+
+        """
+        repo_id = 'fake_user/fake_repo'
+
+        self.mgr.add_entry('fake_pkg_1', 'fake_hash_1', repo_id)
+        self.mgr.add_entry('fake_pkg_2', 'fake_hash_2', repo_id)
+        self.mgr.flush()
+        self.__set_local_rev('fake_pkg_1', 'fake_hash_1')
+        self.__set_local_rev('fake_pkg_2', 'old_fake_hash_2')
+
+        self.assertEqual(
+            [entry['name'] for entry in self.mgr.get_outdated_pkgs()],
+            ['fake_pkg_2']
+        )
+
+        plan = self.mgr.backend.conn.execute(
+            'EXPLAIN QUERY PLAN SELECT repo, name, remote, local FROM packages '
+            "WHERE local != '' AND remote != local"
+        ).fetchall()
+
+        self.assertIn('packages_outdated', plan[0][-1])
+
+    def test_stats(self):
+        """
+        GIVEN the package database contains packages.
+        WHEN  the check statistics of one of them are set and the database is
+              loaded again.
+        THEN  only this package must have statistics.
+
+        """
+        repo_id = 'fake_user/fake_repo'
+        hashes = ['1' * 40, '2' * 40]
+        stats = {
+            'last_check': 1000.0,
+            'last_change': 500.0,
+            'next_check': 1250.0,
+            'interval': 500.0,
+            'delay': 250.0,
+            'fetch_time': 1.5
+        }
+
+        self.mgr.add_entries(
+            [
+                ('foo_pkg', hashes[0], repo_id),
+                ('bar_pkg', hashes[1], repo_id)
+            ]
+        )
+        self.mgr.set_stats_many([('foo_pkg', repo_id, stats)])
+        self.mgr.flush()
+
+        self.mgr.backend.conn.close()
+        self.mgr = PackageDatabaseMgr('sqlite')
+
+        self.assertEqual(self.mgr.get_stats('foo_pkg', repo_id), stats)
+        self.assertIsNone(self.mgr.get_stats('bar_pkg', repo_id))
+
+    def test_lazy_entries(self):
+        """
+        GIVEN the SQLite database was created before the packages could be
+              tracked lazily.
+        WHEN  it's opened and lazily tracked packages are added.
+        THEN  the new column must be added and only the lazy packages must be
+              returned as lazy.
+
+        """
+        repo_id = 'fake_user/fake_repo'
+
+        self.mgr.backend.conn.close()
+        remove(self.mgr.db_file)
+
+        conn = sqlite3.connect(self.mgr.db_file)
+        conn.execute(
+            'CREATE TABLE packages ('
+            'repo TEXT NOT NULL, '
+            'name TEXT NOT NULL, '
+            "remote TEXT NOT NULL DEFAULT '', "
+            "local TEXT NOT NULL DEFAULT '', "
+            'PRIMARY KEY (repo, name))'
+        )
+        conn.execute(
+            "INSERT INTO packages VALUES (?, 'fake_pkg_1', 'fake_hash_1', '')",
+            (repo_id,)
+        )
+        conn.commit()
+        conn.close()
+
+        self.mgr = PackageDatabaseMgr('sqlite')
+        self.mgr.add_entries(
+            [('fake_pkg_2', 'fake_hash_2', repo_id)],
+            materialized=False
+        )
+        self.mgr.flush()
+
+        self.assertEqual(
+            [entry['name'] for entry in self.mgr.get_lazy_entries()],
+            ['fake_pkg_2']
+        )
+        self.assertEqual(len(self.mgr.get_entries()), 2)
+
+    def test_migrate_json_database(self):
+        """
+        GIVEN a JSON package database exists and the SQLite one doesn't.
+        WHEN  the SQLite backend is used for the first time.
+        THEN  the entries of the JSON database must be migrated.
+
+        """
+        self.mgr.backend.conn.close()
+        remove(self.mgr.db_file)
+
+        with open('pkg_db.json', 'w') as f:
+            dump(
+                [
+                    {
+                        'name': 'fake_pkg',
+                        'rev': { 'remote': 'fake_hash', 'local': 'fake_hash' }
+                    }
+                ],
+                f
+            )
+
+        try:
+            self.mgr = PackageDatabaseMgr('sqlite')
+
+            self.assertTrue(self.mgr.is_pkg_installed('fake_pkg'))
+            self.assertTrue(
+                self.mgr.is_pkg_installed('fake_pkg', 'fake_user/fake_repo')
+            )
+        finally:
+            remove('pkg_db.json')
+
+class JournalPackageDatabaseMgrTest(TestCase):
+
+    """
+    Implementation of unit tests for PackageDatabaseMgr class with the journal
+    backend.
+
+    """
+
+    def setUp(self):
+        """
+        Suite setup.
+
+        """
+        self.mgr = PackageDatabaseMgr('journal')
+        self.old_dir = getcwd()
+        self.mgr.switch_dir()
+
+    def tearDown(self):
+        """
+        Suite teardown.
+
+        """
+        remove(self.mgr.db_file)
+        remove(self.mgr.backend.journal_file)
+        chdir(self.old_dir)
+
+    def test_changes_are_appended_to_journal(self):
+        """
+        GIVEN the package database is initially empty.
+        WHEN  we add and update entries below the compaction threshold.
+        THEN  the changes must be appended to the journal, the snapshot must
+              not be changed and the changes must be visible when the database
+              is loaded again.
+
+        """
+        repo_id = 'fake_user/fake_repo'
+
+        self.mgr.add_entry('fake_pkg_1', 'fake_hash_1', repo_id)
+        self.mgr.add_entry('fake_pkg_2', 'fake_hash_2', repo_id)
+        self.mgr.update_entry('fake_pkg_1', 'new_fake_hash_1', repo_id)
+        self.mgr.flush()
+
+        with open(self.mgr.db_file, 'r') as f:
+            self.assertEqual(load(f), [])
+
+        with open(self.mgr.backend.journal_file, 'r') as f:
+            self.assertEqual(len(f.readlines()), 3)
+
+        self.mgr = PackageDatabaseMgr('journal')
+        entry = self.mgr.backend.get_entry(repo_id, 'fake_pkg_1')
+
+        self.assertEqual(entry['rev']['remote'], 'new_fake_hash_1')
+        self.assertIsNotNone(self.mgr.backend.get_entry(repo_id, 'fake_pkg_2'))
+
+    def test_journal_compaction(self):
+        """
+        GIVEN the journal reaches the compaction threshold.
+        WHEN  the changes are flushed and the database is unlocked.
+        THEN  the journal must be kept until the database is unlocked, and
+              then folded into the snapshot and truncated.
+
+        """
+        repo_id = 'fake_user/fake_repo'
+        expected_content = [
+            {
+                'name': 'fake_pkg',
+                'repo': repo_id,
+                'rev': { 'remote': 'new_fake_hash', 'local': '' }
+            }
+        ]
+
+        self.mgr.lock()
+        self.mgr.backend.max_journal_size = 1
+        self.mgr.add_entry('fake_pkg', 'fake_hash', repo_id)
+        self.mgr.update_entry('fake_pkg', 'new_fake_hash', repo_id)
+        self.mgr.flush()
+
+        self.assertGreater(getsize(self.mgr.backend.journal_file), 0)
+
+        self.mgr.unlock()
+
+        self.assertEqual(getsize(self.mgr.backend.journal_file), 0)
+
+        with open(self.mgr.db_file, 'r') as f:
+            self.assertEqual(load(f), expected_content)
+
+    def test_incomplete_record_is_ignored(self):
+        """
+        GIVEN the last record of the journal was not completely written.
+        WHEN  the database is loaded.
+        THEN  the incomplete record must be discarded and the next records
+              must be appended after the last complete one.
+
+        """
+        repo_id = 'fake_user/fake_repo'
+
+        self.mgr.add_entry('fake_pkg', 'fake_hash', repo_id)
+        self.mgr.flush()
+
+        with open(self.mgr.backend.journal_file, 'a') as f:
+            f.write('{"op": "put", "entry": {"na')
+
+        journal_size = getsize(self.mgr.backend.journal_file)
+
+        # readers must not change the journal
+        self.mgr = PackageDatabaseMgr('journal')
+        self.assertEqual(getsize(self.mgr.backend.journal_file), journal_size)
+
+        self.mgr.add_entry('fake_pkg_2', 'fake_hash_2', repo_id)
+        self.mgr.flush()
+
+        self.mgr = PackageDatabaseMgr('journal')
+
+        self.assertIsNotNone(self.mgr.backend.get_entry(repo_id, 'fake_pkg'))
+        self.assertIsNotNone(self.mgr.backend.get_entry(repo_id, 'fake_pkg_2'))
+
+class BinaryPackageDatabaseMgrTest(TestCase):
+
+    """
+    Implementation of unit tests for PackageDatabaseMgr class with the binary
+    backend.
+
+    """
+
+    def setUp(self):
+        """
+        Suite setup.
+
+        """
+        self.mgr = PackageDatabaseMgr('binary')
+        self.old_dir = getcwd()
+        self.mgr.switch_dir()
+
+    def tearDown(self):
+        """
+        Suite teardown.
+
+        """
+        remove(self.mgr.db_file)
+        chdir(self.old_dir)
+
+    def test_add_and_update_entries(self):
+        """
+        GIVEN the package database is initially empty.
+        WHEN  we add and update entries of multiple repositories.
+        THEN  the entries must be found by repository, with their respective
+              properties, after the database is loaded again.
+
+        """
+        repo_ids = ['fake_user/fake_repo_2', 'fake_user/fake_repo_1']
+        hashes = ['1' * 40, '2' * 40, '3' * 40]
+
+        self.mgr.add_entries(
+            [
+                ('foo_pkg', hashes[0], repo_ids[0]),
+                ('foo_pkg', hashes[1], repo_ids[1]),
+                ('bar_pkg', hashes[1], repo_ids[0])
+            ]
+        )
+        self.mgr.flush()
+        self.mgr.update_entry('bar_pkg', hashes[2], repo_ids[0])
+        self.mgr.update_entry('baz_pkg', hashes[2], repo_ids[0])
+        self.mgr.flush()
+
+        self.mgr = PackageDatabaseMgr('binary')
+        backend = self.mgr.backend
+
+        self.assertEqual(backend.record_count, 3)
+        self.assertEqual(
+            backend.get_entry(repo_ids[0], 'foo_pkg')['rev'],
+            { 'remote': hashes[0], 'local': '' }
+        )
+        self.assertEqual(
+            backend.get_entry(repo_ids[1], 'foo_pkg')['rev'],
+            { 'remote': hashes[1], 'local': '' }
+        )
+        self.assertEqual(
+            backend.get_entry(repo_ids[0], 'bar_pkg')['rev'],
+            { 'remote': hashes[2], 'local': '' }
+        )
+        self.assertIsNone(backend.get_entry(repo_ids[1], 'bar_pkg'))
+        self.assertIsNone(backend.get_entry(repo_ids[0], 'baz_pkg'))
+        self.assertEqual(len(backend.find_entries('foo_pkg')), 2)
+
+    def test_non_sha1_revision(self):
+        """
+        GIVEN the package database is initially empty.
+        WHEN  we add an entry whose revision isn't a SHA-1 hash.
+        THEN  an error must be raised instead of storing a truncated
+              revision, and the other entries must still be written.
+
+        """
+        repo_id = 'fake_user/fake_repo'
+
+        self.mgr.add_entry('foo_pkg', '1' * 40, repo_id)
+
+        with self.assertRaises(RuntimeError):
+            self.mgr.add_entry('bar_pkg', '2' * 64, repo_id)
+
+        self.mgr.flush()
+
+        self.mgr = PackageDatabaseMgr('binary')
+
+        self.assertEqual(
+            self.mgr.backend.get_entry(repo_id, 'foo_pkg')['rev'],
+            { 'remote': '1' * 40, 'local': '' }
+        )
+        self.assertIsNone(self.mgr.backend.get_entry(repo_id, 'bar_pkg'))
+
+    def test_is_installed(self):
+        """
+        GIVEN the package database contains installed and not installed
+              packages.
+        WHEN  the user issues an is_pkg_installed call for them.
+        THEN  the return must match the installation state of the package.
+
+        """
+        repo_id = 'fake_user/fake_repo'
+
+        self.mgr.add_entry('fake_pkg_1', 'a' * 40, repo_id)
+        self.mgr.add_entry('fake_pkg_2', 'b' * 40, repo_id)
+
+        # simulate a package installation at database level.
+        entry = self.mgr.backend.get_entry(repo_id, 'fake_pkg_1')
+        entry['rev']['local'] = 'a' * 40
+        self.mgr.backend.put_entry(entry)
+        self.mgr.flush()
+
+        self.mgr = PackageDatabaseMgr('binary')
+
+        self.assertTrue(self.mgr.is_pkg_installed('fake_pkg_1'))
+        self.assertTrue(self.mgr.is_pkg_installed('fake_pkg_1', repo_id))
+        self.assertFalse(self.mgr.is_pkg_installed('fake_pkg_2', repo_id))
+        self.assertFalse(self.mgr.is_pkg_installed('fake_pkg_3'))
+        self.assertEqual(
+            self.mgr.get_installed_pkgs(),
+            {(repo_id, 'fake_pkg_1')}
+        )
+
+    def test_stats(self):
+        """
+        GIVEN the package database contains packages.
+        WHEN  the check statistics of one of them are set and the database is
+              loaded again.
+        THEN  only this package must have statistics.
+
+        """
+        repo_id = 'fake_user/fake_repo'
+        hashes = ['1' * 40, '2' * 40]
+        stats = {
+            'last_check': 1000.0,
+            'last_change': 500.0,
+            'next_check': 1250.0,
+            'interval': 500.0,
+            'delay': 250.0,
+            'fetch_time': 1.5
+        }
+
+        self.mgr.add_entries(
+            [
+                ('foo_pkg', hashes[0], repo_id),
+                ('bar_pkg', hashes[1], repo_id)
+            ]
+        )
+        self.mgr.set_stats_many([('foo_pkg', repo_id, stats)])
+        self.mgr.flush()
+
+        self.mgr = PackageDatabaseMgr('binary')
+
+        self.assertEqual(self.mgr.get_stats('foo_pkg', repo_id), stats)
+        self.assertIsNone(self.mgr.get_stats('bar_pkg', repo_id))
+
+    def test_lazy_entries(self):
+        """
+        GIVEN the package database contains lazily tracked packages.
+        WHEN  one of them is fetched and the database is loaded again.
+        THEN  only the other one must be returned as lazy.
+
+        """
+        repo_id = 'fake_user/fake_repo'
+        hashes = ['1' * 40, '2' * 40]
+
+        self.mgr.add_entries(
+            [
+                ('foo_pkg', hashes[0], repo_id),
+                ('bar_pkg', hashes[1], repo_id)
+            ],
+            materialized=False
+        )
+        self.mgr.flush()
+        self.mgr.add_entry('foo_pkg', hashes[0], repo_id)
+        self.mgr.flush()
+
+        self.mgr = PackageDatabaseMgr('binary')
+
+        self.assertEqual(
+            self.mgr.get_lazy_entries(),
+            [
+                {
+                    'name': 'bar_pkg',
+                    'repo': repo_id,
+                    'rev': { 'remote': hashes[1], 'local': '' },
+                    'materialized': False
+                }
+            ]
+        )
+
+    def test_migrate_json_database(self):
+        """
+        GIVEN a JSON package database exists and the binary one doesn't.
+        WHEN  the binary backend is used for the first time.
+        THEN  the entries of the JSON database must be migrated.
+
+        """
+        remove(self.mgr.db_file)
+
+        with open('pkg_db.json', 'w') as f:
+            dump(
+                [
+                    {
+                        'name': 'fake_pkg',
+                        'rev': { 'remote': 'c' * 40, 'local': 'c' * 40 }
+                    }
+                ],
+                f
+            )
+
+        try:
+            self.mgr = PackageDatabaseMgr('binary')
+
+            self.assertTrue(self.mgr.is_pkg_installed('fake_pkg'))
+        finally:
+            remove('pkg_db.json')
+
+class ShardedPackageDatabaseMgrTest(TestCase):
+
+    """
+    Implementation of unit tests for PackageDatabaseMgr class with the
+    sharded backend.
+
+    """
+
+    def setUp(self):
+        """
+        Suite setup.
+
+        """
+        self.mgr = PackageDatabaseMgr('sharded')
+        self.old_dir = getcwd()
+        self.mgr.switch_dir()
+
+    def tearDown(self):
+        """
+        Suite teardown.
+
+        """
+        rmtree(self.mgr.db_file)
+        chdir(self.old_dir)
+
+    def __read_shard(self, repo_id):
+        """
+        Read the content of the shard of a repository.
+
+        """
+        with open('{}/manifest.json'.format(self.mgr.db_file), 'r') as f:
+            shard_file = load(f)['shards'][repo_id]
+
+        with open('{}/{}'.format(self.mgr.db_file, shard_file), 'r') as f:
+            return load(f)
+
+    def test_entries_are_sharded_by_repo(self):
+        """
+        GIVEN the package database is initially empty.
+        WHEN  we add the same package for multiple repositories.
+        THEN  every repository must have its own shard with its entries.
+
+        """
+        repo_ids = ['fake_user/fake_repo_1', 'fake_user/fake_repo_2']
+
+        self.mgr.add_entry('qux_pkg', 'fake_hash_1', repo_ids[0])
+        self.mgr.add_entry('qux_pkg', 'fake_hash_2', repo_ids[1])
+        self.mgr.flush()
+
+        for i, repo_id in enumerate(repo_ids):
+            self.assertEqual(
+                self.__read_shard(repo_id),
+                [
+                    {
+                        'name': 'qux_pkg',
+                        'repo': repo_id,
+                        'rev': {
+                            'remote': 'fake_hash_{}'.format(i + 1),
+                            'local': ''
+                        }
+                    }
+                ]
+            )
+
+    def test_update_only_touches_its_shard(self):
+        """
+        GIVEN the package database contains entries of multiple repositories.
+        WHEN  we update the entries of one repository.
+        THEN  only the shard of this repository must be written.
+
+        """
+        repo_ids = ['fake_user/fake_repo_1', 'fake_user/fake_repo_2']
+
+        self.mgr.add_entry('qux_pkg', 'fake_hash_1', repo_ids[0])
+        self.mgr.add_entry('qux_pkg', 'fake_hash_2', repo_ids[1])
+        self.mgr.flush()
+
+        with open('{}/manifest.json'.format(self.mgr.db_file), 'r') as f:
+            shard_files = load(f)['shards']
+
+        mtimes = {
+            repo_id: getmtime('{}/{}'.format(self.mgr.db_file, shard_file))
+            for repo_id, shard_file in shard_files.items()
+        }
+
+        self.mgr = PackageDatabaseMgr('sharded')
+        self.mgr.update_entry('qux_pkg', 'new_fake_hash_2', repo_ids[1])
+        self.mgr.flush()
+
+        self.assertEqual(
+            getmtime('{}/{}'.format(self.mgr.db_file, shard_files[repo_ids[0]])),
+            mtimes[repo_ids[0]]
+        )
+        self.assertEqual(
+            self.__read_shard(repo_ids[1])[0]['rev']['remote'],
+            'new_fake_hash_2'
+        )
+        self.assertEqual(len(self.mgr.backend.find_entries('qux_pkg')), 2)
+
+    def test_reader_sees_whole_commits(self):
+        """
+        GIVEN the package database contains entries of multiple repositories.
+        WHEN  a writer commits changes to all of them while a reader loads
+              the database.
+        THEN  the reader must see either all the changes or none of them, and
+              the superseded shards must be removed.
+
+        """
+        repo_ids = ['fake_user/fake_repo_1', 'fake_user/fake_repo_2']
+
+        for repo_id in repo_ids:
+            self.mgr.add_entry('qux_pkg', 'a' * 40, repo_id)
+        self.mgr.flush()
+
+        old_reader = ShardedBackend(self.mgr.pkg_dir)
+        read_shard = ShardedBackend._ShardedBackend__read_shard
+
+        def commit_while_reading(backend, shard_file):
+            # the writer commits once the reader read its first shard
+            if not self.mgr.backend.find_entries('qux_pkg')[0]['rev']['remote'] \
+                    .startswith('b'):
+                for repo_id in repo_ids:
+                    self.mgr.update_entry('qux_pkg', 'b' * 40, repo_id)
+                self.mgr.flush()
+
+            return read_shard(backend, shard_file)
+
+        with patch.object(
+                ShardedBackend,
+                '_ShardedBackend__read_shard',
+                commit_while_reading):
+            new_reader = ShardedBackend(self.mgr.pkg_dir)
+
+        self.assertEqual(
+            [entry['rev']['remote'] for entry in old_reader.find_all_entries()],
+            ['a' * 40] * 2
+        )
+        self.assertEqual(
+            [entry['rev']['remote'] for entry in new_reader.find_all_entries()],
+            ['b' * 40] * 2
+        )
+
+        with open('{}/manifest.json'.format(self.mgr.db_file), 'r') as f:
+            shard_files = set(load(f)['shards'].values())
+
+        self.assertEqual(
+            set(listdir(self.mgr.db_file)),
+            shard_files | {'manifest.json'}
+        )
+
 if __name__ == "__main__":
     main()
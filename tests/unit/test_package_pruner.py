@@ -0,0 +1,282 @@
+from unittest import TestCase, main
+from unittest.mock import patch, MagicMock
+
+from json import dump
+from os import chdir, getcwd, makedirs
+from os.path import isdir
+from shutil import rmtree
+from tempfile import mkdtemp
+
+from object_store import ObjectStore
+from package_pruner import PackagePruner
+
+class PackagePrunerTest(TestCase):
+
+    """
+    Implementation of unit tests for PackagePruner class.
+
+    """
+
+    def setUp(self):
+        """
+        Suite setup: create a package dir with two master repositories, one
+        of them no longer in the mirrors file.
+
+        """
+        self.cwd = getcwd()
+        self.tmp_dir = mkdtemp()
+        chdir(self.tmp_dir)
+
+        self.__create_pkg('fake_user/fake_repo_1', 'fake_pkg_1')
+        self.__create_pkg('fake_user/fake_repo_2', 'fake_pkg_2')
+        makedirs('fake_user/fake_repo_1/src/fake_pkg_3/.repo')
+
+        self.mirrors = [
+            'master,https://github.com/fake_user/fake_repo_1.git'
+        ]
+        self.entries = [
+            self.__entry('fake_user/fake_repo_1', 'fake_pkg_1'),
+            self.__entry('fake_user/fake_repo_1', 'fake_pkg_3'),
+            self.__entry('fake_user/fake_repo_1', 'fake_pkg_4', 'fake_hash'),
+            self.__entry('fake_user/fake_repo_2', 'fake_pkg_2'),
+            self.__entry('', 'fake_pkg_1'),
+            self.__entry('', 'fake_pkg_5')
+        ]
+
+        self.pkg_mgr = MagicMock()
+        self.pkg_mgr.get_entries.return_value = self.entries
+        self.search_idx = MagicMock()
+        self.store = ObjectStore(self.tmp_dir)
+
+    def tearDown(self):
+        """
+        Suite teardown.
+
+        """
+        chdir(self.cwd)
+        rmtree(self.tmp_dir)
+
+    @staticmethod
+    def __create_pkg(repo_id, pkg_name):
+        """
+        Create a package in the working tree of a master repository.
+
+        :repo_id: Identification of the master repository.
+        :pkg_name: Name of the package.
+
+        """
+        pkg_dir = '{}/src/{}'.format(repo_id, pkg_name)
+
+        makedirs('{}/.git'.format(repo_id), exist_ok=True)
+        makedirs('{}/.repo'.format(pkg_dir))
+
+        with open('{}/pkg_desc.json'.format(pkg_dir), 'w') as f:
+            dump(
+                {
+                    'name': pkg_name,
+                    'branch': 'master',
+                    'repo': 'https://github.com/fake/{}.git'.format(pkg_name)
+                },
+                f
+            )
+
+    @staticmethod
+    def __entry(repo_id, pkg_name, local_rev=''):
+        """
+        Create a package entry.
+
+        :repo_id: Identification of the master repository.
+        :pkg_name: Name of the package.
+        :local_rev: Installed revision of the package.
+        :returns: The package entry.
+
+        """
+        return {
+            'name': pkg_name,
+            'repo': repo_id,
+            'rev': { 'remote': 'fake_hash', 'local': local_rev }
+        }
+
+    @patch('mirrors_mgr.MirrorsMgr.get_mirrors')
+    def test_prune_master_repos(self, mirrors_mock):
+        """
+        GIVEN a master repository was removed from the mirrors file.
+        WHEN  the master repositories are pruned.
+        THEN  the master repository, its package entries and its indexed
+              packages must be removed in a single batch.
+
+        """
+        mirrors_mock.return_value = self.mirrors
+
+        pruner = PackagePruner(self.pkg_mgr, self.search_idx, self.store)
+        pruned = pruner.prune_master_repos()
+
+        self.assertEqual(pruned, { 'fake_user/fake_repo_2': ['fake_pkg_2'] })
+        self.assertFalse(isdir('fake_user/fake_repo_2'))
+        self.assertTrue(isdir('fake_user/fake_repo_1'))
+
+        self.pkg_mgr.remove_entries.assert_called_once_with(
+            [('fake_pkg_2', 'fake_user/fake_repo_2')]
+        )
+        self.search_idx.commit_repo.assert_called_once_with(
+            'fake_user/fake_repo_2'
+        )
+
+    @patch('mirrors_mgr.MirrorsMgr.get_mirrors')
+    def test_prune_unknown_master_repos(self, mirrors_mock):
+        """
+        GIVEN a master repository without package entries was removed from the
+              mirrors file.
+        WHEN  the master repositories are fully pruned.
+        THEN  the master repository must be found in the package dir and
+              removed.
+
+        """
+        mirrors_mock.return_value = self.mirrors
+        self.pkg_mgr.get_entries.return_value = []
+
+        pruner = PackagePruner(self.pkg_mgr, self.search_idx, self.store)
+
+        self.assertEqual(pruner.prune_master_repos(), {})
+        self.assertTrue(isdir('fake_user/fake_repo_2'))
+
+        pruned = pruner.prune_master_repos(True)
+
+        self.assertEqual(pruned, { 'fake_user/fake_repo_2': [] })
+        self.assertFalse(isdir('fake_user/fake_repo_2'))
+        self.pkg_mgr.remove_entries.assert_not_called()
+
+    @patch('mirrors_mgr.MirrorsMgr.get_mirrors')
+    def test_keep_master_repos_with_installed_pkgs(self, mirrors_mock):
+        """
+        GIVEN a master repository with an installed package was removed from
+              the mirrors file.
+        WHEN  the master repositories are fully pruned.
+        THEN  the master repository and its package entries must be kept.
+
+        """
+        mirrors_mock.return_value = self.mirrors
+        self.entries.append(
+            self.__entry('fake_user/fake_repo_2', 'fake_pkg_6', 'fake_hash')
+        )
+
+        pruner = PackagePruner(self.pkg_mgr, self.search_idx, self.store)
+
+        self.assertEqual(pruner.prune_master_repos(True), {})
+        self.assertTrue(isdir('fake_user/fake_repo_2'))
+        self.pkg_mgr.remove_entries.assert_not_called()
+
+    @patch('mirrors_mgr.MirrorsMgr.get_mirrors')
+    def test_prune_without_mirrors(self, mirrors_mock):
+        """
+        GIVEN the mirrors file lists no master repository.
+        WHEN  the master repositories and the packages are fully pruned.
+        THEN  nothing must be removed.
+
+        """
+        mirrors_mock.return_value = []
+
+        pruner = PackagePruner(self.pkg_mgr, self.search_idx, self.store)
+
+        self.assertEqual(pruner.prune_master_repos(True), {})
+        self.assertEqual(pruner.prune_pkgs(), {})
+        self.assertTrue(isdir('fake_user/fake_repo_1'))
+        self.assertTrue(isdir('fake_user/fake_repo_2'))
+        self.pkg_mgr.remove_entries.assert_not_called()
+
+    @patch('mirrors_mgr.MirrorsMgr.get_mirrors')
+    def test_prune_pkgs(self, mirrors_mock):
+        """
+        GIVEN some packages were removed from a master repository.
+        WHEN  the packages are pruned.
+        THEN  their package repositories and their package entries must be
+              removed, except the ones of the installed packages.
+
+        """
+        mirrors_mock.return_value = self.mirrors
+
+        pruner = PackagePruner(self.pkg_mgr, self.search_idx, self.store)
+        pruned = pruner.prune_pkgs()
+
+        self.assertEqual(
+            pruned,
+            {
+                'fake_user/fake_repo_1': ['fake_pkg_3'],
+                '': ['fake_pkg_5']
+            }
+        )
+        self.assertFalse(isdir('fake_user/fake_repo_1/src/fake_pkg_3'))
+        self.assertTrue(isdir('fake_user/fake_repo_1/src/fake_pkg_1/.repo'))
+
+        self.pkg_mgr.remove_entries.assert_called_once_with(
+            [
+                ('fake_pkg_3', 'fake_user/fake_repo_1'),
+                ('fake_pkg_5', '')
+            ]
+        )
+
+    @patch('mirrors_mgr.MirrorsMgr.get_mirrors')
+    def test_prune_installed_pkg(self, mirrors_mock):
+        """
+        GIVEN an installed package was removed from a master repository, but
+              its package repository is left in the package dir.
+        WHEN  the packages are pruned.
+        THEN  its package repository and its package entry must be kept.
+
+        """
+        mirrors_mock.return_value = self.mirrors
+        makedirs('fake_user/fake_repo_1/src/fake_pkg_4/.repo')
+
+        pruner = PackagePruner(self.pkg_mgr, self.search_idx, self.store)
+        pruned = pruner.prune_pkgs()
+
+        self.assertNotIn('fake_pkg_4', pruned['fake_user/fake_repo_1'])
+        self.assertTrue(isdir('fake_user/fake_repo_1/src/fake_pkg_4/.repo'))
+        self.assertFalse(isdir('fake_user/fake_repo_1/src/fake_pkg_3'))
+
+    @patch('mirrors_mgr.MirrorsMgr.get_mirrors')
+    def test_prune_object_store(self, mirrors_mock):
+        """
+        GIVEN the store repositories of a package which is still available
+              and of a package which was removed.
+        WHEN  the object store is pruned.
+        THEN  only the store repository which isn't borrowed by any package
+              repository must be removed.
+
+        """
+        mirrors_mock.return_value = self.mirrors
+
+        borrowed_path = self.store.get_store_path('fake_pkg_1')
+        orphan_path = self.store.get_store_path('fake_pkg_6')
+        makedirs('{}/objects'.format(borrowed_path))
+        makedirs('{}/objects'.format(orphan_path))
+
+        alternates_dir = 'fake_user/fake_repo_1/src/fake_pkg_1/.repo/.git/objects/info'
+        makedirs(alternates_dir)
+        with open('{}/alternates'.format(alternates_dir), 'w') as f:
+            f.write('{}/objects\n'.format(borrowed_path))
+
+        pruner = PackagePruner(self.pkg_mgr, self.search_idx, self.store)
+
+        self.assertEqual(pruner.prune_object_store(), [orphan_path])
+        self.assertTrue(isdir(borrowed_path))
+        self.assertFalse(isdir(orphan_path))
+
+    @patch('config_mgr.ConfigMgr.get_boolean')
+    @patch('package_pruner.ObjectStore')
+    def test_object_store_disabled(self, store_mock, get_boolean_mock):
+        """
+        GIVEN the shared object store is disabled in the configuration file.
+        WHEN  the object store is pruned.
+        THEN  no object store may be created and nothing must be removed.
+
+        """
+        get_boolean_mock.return_value = False
+
+        pruner = PackagePruner(self.pkg_mgr, self.search_idx)
+
+        self.assertEqual(pruner.prune_object_store(), [])
+        store_mock.assert_not_called()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+from unittest import TestCase, main
+from unittest.mock import patch, PropertyMock
+
+from json import dump
+from os import makedirs
+from os.path import isfile
+from shutil import rmtree
+from tempfile import mkdtemp
+
+import git
+
+from pkg_desc_reader import PkgDescReader
+
+class PkgDescReaderTest(TestCase):
+
+    """
+    Implementation of unit tests for PkgDescReader class.
+
+    """
+
+    def setUp(self):
+        """
+        Suite setup: create a master repository with two packages.
+
+        """
+        self.tmp_dir = mkdtemp()
+        self.repo_id = '{}/fake_repo'.format(self.tmp_dir)
+
+        self.__create_master_repo(self.repo_id)
+
+    def __create_master_repo(self, repo_id):
+        """
+        Create a master repository with two packages and remove its working
+        tree files.
+
+        :repo_id: Identification of the master repository.
+
+        """
+        repo = git.Repo.init(repo_id)
+
+        for pkg_name in ['foo_pkg', 'bar_pkg']:
+            makedirs('{}/src/{}'.format(repo_id, pkg_name))
+
+            with open('{}/src/{}/pkg_desc.json'.format(repo_id, pkg_name), 'w') as f:
+                dump(
+                    {
+                        'name': pkg_name,
+                        'repo': '{}_repo'.format(pkg_name),
+                        'branch': 'master',
+                        'description': 'fake {}'.format(pkg_name)
+                    },
+                    f
+                )
+
+        with open('{}/src/README'.format(repo_id), 'w') as f:
+            f.write('not a package')
+
+        repo.git.add('src')
+        repo.git.commit(
+            '-m', 'fake commit',
+            '--author', 'fake <fake@fake>',
+            env={
+                'GIT_COMMITTER_NAME': 'fake',
+                'GIT_COMMITTER_EMAIL': 'fake@fake'
+            }
+        )
+        repo.close()
+
+        rmtree('{}/src'.format(repo_id))
+
+    def tearDown(self):
+        """
+        Suite teardown.
+
+        """
+        rmtree(self.tmp_dir)
+
+    def test_read_pkg_descs(self):
+        """
+        GIVEN a master repository without working tree files.
+        WHEN  its packages are listed and read.
+        THEN  the package descriptions must be read from the HEAD tree.
+
+        """
+        reader = PkgDescReader(self.tmp_dir)
+
+        self.assertEqual(reader.list_pkgs(self.repo_id), ['bar_pkg', 'foo_pkg'])
+
+        pkg = reader.get_pkg_desc(self.repo_id, 'foo_pkg')
+
+        self.assertEqual(pkg.name, 'foo_pkg')
+        self.assertEqual(pkg.repo, 'foo_pkg_repo')
+        self.assertEqual(pkg.branch, 'master')
+        self.assertEqual(pkg.description, 'fake foo_pkg')
+        self.assertEqual(pkg.dir, '{}/src/foo_pkg/.repo'.format(self.repo_id))
+
+        reader.save()
+
+    def test_cached_pkg_descs(self):
+        """
+        GIVEN the package descriptions were read by a previous update.
+        WHEN  they are read again.
+        THEN  the blobs must not be read again.
+
+        """
+        reader = PkgDescReader(self.tmp_dir)
+        for pkg_entry in reader.list_pkgs(self.repo_id):
+            reader.get_pkg_desc(self.repo_id, pkg_entry)
+        reader.save()
+
+        self.assertTrue(isfile(reader.cache_file_path))
+
+        reader = PkgDescReader(self.tmp_dir)
+
+        with patch.object(
+                git.Blob,
+                'data_stream',
+                new_callable=PropertyMock) as stream_mock:
+            names = [
+                reader.get_pkg_desc(self.repo_id, pkg_entry).name
+                for pkg_entry in reader.list_pkgs(self.repo_id)
+            ]
+
+        reader.save()
+
+        self.assertEqual(names, ['bar_pkg', 'foo_pkg'])
+        stream_mock.assert_not_called()
+
+    def test_partially_read_pkg_descs(self):
+        """
+        GIVEN the package descriptions of two master repositories were read by
+              a previous update.
+        WHEN  only the first one is read again.
+        THEN  the cached descriptions of the second one must be kept.
+
+        """
+        other_repo_id = '{}/other_fake_repo'.format(self.tmp_dir)
+        self.__create_master_repo(other_repo_id)
+
+        reader = PkgDescReader(self.tmp_dir)
+        for repo_id in [self.repo_id, other_repo_id]:
+            for pkg_entry in reader.list_pkgs(repo_id):
+                reader.get_pkg_desc(repo_id, pkg_entry)
+        reader.save()
+
+        reader = PkgDescReader(self.tmp_dir)
+        reader.get_pkg_desc(self.repo_id, reader.list_pkgs(self.repo_id)[0])
+        reader.save()
+
+        reader = PkgDescReader(self.tmp_dir)
+
+        with patch.object(
+                git.Blob,
+                'data_stream',
+                new_callable=PropertyMock) as stream_mock:
+            names = [
+                reader.get_pkg_desc(repo_id, pkg_entry).name
+                for repo_id in [self.repo_id, other_repo_id]
+                for pkg_entry in reader.list_pkgs(repo_id)
+            ]
+
+        reader.save()
+
+        self.assertEqual(names, ['bar_pkg', 'foo_pkg', 'bar_pkg', 'foo_pkg'])
+        stream_mock.assert_not_called()
+
+if __name__ == "__main__":
+    main()
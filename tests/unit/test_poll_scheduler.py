@@ -0,0 +1,106 @@
+from unittest import TestCase, main
+
+from poll_scheduler import PollScheduler
+
+class PollSchedulerTest(TestCase):
+
+    """
+    Implementation of unit tests for PollScheduler class.
+
+    """
+
+    def setUp(self):
+        """
+        Suite setup.
+
+        """
+        self.scheduler = PollScheduler(
+            min_interval=60,
+            max_interval=3600,
+            backoff=2
+        )
+
+    def test_first_check(self):
+        """
+        GIVEN a package without check statistics.
+        WHEN  it's checked.
+        THEN  the package must be due and the next check must be scheduled
+              after the minimum interval.
+
+        """
+        self.assertTrue(self.scheduler.is_due(None))
+
+        stats = self.scheduler.record_check(None, True, 1.5, now=1000)
+
+        self.assertEqual(
+            stats,
+            {
+                'last_check': 1000,
+                'last_change': 1000,
+                'next_check': 1060,
+                'interval': 0.0,
+                'delay': 60,
+                'fetch_time': 1.5
+            }
+        )
+        self.assertFalse(self.scheduler.is_due(stats, now=1059))
+        self.assertTrue(self.scheduler.is_due(stats, now=1060))
+
+    def test_backoff_without_changes(self):
+        """
+        GIVEN a package which doesn't change.
+        WHEN  it's checked multiple times.
+        THEN  the delay must grow by the backoff factor up to the maximum
+              interval.
+
+        """
+        stats = self.scheduler.record_check(None, True, 1, now=0)
+        delays = []
+
+        for _ in range(7):
+            stats = self.scheduler.record_check(
+                stats,
+                False,
+                1,
+                now=stats['next_check']
+            )
+            delays.append(stats['delay'])
+
+        self.assertEqual(delays, [120, 240, 480, 960, 1920, 3600, 3600])
+        self.assertEqual(stats['last_change'], 0)
+
+    def test_change_interval(self):
+        """
+        GIVEN a package which changes regularly.
+        WHEN  it's checked after each change.
+        THEN  the change interval must be averaged and the next check must be
+              scheduled after half of it.
+
+        """
+        stats = self.scheduler.record_check(None, True, 1, now=0)
+        stats = self.scheduler.record_check(stats, True, 1, now=1000)
+
+        self.assertEqual(stats['interval'], 1000)
+        self.assertEqual(stats['delay'], 500)
+        self.assertEqual(stats['next_check'], 1500)
+
+        stats = self.scheduler.record_check(stats, True, 1, now=1200)
+
+        self.assertEqual(stats['interval'], 600)
+        self.assertEqual(stats['delay'], 300)
+        self.assertEqual(stats['last_change'], 1200)
+
+    def test_full_update(self):
+        """
+        GIVEN a package which isn't due for a check.
+        WHEN  a full update is issued.
+        THEN  the package must be due.
+
+        """
+        stats = self.scheduler.record_check(None, True, 1, now=0)
+
+        self.assertFalse(self.scheduler.is_due(stats, now=1))
+        self.assertTrue(PollScheduler(full=True).is_due(stats, now=1))
+
+if __name__ == "__main__":
+    main()
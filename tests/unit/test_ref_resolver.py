@@ -0,0 +1,116 @@
+from unittest import TestCase, main
+
+from os import makedirs
+from shutil import rmtree
+from tempfile import mkdtemp
+
+from ref_resolver import RefResolver
+
+class RefResolverTest(TestCase):
+
+    """
+    Implementation of unit tests for RefResolver class.
+
+    """
+
+    def setUp(self):
+        """
+        Suite setup: create the git dir of a repository.
+
+        """
+        self.tmp_dir = mkdtemp()
+        self.git_dir = '{}/.git'.format(self.tmp_dir)
+
+        makedirs('{}/refs/remotes/origin'.format(self.git_dir))
+
+    def tearDown(self):
+        """
+        Suite teardown.
+
+        """
+        rmtree(self.tmp_dir)
+
+    def __write(self, file_name, lines):
+        """
+        Write a file of the git dir.
+
+        :file_name: Path of the file, relative to the git dir.
+        :lines: Lines of the file.
+
+        """
+        with open('{}/{}'.format(self.git_dir, file_name), 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+
+    def test_resolve(self):
+        """
+        GIVEN a repository with a loose ref, a symbolic ref, a packed ref and
+              a branch only known by the last fetch.
+        WHEN  the remote branches are resolved.
+        THEN  each one must be read from its file and the unknown branches
+              must not be resolved.
+
+        """
+        self.__write('refs/remotes/origin/foo', ['a' * 40])
+        self.__write('refs/remotes/origin/HEAD', ['ref: refs/remotes/origin/bar'])
+        self.__write(
+            'packed-refs',
+            [
+                '# pack-refs with: peeled fully-peeled sorted',
+                '{} refs/remotes/origin/bar'.format('b' * 40),
+                '{} refs/tags/v1'.format('e' * 40),
+                '^{}'.format('f' * 40)
+            ]
+        )
+        self.__write(
+            'FETCH_HEAD',
+            [
+                "{}\t\tbranch 'baz' of https://github.com/fake/fake".format(
+                    'c' * 40
+                ),
+                "{}\tnot-for-merge\tbranch 'qux' of https://github.com/fake/fake"
+                    .format('d' * 40)
+            ]
+        )
+
+        resolver = RefResolver()
+
+        self.assertEqual(
+            resolver.resolve_many(
+                [
+                    (self.git_dir, 'foo'),
+                    (self.git_dir, 'HEAD'),
+                    (self.git_dir, 'bar'),
+                    (self.git_dir, 'baz'),
+                    (self.git_dir, 'qux'),
+                    (self.git_dir, 'unknown'),
+                    ('{}/missing'.format(self.tmp_dir), 'foo')
+                ]
+            ),
+            ['a' * 40, 'b' * 40, 'b' * 40, 'c' * 40, 'd' * 40, None, None]
+        )
+
+    def test_packed_refs_changed(self):
+        """
+        GIVEN the packed refs of a repository were cached.
+        WHEN  the packed refs file changes.
+        THEN  the new packed refs must be resolved.
+
+        """
+        self.__write('packed-refs', ['{} refs/remotes/origin/foo'.format('a' * 40)])
+
+        resolver = RefResolver(cache_size=1)
+
+        self.assertEqual(resolver.resolve(self.git_dir, 'foo'), 'a' * 40)
+
+        self.__write(
+            'packed-refs',
+            [
+                '{} refs/remotes/origin/bar'.format('a' * 40),
+                '{} refs/remotes/origin/foo'.format('b' * 40)
+            ]
+        )
+
+        self.assertEqual(resolver.resolve(self.git_dir, 'foo'), 'b' * 40)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+from unittest import TestCase, main
+from unittest.mock import patch, call, ANY
+
+import git
+
+from remote_probe import RemoteProbe
+
+class RemoteProbeTest(TestCase):
+
+    """
+    Implementation of unit tests for RemoteProbe class.
+
+    """
+
+    @patch('git.cmd.Git')
+    def test_get_head(self, git_mock):
+        """
+        GIVEN a remote repository with multiple branches.
+        WHEN  we probe the heads of two of its branches.
+        THEN  the remote must be queried only once and the heads must be
+              returned.
+
+        """
+        git_mock.return_value.ls_remote.return_value = (
+            'foo_hash\trefs/heads/master\n'
+            'bar_hash\trefs/heads/dev'
+        )
+
+        probe = RemoteProbe()
+
+        self.assertEqual(probe.get_head('fake_url', 'master'), 'foo_hash')
+        self.assertEqual(probe.get_head('fake_url', 'dev'), 'bar_hash')
+        self.assertIsNone(probe.get_head('fake_url', 'unknown'))
+
+        git_mock.return_value.ls_remote.assert_called_once_with(
+            '--heads',
+            'fake_url',
+            env=ANY
+        )
+
+    @patch('git.cmd.Git')
+    def test_probe_many(self, git_mock):
+        """
+        GIVEN multiple remote repositories, one of them already probed.
+        WHEN  we probe them in a batch, with a duplicated url, and then probe
+              their heads.
+        THEN  each remote must be queried only once.
+
+        """
+        git_mock.return_value.ls_remote.side_effect = \
+            lambda _, repo_url, env: '{}_hash\trefs/heads/master'.format(
+                repo_url
+            )
+
+        probe = RemoteProbe(batch_size=2)
+        probe.get_head('foo_url', 'master')
+        probe.probe_many(['foo_url', 'bar_url', 'baz_url', 'bar_url'])
+
+        self.assertEqual(
+            [probe.get_head(url, 'master') for url in ['bar_url', 'baz_url']],
+            ['bar_url_hash', 'baz_url_hash']
+        )
+
+        self.assertEqual(git_mock.return_value.ls_remote.call_count, 3)
+        git_mock.return_value.ls_remote.assert_has_calls(
+            [
+                call('--heads', 'bar_url', env=ANY),
+                call('--heads', 'baz_url', env=ANY)
+            ],
+            any_order=True
+        )
+
+    @patch('git.cmd.Git')
+    def test_get_head_with_error(self, git_mock):
+        """
+        GIVEN a remote repository which can't be reached.
+        WHEN  we probe the head of one of its branches.
+        THEN  no head must be returned.
+
+        """
+        git_mock.return_value.ls_remote.side_effect = git.GitCommandError(
+            'ls-remote',
+            128
+        )
+
+        probe = RemoteProbe()
+
+        self.assertIsNone(probe.get_head('fake_url', 'master'))
+        self.assertIsNone(probe.get_head('fake_url', 'master'))
+
+        git_mock.return_value.ls_remote.assert_called_once()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+from unittest import TestCase, main
+from unittest.mock import MagicMock, call
+
+from threading import Event, Thread
+
+from repo_pool import RepoPool
+
+class RepoPoolTest(TestCase):
+
+    """
+    Implementation of unit tests for RepoPool class.
+
+    """
+
+    def test_evict_least_recently_used(self):
+        """
+        GIVEN a pool of two repository handles.
+        WHEN  three repositories are opened, reusing the first one.
+        THEN  the least recently used handle must be closed and the reused one
+              must be kept open.
+
+        """
+        close_mock = MagicMock()
+        open_mock = MagicMock(side_effect=lambda path: 'repo_{}'.format(path))
+
+        pool = RepoPool(close_mock, max_size=2)
+
+        self.assertEqual(pool.get('foo', open_mock), 'repo_foo')
+        self.assertEqual(pool.get('bar', open_mock), 'repo_bar')
+        self.assertEqual(pool.get('foo', open_mock), 'repo_foo')
+        self.assertEqual(pool.get('baz', open_mock), 'repo_baz')
+
+        open_mock.assert_has_calls([call('foo'), call('bar'), call('baz')])
+        close_mock.assert_called_once_with('repo_bar')
+
+        self.assertEqual(
+            pool.get_counters(),
+            { 'opened': 3, 'reused': 1, 'closed': 1, 'peak': 2, 'open': 2 }
+        )
+
+    def test_replace_and_clear(self):
+        """
+        GIVEN a pool with a repository handle.
+        WHEN  the repository is put again with a new handle and the pool is
+              cleared.
+        THEN  every handle must be closed.
+
+        """
+        close_mock = MagicMock()
+
+        pool = RepoPool(close_mock)
+        pool.put('foo', 'old_repo_foo')
+        pool.put('foo/../foo', 'new_repo_foo')
+
+        close_mock.assert_called_once_with('old_repo_foo')
+
+        pool.clear()
+
+        close_mock.assert_has_calls([call('old_repo_foo'), call('new_repo_foo')])
+
+        self.assertEqual(pool.get_counters()['open'], 0)
+        self.assertEqual(pool.get_counters()['closed'], 2)
+        self.assertEqual(pool.get_counters()['opened'], 0)
+
+    def test_open_once(self):
+        """
+        GIVEN a repository being opened by a thread.
+        WHEN  another thread gets the same repository meanwhile, and a third
+              one gets another repository.
+        THEN  the repository must be opened only once, its handle must be
+              shared and the other repository must not wait for it.
+
+        """
+        opening = Event()
+        other_opened = Event()
+
+        def open_repo(path):
+            if path == 'foo':
+                opening.set()
+                # released once the other repository was opened
+                other_opened.wait(10)
+
+            return 'repo_{}'.format(path)
+
+        open_mock = MagicMock(side_effect=open_repo)
+        pool = RepoPool(MagicMock())
+        repos = []
+
+        threads = [
+            Thread(target=lambda: repos.append(pool.get('foo', open_mock)))
+            for _ in range(2)
+        ]
+
+        threads[0].start()
+        opening.wait(10)
+        threads[1].start()
+
+        self.assertEqual(pool.get('bar', open_mock), 'repo_bar')
+        other_opened.set()
+
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(repos, ['repo_foo', 'repo_foo'])
+        self.assertEqual(open_mock.call_count, 2)
+        self.assertEqual(
+            pool.get_counters(),
+            { 'opened': 2, 'reused': 1, 'closed': 0, 'peak': 2, 'open': 2 }
+        )
+
+    def test_discard(self):
+        """
+        GIVEN a pool with a repository handle.
+        WHEN  the repository is discarded, twice.
+        THEN  its handle must be closed once and removed from the pool.
+
+        """
+        close_mock = MagicMock()
+
+        pool = RepoPool(close_mock)
+        pool.put('foo', 'repo_foo')
+        pool.discard('foo')
+        pool.discard('foo')
+
+        close_mock.assert_called_once_with('repo_foo')
+        self.assertEqual(pool.get_counters()['open'], 0)
+        self.assertEqual(pool.get_counters()['closed'], 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+from unittest import TestCase, main
+from unittest.mock import patch, call, MagicMock
+
+from json import dump
+from os import remove
+from os.path import isfile
+from shutil import rmtree
+from tempfile import mkdtemp
+
+from commands import SearchCmd
+from search_index_mgr import SearchIndexMgr
+
+class SearchTest(TestCase):
+
+    """
+    Implementation of unit tests for search command.
+
+    """
+
+    def setUp(self):
+        """
+        Create a search index with a few packages.
+
+        """
+        self.idx = SearchIndexMgr()
+
+        for name, description in [
+            ('vim', 'Vi IMproved text editor'),
+            ('neovim', 'Vim-fork focused on extensibility'),
+            ('emacs', 'An extensible text editor'),
+            ('vimb', 'A fast web browser with vim bindings')
+        ]:
+            self.idx.add_pkg('fake_user/fake_repo', self.__pkg(name, description))
+
+        self.idx.commit_repo('fake_user/fake_repo')
+        self.idx.save()
+
+    def tearDown(self):
+        """
+        Remove the search index file.
+
+        """
+        if isfile(self.idx.idx_file_path):
+            remove(self.idx.idx_file_path)
+
+    def __pkg(self, name, description):
+        """
+        Create a fake package description.
+
+        """
+        pkg = MagicMock()
+        pkg.name = name
+        pkg.repo = 'https://github.com/fake_user/{}.git'.format(name)
+        pkg.branch = 'master'
+        pkg.description = description
+
+        return pkg
+
+    def __names(self, query):
+        """
+        Search the index saved by setUp and return the package names found.
+
+        """
+        return [doc['name'] for doc in SearchIndexMgr().search(query)]
+
+    def test_search_by_prefix_and_substring(self):
+        """
+        GIVEN the search index contains packages whose names match the query.
+        WHEN  the user searches for the query.
+        THEN  the prefix matches must come first, followed by the substring
+              matches and by the token matches.
+
+        """
+        self.assertEqual(self.__names('vim'), ['vim', 'vimb', 'neovim'])
+
+    def test_search_by_short_substring(self):
+        """
+        GIVEN the search index contains packages whose names contain a two
+              character query, at any position.
+        WHEN  the user searches for the query.
+        THEN  all the packages containing it must be found, by name.
+
+        """
+        self.assertEqual(self.__names('im'), ['neovim', 'vim', 'vimb'])
+        self.assertEqual(self.__names('mb'), ['vimb'])
+
+    def test_search_by_tokens(self):
+        """
+        GIVEN the search index contains packages whose descriptions match the
+              query.
+        WHEN  the user searches for the query.
+        THEN  only the packages containing all the tokens must be found.
+
+        """
+        self.assertEqual(self.__names('text editor'), ['emacs', 'vim'])
+        self.assertEqual(self.__names('browser'), ['vimb'])
+        self.assertEqual(self.__names('unknown'), [])
+
+    def test_replace_repo_packages(self):
+        """
+        GIVEN the search index contains the packages of a master repository.
+        WHEN  the master repository is indexed again.
+        THEN  the old packages of the repository must be replaced.
+
+        """
+        idx = SearchIndexMgr()
+        idx.add_pkg('fake_user/fake_repo', self.__pkg('nano', 'Text editor'))
+        idx.commit_repo('fake_user/fake_repo')
+        idx.save()
+
+        self.assertEqual(self.__names('editor'), ['nano'])
+
+    def test_discard_repo_packages(self):
+        """
+        GIVEN packages of a master repository were staged.
+        WHEN  the update of the repository fails.
+        THEN  the indexed packages of the repository must be kept.
+
+        """
+        idx = SearchIndexMgr()
+        idx.add_pkg('fake_user/fake_repo', self.__pkg('nano', 'Text editor'))
+        idx.discard_repo('fake_user/fake_repo')
+        idx.save()
+
+        self.assertEqual(self.__names('nano'), [])
+        self.assertEqual(self.__names('emacs'), ['emacs'])
+
+    def test_migrate_json_index(self):
+        """
+        GIVEN a search index built in the JSON format.
+        WHEN  the user searches for a package.
+        THEN  the documents of the JSON index must be migrated and found.
+
+        """
+        tmp_dir = mkdtemp()
+
+        with open('{}/search_idx.json'.format(tmp_dir), 'w') as f:
+            dump(
+                {
+                    'docs': [
+                        {
+                            'repo_id': 'fake_user/fake_repo',
+                            'name': 'nano',
+                            'repo': 'https://github.com/fake_user/nano.git',
+                            'branch': 'master',
+                            'description': 'Text editor'
+                        }
+                    ]
+                },
+                f
+            )
+
+        try:
+            idx = SearchIndexMgr(tmp_dir)
+
+            self.assertEqual(
+                [doc['name'] for doc in idx.search('editor')],
+                ['nano']
+            )
+            self.assertTrue(isfile(idx.idx_file_path))
+        finally:
+            rmtree(tmp_dir)
+
+    @patch('search_index_mgr.SearchIndexMgr')
+    @patch('views.CliSearchView')
+    def test_search_cmd(self, listener_mock, idx_mock):
+        """
+        GIVEN the search index contains one package matching the query.
+        WHEN  the user issues a search command.
+        THEN  the events must be issued to the view properly.
+
+        """
+        idx_mock.search.return_value = [
+            {
+                'repo_id': 'fake_user/fake_repo',
+                'name': 'vim',
+                'repo': 'https://github.com/fake_user/vim.git',
+                'branch': 'master',
+                'description': 'Vi IMproved'
+            }
+        ]
+
+        cmd = SearchCmd('vim', idx_mock)
+        cmd.execute(listener_mock)
+
+        idx_mock.search.assert_called_once_with('vim')
+
+        listener_mock.assert_has_calls(
+            [
+                call.on_search_start('vim'),
+                call.on_pkg_found('fake_user/fake_repo', 'vim', 'Vi IMproved'),
+                call.on_search_finish('vim', 1)
+            ]
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+from unittest import TestCase, main
+from unittest.mock import patch
+
+import os
+import signal
+from subprocess import CalledProcessError, Popen, run
+from time import monotonic
+
+from transfer_guard import (
+    Transfer,
+    TransferCancelled,
+    TransferGuard,
+    TransferTimeout
+)
+
+class TransferGuardTest(TestCase):
+
+    """
+    Implementation of unit tests for TransferGuard class.
+
+    """
+
+    def test_timeout(self):
+        """
+        GIVEN a transfer guard with a timeout of one second.
+        WHEN  a transfer runs a process which hangs.
+        THEN  the process must be killed and a timeout must be raised.
+
+        """
+        guard = TransferGuard(timeout=1)
+        start = monotonic()
+
+        with self.assertRaises(TransferTimeout):
+            with guard.watch('fetch') as transfer:
+                run(
+                    ['sleep', '30'],
+                    env=dict(os.environ, **transfer.env),
+                    check=True
+                )
+
+        self.assertLess(monotonic() - start, 10)
+
+    def test_unrelated_process_error(self):
+        """
+        GIVEN a transfer guard.
+        WHEN  a transfer runs a process which fails before its timeout.
+        THEN  the error of the process must be raised as is.
+
+        """
+        guard = TransferGuard(timeout=30)
+
+        with self.assertRaises(CalledProcessError):
+            with guard.watch('fetch') as transfer:
+                run(['false'], env=dict(os.environ, **transfer.env), check=True)
+
+    def test_cancel(self):
+        """
+        GIVEN a running child process.
+        WHEN  the transfers are cancelled.
+        THEN  the process must be killed and no transfer may start anymore.
+
+        """
+        guard = TransferGuard()
+        process = Popen(['sleep', '30'])
+
+        guard.cancel()
+
+        self.assertEqual(process.wait(timeout=10), -signal.SIGKILL)
+
+        with self.assertRaises(TransferCancelled):
+            with guard.watch('fetch'):
+                pass
+
+    def test_handle_signals(self):
+        """
+        GIVEN the signals are handled by a transfer guard.
+        WHEN  a SIGTERM is received.
+        THEN  the transfers must be cancelled and the process must exit once
+              the signals aren't handled anymore.
+
+        """
+        guard = TransferGuard()
+        old_handler = signal.getsignal(signal.SIGTERM)
+
+        with self.assertRaises(SystemExit) as context:
+            with guard.handle_signals():
+                os.kill(os.getpid(), signal.SIGTERM)
+
+        self.assertEqual(context.exception.code, 128 + signal.SIGTERM)
+        self.assertTrue(guard.cancelled)
+        self.assertEqual(signal.getsignal(signal.SIGTERM), old_handler)
+
+    @patch.dict('os.environ', { 'GIT_SSH_COMMAND': 'ssh -i fake_key' })
+    def test_env(self):
+        """
+        GIVEN the user has its own ssh command.
+        WHEN  the environment of a transfer is built.
+        THEN  no git process may wait for credentials, the ssh command of the
+              user must be kept and the low speed limit must be set.
+
+        """
+        env = TransferGuard(connect_timeout=5, idle_timeout=30).get_env(7)
+
+        self.assertEqual(env['GIT_TERMINAL_PROMPT'], '0')
+        self.assertEqual(env['GUR_TRANSFER'], '7')
+        self.assertEqual(env['GIT_HTTP_LOW_SPEED_TIME'], '30')
+        self.assertEqual(
+            env['GIT_SSH_COMMAND'],
+            'ssh -i fake_key -o BatchMode=yes -o ConnectTimeout=5 '
+            '-o ServerAliveInterval=10 -o ServerAliveCountMax=3'
+        )
+
+        self.assertNotIn(
+            'GIT_HTTP_LOW_SPEED_TIME',
+            TransferGuard(idle_timeout=0).get_env()
+        )
+
+    @patch('transfer_guard.monotonic')
+    def test_low_speed(self, monotonic_mock):
+        """
+        GIVEN an in-process transfer with a low speed limit of 100 bytes/s
+              for 10 seconds.
+        WHEN  its progress is checked.
+        THEN  it must be aborted once it's slower than the limit for 10
+              seconds.
+
+        """
+        monotonic_mock.side_effect = [0, 5, 10, 10, 20]
+
+        transfer = Transfer(
+            TransferGuard(idle_timeout=10, low_speed_limit=100),
+            1,
+            'fetch'
+        )
+
+        transfer.check(500)
+        transfer.check(2000)
+
+        with self.assertRaises(TransferTimeout):
+            transfer.check(2500)
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,15 @@
 from unittest import TestCase, main
-from unittest.mock import patch, call
+from unittest.mock import patch, call, ANY, MagicMock
 
+from os import chdir, getcwd, listdir, remove
+from os.path import isdir
+from shutil import rmtree
 import git
 
 from commands import UpdateCmd
 from errors import error_map
+from package_database_backends import backend_map
+from package_database_mgr import PackageDatabaseMgr
 
 class UpdateTest(TestCase):
 
@@ -13,6 +18,7 @@ class UpdateTest(TestCase):
 
     """
 
+    @patch('search_index_mgr.SearchIndexMgr')
     @patch('mirrors_mgr.MirrorsMgr.get_mirrors')
     @patch('commands.UpdateCmd.InitializeRepoCmd')
     @patch('os.path.isdir')
@@ -24,7 +30,8 @@ class UpdateTest(TestCase):
         pkg_mgr_mock,
         isdir_mock,
         cmd_mock,
-        mirrors_mock):
+        mirrors_mock,
+        search_idx_mock):
         """
         GIVEN the package dir is empty and the mirrors file contains only one
               repo.
@@ -46,8 +53,9 @@ class UpdateTest(TestCase):
         mirrors_mock.return_value = [
             '{},{}'.format(master_branch_name, repo_url)
         ]
+        pkg_mgr_mock.get_entries.return_value = []
 
-        cmd = UpdateCmd(pkg_mgr_mock)
+        cmd = UpdateCmd(pkg_mgr_mock, search_idx_mock)
         cmd.execute(listener_mock)
 
         mirrors_mock.assert_has_calls(
@@ -73,22 +81,52 @@ class UpdateTest(TestCase):
 
         pkg_mgr_mock.assert_has_calls(
             [
-                call.switch_dir()
+                call.switch_dir(),
+                call.lock(),
+                call.flush(),
+                call.get_entries(),
+                call.unlock()
+            ]
+        )
+
+        search_idx_mock.assert_has_calls(
+            [
+                call.discard_repo(master_repo_id),
+                call.commit_repo(master_repo_id),
+                call.save()
             ]
         )
 
         cmd_mock.assert_has_calls(
             [
-                call(pkg_mgr_mock, master_repo_id, master_branch_name, repo_url),
                 call(
                     pkg_mgr_mock,
                     master_repo_id,
                     master_branch_name,
-                    repo_url
+                    repo_url,
+                    search_idx_mock,
+                    ANY,
+                    ANY,
+                    None,
+                    None,
+                    plumbing=ANY
+                ),
+                call(
+                    pkg_mgr_mock,
+                    master_repo_id,
+                    master_branch_name,
+                    repo_url,
+                    search_idx_mock,
+                    ANY,
+                    ANY,
+                    None,
+                    None,
+                    plumbing=ANY
                 ).execute(listener_mock)
             ]
         )
 
+    @patch('search_index_mgr.SearchIndexMgr')
     @patch('mirrors_mgr.MirrorsMgr.get_mirrors')
     @patch('commands.UpdateCmd.InitializeRepoCmd')
     @patch('os.path.isdir')
@@ -100,7 +138,8 @@ class UpdateTest(TestCase):
         pkg_mgr_mock,
         isdir_mock,
         cmd_mock,
-        mirrors_mock):
+        mirrors_mock,
+        search_idx_mock):
         """
         GIVEN the package dir is empty and the mirrors file contains multiple
               repos.
@@ -130,7 +169,7 @@ class UpdateTest(TestCase):
             '{},{}'.format(master_branch_name, repo_urls[2])
         ]
 
-        cmd = UpdateCmd(pkg_mgr_mock)
+        cmd = UpdateCmd(pkg_mgr_mock, search_idx_mock)
         cmd.execute(listener_mock)
 
         mirrors_mock.assert_has_calls(
@@ -178,30 +217,82 @@ class UpdateTest(TestCase):
 
         cmd_mock.assert_has_calls(
             [
-                call(pkg_mgr_mock, master_repo_ids[0], master_branch_name, repo_urls[0]),
                 call(
                     pkg_mgr_mock,
                     master_repo_ids[0],
                     master_branch_name,
-                    repo_urls[0]
+                    repo_urls[0],
+                    search_idx_mock,
+                    ANY,
+                    ANY,
+                    None,
+                    None,
+                    plumbing=ANY
+                ),
+                call(
+                    pkg_mgr_mock,
+                    master_repo_ids[0],
+                    master_branch_name,
+                    repo_urls[0],
+                    search_idx_mock,
+                    ANY,
+                    ANY,
+                    None,
+                    None,
+                    plumbing=ANY
                 ).execute(listener_mock),
-                call(pkg_mgr_mock, master_repo_ids[1], master_branch_name, repo_urls[1]),
                 call(
                     pkg_mgr_mock,
                     master_repo_ids[1],
                     master_branch_name,
-                    repo_urls[1]
+                    repo_urls[1],
+                    search_idx_mock,
+                    ANY,
+                    ANY,
+                    None,
+                    None,
+                    plumbing=ANY
+                ),
+                call(
+                    pkg_mgr_mock,
+                    master_repo_ids[1],
+                    master_branch_name,
+                    repo_urls[1],
+                    search_idx_mock,
+                    ANY,
+                    ANY,
+                    None,
+                    None,
+                    plumbing=ANY
                 ).execute(listener_mock),
-                call(pkg_mgr_mock, master_repo_ids[2], master_branch_name, repo_urls[2]),
                 call(
                     pkg_mgr_mock,
                     master_repo_ids[2],
                     master_branch_name,
-                    repo_urls[2]
+                    repo_urls[2],
+                    search_idx_mock,
+                    ANY,
+                    ANY,
+                    None,
+                    None,
+                    plumbing=ANY
+                ),
+                call(
+                    pkg_mgr_mock,
+                    master_repo_ids[2],
+                    master_branch_name,
+                    repo_urls[2],
+                    search_idx_mock,
+                    ANY,
+                    ANY,
+                    None,
+                    None,
+                    plumbing=ANY
                 ).execute(listener_mock)
             ]
         )
 
+    @patch('search_index_mgr.SearchIndexMgr')
     @patch('mirrors_mgr.MirrorsMgr.get_mirrors')
     @patch('commands.UpdateCmd.UpdateRepoCmd')
     @patch('os.path.isdir')
@@ -213,7 +304,8 @@ class UpdateTest(TestCase):
         pkg_mgr_mock,
         isdir_mock,
         cmd_mock,
-        mirrors_mock):
+        mirrors_mock,
+        search_idx_mock):
         """
         GIVEN the package dir is not empty and the mirrors file contains only
               one repo.
@@ -236,7 +328,7 @@ class UpdateTest(TestCase):
             '{},{}'.format(master_branch_name, repo_url)
         ]
 
-        cmd = UpdateCmd(pkg_mgr_mock)
+        cmd = UpdateCmd(pkg_mgr_mock, search_idx_mock)
         cmd.execute(listener_mock)
 
         mirrors_mock.assert_has_calls(
@@ -268,15 +360,34 @@ class UpdateTest(TestCase):
 
         cmd_mock.assert_has_calls(
             [
-                call(pkg_mgr_mock, master_repo_id, master_branch_name),
                 call(
                     pkg_mgr_mock,
                     master_repo_id,
-                    master_branch_name
+                    master_branch_name,
+                    search_idx_mock,
+                    ANY,
+                    ANY,
+                    None,
+                    None,
+                    scheduler=None,
+                    plumbing=ANY
+                ),
+                call(
+                    pkg_mgr_mock,
+                    master_repo_id,
+                    master_branch_name,
+                    search_idx_mock,
+                    ANY,
+                    ANY,
+                    None,
+                    None,
+                    scheduler=None,
+                    plumbing=ANY
                 ).execute(listener_mock)
             ]
         )
 
+    @patch('search_index_mgr.SearchIndexMgr')
     @patch('mirrors_mgr.MirrorsMgr.get_mirrors')
     @patch('commands.UpdateCmd.UpdateRepoCmd')
     @patch('os.path.isdir')
@@ -288,7 +399,8 @@ class UpdateTest(TestCase):
         pkg_mgr_mock,
         isdir_mock,
         cmd_mock,
-        mirrors_mock):
+        mirrors_mock,
+        search_idx_mock):
         """
         GIVEN the package dir is not empty and the mirrors file contains
               multiple repos.
@@ -318,7 +430,7 @@ class UpdateTest(TestCase):
             '{},{}'.format(master_branch_name, repo_urls[2])
         ]
 
-        cmd = UpdateCmd(pkg_mgr_mock)
+        cmd = UpdateCmd(pkg_mgr_mock, search_idx_mock)
         cmd.execute(listener_mock)
 
         mirrors_mock.assert_has_calls(
@@ -366,27 +478,82 @@ class UpdateTest(TestCase):
 
         cmd_mock.assert_has_calls(
             [
-                call(pkg_mgr_mock, master_repo_ids[0], master_branch_name),
                 call(
                     pkg_mgr_mock,
                     master_repo_ids[0],
-                    master_branch_name
+                    master_branch_name,
+                    search_idx_mock,
+                    ANY,
+                    ANY,
+                    None,
+                    None,
+                    scheduler=None,
+                    plumbing=ANY
+                ),
+                call(
+                    pkg_mgr_mock,
+                    master_repo_ids[0],
+                    master_branch_name,
+                    search_idx_mock,
+                    ANY,
+                    ANY,
+                    None,
+                    None,
+                    scheduler=None,
+                    plumbing=ANY
                 ).execute(listener_mock),
-                call(pkg_mgr_mock, master_repo_ids[1], master_branch_name),
                 call(
                     pkg_mgr_mock,
                     master_repo_ids[1],
-                    master_branch_name
+                    master_branch_name,
+                    search_idx_mock,
+                    ANY,
+                    ANY,
+                    None,
+                    None,
+                    scheduler=None,
+                    plumbing=ANY
+                ),
+                call(
+                    pkg_mgr_mock,
+                    master_repo_ids[1],
+                    master_branch_name,
+                    search_idx_mock,
+                    ANY,
+                    ANY,
+                    None,
+                    None,
+                    scheduler=None,
+                    plumbing=ANY
                 ).execute(listener_mock),
-                call(pkg_mgr_mock, master_repo_ids[2], master_branch_name),
                 call(
                     pkg_mgr_mock,
                     master_repo_ids[2],
-                    master_branch_name
+                    master_branch_name,
+                    search_idx_mock,
+                    ANY,
+                    ANY,
+                    None,
+                    None,
+                    scheduler=None,
+                    plumbing=ANY
+                ),
+                call(
+                    pkg_mgr_mock,
+                    master_repo_ids[2],
+                    master_branch_name,
+                    search_idx_mock,
+                    ANY,
+                    ANY,
+                    None,
+                    None,
+                    scheduler=None,
+                    plumbing=ANY
                 ).execute(listener_mock)
             ]
         )
 
+    @patch('search_index_mgr.SearchIndexMgr')
     @patch('mirrors_mgr.MirrorsMgr.get_mirrors')
     @patch('commands.UpdateCmd.InitializeRepoCmd')
     @patch('os.path.isdir')
@@ -398,7 +565,8 @@ class UpdateTest(TestCase):
         pkg_mgr_mock,
         isdir_mock,
         cmd_mock,
-        mirrors_mock):
+        mirrors_mock,
+        search_idx_mock):
         """
         GIVEN the package dir is empty and the mirrors file contains only one
               repo.
@@ -423,7 +591,7 @@ class UpdateTest(TestCase):
         ]
         cmd_mock().execute.side_effect = git.GitCommandError('git clone', '')
 
-        cmd = UpdateCmd(pkg_mgr_mock)
+        cmd = UpdateCmd(pkg_mgr_mock, search_idx_mock)
         cmd.execute(listener_mock)
 
         mirrors_mock.assert_has_calls(
@@ -453,18 +621,39 @@ class UpdateTest(TestCase):
             ]
         )
 
+        search_idx_mock.commit_repo.assert_not_called()
+        search_idx_mock.save.assert_called_once_with()
+
         cmd_mock.assert_has_calls(
             [
-                call(pkg_mgr_mock, master_repo_id, master_branch_name, repo_url),
                 call(
                     pkg_mgr_mock,
                     master_repo_id,
                     master_branch_name,
-                    repo_url
+                    repo_url,
+                    search_idx_mock,
+                    ANY,
+                    ANY,
+                    None,
+                    None,
+                    plumbing=ANY
+                ),
+                call(
+                    pkg_mgr_mock,
+                    master_repo_id,
+                    master_branch_name,
+                    repo_url,
+                    search_idx_mock,
+                    ANY,
+                    ANY,
+                    None,
+                    None,
+                    plumbing=ANY
                 ).execute(listener_mock)
             ]
         )
 
+    @patch('search_index_mgr.SearchIndexMgr')
     @patch('mirrors_mgr.MirrorsMgr.get_mirrors')
     @patch('commands.UpdateCmd.InitializeRepoCmd')
     @patch('os.path.isdir')
@@ -476,7 +665,8 @@ class UpdateTest(TestCase):
         pkg_mgr_mock,
         isdir_mock,
         cmd_mock,
-        mirrors_mock):
+        mirrors_mock,
+        search_idx_mock):
         """
         GIVEN the package dir is empty and the mirrors file contains only one
               repo.
@@ -501,7 +691,7 @@ class UpdateTest(TestCase):
         ]
         cmd_mock().execute.side_effect = git.GitCommandError('git fetch', '')
 
-        cmd = UpdateCmd(pkg_mgr_mock)
+        cmd = UpdateCmd(pkg_mgr_mock, search_idx_mock)
         cmd.execute(listener_mock)
 
         mirrors_mock.assert_has_calls(
@@ -533,16 +723,34 @@ class UpdateTest(TestCase):
 
         cmd_mock.assert_has_calls(
             [
-                call(pkg_mgr_mock, master_repo_id, master_branch_name, repo_url),
                 call(
                     pkg_mgr_mock,
                     master_repo_id,
                     master_branch_name,
-                    repo_url
+                    repo_url,
+                    search_idx_mock,
+                    ANY,
+                    ANY,
+                    None,
+                    None,
+                    plumbing=ANY
+                ),
+                call(
+                    pkg_mgr_mock,
+                    master_repo_id,
+                    master_branch_name,
+                    repo_url,
+                    search_idx_mock,
+                    ANY,
+                    ANY,
+                    None,
+                    None,
+                    plumbing=ANY
                 ).execute(listener_mock)
             ]
         )
 
+    @patch('search_index_mgr.SearchIndexMgr')
     @patch('mirrors_mgr.MirrorsMgr.get_mirrors')
     @patch('commands.UpdateCmd.InitializeRepoCmd')
     @patch('os.path.isdir')
@@ -554,7 +762,8 @@ class UpdateTest(TestCase):
         pkg_mgr_mock,
         isdir_mock,
         cmd_mock,
-        mirrors_mock):
+        mirrors_mock,
+        search_idx_mock):
         """
         GIVEN the package dir is empty and the mirrors file contains only one
               repo.
@@ -579,7 +788,7 @@ class UpdateTest(TestCase):
         ]
         cmd_mock().execute.side_effect = git.GitCommandError('git pull', '')
 
-        cmd = UpdateCmd(pkg_mgr_mock)
+        cmd = UpdateCmd(pkg_mgr_mock, search_idx_mock)
         cmd.execute(listener_mock)
 
         mirrors_mock.assert_has_calls(
@@ -611,16 +820,34 @@ class UpdateTest(TestCase):
 
         cmd_mock.assert_has_calls(
             [
-                call(pkg_mgr_mock, master_repo_id, master_branch_name, repo_url),
                 call(
                     pkg_mgr_mock,
                     master_repo_id,
                     master_branch_name,
-                    repo_url
+                    repo_url,
+                    search_idx_mock,
+                    ANY,
+                    ANY,
+                    None,
+                    None,
+                    plumbing=ANY
+                ),
+                call(
+                    pkg_mgr_mock,
+                    master_repo_id,
+                    master_branch_name,
+                    repo_url,
+                    search_idx_mock,
+                    ANY,
+                    ANY,
+                    None,
+                    None,
+                    plumbing=ANY
                 ).execute(listener_mock)
             ]
         )
 
+    @patch('search_index_mgr.SearchIndexMgr')
     @patch('mirrors_mgr.MirrorsMgr.get_mirrors')
     @patch('commands.UpdateCmd.InitializeRepoCmd')
     @patch('os.path.isdir')
@@ -632,7 +859,8 @@ class UpdateTest(TestCase):
         pkg_mgr_mock,
         isdir_mock,
         cmd_mock,
-        mirrors_mock):
+        mirrors_mock,
+        search_idx_mock):
         """
         GIVEN the package dir is empty and the mirrors file contains only one
               repo.
@@ -656,7 +884,7 @@ class UpdateTest(TestCase):
         ]
         cmd_mock().execute.side_effect = ValueError('foo')
 
-        cmd = UpdateCmd(pkg_mgr_mock)
+        cmd = UpdateCmd(pkg_mgr_mock, search_idx_mock)
         cmd.execute(listener_mock)
 
         mirrors_mock.assert_has_calls(
@@ -688,15 +916,275 @@ class UpdateTest(TestCase):
 
         cmd_mock.assert_has_calls(
             [
-                call(pkg_mgr_mock, master_repo_id, master_branch_name, repo_url),
                 call(
                     pkg_mgr_mock,
                     master_repo_id,
                     master_branch_name,
-                    repo_url
+                    repo_url,
+                    search_idx_mock,
+                    ANY,
+                    ANY,
+                    None,
+                    None,
+                    plumbing=ANY
+                ),
+                call(
+                    pkg_mgr_mock,
+                    master_repo_id,
+                    master_branch_name,
+                    repo_url,
+                    search_idx_mock,
+                    ANY,
+                    ANY,
+                    None,
+                    None,
+                    plumbing=ANY
                 ).execute(listener_mock)
             ]
         )
 
+    @patch('search_index_mgr.SearchIndexMgr')
+    @patch('mirrors_mgr.MirrorsMgr.get_mirrors')
+    @patch('commands.UpdateCmd.UpdateRepoCmd')
+    @patch('os.path.isdir')
+    @patch('package_database_mgr.PackageDatabaseMgr')
+    @patch('views.CliUpdateView')
+    def test_update_multiple_repos_concurrently(
+        self,
+        listener_mock,
+        pkg_mgr_mock,
+        isdir_mock,
+        cmd_mock,
+        mirrors_mock,
+        search_idx_mock):
+        """
+        GIVEN the package dir is not empty and the mirrors file contains
+              multiple repos.
+        WHEN  the user issues an update command with multiple jobs.
+        THEN  the command 'UpdateRepo' must be executed for every repo, all of
+              them sharing the same pool of package fetches.
+
+        """
+        master_branch_name = 'master'
+        master_repo_ids = [
+            'fake_user/fake_repo_1',
+            'fake_user/fake_repo_2',
+            'fake_user/fake_repo_3'
+        ]
+
+        isdir_mock.return_value = True
+        mirrors_mock.return_value = [
+            '{},https://github.com/{}.git'.format(master_branch_name, repo_id)
+            for repo_id in master_repo_ids
+        ]
+
+        cmd = UpdateCmd(pkg_mgr_mock, search_idx_mock, jobs=3)
+        cmd.execute(listener_mock)
+
+        for repo_id in master_repo_ids:
+            cmd_mock.assert_any_call(
+                pkg_mgr_mock,
+                repo_id,
+                master_branch_name,
+                search_idx_mock,
+                ANY,
+                ANY,
+                None,
+                None,
+                scheduler=None,
+                plumbing=ANY
+            )
+            listener_mock.on_master_repo_update_finish.assert_any_call(
+                repo_id,
+                master_branch_name
+            )
+            search_idx_mock.commit_repo.assert_any_call(repo_id)
+
+        pools = {id(args[4]) for args, _ in cmd_mock.call_args_list}
+        self.assertEqual(len(pools), 1)
+
+        self.assertEqual(cmd_mock.return_value.execute.call_count, 3)
+        self.assertEqual(pkg_mgr_mock.flush.call_count, 3)
+        search_idx_mock.save.assert_called_once_with()
+        listener_mock.on_error.assert_not_called()
+
+    @patch('search_index_mgr.SearchIndexMgr')
+    @patch('mirrors_mgr.MirrorsMgr.get_mirrors')
+    @patch('commands.UpdateCmd.UpdateRepoCmd')
+    @patch('os.path.isdir')
+    @patch('package_database_mgr.PackageDatabaseMgr')
+    @patch('views.CliUpdateView')
+    def test_update_removed_mirror(
+        self,
+        listener_mock,
+        pkg_mgr_mock,
+        isdir_mock,
+        cmd_mock,
+        mirrors_mock,
+        search_idx_mock):
+        """
+        GIVEN a master repo with package entries was removed from the mirrors
+              file.
+        WHEN  the user issues an update command.
+        THEN  its package entries and its indexed packages must be pruned and
+              the removal must be issued to the view.
+
+        """
+        master_branch_name = 'master'
+        removed_repo_id = 'fake_user/fake_repo_2'
+
+        isdir_mock.return_value = True
+        mirrors_mock.return_value = [
+            '{},https://github.com/fake_user/fake_repo_1.git'.format(
+                master_branch_name
+            )
+        ]
+        pkg_mgr_mock.get_entries.return_value = [
+            {
+                'name': 'fake_pkg',
+                'repo': removed_repo_id,
+                'rev': { 'remote': 'fake_hash', 'local': '' }
+            }
+        ]
+
+        cmd = UpdateCmd(pkg_mgr_mock, search_idx_mock)
+        cmd.execute(listener_mock)
+
+        listener_mock.assert_has_calls(
+            [
+                call.on_master_repo_remove(removed_repo_id),
+                call.on_update_finish()
+            ]
+        )
+
+        pkg_mgr_mock.remove_entries.assert_called_once_with(
+            [('fake_pkg', removed_repo_id)]
+        )
+        search_idx_mock.commit_repo.assert_any_call(removed_repo_id)
+
+        self.assertEqual(pkg_mgr_mock.flush.call_count, 2)
+
+    @patch('search_index_mgr.SearchIndexMgr')
+    @patch('mirrors_mgr.MirrorsMgr.get_mirrors')
+    @patch('commands.UpdateCmd.UpdateRepoCmd')
+    @patch('os.path.isdir')
+    @patch('package_database_mgr.PackageDatabaseMgr')
+    @patch('views.CliUpdateView')
+    def test_update_removed_mirror_with_error(
+        self,
+        listener_mock,
+        pkg_mgr_mock,
+        isdir_mock,
+        cmd_mock,
+        mirrors_mock,
+        search_idx_mock):
+        """
+        GIVEN a master repo with package entries was removed from the mirrors
+              file and the update of another master repo fails.
+        WHEN  the user issues an update command.
+        THEN  the error must be issued to the view and nothing must be
+              pruned.
+
+        """
+        removed_repo_id = 'fake_user/fake_repo_2'
+
+        isdir_mock.return_value = True
+        mirrors_mock.return_value = [
+            'master,https://github.com/fake_user/fake_repo_1.git'
+        ]
+        pkg_mgr_mock.get_entries.return_value = [
+            {
+                'name': 'fake_pkg',
+                'repo': removed_repo_id,
+                'rev': { 'remote': 'fake_hash', 'local': '' }
+            }
+        ]
+        cmd_mock.return_value.execute.side_effect = \
+            git.GitCommandError(['git', 'fetch'], 128)
+
+        cmd = UpdateCmd(pkg_mgr_mock, search_idx_mock)
+        cmd.execute(listener_mock)
+
+        listener_mock.on_error.assert_called_once()
+        listener_mock.on_master_repo_remove.assert_not_called()
+
+        pkg_mgr_mock.get_entries.assert_not_called()
+        pkg_mgr_mock.remove_entries.assert_not_called()
+
+    @patch('mirrors_mgr.MirrorsMgr.get_mirrors')
+    @patch('commands.UpdateCmd.UpdateRepoCmd')
+    @patch('os.path.isdir')
+    @patch('views.CliUpdateView')
+    def test_update_concurrently_with_every_backend(
+        self,
+        listener_mock,
+        isdir_mock,
+        cmd_mock,
+        mirrors_mock):
+        """
+        GIVEN the mirrors file contains multiple repos.
+        WHEN  the user issues an update command with multiple jobs, for each
+              database backend.
+        THEN  the packages added by the worker threads must be flushed into
+              the package database without errors.
+
+        """
+        master_repo_ids = [
+            'fake_user/fake_repo_1',
+            'fake_user/fake_repo_2',
+            'fake_user/fake_repo_3'
+        ]
+
+        isdir_mock.return_value = True
+        mirrors_mock.return_value = [
+            'master,https://github.com/{}.git'.format(repo_id)
+            for repo_id in master_repo_ids
+        ]
+
+        # the inner commands add their packages from the worker threads
+        def create_cmd(pkg_mgr, repo_id, *args, **kwargs):
+            inner_cmd = MagicMock()
+            inner_cmd.execute.side_effect = lambda listener: \
+                pkg_mgr.add_entries([('fake_pkg', 'a' * 40, repo_id)])
+
+            return inner_cmd
+
+        cmd_mock.side_effect = create_cmd
+
+        old_dir = getcwd()
+        pkg_dir = PackageDatabaseMgr().pkg_dir
+        old_files = set(listdir(pkg_dir))
+
+        try:
+            for backend in backend_map:
+                with self.subTest(backend=backend):
+                    listener_mock.reset_mock()
+
+                    pkg_mgr = PackageDatabaseMgr(backend)
+                    cmd = UpdateCmd(pkg_mgr, MagicMock(), jobs=3)
+                    cmd.execute(listener_mock)
+
+                    listener_mock.on_error.assert_not_called()
+
+                    entries = PackageDatabaseMgr(backend).get_entries()
+
+                    self.assertEqual(
+                        sorted(
+                            entry['repo'] for entry in entries
+                            if entry['name'] == 'fake_pkg'
+                        ),
+                        master_repo_ids
+                    )
+        finally:
+            chdir(old_dir)
+
+            for file_name in set(listdir(pkg_dir)) - old_files:
+                file_path = '{}/{}'.format(pkg_dir, file_name)
+
+                if isdir(file_path):
+                    rmtree(file_path)
+                else:
+                    remove(file_path)
+
 if __name__ == "__main__":
     main()
@@ -1,10 +1,16 @@
 from unittest import TestCase, main
-from unittest.mock import patch, call, ANY
+from unittest.mock import patch, call, ANY, MagicMock
 
-from os import chdir
+from json import dumps
+from os import chdir, getcwd, makedirs
+from os.path import dirname, isdir
+from shutil import rmtree
+from tempfile import mkdtemp
+from time import time
 import git
 
 from commands import UpdateCmd
+from poll_scheduler import PollScheduler
 
 class UpdateRepoTest(TestCase):
 
@@ -36,7 +42,7 @@ class UpdateRepoTest(TestCase):
         GIVEN packages dir is not empty and the mirrors file contains only one
               repo which contains one package.
         WHEN  the user issues an update command.
-        THEN  the repository must be pulled from origin, the package must
+        THEN  the repository must be synced with origin, the package must
               be updated on the package database and the events must be
               issued to the view properly.
 
@@ -53,7 +59,10 @@ class UpdateRepoTest(TestCase):
         master_repo_id = '{}/{}'.format(master_user, master_repo_name)
 
         isdir_mock.return_value = True
+        git_mock.return_value.head.commit.hexsha = 'fake_master_hash'
         listdir_mock.return_value = [pkg_name]
+        # no ref files, so the heads are resolved by rev_parse
+        git_mock.return_value.git_dir = 'fake_git_dir'
         mirrors_mock.return_value = [
             '{},{}'.format(master_branch_name, repo_url)
         ]
@@ -68,8 +77,8 @@ class UpdateRepoTest(TestCase):
         listener_mock.assert_has_calls(
             [
                 call.on_repo_update_start(master_repo_id, master_branch_name),
-                call.on_update_progress(1, 0, 1, 'Pulling master repo ...'),
-                call.on_update_progress(1, 1, 1, 'Pulling master repo ...'),
+                call.on_update_progress(1, 0, 1, 'Syncing master repo ...'),
+                call.on_update_progress(1, 1, 1, 'Syncing master repo ...'),
                 call.on_repo_update_finish(master_repo_id, master_branch_name),
                 call.on_pkg_update_start(pkg_name, pkg_branch),
                 call.on_update_progress(0, 0, 0, 'Fetching {} ...'.format(pkg_name)),
@@ -79,16 +88,35 @@ class UpdateRepoTest(TestCase):
 
         pkg_mgr_mock.assert_has_calls(
             [
-                call.update_entry(pkg_name, ANY) # TODO
+                call.update_entries(
+                    [
+                        (
+                            pkg_name,
+                            git_mock.return_value.rev_parse.return_value.hexsha,
+                            master_repo_id
+                        )
+                    ]
+                )
             ]
         )
 
         git_mock.assert_has_calls(
             [
                 call(master_repo_id),
-                call().remotes.origin.pull(master_branch_name),
-                call('{}/src/{}/.repo'.format(master_repo_id, pkg_name)),
-                call().remotes.origin.fetch(progress=ANY), # TODO
+                call().remotes.origin.fetch(
+                    '+refs/heads/{0}:refs/remotes/origin/{0}'.format(master_branch_name),
+                    env=ANY
+                ),
+                call().git.sparse_checkout(
+                    'set',
+                    '--no-cone',
+                    '/src/*/pkg_desc.json'
+                ),
+                call().git.reset('--hard', 'origin/{}'.format(master_branch_name)),
+                call('{}/src/{}/.repo'.format(master_repo_id, pkg_name), odbt=ANY),
+                # the progress handler and the environment of the transfer
+                # are created by each fetch
+                call().remotes.origin.fetch(progress=ANY, env=ANY),
                 call().rev_parse('origin/{}'.format(pkg_branch))
             ]
         )
@@ -128,7 +156,10 @@ class UpdateRepoTest(TestCase):
         master_repo_id = '{}/{}'.format(master_user, master_repo_name)
 
         isdir_mock.return_value = True
+        git_mock.return_value.head.commit.hexsha = 'fake_master_hash'
         listdir_mock.return_value = pkg_names
+        # no ref files, so the heads are resolved by rev_parse
+        git_mock.return_value.git_dir = 'fake_git_dir'
         mirrors_mock.return_value = [
             '{},{}'.format(master_branch_name, repo_url)
         ]
@@ -143,8 +174,8 @@ class UpdateRepoTest(TestCase):
         listener_mock.assert_has_calls(
             [
                 call.on_repo_update_start(master_repo_id, master_branch_name),
-                call.on_update_progress(1, 0, 1, 'Pulling master repo ...'),
-                call.on_update_progress(1, 1, 1, 'Pulling master repo ...'),
+                call.on_update_progress(1, 0, 1, 'Syncing master repo ...'),
+                call.on_update_progress(1, 1, 1, 'Syncing master repo ...'),
                 call.on_repo_update_finish(master_repo_id, master_branch_name),
                 call.on_pkg_update_start(pkg_names[0], pkg_branches[0]),
                 call.on_update_progress(0, 0, 0, 'Fetching {} ...'.format(pkg_names[0])),
@@ -163,32 +194,45 @@ class UpdateRepoTest(TestCase):
 
         pkg_mgr_mock.assert_has_calls(
             [
-                call.update_entry(pkg_names[0], ANY),
-                call.update_entry(pkg_names[1], ANY),
-                call.update_entry(pkg_names[2], ANY),
-                call.update_entry(pkg_names[3], ANY)
-            ],
+                call.update_entries(
+                    [
+                        (pkg_names[0], ANY, master_repo_id),
+                        (pkg_names[1], ANY, master_repo_id),
+                        (pkg_names[2], ANY, master_repo_id),
+                        (pkg_names[3], ANY, master_repo_id)
+                    ]
+                )
+            ]
         )
 
         git_mock.assert_has_calls(
             [
                 call(master_repo_id),
-                call().remotes.origin.pull(master_branch_name),
+                call().remotes.origin.fetch(
+                    '+refs/heads/{0}:refs/remotes/origin/{0}'.format(master_branch_name),
+                    env=ANY
+                ),
+                call().git.sparse_checkout(
+                    'set',
+                    '--no-cone',
+                    '/src/*/pkg_desc.json'
+                ),
+                call().git.reset('--hard', 'origin/{}'.format(master_branch_name)),
 
-                call('{}/src/{}/.repo'.format(master_repo_id, pkg_names[0])),
-                call().remotes.origin.fetch(progress=ANY),
-                call().rev_parse('origin/{}'.format(pkg_branches[0])),
+                call('{}/src/{}/.repo'.format(master_repo_id, pkg_names[0]), odbt=ANY),
+                call().remotes.origin.fetch(progress=ANY, env=ANY),
 
-                call('{}/src/{}/.repo'.format(master_repo_id, pkg_names[1])),
-                call().remotes.origin.fetch(progress=ANY),
-                call().rev_parse('origin/{}'.format(pkg_branches[1])),
+                call('{}/src/{}/.repo'.format(master_repo_id, pkg_names[1]), odbt=ANY),
+                call().remotes.origin.fetch(progress=ANY, env=ANY),
 
-                call('{}/src/{}/.repo'.format(master_repo_id, pkg_names[2])),
-                call().remotes.origin.fetch(progress=ANY),
-                call().rev_parse('origin/{}'.format(pkg_branches[2])),
+                call('{}/src/{}/.repo'.format(master_repo_id, pkg_names[2]), odbt=ANY),
+                call().remotes.origin.fetch(progress=ANY, env=ANY),
 
-                call('{}/src/{}/.repo'.format(master_repo_id, pkg_names[3])),
-                call().remotes.origin.fetch(progress=ANY),
+                call('{}/src/{}/.repo'.format(master_repo_id, pkg_names[3]), odbt=ANY),
+                call().remotes.origin.fetch(progress=ANY, env=ANY),
+                call().rev_parse('origin/{}'.format(pkg_branches[0])),
+                call().rev_parse('origin/{}'.format(pkg_branches[1])),
+                call().rev_parse('origin/{}'.format(pkg_branches[2])),
                 call().rev_parse('origin/{}'.format(pkg_branches[3]))
             ]
         )
@@ -233,7 +277,10 @@ class UpdateRepoTest(TestCase):
         ]
 
         isdir_mock.return_value = True
+        git_mock.return_value.head.commit.hexsha = 'fake_master_hash'
         listdir_mock.return_value = [pkg_name]
+        # no ref files, so the heads are resolved by rev_parse
+        git_mock.return_value.git_dir = 'fake_git_dir'
         mirrors_mock.return_value = [
             '{},{}\n'.format(master_branch_name, repo_urls[0]),
             '{},{}\n'.format(master_branch_name, repo_urls[1]),
@@ -251,24 +298,24 @@ class UpdateRepoTest(TestCase):
         listener_mock.assert_has_calls(
             [
                 call.on_repo_update_start(master_repo_ids[0], master_branch_name),
-                call.on_update_progress(1, 0, 1, 'Pulling master repo ...'),
-                call.on_update_progress(1, 1, 1, 'Pulling master repo ...'),
+                call.on_update_progress(1, 0, 1, 'Syncing master repo ...'),
+                call.on_update_progress(1, 1, 1, 'Syncing master repo ...'),
                 call.on_repo_update_finish(master_repo_ids[0], master_branch_name),
                 call.on_pkg_update_start(pkg_name, pkg_branch),
                 call.on_update_progress(0, 0, 0, 'Fetching {} ...'.format(pkg_name)),
                 call.on_pkg_update_finish(pkg_name, pkg_branch),
 
                 call.on_repo_update_start(master_repo_ids[1], master_branch_name),
-                call.on_update_progress(1, 0, 1, 'Pulling master repo ...'),
-                call.on_update_progress(1, 1, 1, 'Pulling master repo ...'),
+                call.on_update_progress(1, 0, 1, 'Syncing master repo ...'),
+                call.on_update_progress(1, 1, 1, 'Syncing master repo ...'),
                 call.on_repo_update_finish(master_repo_ids[1], master_branch_name),
                 call.on_pkg_update_start(pkg_name, pkg_branch),
                 call.on_update_progress(0, 0, 0, 'Fetching {} ...'.format(pkg_name)),
                 call.on_pkg_update_finish(pkg_name, pkg_branch),
 
                 call.on_repo_update_start(master_repo_ids[2], master_branch_name),
-                call.on_update_progress(1, 0, 1, 'Pulling master repo ...'),
-                call.on_update_progress(1, 1, 1, 'Pulling master repo ...'),
+                call.on_update_progress(1, 0, 1, 'Syncing master repo ...'),
+                call.on_update_progress(1, 1, 1, 'Syncing master repo ...'),
                 call.on_repo_update_finish(master_repo_ids[2], master_branch_name),
                 call.on_pkg_update_start(pkg_name, pkg_branch),
                 call.on_update_progress(0, 0, 0, 'Fetching {} ...'.format(pkg_name)),
@@ -278,33 +325,76 @@ class UpdateRepoTest(TestCase):
 
         pkg_mgr_mock.assert_has_calls(
             [
-                call.update_entry(pkg_name, ANY),
-                call.update_entry(pkg_name, ANY),
-                call.update_entry(pkg_name, ANY)
+                call.update_entries(
+                    [
+                        (pkg_name, ANY, master_repo_ids[0])
+                    ]
+                ),
+                call.update_entries(
+                    [
+                        (pkg_name, ANY, master_repo_ids[1])
+                    ]
+                ),
+                call.update_entries(
+                    [
+                        (pkg_name, ANY, master_repo_ids[2])
+                    ]
+                )
             ]
         )
 
         git_mock.assert_has_calls(
             [
                 call(master_repo_ids[0]),
-                call().remotes.origin.pull(master_branch_name),
+                call().remotes.origin.fetch(
+                    '+refs/heads/{0}:refs/remotes/origin/{0}'.format(master_branch_name),
+                    env=ANY
+                ),
+                call().git.sparse_checkout(
+                    'set',
+                    '--no-cone',
+                    '/src/*/pkg_desc.json'
+                ),
+                call().git.reset('--hard', 'origin/{}'.format(master_branch_name)),
 
-                call('{}/src/{}/.repo'.format(master_repo_ids[0], pkg_name)),
-                call().remotes.origin.fetch(progress=ANY),
+                call('{}/src/{}/.repo'.format(master_repo_ids[0], pkg_name), odbt=ANY),
+                call().remotes.origin.fetch(progress=ANY, env=ANY),
                 call().rev_parse('origin/{}'.format(pkg_branch)),
 
+                call().close(),
+
                 call(master_repo_ids[1]),
-                call().remotes.origin.pull(master_branch_name),
+                call().remotes.origin.fetch(
+                    '+refs/heads/{0}:refs/remotes/origin/{0}'.format(master_branch_name),
+                    env=ANY
+                ),
+                call().git.sparse_checkout(
+                    'set',
+                    '--no-cone',
+                    '/src/*/pkg_desc.json'
+                ),
+                call().git.reset('--hard', 'origin/{}'.format(master_branch_name)),
 
-                call('{}/src/{}/.repo'.format(master_repo_ids[1], pkg_name)),
-                call().remotes.origin.fetch(progress=ANY),
+                call('{}/src/{}/.repo'.format(master_repo_ids[1], pkg_name), odbt=ANY),
+                call().remotes.origin.fetch(progress=ANY, env=ANY),
                 call().rev_parse('origin/{}'.format(pkg_branch)),
 
+                call().close(),
+
                 call(master_repo_ids[2]),
-                call().remotes.origin.pull(master_branch_name),
+                call().remotes.origin.fetch(
+                    '+refs/heads/{0}:refs/remotes/origin/{0}'.format(master_branch_name),
+                    env=ANY
+                ),
+                call().git.sparse_checkout(
+                    'set',
+                    '--no-cone',
+                    '/src/*/pkg_desc.json'
+                ),
+                call().git.reset('--hard', 'origin/{}'.format(master_branch_name)),
 
-                call('{}/src/{}/.repo'.format(master_repo_ids[2], pkg_name)),
-                call().remotes.origin.fetch(progress=ANY),
+                call('{}/src/{}/.repo'.format(master_repo_ids[2], pkg_name), odbt=ANY),
+                call().remotes.origin.fetch(progress=ANY, env=ANY),
                 call().rev_parse('origin/{}'.format(pkg_branch)),
             ]
         )
@@ -349,7 +439,10 @@ class UpdateRepoTest(TestCase):
         ]
 
         isdir_mock.return_value = True
+        git_mock.return_value.head.commit.hexsha = 'fake_master_hash'
         listdir_mock.return_value = pkg_names
+        # no ref files, so the heads are resolved by rev_parse
+        git_mock.return_value.git_dir = 'fake_git_dir'
         mirrors_mock.return_value = [
             '{},{}\n'.format(master_branch_name, repo_urls[0]),
             '{},{}\n'.format(master_branch_name, repo_urls[1]),
@@ -367,8 +460,8 @@ class UpdateRepoTest(TestCase):
         listener_mock.assert_has_calls(
             [
                 call.on_repo_update_start(master_repo_ids[0], master_branch_name),
-                call.on_update_progress(1, 0, 1, 'Pulling master repo ...'),
-                call.on_update_progress(1, 1, 1, 'Pulling master repo ...'),
+                call.on_update_progress(1, 0, 1, 'Syncing master repo ...'),
+                call.on_update_progress(1, 1, 1, 'Syncing master repo ...'),
                 call.on_repo_update_finish(master_repo_ids[0], master_branch_name),
                 call.on_pkg_update_start(pkg_names[0], pkg_branches[0]),
                 call.on_update_progress(0, 0, 0, 'Fetching {} ...'.format(pkg_names[0])),
@@ -381,8 +474,8 @@ class UpdateRepoTest(TestCase):
                 call.on_pkg_update_finish(pkg_names[2], pkg_branches[2]),
 
                 call.on_repo_update_start(master_repo_ids[1], master_branch_name),
-                call.on_update_progress(1, 0, 1, 'Pulling master repo ...'),
-                call.on_update_progress(1, 1, 1, 'Pulling master repo ...'),
+                call.on_update_progress(1, 0, 1, 'Syncing master repo ...'),
+                call.on_update_progress(1, 1, 1, 'Syncing master repo ...'),
                 call.on_repo_update_finish(master_repo_ids[1], master_branch_name),
                 call.on_pkg_update_start(pkg_names[0], pkg_branches[0]),
                 call.on_update_progress(0, 0, 0, 'Fetching {} ...'.format(pkg_names[0])),
@@ -395,8 +488,8 @@ class UpdateRepoTest(TestCase):
                 call.on_pkg_update_finish(pkg_names[2], pkg_branches[2]),
 
                 call.on_repo_update_start(master_repo_ids[2], master_branch_name),
-                call.on_update_progress(1, 0, 1, 'Pulling master repo ...'),
-                call.on_update_progress(1, 1, 1, 'Pulling master repo ...'),
+                call.on_update_progress(1, 0, 1, 'Syncing master repo ...'),
+                call.on_update_progress(1, 1, 1, 'Syncing master repo ...'),
                 call.on_repo_update_finish(master_repo_ids[2], master_branch_name),
                 call.on_pkg_update_start(pkg_names[0], pkg_branches[0]),
                 call.on_update_progress(0, 0, 0, 'Fetching {} ...'.format(pkg_names[0])),
@@ -412,54 +505,97 @@ class UpdateRepoTest(TestCase):
 
         pkg_mgr_mock.assert_has_calls(
             [
-                call.update_entry(pkg_names[0], ANY),
-                call.update_entry(pkg_names[1], ANY),
-                call.update_entry(pkg_names[2], ANY),
-                call.update_entry(pkg_names[0], ANY),
-                call.update_entry(pkg_names[1], ANY),
-                call.update_entry(pkg_names[2], ANY),
-                call.update_entry(pkg_names[0], ANY),
-                call.update_entry(pkg_names[1], ANY),
-                call.update_entry(pkg_names[2], ANY)
+                call.update_entries(
+                    [
+                        (pkg_names[0], ANY, master_repo_ids[0]),
+                        (pkg_names[1], ANY, master_repo_ids[0]),
+                        (pkg_names[2], ANY, master_repo_ids[0])
+                    ]
+                ),
+                call.update_entries(
+                    [
+                        (pkg_names[0], ANY, master_repo_ids[1]),
+                        (pkg_names[1], ANY, master_repo_ids[1]),
+                        (pkg_names[2], ANY, master_repo_ids[1])
+                    ]
+                ),
+                call.update_entries(
+                    [
+                        (pkg_names[0], ANY, master_repo_ids[2]),
+                        (pkg_names[1], ANY, master_repo_ids[2]),
+                        (pkg_names[2], ANY, master_repo_ids[2])
+                    ]
+                )
             ]
         )
 
         git_mock.assert_has_calls(
             [
                 call(master_repo_ids[0]),
-                call().remotes.origin.pull(master_branch_name),
-                call('{}/src/{}/.repo'.format(master_repo_ids[0], pkg_names[0])),
-                call().remotes.origin.fetch(progress=ANY),
+                call().remotes.origin.fetch(
+                    '+refs/heads/{0}:refs/remotes/origin/{0}'.format(master_branch_name),
+                    env=ANY
+                ),
+                call().git.sparse_checkout(
+                    'set',
+                    '--no-cone',
+                    '/src/*/pkg_desc.json'
+                ),
+                call().git.reset('--hard', 'origin/{}'.format(master_branch_name)),
+                call('{}/src/{}/.repo'.format(master_repo_ids[0], pkg_names[0]), odbt=ANY),
+                call().remotes.origin.fetch(progress=ANY, env=ANY),
+                call('{}/src/{}/.repo'.format(master_repo_ids[0], pkg_names[1]), odbt=ANY),
+                call().remotes.origin.fetch(progress=ANY, env=ANY),
+                call('{}/src/{}/.repo'.format(master_repo_ids[0], pkg_names[2]), odbt=ANY),
+                call().remotes.origin.fetch(progress=ANY, env=ANY),
                 call().rev_parse('origin/{}'.format(pkg_branches[0])),
-                call('{}/src/{}/.repo'.format(master_repo_ids[0], pkg_names[1])),
-                call().remotes.origin.fetch(progress=ANY),
                 call().rev_parse('origin/{}'.format(pkg_branches[1])),
-                call('{}/src/{}/.repo'.format(master_repo_ids[0], pkg_names[2])),
-                call().remotes.origin.fetch(progress=ANY),
                 call().rev_parse('origin/{}'.format(pkg_branches[2])),
 
+                call().close(),
+
                 call(master_repo_ids[1]),
-                call().remotes.origin.pull(master_branch_name),
-                call('{}/src/{}/.repo'.format(master_repo_ids[1], pkg_names[0])),
-                call().remotes.origin.fetch(progress=ANY),
+                call().remotes.origin.fetch(
+                    '+refs/heads/{0}:refs/remotes/origin/{0}'.format(master_branch_name),
+                    env=ANY
+                ),
+                call().git.sparse_checkout(
+                    'set',
+                    '--no-cone',
+                    '/src/*/pkg_desc.json'
+                ),
+                call().git.reset('--hard', 'origin/{}'.format(master_branch_name)),
+                call('{}/src/{}/.repo'.format(master_repo_ids[1], pkg_names[0]), odbt=ANY),
+                call().remotes.origin.fetch(progress=ANY, env=ANY),
+                call('{}/src/{}/.repo'.format(master_repo_ids[1], pkg_names[1]), odbt=ANY),
+                call().remotes.origin.fetch(progress=ANY, env=ANY),
+                call('{}/src/{}/.repo'.format(master_repo_ids[1], pkg_names[2]), odbt=ANY),
+                call().remotes.origin.fetch(progress=ANY, env=ANY),
                 call().rev_parse('origin/{}'.format(pkg_branches[0])),
-                call('{}/src/{}/.repo'.format(master_repo_ids[1], pkg_names[1])),
-                call().remotes.origin.fetch(progress=ANY),
                 call().rev_parse('origin/{}'.format(pkg_branches[1])),
-                call('{}/src/{}/.repo'.format(master_repo_ids[1], pkg_names[2])),
-                call().remotes.origin.fetch(progress=ANY),
                 call().rev_parse('origin/{}'.format(pkg_branches[2])),
 
+                call().close(),
+
                 call(master_repo_ids[2]),
-                call().remotes.origin.pull(master_branch_name),
-                call('{}/src/{}/.repo'.format(master_repo_ids[2], pkg_names[0])),
-                call().remotes.origin.fetch(progress=ANY),
+                call().remotes.origin.fetch(
+                    '+refs/heads/{0}:refs/remotes/origin/{0}'.format(master_branch_name),
+                    env=ANY
+                ),
+                call().git.sparse_checkout(
+                    'set',
+                    '--no-cone',
+                    '/src/*/pkg_desc.json'
+                ),
+                call().git.reset('--hard', 'origin/{}'.format(master_branch_name)),
+                call('{}/src/{}/.repo'.format(master_repo_ids[2], pkg_names[0]), odbt=ANY),
+                call().remotes.origin.fetch(progress=ANY, env=ANY),
+                call('{}/src/{}/.repo'.format(master_repo_ids[2], pkg_names[1]), odbt=ANY),
+                call().remotes.origin.fetch(progress=ANY, env=ANY),
+                call('{}/src/{}/.repo'.format(master_repo_ids[2], pkg_names[2]), odbt=ANY),
+                call().remotes.origin.fetch(progress=ANY, env=ANY),
                 call().rev_parse('origin/{}'.format(pkg_branches[0])),
-                call('{}/src/{}/.repo'.format(master_repo_ids[2], pkg_names[1])),
-                call().remotes.origin.fetch(progress=ANY),
                 call().rev_parse('origin/{}'.format(pkg_branches[1])),
-                call('{}/src/{}/.repo'.format(master_repo_ids[2], pkg_names[2])),
-                call().remotes.origin.fetch(progress=ANY),
                 call().rev_parse('origin/{}'.format(pkg_branches[2]))
             ]
         )
@@ -502,6 +638,7 @@ class UpdateRepoTest(TestCase):
         ]
 
         isdir_mock.return_value = True
+        git_mock.return_value.head.commit.hexsha = 'fake_master_hash'
         listdir_mock.return_value = []
         mirrors_mock.return_value = [
             '{},{}\n'.format(master_branch_name, repo_urls[0]),
@@ -520,36 +657,67 @@ class UpdateRepoTest(TestCase):
         listener_mock.assert_has_calls(
             [
                 call.on_repo_update_start(master_repo_ids[0], master_branch_name),
-                call.on_update_progress(1, 0, 1, 'Pulling master repo ...'),
-                call.on_update_progress(1, 1, 1, 'Pulling master repo ...'),
+                call.on_update_progress(1, 0, 1, 'Syncing master repo ...'),
+                call.on_update_progress(1, 1, 1, 'Syncing master repo ...'),
                 call.on_repo_update_finish(master_repo_ids[0], master_branch_name),
 
                 call.on_repo_update_start(master_repo_ids[1], master_branch_name),
-                call.on_update_progress(1, 0, 1, 'Pulling master repo ...'),
-                call.on_update_progress(1, 1, 1, 'Pulling master repo ...'),
+                call.on_update_progress(1, 0, 1, 'Syncing master repo ...'),
+                call.on_update_progress(1, 1, 1, 'Syncing master repo ...'),
                 call.on_repo_update_finish(master_repo_ids[1], master_branch_name),
 
                 call.on_repo_update_start(master_repo_ids[2], master_branch_name),
-                call.on_update_progress(1, 0, 1, 'Pulling master repo ...'),
-                call.on_update_progress(1, 1, 1, 'Pulling master repo ...'),
+                call.on_update_progress(1, 0, 1, 'Syncing master repo ...'),
+                call.on_update_progress(1, 1, 1, 'Syncing master repo ...'),
                 call.on_repo_update_finish(master_repo_ids[2], master_branch_name),
             ]
         )
 
         listener_mock.on_pkg_update_start.assert_not_called()
         listener_mock.on_pkg_update_finish.assert_not_called()
-        pkg_mgr_mock.update_entry.assert_not_called()
+        pkg_mgr_mock.update_entries.assert_not_called()
 
         git_mock.assert_has_calls(
             [
                 call(master_repo_ids[0]),
-                call().remotes.origin.pull(master_branch_name),
+                call().remotes.origin.fetch(
+                    '+refs/heads/{0}:refs/remotes/origin/{0}'.format(master_branch_name),
+                    env=ANY
+                ),
+                call().git.sparse_checkout(
+                    'set',
+                    '--no-cone',
+                    '/src/*/pkg_desc.json'
+                ),
+                call().git.reset('--hard', 'origin/{}'.format(master_branch_name)),
+
+                call().close(),
 
                 call(master_repo_ids[1]),
-                call().remotes.origin.pull(master_branch_name),
+                call().remotes.origin.fetch(
+                    '+refs/heads/{0}:refs/remotes/origin/{0}'.format(master_branch_name),
+                    env=ANY
+                ),
+                call().git.sparse_checkout(
+                    'set',
+                    '--no-cone',
+                    '/src/*/pkg_desc.json'
+                ),
+                call().git.reset('--hard', 'origin/{}'.format(master_branch_name)),
+
+                call().close(),
 
                 call(master_repo_ids[2]),
-                call().remotes.origin.pull(master_branch_name)
+                call().remotes.origin.fetch(
+                    '+refs/heads/{0}:refs/remotes/origin/{0}'.format(master_branch_name),
+                    env=ANY
+                ),
+                call().git.sparse_checkout(
+                    'set',
+                    '--no-cone',
+                    '/src/*/pkg_desc.json'
+                ),
+                call().git.reset('--hard', 'origin/{}'.format(master_branch_name))
             ]
         )
 
@@ -557,5 +725,426 @@ class UpdateRepoTest(TestCase):
         git_mock.init.create_remote.assert_not_called()
         git_mock.init.create_remote.fetch.assert_not_called()
 
+    @patch('remote_probe.RemoteProbe')
+    @patch('os.path.isdir')
+    @patch('os.listdir')
+    @patch('package_database_mgr.PackageDatabaseMgr')
+    @patch('git.Repo')
+    @patch('views.CliUpdateView')
+    def test_update_unchanged_repo(
+        self,
+        listener_mock,
+        git_mock,
+        pkg_mgr_mock,
+        listdir_mock,
+        isdir_mock,
+        probe_mock):
+        """
+        GIVEN the upstream heads of the master repo and of its package are the
+              ones of the last update.
+        WHEN  the user issues an update command.
+        THEN  the repository must not be synced, the package must be probed
+              in a batch and not fetched, and the events must be issued to
+              the view properly.
+
+        """
+        pkg_name = 'foo_pkg'
+        pkg_branch = 'foo_branch'
+        master_branch_name = 'master'
+        master_repo_id = 'fake_user/fake_repo_1'
+
+        isdir_mock.return_value = True
+        git_mock.return_value.head.commit.hexsha = 'fake_master_hash'
+        listdir_mock.return_value = [pkg_name]
+        git_mock.return_value.head.commit.hexsha = 'master_hash'
+        probe_mock.get_head.side_effect = lambda url, branch: (
+            'master_hash' if branch == master_branch_name else 'pkg_hash'
+        )
+        pkg_mgr_mock.get_remote_rev.return_value = 'pkg_hash'
+
+        cmd = UpdateCmd.UpdateRepoCmd(
+            pkg_mgr_mock,
+            master_repo_id,
+            master_branch_name,
+            probe=probe_mock
+        )
+        cmd.execute(listener_mock)
+
+        listener_mock.assert_has_calls(
+            [
+                call.on_repo_update_start(master_repo_id, master_branch_name),
+                call.on_update_progress(1, 0, 1, 'Syncing master repo ...'),
+                call.on_update_progress(1, 1, 1, 'Syncing master repo ...'),
+                call.on_repo_update_finish(master_repo_id, master_branch_name),
+                call.on_pkg_update_start(pkg_name, pkg_branch),
+                call.on_update_progress(1, 1, 1, 'Fetching {} ...'.format(pkg_name)),
+                call.on_pkg_update_finish(pkg_name, pkg_branch),
+            ]
+        )
+
+        probe_mock.get_head.assert_has_calls(
+            [
+                call(git_mock.return_value.remotes.origin.url, master_branch_name),
+                call('foo_repo', pkg_branch)
+            ]
+        )
+        probe_mock.probe_many.assert_called_once_with(['foo_repo'])
+
+        pkg_mgr_mock.get_remote_rev.assert_called_once_with(
+            pkg_name,
+            master_repo_id
+        )
+        pkg_mgr_mock.update_entries.assert_called_once_with(
+            [
+                (pkg_name, 'pkg_hash', master_repo_id)
+            ]
+        )
+
+        git_mock.return_value.remotes.origin.fetch.assert_not_called()
+        git_mock.return_value.git.reset.assert_not_called()
+
+    @patch('remote_probe.RemoteProbe')
+    @patch('os.path.isdir')
+    @patch('os.listdir')
+    @patch('package_database_mgr.PackageDatabaseMgr')
+    @patch('git.Repo')
+    @patch('views.CliUpdateView')
+    def test_update_changed_repo(
+        self,
+        listener_mock,
+        git_mock,
+        pkg_mgr_mock,
+        listdir_mock,
+        isdir_mock,
+        probe_mock):
+        """
+        GIVEN the upstream heads of the master repo and of its package differ
+              from the ones of the last update.
+        WHEN  the user issues an update command.
+        THEN  the repository must be synced and the package must be fetched.
+
+        """
+        pkg_name = 'foo_pkg'
+        master_branch_name = 'master'
+        master_repo_id = 'fake_user/fake_repo_1'
+
+        isdir_mock.return_value = True
+        git_mock.return_value.head.commit.hexsha = 'fake_master_hash'
+        listdir_mock.return_value = [pkg_name]
+        git_mock.return_value.head.commit.hexsha = 'old_master_hash'
+        probe_mock.get_head.side_effect = lambda url, branch: (
+            'master_hash' if branch == master_branch_name else 'pkg_hash'
+        )
+        pkg_mgr_mock.get_remote_rev.return_value = 'old_pkg_hash'
+
+        cmd = UpdateCmd.UpdateRepoCmd(
+            pkg_mgr_mock,
+            master_repo_id,
+            master_branch_name,
+            probe=probe_mock
+        )
+        cmd.execute(listener_mock)
+
+        git_mock.return_value.remotes.origin.fetch.assert_has_calls(
+            [
+                call('+refs/heads/master:refs/remotes/origin/master', env=ANY),
+                call(progress=ANY, env=ANY)
+            ]
+        )
+        git_mock.return_value.git.reset.assert_called_once_with(
+            '--hard',
+            'origin/master'
+        )
+
+    @patch('remote_probe.RemoteProbe')
+    @patch('os.path.isdir')
+    @patch('os.listdir')
+    @patch('package_database_mgr.PackageDatabaseMgr')
+    @patch('git.Repo')
+    @patch('views.CliUpdateView')
+    def test_update_with_adaptive_schedule(
+        self,
+        listener_mock,
+        git_mock,
+        pkg_mgr_mock,
+        listdir_mock,
+        isdir_mock,
+        probe_mock):
+        """
+        GIVEN the master repo contains a package which isn't due for a check
+              and a package without check statistics.
+        WHEN  the user issues an update command with an adaptive schedule.
+        THEN  only the package without statistics must be checked and its
+              check must be recorded.
+
+        """
+        master_branch_name = 'master'
+        master_repo_id = 'fake_user/fake_repo_1'
+
+        isdir_mock.return_value = True
+        listdir_mock.return_value = ['foo_pkg', 'bar_pkg']
+        git_mock.return_value.head.commit.hexsha = 'master_hash'
+        probe_mock.get_head.side_effect = lambda url, branch: (
+            'master_hash' if branch == master_branch_name else 'pkg_hash'
+        )
+        pkg_mgr_mock.get_remote_rev.return_value = 'pkg_hash'
+        pkg_mgr_mock.get_stats.side_effect = lambda pkg_name, repo_id: (
+            { 'next_check': time() + 3600 } if pkg_name == 'foo_pkg' else None
+        )
+
+        cmd = UpdateCmd.UpdateRepoCmd(
+            pkg_mgr_mock,
+            master_repo_id,
+            master_branch_name,
+            probe=probe_mock,
+            scheduler=PollScheduler()
+        )
+        cmd.execute(listener_mock)
+
+        listener_mock.on_pkg_update_start.assert_called_once_with(
+            'bar_pkg',
+            'bar_branch'
+        )
+        pkg_mgr_mock.update_entries.assert_called_once_with(
+            [
+                ('bar_pkg', 'pkg_hash', master_repo_id)
+            ]
+        )
+
+        pkg_mgr_mock.set_stats_many.assert_called_once_with(
+            [
+                ('bar_pkg', master_repo_id, ANY)
+            ]
+        )
+        stats = pkg_mgr_mock.set_stats_many.call_args[0][0][0][2]
+        self.assertGreater(stats['next_check'], stats['last_check'])
+
+    @patch('git_plumbing.GitPlumbing.resolve_heads', autospec=True)
+    @patch('os.path.isdir')
+    @patch('os.listdir')
+    @patch('package_database_mgr.PackageDatabaseMgr')
+    @patch('git.Repo')
+    @patch('views.CliUpdateView')
+    def test_update_repo_resolves_heads_once(
+        self,
+        listener_mock,
+        git_mock,
+        pkg_mgr_mock,
+        listdir_mock,
+        isdir_mock,
+        resolve_heads_mock):
+        """
+        GIVEN the master repo contains multiple packages.
+        WHEN  the user issues an update command.
+        THEN  the heads of all the fetched packages must be resolved in a
+              single pass, once the packages were fetched.
+
+        """
+        pkg_names = ['foo_pkg', 'bar_pkg', 'baz_pkg', 'qux_pkg']
+        pkg_branches = ['foo_branch', 'bar_branch', 'baz_branch', 'qux_branch']
+        master_repo_id = 'fake_user/fake_repo_1'
+
+        isdir_mock.return_value = True
+        git_mock.return_value.head.commit.hexsha = 'fake_master_hash'
+        listdir_mock.return_value = pkg_names
+        resolve_heads_mock.side_effect = lambda plumbing, branches: [
+            '{}_hash'.format(branch_name) for _, branch_name in branches
+        ]
+
+        cmd = UpdateCmd.UpdateRepoCmd(pkg_mgr_mock, master_repo_id, 'master')
+        cmd.execute(listener_mock)
+
+        resolve_heads_mock.assert_called_once_with(
+            ANY,
+            [(ANY, pkg_branch) for pkg_branch in pkg_branches]
+        )
+        pkg_mgr_mock.update_entries.assert_called_once_with(
+            [
+                (pkg_name, '{}_hash'.format(pkg_branch), master_repo_id)
+                for pkg_name, pkg_branch in zip(pkg_names, pkg_branches)
+            ]
+        )
+
+class UpdateRepoTreeDiffTest(TestCase):
+
+    """
+    Implementation of unit tests for the changes of package descriptions
+    applied by update repo command, with real git repositories.
+
+    """
+
+    def setUp(self):
+        """
+        Suite setup: create the upstream repositories and initialize the
+        master repository.
+
+        """
+        self.old_dir = getcwd()
+        self.tmp_dir = mkdtemp()
+        self.repo_id = 'fake_user/fake_repo'
+
+        chdir(self.tmp_dir)
+
+        self.pkg_urls = [
+            self.__create_upstream('pkg_upstream_{}'.format(i), {})
+            for i in range(2)
+        ]
+        self.master_url = self.__create_upstream(
+            'master_upstream',
+            {
+                'src/foo_pkg/pkg_desc.json': self.__pkg_desc('foo_pkg', 0),
+                'src/bar_pkg/pkg_desc.json': self.__pkg_desc('bar_pkg', 0)
+            }
+        )
+
+        with patch('package_database_mgr.PackageDatabaseMgr') as pkg_mgr_mock:
+            UpdateCmd.InitializeRepoCmd(
+                pkg_mgr_mock,
+                self.repo_id,
+                'master',
+                self.master_url
+            ).execute(MagicMock())
+
+    def tearDown(self):
+        """
+        Suite teardown.
+
+        """
+        chdir(self.old_dir)
+        rmtree(self.tmp_dir)
+
+    def __pkg_desc(self, pkg_name, upstream):
+        """
+        Get the content of a package description.
+
+        """
+        return dumps(
+            {
+                'name': pkg_name,
+                'repo': 'file://{}/pkg_upstream_{}'.format(self.tmp_dir, upstream),
+                'branch': 'master'
+            }
+        )
+
+    def __commit(self, repo, files):
+        """
+        Commit files (None to delete them) into a repository.
+
+        """
+        for path, content in files.items():
+            file_path = '{}/{}'.format(repo.working_tree_dir, path)
+
+            if content is None:
+                repo.git.rm(path)
+                continue
+
+            makedirs(dirname(file_path), exist_ok=True)
+            with open(file_path, 'w') as f:
+                f.write(content)
+
+            repo.git.add(path)
+
+        repo.git.commit(
+            '--allow-empty',
+            '-m', 'fake commit',
+            '--author', 'fake <fake@fake>',
+            env={
+                'GIT_COMMITTER_NAME': 'fake',
+                'GIT_COMMITTER_EMAIL': 'fake@fake'
+            }
+        )
+
+    def __create_upstream(self, name, files):
+        """
+        Create an upstream repository.
+
+        :returns: The upstream url.
+
+        """
+        repo = git.Repo.init('{}/{}'.format(self.tmp_dir, name))
+        repo.git.checkout('-b', 'master')
+        self.__commit(repo, files)
+
+        return 'file://{}/{}'.format(self.tmp_dir, name)
+
+    def test_apply_tree_diff(self):
+        """
+        GIVEN a package of the master repository was deleted, another one
+              moved to a new upstream and a new one was added.
+        WHEN  the user issues an update command.
+        THEN  the deleted package must be removed, the moved one must be
+              fetched from its new upstream and the new one must be added.
+
+        """
+        self.__commit(
+            git.Repo('{}/master_upstream'.format(self.tmp_dir)),
+            {
+                'src/foo_pkg/pkg_desc.json': self.__pkg_desc('foo_pkg', 1),
+                'src/bar_pkg/pkg_desc.json': None,
+                'src/qux_pkg/pkg_desc.json': self.__pkg_desc('qux_pkg', 0)
+            }
+        )
+
+        pkg_mgr_mock = MagicMock()
+        pkg_mgr_mock.is_pkg_installed.return_value = False
+        listener_mock = MagicMock()
+
+        UpdateCmd.UpdateRepoCmd(
+            pkg_mgr_mock,
+            self.repo_id,
+            'master'
+        ).execute(listener_mock)
+
+        listener_mock.on_pkg_remove.assert_called_once_with('bar_pkg')
+        pkg_mgr_mock.remove_entries.assert_called_once_with(
+            [('bar_pkg', self.repo_id)]
+        )
+        pkg_mgr_mock.add_entries.assert_called_once_with(
+            [('qux_pkg', ANY, self.repo_id)]
+        )
+        pkg_mgr_mock.update_entries.assert_called_once_with(
+            [('foo_pkg', ANY, self.repo_id)]
+        )
+
+        self.assertFalse(isdir('{}/src/bar_pkg'.format(self.repo_id)))
+        self.assertEqual(
+            git.Repo('{}/src/foo_pkg/.repo'.format(self.repo_id)).remotes.origin.url,
+            self.pkg_urls[1]
+        )
+
+    def test_apply_tree_diff_of_installed_package(self):
+        """
+        GIVEN the description of an installed package of the master repository
+              was deleted.
+        WHEN  the user issues an update command twice.
+        THEN  the removal must be reported, but the package entry and the
+              package repository must be kept, and the next update must skip
+              the package.
+
+        """
+        self.__commit(
+            git.Repo('{}/master_upstream'.format(self.tmp_dir)),
+            {'src/bar_pkg/pkg_desc.json': None}
+        )
+
+        pkg_mgr_mock = MagicMock()
+        pkg_mgr_mock.is_pkg_installed.side_effect = \
+            lambda pkg_name, repo_id=None: pkg_name == 'bar_pkg'
+        listener_mock = MagicMock()
+
+        for _ in range(2):
+            UpdateCmd.UpdateRepoCmd(
+                pkg_mgr_mock,
+                self.repo_id,
+                'master'
+            ).execute(listener_mock)
+
+        listener_mock.on_pkg_remove.assert_called_once_with('bar_pkg')
+        listener_mock.on_error.assert_not_called()
+        pkg_mgr_mock.is_pkg_installed.assert_any_call('bar_pkg', self.repo_id)
+        pkg_mgr_mock.remove_entries.assert_not_called()
+
+        self.assertTrue(isdir('{}/src/bar_pkg/.repo'.format(self.repo_id)))
+
 if __name__ == "__main__":
     main()